@@ -0,0 +1,78 @@
+"""
+Comando de gestión: prune_tokens
+────────────────────────────────
+Elimina los refresh tokens vencidos de la blacklist de simplejwt
+(``OutstandingToken`` y sus ``BlacklistedToken``, que caen en cascada).
+Un token vencido ya no autentica: conservarlo solo hace crecer las tablas que
+se consultan en cada refresh y en cada revocación de sesiones.
+
+Borra por lotes de ids para no bloquear las tablas con un único DELETE.
+
+Uso:
+    python manage.py prune_tokens
+    python manage.py prune_tokens --grace-days 7
+    python manage.py prune_tokens --batch-size 20000 --dry-run
+
+Pensado para ejecutarse como cron diario.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Elimina los tokens JWT vencidos (outstanding y blacklisted)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-days",
+            type=int,
+            default=0,
+            help="Conservar tokens vencidos hace menos de N días (default: 0).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Tokens por DELETE (default: 5000).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Solo contar, sin borrar.",
+        )
+
+    def handle(self, *args, **options):
+        from rest_framework_simplejwt.token_blacklist.models import (
+            BlacklistedToken, OutstandingToken,
+        )
+
+        if options["grace_days"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--grace-days no puede ser negativo y --batch-size debe ser mayor que 0.")
+
+        cutoff = timezone.now() - timedelta(days=options["grace_days"])
+        expired = OutstandingToken.objects.filter(expires_at__lt=cutoff)
+
+        if options["dry_run"]:
+            outstanding = expired.count()
+            blacklisted = BlacklistedToken.objects.filter(token__expires_at__lt=cutoff).count()
+            self.stdout.write(
+                f"[dry-run] {outstanding} tokens vencidos ({blacklisted} en blacklist) antes de {cutoff:%Y-%m-%d %H:%M}."
+            )
+            return
+
+        outstanding = blacklisted = 0
+        while True:
+            ids = list(expired.order_by("id").values_list("id", flat=True)[: options["batch_size"]])
+            if not ids:
+                break
+            _, per_model = OutstandingToken.objects.filter(id__in=ids).delete()
+            outstanding += per_model.get(OutstandingToken._meta.label, 0)
+            blacklisted += per_model.get(BlacklistedToken._meta.label, 0)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {outstanding} tokens vencidos eliminados ({blacklisted} en blacklist)."
+        ))
@@ -51,13 +51,8 @@ class UserSerializer(serializers.ModelSerializer):
         ]
 
     def get_puntos(self, obj):
-        from gamification.models import UserPoints
-        from django.db.models import Sum
-        return (
-            UserPoints.objects
-            .filter(user=obj, status=UserPoints.Status.APPROVED)
-            .aggregate(total=Sum("points"))["total"] or 0
-        )
+        from gamification.services import approved_points
+        return approved_points(obj)
 
     def get_active_membership(self, obj):
         membership = obj.active_membership
@@ -10,10 +10,37 @@ python manage.py migrate --no-input 2>&1
 echo "==> Recolectando estáticos..."
 python manage.py collectstatic --no-input 2>&1
 
-echo "==> Iniciando servidor..."
+# Worker de la cola core.jobs (emails de invitación, etc.) junto al servidor web.
+# Se reinicia si termina. Con un servicio aparte que corra `manage.py run_jobs`
+# (Procfile: worker) desactivarlo con RUN_JOBS_WORKER=0.
+if [ "${RUN_JOBS_WORKER:-1}" = "1" ]; then
+  echo "==> Iniciando worker de trabajos en segundo plano..."
+  (
+    while true; do
+      python manage.py run_jobs || true
+      echo "==> run_jobs terminó; reiniciando en 5s..."
+      sleep 5
+    done
+  ) &
+fi
+
+echo "==> Iniciando servidor (${SERVER_MODE:-wsgi})..."
+# SERVER_MODE=asgi: workers uvicorn (config.asgi). Comparar ambos modos con
+# `manage.py bench_http` antes de cambiar el default. Las exportaciones CSV
+# siguen en streaming en ambos modos: con ASGI core.exports entrega un iterador
+# asíncrono por lotes en vez de dejar que Django bufferice el archivo entero.
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+  exec gunicorn config.asgi:application \
+    --worker-class uvicorn_worker.UvicornWorker \
+    --bind "0.0.0.0:${PORT:-8000}" \
+    --workers "${WEB_CONCURRENCY:-2}" \
+    --timeout 120 \
+    --log-level info
+fi
+
 exec gunicorn config.wsgi:application \
   --bind "0.0.0.0:${PORT:-8000}" \
-  --workers 2 \
+  --workers "${WEB_CONCURRENCY:-2}" \
   --threads 2 \
   --timeout 120 \
   --log-level info
@@ -5,52 +5,72 @@ Supported keys:
   workouts_completed   — total completed WorkoutSessions
   challenges_completed — completed ChallengeParticipations
   checkins             — total CheckIns
-"""
-from django.db import transaction
 
+Cada contador se consulta una sola vez por llamada, sin importar cuántas
+insignias lo usen, y solo si alguna insignia pendiente lo necesita. Las
+señales pasan ``keys`` para evaluar únicamente los contadores que el evento
+pudo cambiar.
+"""
 from .models import Badge, ChallengeParticipation, UserBadge
 
 
-def check_and_award_badges(user):
-    """Award any unearned badges whose conditions the user now meets."""
+def _parse_condition(condition: str):
+    try:
+        key, raw_value = condition.split(":", 1)
+        return key, int(raw_value)
+    except (ValueError, AttributeError):
+        return None, None
+
+
+def _count_workouts(user) -> int:
+    from workouts.models import WorkoutSession
+    return WorkoutSession.objects.filter(user=user, status="completed").count()
+
+
+def _count_challenges(user) -> int:
+    return ChallengeParticipation.objects.filter(
+        user=user, status=ChallengeParticipation.ParticipationStatus.COMPLETED
+    ).count()
+
+
+def _count_checkins(user) -> int:
+    from gyms.models import CheckIn
+    return CheckIn.objects.filter(user=user).count()
+
+
+_COUNTERS = {
+    "workouts_completed": _count_workouts,
+    "challenges_completed": _count_challenges,
+    "checkins": _count_checkins,
+}
+
+
+def check_and_award_badges(user, keys=None) -> int:
+    """
+    Award any unearned badges whose conditions the user now meets.
+    ``keys`` limita la evaluación a esos contadores. Devuelve cuántas se otorgaron.
+    """
     if not user.gym_id:
-        return
+        return 0
 
-    already_earned = set(
-        UserBadge.objects.filter(user=user).values_list("badge_id", flat=True)
+    candidates = (
+        Badge.objects.filter(gym_id=user.gym_id)
+        .exclude(awards__user=user)
+        .values_list("id", "condition")
     )
-    candidates = Badge.objects.filter(gym_id=user.gym_id).exclude(id__in=already_earned)
 
-    with transaction.atomic():
-        for badge in candidates:
-            if _meets_condition(user, badge.condition):
-                UserBadge.objects.get_or_create(user=user, badge=badge)
+    pending: dict[str, list] = {}
+    for badge_id, condition in candidates:
+        key, threshold = _parse_condition(condition)
+        if key not in _COUNTERS or (keys is not None and key not in keys):
+            continue
+        pending.setdefault(key, []).append((badge_id, threshold))
 
+    earned = []
+    for key, badges in pending.items():
+        total = _COUNTERS[key](user)
+        earned += [UserBadge(user=user, badge_id=b) for b, threshold in badges if total >= threshold]
 
-def _meets_condition(user, condition: str) -> bool:
-    try:
-        key, raw_value = condition.split(":", 1)
-        threshold = int(raw_value)
-    except (ValueError, AttributeError):
-        return False
-
-    if key == "workouts_completed":
-        from workouts.models import WorkoutSession
-        return (
-            WorkoutSession.objects.filter(user=user, status="completed").count()
-            >= threshold
-        )
-
-    if key == "challenges_completed":
-        return (
-            ChallengeParticipation.objects.filter(
-                user=user, status=ChallengeParticipation.ParticipationStatus.COMPLETED
-            ).count()
-            >= threshold
-        )
-
-    if key == "checkins":
-        from gyms.models import CheckIn
-        return CheckIn.objects.filter(user=user).count() >= threshold
-
-    return False
+    if earned:
+        UserBadge.objects.bulk_create(earned, ignore_conflicts=True)
+    return len(earned)
@@ -46,7 +46,7 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         from challenges.models import Challenge, ChallengeParticipation
-        from challenges.services import _notify
+        from gyms.notifications import notify_many
 
         gym_id = options["gym_id"]
         dry_run = options["dry_run"]
@@ -114,21 +114,20 @@ class Command(BaseCommand):
                 )
             )
 
-            # 3. Notificar a cada atleta afectado (fuera de la transacción para no bloquear)
-            for p in drop_list:
-                try:
-                    _notify(
-                        recipient_id=p.user_id,
-                        notification_type="challenge_rejected",
-                        title=f'Reto expirado: {challenge.name}',
-                        message=(
-                            f'El reto "{challenge.name}" finalizó el {challenge.end_date} '
-                            f'sin que se completara tu participación.'
-                        ),
-                    )
-                    notified_count += 1
-                except Exception as exc:
-                    logger.warning("No se pudo notificar a user %s: %s", p.user_id, exc)
+            # 3. Notificar a los atletas afectados en lote (fuera de la transacción para no bloquear)
+            try:
+                notified_count += notify_many(
+                    [p.user_id for p in drop_list],
+                    notification_type="challenge_rejected",
+                    title=f'Reto expirado: {challenge.name}',
+                    message=(
+                        f'El reto "{challenge.name}" finalizó el {challenge.end_date} '
+                        f'sin que se completara tu participación.'
+                    ),
+                    gym_id=challenge.gym_id,
+                )
+            except Exception as exc:
+                logger.warning("No se pudo notificar el cierre del reto %s: %s", challenge.pk, exc)
 
         # Resumen
         self.stdout.write("\n-- Resumen ----------------------------------")
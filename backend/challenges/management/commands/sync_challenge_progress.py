@@ -3,10 +3,18 @@ Comando de gestión: sync_challenge_progress
 ────────────────────────────────────────────
 Recalcula el progreso de todas las participaciones automáticas activas.
 
+Por defecto trabaja reto por reto y por lotes: una consulta agrupada y un
+``bulk_update`` por lote (services.sync_all_active_participations).
+``--per-row`` usa el recálculo individual (sync_participation_progress), que
+además reconstruye los eventos de cada participación; sirve para reparar y
+para comparar tiempos.
+
 Uso:
     python manage.py sync_challenge_progress
     python manage.py sync_challenge_progress --gym-id <uuid>
+    python manage.py sync_challenge_progress --batch-size 1000
     python manage.py sync_challenge_progress --dry-run
+    python manage.py sync_challenge_progress --per-row
 
 Casos de uso:
   - Ejecutar como cron job nocturno para mantener el progreso actualizado.
@@ -15,8 +23,10 @@ Casos de uso:
 """
 
 import logging
+import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 
 logger = logging.getLogger(__name__)
 
@@ -31,22 +41,81 @@ class Command(BaseCommand):
             default=None,
             help="Limitar la sincronización a un gimnasio específico (UUID).",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Participaciones por consulta agrupada / bulk_update (default: 500).",
+        )
         parser.add_argument(
             "--dry-run",
             action="store_true",
             default=False,
             help="Calcular sin guardar cambios. Útil para auditoría.",
         )
+        parser.add_argument(
+            "--per-row",
+            action="store_true",
+            default=False,
+            help="Recalcular participación por participación (ruta de reparación).",
+        )
 
     def handle(self, *args, **options):
-        from challenges.models import Challenge, ChallengeParticipation
-        from challenges.services import sync_participation_progress, compute_auto_progress
+        from challenges.services import SYNC_BATCH_SIZE
 
-        gym_id = options["gym_id"]
-        dry_run = options["dry_run"]
+        batch_size = options["batch_size"] or SYNC_BATCH_SIZE
+        if batch_size < 1:
+            raise CommandError("--batch-size debe ser mayor que 0.")
+        if options["dry_run"] and options["per_row"]:
+            raise CommandError("--dry-run solo está disponible en modo por lotes.")
 
-        if dry_run:
+        if options["dry_run"]:
             self.stdout.write(self.style.WARNING("Modo DRY-RUN activado. No se guardarán cambios.\n"))
+        if options["gym_id"]:
+            self.stdout.write(f"Filtrando por gym_id: {options['gym_id']}\n")
+
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            if options["per_row"]:
+                totals = self._sync_per_row(options["gym_id"])
+            else:
+                totals = self._sync_batched(options["gym_id"], batch_size, options["dry_run"])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write("\n── Resumen ──────────────────────────")
+        self.stdout.write(f"  Procesadas : {totals['processed']}")
+        self.stdout.write(f"  Cambiadas  : {totals['updated']}")
+        self.stdout.write(self.style.SUCCESS(f"  Completadas: {totals['completed']}"))
+        if totals["errors"]:
+            self.stdout.write(self.style.ERROR(f"  Errores    : {totals['errors']}"))
+        self.stdout.write(f"  Tiempo     : {elapsed:.2f}s · {queries} consultas")
+        self.stdout.write("─────────────────────────────────────\n")
+
+    def _sync_batched(self, gym_id, batch_size, dry_run):
+        from challenges.services import sync_all_active_participations
+
+        def report(challenge, summary):
+            line = (
+                f"  {challenge.name}: {summary['processed']} procesadas, "
+                f"{summary['updated']} cambiadas, {summary['completed']} "
+                f"{'completarían' if dry_run else 'completadas'}"
+            )
+            self.stdout.write(self.style.ERROR(line) if summary["errors"] else line)
+
+        return sync_all_active_participations(
+            gym_id=gym_id, batch_size=batch_size, dry_run=dry_run, on_challenge=report,
+        )
+
+    def _sync_per_row(self, gym_id):
+        from challenges.models import Challenge, ChallengeParticipation
+        from challenges.services import sync_participation_progress
 
         queryset = (
             ChallengeParticipation.objects
@@ -57,56 +126,27 @@ class Command(BaseCommand):
                 status=ChallengeParticipation.ParticipationStatus.JOINED,
             )
         )
-
         if gym_id:
             queryset = queryset.filter(challenge__gym_id=gym_id)
-            self.stdout.write(f"Filtrando por gym_id: {gym_id}\n")
 
         total = queryset.count()
         self.stdout.write(f"Participaciones a procesar: {total}\n")
-
-        updated = 0
-        completed = 0
-        errors = 0
+        totals = {"processed": 0, "updated": 0, "completed": 0, "errors": 0}
 
         for participation in queryset.iterator(chunk_size=100):
             try:
-                if dry_run:
-                    new_progress = compute_auto_progress(participation)
-                    will_complete = new_progress >= participation.challenge.goal_value
-                    self.stdout.write(
-                        f"  [DRY] {participation.user.email} / {participation.challenge.name}: "
-                        f"progreso {participation.progress} → {new_progress}"
-                        f"{' ✓ COMPLETARÍA' if will_complete else ''}"
-                    )
-                    updated += 1
-                    if will_complete:
-                        completed += 1
-                else:
-                    before_status = participation.status
-                    sync_participation_progress(participation)
-                    participation.refresh_from_db()
-                    updated += 1
-                    if (
-                        participation.status == ChallengeParticipation.ParticipationStatus.COMPLETED
-                        and before_status != participation.status
-                    ):
-                        completed += 1
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f"  ✓ Completado: {participation.user.email} / {participation.challenge.name}"
-                            )
-                        )
+                before = participation.progress
+                sync_participation_progress(participation)
+                totals["processed"] += 1
+                if participation.progress != before:
+                    totals["updated"] += 1
+                if participation.status == ChallengeParticipation.ParticipationStatus.COMPLETED:
+                    totals["completed"] += 1
             except Exception as exc:
-                errors += 1
+                totals["errors"] += 1
                 logger.error("Error en participación %s: %s", participation.pk, exc)
-                self.stdout.write(
-                    self.style.ERROR(f"  ✗ Error en {participation.pk}: {exc}")
-                )
+                self.stdout.write(self.style.ERROR(f"  ✗ Error en {participation.pk}: {exc}"))
 
-        self.stdout.write("\n── Resumen ──────────────────────────")
-        self.stdout.write(f"  Procesadas : {updated}")
-        self.stdout.write(self.style.SUCCESS(f"  Completadas: {completed}"))
-        if errors:
-            self.stdout.write(self.style.ERROR(f"  Errores    : {errors}"))
-        self.stdout.write("─────────────────────────────────────\n")
+            if totals["processed"] % 500 == 0:
+                self.stdout.write(f"  … {totals['processed']}/{total}")
+        return totals
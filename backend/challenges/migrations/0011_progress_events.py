@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:04
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0010_add_is_winner_to_participation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challengeparticipation',
+            name='progress_synced_at',
+            field=models.DateTimeField(blank=True, help_text='Último recálculo completo. Null = el progreso aún no tiene eventos registrados.', null=True),
+        ),
+        migrations.CreateModel(
+            name='ChallengeProgressEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('event_key', models.CharField(max_length=64)),
+                ('participation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_events', to='challenges.challengeparticipation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event_key'], name='challenges__event_k_bf4654_idx')],
+                'unique_together': {('participation', 'event_key')},
+            },
+        ),
+    ]
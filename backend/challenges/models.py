@@ -128,6 +128,11 @@ class ChallengeParticipation(BaseModel):
         default=False,
         help_text="True si el staff declaró a este atleta ganador del reto.",
     )
+    progress_synced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Último recálculo completo. Null = el progreso aún no tiene eventos registrados.",
+    )
 
     class Meta:
         unique_together = ("challenge", "user")
@@ -152,6 +157,28 @@ class ChallengeParticipation(BaseModel):
         return min(100, round(self.progress * 100 / goal))
 
 
+class ChallengeProgressEvent(BaseModel):
+    """
+    Evento que ya sumó al progreso de una participación automática.
+    La clave (``checkin:<id>``, ``workout:<id>``, ``meal_day:<fecha>``) hace
+    idempotente el incremento: guardar dos veces lo mismo no cuenta doble.
+    """
+
+    participation = models.ForeignKey(
+        ChallengeParticipation,
+        related_name="progress_events",
+        on_delete=models.CASCADE,
+    )
+    event_key = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ("participation", "event_key")
+        indexes = [models.Index(fields=["event_key"])]
+
+    def __str__(self) -> str:
+        return f"{self.participation_id} · {self.event_key}"
+
+
 class Badge(BaseModel):
     gym = models.ForeignKey("gyms.Gym", related_name="badges", on_delete=models.CASCADE, null=True, blank=True)
     name = models.CharField(max_length=120)
@@ -17,8 +17,8 @@ import logging
 from datetime import date
 from typing import TYPE_CHECKING
 
-from django.db import transaction
-
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.utils import timezone
 
 if TYPE_CHECKING:
@@ -64,9 +64,9 @@ def _count_nutrition(user_id, start_date: date, end_date: date) -> int:
     return (
         UserMealLog.objects.filter(
             user_id=user_id,
-            completed=True,
-            date__gte=str(start_date),
-            date__lte=str(end_date),
+            status=UserMealLog.MealLogStatus.COMPLETED,
+            date__gte=start_date,
+            date__lte=end_date,
         )
         .values("date")
         .distinct()
@@ -98,6 +98,164 @@ def compute_auto_progress(participation: "ChallengeParticipation") -> int:
     )
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Progreso incremental por eventos
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Cada check-in, sesión completada o día con comida completada es un evento con
+# clave estable. Las señales insertan (participación, clave) en
+# ChallengeProgressEvent y suman 1 al progreso solo si la fila es nueva; el
+# costo no depende de cuánto lleve el reto. El recuento completo
+# (sync_participation_progress) queda como vía de reparación y reconstruye
+# los eventos desde el historial.
+
+def _attendance_keys(user_id, start_date: date, end_date: date) -> list[str]:
+    from gyms.models import CheckIn
+    ids = CheckIn.objects.filter(
+        user_id=user_id,
+        timestamp__date__gte=start_date,
+        timestamp__date__lte=end_date,
+    ).values_list("pk", flat=True)
+    return [f"checkin:{pk}" for pk in ids]
+
+
+def _workout_keys(user_id, start_date: date, end_date: date) -> list[str]:
+    from workouts.models import WorkoutSession
+    ids = WorkoutSession.objects.filter(
+        user_id=user_id,
+        status=WorkoutSession.Status.COMPLETED,
+        performed_at__date__gte=start_date,
+        performed_at__date__lte=end_date,
+    ).values_list("pk", flat=True)
+    return [f"workout:{pk}" for pk in ids]
+
+
+def _nutrition_keys(user_id, start_date: date, end_date: date) -> list[str]:
+    from nutrition.models import UserMealLog
+    days = (
+        UserMealLog.objects.filter(
+            user_id=user_id,
+            status=UserMealLog.MealLogStatus.COMPLETED,
+            date__gte=start_date,
+            date__lte=end_date,
+        )
+        .values_list("date", flat=True)
+        .distinct()
+        .order_by()
+    )
+    return [f"meal_day:{day.isoformat()}" for day in days]
+
+
+_EVENT_KEY_COLLECTORS = {
+    "attendance": _attendance_keys,
+    "workouts": _workout_keys,
+    "nutrition": _nutrition_keys,
+}
+
+
+def _rebuild_progress_events(participation: "ChallengeParticipation") -> int:
+    """Reemplaza los eventos de la participación por los del historial. Devuelve el total."""
+    from .models import ChallengeParticipation, ChallengeProgressEvent
+
+    challenge = participation.challenge
+    keys = _EVENT_KEY_COLLECTORS[challenge.type](
+        participation.user_id, challenge.start_date, challenge.end_date,
+    )
+    now = timezone.now()
+    with transaction.atomic():
+        ChallengeProgressEvent.objects.filter(participation_id=participation.pk).delete()
+        ChallengeProgressEvent.objects.bulk_create(
+            [ChallengeProgressEvent(participation_id=participation.pk, event_key=k) for k in keys],
+            batch_size=1000,
+        )
+        ChallengeParticipation.objects.filter(pk=participation.pk).update(
+            progress=len(keys), progress_synced_at=now,
+        )
+    participation.progress = len(keys)
+    participation.progress_synced_at = now
+    return len(keys)
+
+
+def _apply_progress_event(participation: "ChallengeParticipation", event_key: str) -> None:
+    """Suma un evento a una participación si todavía no estaba registrado."""
+    from .models import ChallengeParticipation, ChallengeProgressEvent
+
+    if participation.progress_synced_at is None:
+        # Participación anterior al registro de eventos: se reconstruye una vez.
+        sync_participation_progress(participation)
+        return
+
+    try:
+        with transaction.atomic():
+            ChallengeProgressEvent.objects.create(participation_id=participation.pk, event_key=event_key)
+            ChallengeParticipation.objects.filter(pk=participation.pk).update(
+                progress=F("progress") + 1, last_update=timezone.now(),
+            )
+    except IntegrityError:
+        return  # evento repetido: ya contado
+
+    participation.progress = (
+        ChallengeParticipation.objects.filter(pk=participation.pk)
+        .values_list("progress", flat=True)
+        .order_by()
+        .first()
+    ) or 0
+    if participation.progress >= participation.challenge.goal_value:
+        _mark_completed(participation)
+
+
+def record_progress_event(user_id, challenge_type: str, event_key: str, event_date: date) -> int:
+    """
+    Registra un evento (check-in, sesión, día de nutrición) en las
+    participaciones automáticas activas del usuario cuyo período lo incluye.
+    Idempotente por ``event_key``. Devuelve cuántas participaciones se evaluaron.
+    """
+    from .models import Challenge, ChallengeParticipation
+
+    participations = list(
+        ChallengeParticipation.objects
+        .select_related("challenge", "user")
+        .filter(
+            user_id=user_id,
+            status=ChallengeParticipation.ParticipationStatus.JOINED,
+            challenge__type=challenge_type,
+            challenge__status=Challenge.Status.ACTIVE,
+            challenge__verification_type=Challenge.VerificationType.AUTOMATIC,
+            challenge__start_date__lte=event_date,
+            challenge__end_date__gte=event_date,
+        )
+    )
+    for participation in participations:
+        _apply_progress_event(participation, event_key)
+    return len(participations)
+
+
+def revoke_progress_event(user_id, event_key: str) -> int:
+    """
+    Descuenta un evento que dejó de valer (check-in borrado, sesión que ya no
+    está completada, día sin comidas completadas) de las participaciones
+    abiertas que lo habían contado. Devuelve cuántas se ajustaron.
+    """
+    from .models import ChallengeParticipation, ChallengeProgressEvent
+
+    events = ChallengeProgressEvent.objects.filter(
+        event_key=event_key,
+        participation__user_id=user_id,
+        participation__status=ChallengeParticipation.ParticipationStatus.JOINED,
+    )
+    with transaction.atomic():
+        participation_ids = list(events.values_list("participation_id", flat=True))
+        if not participation_ids:
+            return 0
+        ChallengeProgressEvent.objects.filter(
+            event_key=event_key, participation_id__in=participation_ids,
+        ).delete()
+        ChallengeParticipation.objects.filter(pk__in=participation_ids, progress__gt=0).update(
+            progress=F("progress") - 1, last_update=timezone.now(),
+        )
+    return len(participation_ids)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Otorgar puntos
 # ─────────────────────────────────────────────────────────────────────────────
@@ -197,11 +355,11 @@ def _mark_completed(participation: "ChallengeParticipation", verified_by_id=None
 
 def sync_participation_progress(participation: "ChallengeParticipation") -> "ChallengeParticipation":
     """
-    Recalcula el progreso de una participación automática y la completa
-    si supera el goal_value.
+    Recalcula desde el historial el progreso de una participación automática
+    (reconstruyendo sus eventos) y la completa si supera el goal_value.
+    Es la vía de reparación; el día a día lo cubre record_progress_event.
 
     Llaman a esta función:
-      - Las señales de CheckIn, WorkoutSession y UserMealLog.
       - El comando de gestión `sync_challenge_progress`.
       - El endpoint `sync_progress` (admin/coach).
     """
@@ -217,13 +375,10 @@ def sync_participation_progress(participation: "ChallengeParticipation") -> "Cha
     if participation.status == ChallengeParticipation.ParticipationStatus.COMPLETED:
         return participation
 
-    new_progress = compute_auto_progress(participation)
+    if challenge.type not in _EVENT_KEY_COLLECTORS:
+        return participation  # tipo no medible automáticamente
 
-    if new_progress != participation.progress:
-        ChallengeParticipation.objects.filter(pk=participation.pk).update(
-            progress=new_progress
-        )
-        participation.progress = new_progress
+    new_progress = _rebuild_progress_events(participation)
 
     if new_progress >= challenge.goal_value:
         _mark_completed(participation)
@@ -343,41 +498,149 @@ def reject_participation(
     return participation
 
 
-def sync_all_active_participations() -> dict:
+# ─────────────────────────────────────────────────────────────────────────────
+# Recálculo masivo (cron / sync-all)
+# ─────────────────────────────────────────────────────────────────────────────
+
+SYNC_BATCH_SIZE = 500
+
+
+def _grouped_counts(challenge: "Challenge", user_ids: list) -> dict:
+    """Progreso de varios atletas en un reto con una sola consulta agrupada por usuario."""
+    from django.db.models import Count
+
+    start, end = challenge.start_date, challenge.end_date
+    if challenge.type == "attendance":
+        from gyms.models import CheckIn
+        qs = CheckIn.objects.filter(timestamp__date__gte=start, timestamp__date__lte=end)
+        total = Count("id")
+    elif challenge.type == "workouts":
+        from workouts.models import WorkoutSession
+        qs = WorkoutSession.objects.filter(
+            status=WorkoutSession.Status.COMPLETED,
+            performed_at__date__gte=start,
+            performed_at__date__lte=end,
+        )
+        total = Count("id")
+    else:
+        from nutrition.models import UserMealLog
+        qs = UserMealLog.objects.filter(
+            status=UserMealLog.MealLogStatus.COMPLETED, date__gte=start, date__lte=end,
+        )
+        total = Count("date", distinct=True)
+
+    rows = (
+        qs.filter(user_id__in=user_ids)
+        .values("user_id")
+        .annotate(total=total)
+        .order_by()
+        .values_list("user_id", "total")
+    )
+    return dict(rows)
+
+
+def sync_challenge_batch(
+    challenge: "Challenge",
+    batch_size: int = SYNC_BATCH_SIZE,
+    dry_run: bool = False,
+) -> dict:
     """
-    Recalcula el progreso de todas las participaciones automáticas activas.
-    Usado por el comando de gestión y tareas periódicas (cron).
-    Devuelve un resumen del resultado.
+    Recalcula el progreso de todas las participaciones abiertas de un reto:
+    una consulta agrupada y un ``bulk_update`` por lote de ``batch_size``.
+    Solo las que cruzan ``goal_value`` pasan por _mark_completed.
+
+    Las filas cuyo progreso cambia quedan con ``progress_synced_at = None``:
+    su registro de eventos estaba desfasado y se reconstruye en el próximo
+    evento (ver _apply_progress_event).
     """
-    from .models import Challenge, ChallengeParticipation
+    from .models import ChallengeParticipation
+
+    summary = {"processed": 0, "updated": 0, "completed": 0, "errors": 0}
+    if challenge.type not in _EVENT_KEY_COLLECTORS:
+        return summary
 
     participations = (
         ChallengeParticipation.objects
-        .select_related("challenge", "user")
-        .filter(
-            challenge__status=Challenge.Status.ACTIVE,
-            challenge__verification_type=Challenge.VerificationType.AUTOMATIC,
-            status=ChallengeParticipation.ParticipationStatus.JOINED,
-        )
+        .filter(challenge=challenge, status=ChallengeParticipation.ParticipationStatus.JOINED)
+        .only("id", "user_id", "challenge_id", "progress", "status", "progress_synced_at")
+        .order_by("pk")
     )
+    batch: list = []
+
+    def flush():
+        counts = _grouped_counts(challenge, [p.user_id for p in batch])
+        changed, crossed = [], []
+        for p in batch:
+            new_progress = counts.get(p.user_id, 0)
+            if new_progress != p.progress:
+                p.progress = new_progress
+                p.progress_synced_at = None
+                changed.append(p)
+            if new_progress >= challenge.goal_value:
+                crossed.append(p)
+
+        summary["processed"] += len(batch)
+        summary["updated"] += len(changed)
+        if dry_run:
+            summary["completed"] += len(crossed)
+            return
 
-    updated = 0
-    completed = 0
-    errors = 0
-
-    for p in participations:
+        if changed:
+            ChallengeParticipation.objects.bulk_update(changed, ["progress", "progress_synced_at"])
+        for p in crossed:
+            p.challenge = challenge
+            try:
+                _mark_completed(p)
+                summary["completed"] += 1
+            except Exception as exc:
+                logger.error("Error completando participación %s: %s", p.pk, exc)
+                summary["errors"] += 1
+
+    for participation in participations.iterator(chunk_size=batch_size):
+        batch.append(participation)
+        if len(batch) >= batch_size:
+            flush()
+            batch = []
+    if batch:
+        flush()
+    return summary
+
+
+def sync_all_active_participations(
+    gym_id=None,
+    batch_size: int = SYNC_BATCH_SIZE,
+    dry_run: bool = False,
+    on_challenge=None,
+) -> dict:
+    """
+    Recalcula el progreso de todas las participaciones automáticas activas,
+    reto por reto y por lotes (sync_challenge_batch).
+    Usado por el comando de gestión, el endpoint sync-all y tareas periódicas (cron).
+    ``on_challenge(challenge, summary)`` se llama tras cada reto (reporte de avance).
+    Devuelve un resumen del resultado.
+    """
+    from .models import Challenge
+
+    challenges = Challenge.objects.filter(
+        status=Challenge.Status.ACTIVE,
+        verification_type=Challenge.VerificationType.AUTOMATIC,
+        type__in=list(_EVENT_KEY_COLLECTORS),
+    ).order_by("start_date", "pk")
+    if gym_id:
+        challenges = challenges.filter(gym_id=gym_id)
+
+    totals = {"processed": 0, "updated": 0, "completed": 0, "errors": 0}
+    for challenge in challenges:
         try:
-            before = p.status
-            sync_participation_progress(p)
-            p.refresh_from_db()
-            updated += 1
-            if p.status == ChallengeParticipation.ParticipationStatus.COMPLETED and before != p.status:
-                completed += 1
+            summary = sync_challenge_batch(challenge, batch_size=batch_size, dry_run=dry_run)
         except Exception as exc:
-            logger.error("Error sincronizando participación %s: %s", p.pk, exc)
-            errors += 1
-
-    return {"updated": updated, "completed": completed, "errors": errors}
+            logger.error("Error sincronizando reto %s: %s", challenge.pk, exc)
+            summary = {"processed": 0, "updated": 0, "completed": 0, "errors": 1}
+        for key, value in summary.items():
+            totals[key] += value
+        if on_challenge:
+            on_challenge(challenge, summary)
+    return totals
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -388,7 +651,7 @@ def notify_gym_athletes_new_challenge(challenge) -> int:
     """
     Envía una notificación a todos los atletas activos del gimnasio cuando
     se crea un nuevo reto. Devuelve la cantidad de notificaciones enviadas.
-    No interrumpe el flujo si falla alguna notificación individual.
+    Inserta por lotes (gyms.notifications.notify_many); no interrumpe el flujo si falla.
     """
     from django.contrib.auth import get_user_model
     User = get_user_model()
@@ -402,26 +665,54 @@ def notify_gym_athletes_new_challenge(challenge) -> int:
     else:
         target_roles = [challenge.target_role]
 
-    athletes = User.objects.filter(
+    recipient_ids = User.objects.filter(
         gym_id=challenge.gym_id,
         is_active=True,
         role__in=target_roles,
-    ).exclude(id=challenge.responsible_id)
+    ).exclude(id=challenge.responsible_id).values_list("id", flat=True)
 
     end_str = challenge.end_date.strftime("%d/%m/%Y") if challenge.end_date else "—"
-    sent = 0
-    for athlete in athletes:
-        _notify(
-            recipient_id=athlete.pk,
+    try:
+        from gyms.notifications import notify_many
+        return notify_many(
+            recipient_ids,
             notification_type="challenge",
             title=f"Nuevo reto: {challenge.name}",
             message=(
                 f"El reto '{challenge.name}' ya está disponible. "
                 f"Premio: {challenge.reward_points} pts. Hasta el {end_str}."
             ),
+            gym_id=challenge.gym_id,
         )
-        sent += 1
-    return sent
+    except Exception as exc:
+        logger.warning("No se pudo anunciar el reto %s: %s", challenge.pk, exc)
+        return 0
+
+
+def notify_new_challenge_job(challenge_id) -> int:
+    """Trabajo en segundo plano: anuncia un reto recién activado (ver core.jobs)."""
+    from .models import Challenge
+
+    challenge = Challenge.objects.filter(pk=challenge_id).first()
+    if not challenge or challenge.status != Challenge.Status.ACTIVE:
+        return 0
+    return notify_gym_athletes_new_challenge(challenge)
+
+
+def enqueue_new_challenge_announcement(challenge) -> None:
+    """
+    Encola el anuncio del reto para que la petición no espere al fan-out.
+    Idempotente por reto: reactivar el mismo reto no repite el anuncio.
+    """
+    from core.jobs import enqueue
+
+    if not challenge.gym_id:
+        return
+    enqueue(
+        "challenges.services.notify_new_challenge_job",
+        str(challenge.pk),
+        idempotency_key=f"challenge_announcement:{challenge.pk}",
+    )
 
 
 def declare_challenge_winner(
@@ -480,22 +771,23 @@ def declare_challenge_winner(
         ),
     )
 
-    # Notificar a todos los atletas del gym
+    # Notificar a todos los atletas del gym (en segundo plano)
     if challenge.gym_id:
-        athletes = User.objects.filter(
+        from gyms.notifications import notify_many
+        notify_many(
+            User.objects.filter(
+                gym_id=challenge.gym_id,
+                is_active=True,
+            ).exclude(pk=locked.user_id).values_list("id", flat=True),
+            notification_type="challenge",
+            title=f"🏆 Ganador del reto '{challenge.name}'",
+            message=(
+                f"{winner_name} ganó el reto '{challenge.name}' "
+                f"con {total_pts} puntos. ¡Participa en el próximo!"
+            ),
             gym_id=challenge.gym_id,
-            is_active=True,
-        ).exclude(pk=locked.user_id)
-        for athlete in athletes:
-            _notify(
-                recipient_id=athlete.pk,
-                notification_type="challenge",
-                title=f"🏆 Ganador del reto '{challenge.name}'",
-                message=(
-                    f"{winner_name} ganó el reto '{challenge.name}' "
-                    f"con {total_pts} puntos. ¡Participa en el próximo!"
-                ),
-            )
+            defer=True,
+        )
 
     locked.refresh_from_db()
     return locked
@@ -1,16 +1,20 @@
 """
 challenges/signals.py
 ─────────────────────
-Señales que disparan la sincronización automática del progreso de retos.
+Señales que alimentan el progreso automático de retos.
 
-Regla: las señales son delgadas. Solo obtienen las participaciones relevantes
-y delegan en services.sync_participation_progress().
+Regla: las señales son delgadas. Traducen cada escritura en un evento con
+clave estable y delegan en services.record_progress_event() /
+services.revoke_progress_event(), que ajustan el progreso por deltas.
+El recuento completo (sync_participation_progress) solo se usa para reparar.
 """
 
 import logging
+from datetime import date
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
 from .awards import check_and_award_badges
 
@@ -21,57 +25,58 @@ logger = logging.getLogger(__name__)
 # Helpers internos
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _sync_auto_participations(user_id, challenge_type: str) -> None:
-    """
-    Busca participaciones activas y automáticas del tipo indicado para
-    el usuario y lanza la sincronización de progreso en cada una.
-    """
-    from .models import Challenge, ChallengeParticipation
-    from .services import sync_participation_progress
+def _resolve_user(instance, receiver_name: str):
+    try:
+        return instance.user
+    except Exception:
+        logger.warning("%s: fallo acceso a instance.user (pk=%s), usando DB", receiver_name, instance.user_id)
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        return User.objects.filter(pk=instance.user_id).first()
 
-    participations = (
-        ChallengeParticipation.objects
-        .select_related("challenge", "user")
-        .filter(
-            user_id=user_id,
-            status=ChallengeParticipation.ParticipationStatus.JOINED,
-            challenge__type=challenge_type,
-            challenge__status=Challenge.Status.ACTIVE,
-            challenge__verification_type=Challenge.VerificationType.AUTOMATIC,
-        )
-    )
 
-    for participation in participations:
-        sync_participation_progress(participation)
+def _record(user_id, challenge_type: str, event_key: str, event_date) -> None:
+    from .services import record_progress_event
+    record_progress_event(user_id, challenge_type, event_key, event_date)
+
+
+def _revoke(user_id, event_key: str) -> None:
+    from .services import revoke_progress_event
+    revoke_progress_event(user_id, event_key)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Señales existentes (entrenamientos y badges)
+# Entrenamientos y badges
 # ─────────────────────────────────────────────────────────────────────────────
 
 @receiver(post_save, sender="workouts.WorkoutSession")
-def on_workout_session_save(sender, instance, **kwargs):
-    """Actualiza progreso de retos tipo 'workouts' cuando una sesión se completa."""
-    if instance.status != "completed" or not instance.user_id:
+def on_workout_session_save(sender, instance, created, **kwargs):
+    """Suma (o descuenta) la sesión en retos tipo 'workouts' según su estado."""
+    if not instance.user_id:
         return
 
     update_fields = kwargs.get("update_fields")
     if update_fields is not None and set(update_fields) == {"points_awarded"}:
         return
 
-    try:
-        user = instance.user
-    except Exception:
-        logger.warning("on_workout_session_save: fallo acceso a instance.user (pk=%s), usando DB", instance.user_id)
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        user = User.objects.filter(pk=instance.user_id).first()
+    event_key = f"workout:{instance.pk}"
+    if instance.status != "completed":
+        if not created:
+            _revoke(instance.user_id, event_key)
+        return
 
+    user = _resolve_user(instance, "on_workout_session_save")
     if not user or user.role != "athlete":
         return
 
-    _sync_auto_participations(instance.user_id, "workouts")
-    check_and_award_badges(user)
+    _record(instance.user_id, "workouts", event_key, timezone.localdate(instance.performed_at))
+    check_and_award_badges(user, keys={"workouts_completed"})
+
+
+@receiver(post_delete, sender="workouts.WorkoutSession")
+def on_workout_session_delete(sender, instance, **kwargs):
+    if instance.user_id:
+        _revoke(instance.user_id, f"workout:{instance.pk}")
 
 
 @receiver(post_save, sender="challenges.ChallengeParticipation")
@@ -80,64 +85,80 @@ def on_participation_save(sender, instance, **kwargs):
     if instance.status != "completed" or not instance.user_id:
         return
 
-    try:
-        user = instance.user
-    except Exception:
-        logger.warning("on_participation_save: fallo acceso a instance.user (pk=%s), usando DB", instance.user_id)
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        user = User.objects.filter(pk=instance.user_id).first()
-
+    user = _resolve_user(instance, "on_participation_save")
     if user:
-        check_and_award_badges(user)
-
+        check_and_award_badges(user, keys={"challenges_completed"})
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Nuevas señales — verificación automática
+# Verificación automática — asistencia y nutrición
 # ─────────────────────────────────────────────────────────────────────────────
 
 @receiver(post_save, sender="gyms.CheckIn")
 def on_checkin_save(sender, instance, created, **kwargs):
     """
-    Sincroniza progreso de retos tipo 'attendance' cuando el atleta
-    hace check-in en el gimnasio.
+    Suma el check-in en retos tipo 'attendance' del atleta.
     """
     if not created or not instance.user_id:
         return
 
-    try:
-        user = instance.user
-    except Exception:
-        logger.warning("on_checkin_save: fallo acceso a instance.user (pk=%s), usando DB", instance.user_id)
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        user = User.objects.filter(pk=instance.user_id).first()
-
+    user = _resolve_user(instance, "on_checkin_save")
     if not user or user.role != "athlete":
         return
 
-    _sync_auto_participations(instance.user_id, "attendance")
+    _record(instance.user_id, "attendance", f"checkin:{instance.pk}", timezone.localdate(instance.timestamp))
+    check_and_award_badges(user, keys={"checkins"})
+
+
+@receiver(post_delete, sender="gyms.CheckIn")
+def on_checkin_delete(sender, instance, **kwargs):
+    if instance.user_id:
+        _revoke(instance.user_id, f"checkin:{instance.pk}")
+
+
+def _meal_day(instance) -> date:
+    # ``date`` puede llegar como string si el log se creó sin pasar por un serializer.
+    value = instance.date
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _revoke_meal_day_if_empty(instance) -> None:
+    """El día deja de contar solo si no queda ninguna comida completada en él."""
+    from nutrition.models import UserMealLog
+
+    day = _meal_day(instance)
+    still_completed = UserMealLog.objects.filter(
+        user_id=instance.user_id,
+        date=day,
+        status=UserMealLog.MealLogStatus.COMPLETED,
+    ).exists()
+    if not still_completed:
+        _revoke(instance.user_id, f"meal_day:{day.isoformat()}")
 
 
 @receiver(post_save, sender="nutrition.UserMealLog")
-def on_meal_log_save(sender, instance, **kwargs):
+def on_meal_log_save(sender, instance, created, **kwargs):
     """
-    Sincroniza progreso de retos tipo 'nutrition' cuando el atleta
-    marca una comida como completada en su plan.
+    Suma el día en retos tipo 'nutrition' cuando el atleta marca una comida
+    como completada (un evento por día, sin importar cuántas comidas).
     """
-    if instance.status != "completed" or not instance.user_id:
+    if not instance.user_id:
         return
 
-    try:
-        user = instance.user
-    except Exception:
-        logger.warning("on_meal_log_save: fallo acceso a instance.user (pk=%s), usando DB", instance.user_id)
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        user = User.objects.filter(pk=instance.user_id).first()
+    if instance.status != "completed":
+        if not created:
+            _revoke_meal_day_if_empty(instance)
+        return
 
+    user = _resolve_user(instance, "on_meal_log_save")
     if not user or user.role != "athlete":
         return
 
-    _sync_auto_participations(instance.user_id, "nutrition")
+    day = _meal_day(instance)
+    _record(instance.user_id, "nutrition", f"meal_day:{day.isoformat()}", day)
+
+
+@receiver(post_delete, sender="nutrition.UserMealLog")
+def on_meal_log_delete(sender, instance, **kwargs):
+    if instance.user_id:
+        _revoke_meal_day_if_empty(instance)
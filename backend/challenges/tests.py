@@ -1,3 +1,166 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from gyms.models import CheckIn, Gym
+from workouts.models import WorkoutSession
+from .models import Badge, Challenge, ChallengeParticipation, ChallengeProgressEvent, UserBadge
+from .services import sync_all_active_participations, sync_challenge_batch, sync_participation_progress
+
+User = get_user_model()
+
+
+class IncrementalProgressTests(TestCase):
+    """El progreso automático se ajusta por eventos idempotentes, sin recontar el historial."""
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Progress Gym", slug="progress-gym")
+        self.athlete = User.objects.create_user(
+            email="athlete@progress.com", password="pass123",
+            role=User.Role.ATHLETE, gym=self.gym,
+        )
+        today = timezone.localdate()
+
+        def challenge(kind, goal):
+            return Challenge.objects.create(
+                gym=self.gym, name=f"Reto {kind}", type=kind, goal_value=goal,
+                status=Challenge.Status.ACTIVE, reward_points=40,
+                start_date=today - timedelta(days=7), end_date=today + timedelta(days=7),
+            )
+
+        self.attendance = ChallengeParticipation.objects.create(
+            challenge=challenge(Challenge.ChallengeType.ATTENDANCE, 2), user=self.athlete,
+        )
+        self.workouts = ChallengeParticipation.objects.create(
+            challenge=challenge(Challenge.ChallengeType.WORKOUTS, 5), user=self.athlete,
+        )
+        sync_participation_progress(self.attendance)
+        sync_participation_progress(self.workouts)
+
+    def _progress(self, participation):
+        participation.refresh_from_db()
+        return participation.progress
+
+    def _session(self, **kwargs):
+        return WorkoutSession.objects.create(
+            user=self.athlete, gym=self.gym, performed_at=timezone.now(),
+            status=WorkoutSession.Status.COMPLETED, **kwargs,
+        )
+
+    def test_duplicate_saves_do_not_double_count(self):
+        session = self._session()
+        session.notes = "editada"
+        session.save()
+        session.save()
+        self.assertEqual(self._progress(self.workouts), 1)
+        self.assertEqual(ChallengeProgressEvent.objects.filter(participation=self.workouts).count(), 1)
+
+    def test_status_change_and_delete_revoke_the_event(self):
+        session = self._session()
+        second = self._session()
+        session.status = WorkoutSession.Status.SKIPPED
+        session.save()
+        self.assertEqual(self._progress(self.workouts), 1)
+        second.delete()
+        self.assertEqual(self._progress(self.workouts), 0)
+
+    def test_crossing_goal_completes_participation(self):
+        CheckIn.objects.create(user=self.athlete, gym=self.gym)
+        CheckIn.objects.create(user=self.athlete, gym=self.gym)
+        self.attendance.refresh_from_db()
+        self.assertEqual(self.attendance.status, ChallengeParticipation.ParticipationStatus.COMPLETED)
+        self.assertEqual(self.attendance.points_earned, 40)
+
+    def test_checkin_cost_does_not_grow_with_history(self):
+        self.attendance.challenge.goal_value = 100
+        self.attendance.challenge.save()
+
+        def queries_for_checkin():
+            with CaptureQueriesContext(connection) as ctx:
+                CheckIn.objects.create(user=self.athlete, gym=self.gym)
+            return len(ctx.captured_queries)
+
+        queries_for_checkin()
+        short_history = queries_for_checkin()
+        for _ in range(10):
+            CheckIn.objects.create(user=self.athlete, gym=self.gym)
+        self.assertEqual(queries_for_checkin(), short_history)
+        self.assertEqual(self._progress(self.attendance), 13)
+
+    def test_repair_recount_rebuilds_events(self):
+        for _ in range(3):
+            self._session()
+        ChallengeProgressEvent.objects.filter(participation=self.workouts).delete()
+        ChallengeParticipation.objects.filter(pk=self.workouts.pk).update(progress=0)
+
+        sync_participation_progress(self.workouts)
+        self.assertEqual(self._progress(self.workouts), 3)
+        self.assertEqual(ChallengeProgressEvent.objects.filter(participation=self.workouts).count(), 3)
+
+    def test_badges_evaluate_only_affected_counter(self):
+        Badge.objects.create(gym=self.gym, name="Primer check-in", condition="checkins:1")
+        Badge.objects.create(gym=self.gym, name="Constante", condition="workouts_completed:1")
+        CheckIn.objects.create(user=self.athlete, gym=self.gym)
+        self.assertEqual(
+            list(UserBadge.objects.filter(user=self.athlete).values_list("badge__name", flat=True)),
+            ["Primer check-in"],
+        )
+
+
+class BatchSyncTests(TestCase):
+    """El recálculo masivo usa consultas agrupadas por lote, no una por participación."""
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Batch Gym", slug="batch-gym")
+        today = timezone.localdate()
+        self.challenge = Challenge.objects.create(
+            gym=self.gym, name="Asistencia", type=Challenge.ChallengeType.ATTENDANCE,
+            goal_value=3, reward_points=10, status=Challenge.Status.ACTIVE,
+            start_date=today - timedelta(days=3), end_date=today + timedelta(days=3),
+        )
+        self.athletes = [
+            User.objects.create_user(
+                email=f"a{i}@batch.com", password="pass123", role=User.Role.ATHLETE, gym=self.gym,
+            )
+            for i in range(6)
+        ]
+        # Historial cargado antes de que existieran las participaciones.
+        for i, athlete in enumerate(self.athletes):
+            for _ in range(i):
+                CheckIn.objects.create(user=athlete, gym=self.gym)
+        for athlete in self.athletes:
+            ChallengeParticipation.objects.create(challenge=self.challenge, user=athlete)
+
+    def test_batch_sync_updates_progress_and_completes_crossers(self):
+        with CaptureQueriesContext(connection) as ctx:
+            result = sync_challenge_batch(self.challenge, batch_size=100, dry_run=True)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(result["completed"], 3)
+
+        result = sync_all_active_participations(batch_size=4)
+        self.assertEqual(result, {"processed": 6, "updated": 5, "completed": 3, "errors": 0})
+
+        rows = dict(
+            ChallengeParticipation.objects.filter(challenge=self.challenge)
+            .values_list("user__email", "progress")
+        )
+        self.assertEqual(rows["a4@batch.com"], 4)
+        completed = ChallengeParticipation.objects.filter(
+            challenge=self.challenge, status=ChallengeParticipation.ParticipationStatus.COMPLETED,
+        )
+        self.assertEqual(completed.count(), 3)
+        self.assertEqual(sum(completed.values_list("points_earned", flat=True)), 30)
+
+    def test_changed_rows_rebuild_event_ledger_on_next_event(self):
+        sync_all_active_participations()
+        participation = ChallengeParticipation.objects.get(user=self.athletes[1])
+        self.assertIsNone(participation.progress_synced_at)
 
-# Create your tests here.
+        CheckIn.objects.create(user=self.athletes[1], gym=self.gym)
+        participation.refresh_from_db()
+        self.assertEqual(participation.progress, 2)
+        self.assertEqual(ChallengeProgressEvent.objects.filter(participation=participation).count(), 2)
@@ -16,7 +16,7 @@ from .serializers import (
 from .services import (
     approve_participation,
     declare_challenge_winner,
-    notify_gym_athletes_new_challenge,
+    enqueue_new_challenge_announcement,
     reject_participation,
     submit_evidence,
     sync_all_active_participations,
@@ -99,7 +99,7 @@ class ChallengeViewSet(viewsets.ModelViewSet):
         # Notificar atletas solo cuando el reto se crea como activo
         if instance.status == Challenge.Status.ACTIVE:
             try:
-                notify_gym_athletes_new_challenge(instance)
+                enqueue_new_challenge_announcement(instance)
             except Exception:
                 import logging
                 logging.getLogger(__name__).warning(
@@ -130,7 +130,7 @@ class ChallengeViewSet(viewsets.ModelViewSet):
         # Notificar si el reto acaba de activarse (draft → active)
         if prev_status != Challenge.Status.ACTIVE and updated.status == Challenge.Status.ACTIVE:
             try:
-                notify_gym_athletes_new_challenge(updated)
+                enqueue_new_challenge_announcement(updated)
             except Exception:
                 import logging
                 logging.getLogger(__name__).warning(
@@ -485,7 +485,8 @@ class ChallengeParticipationViewSet(viewsets.ModelViewSet):
         if user.role not in {User.Role.GYM_ADMIN, User.Role.SUPER_ADMIN}:
             raise PermissionDenied("Solo administradores pueden lanzar sincronización masiva.")
 
-        result = sync_all_active_participations()
+        gym_id = None if user.role == User.Role.SUPER_ADMIN else user.gym_id
+        result = sync_all_active_participations(gym_id=gym_id)
         return Response(result)
 
     @action(detail=False, methods=["get"], url_path="pending-review")
@@ -588,16 +589,11 @@ class AthleteDashboardView(APIView):
         from datetime import date
         from workouts.models import WorkoutSession
         from nutrition.models import UserMealLog, UserNutritionPlan
-        from gamification.models import UserPoints
-        from django.db.models import Sum
+        from gamification.services import approved_points
 
         user = request.user
 
-        total_points = (
-            UserPoints.objects
-            .filter(user=user, status=UserPoints.Status.APPROVED)
-            .aggregate(total=Sum("points"))["total"] or 0
-        )
+        total_points = approved_points(user)
         active_challenges = ChallengeParticipation.objects.filter(
             user=user,
             status=ChallengeParticipation.ParticipationStatus.JOINED,
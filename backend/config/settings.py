@@ -89,6 +89,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'social_django.middleware.SocialAuthExceptionMiddleware',
+    'core.db_router.ReplicaPinMiddleware',
+    'core.instrumentation.QueryInstrumentationMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -141,6 +143,28 @@ else:
         }
     }
 
+# Réplica de solo lectura opcional para analítica y exportaciones (core.db_router).
+if env("DATABASE_REPLICA_URL", default=None):
+    DATABASES['replica'] = env.db("DATABASE_REPLICA_URL")
+    DATABASES['replica']['CONN_MAX_AGE'] = env.int('CONN_MAX_AGE', default=60)
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+# Segundos que las lecturas de un usuario quedan en el primario tras escribir.
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", default=10)
+
+# Pool de conexiones del lado del servidor (psycopg 3, Postgres). Reemplaza a
+# CONN_MAX_AGE: cada worker mantiene entre MIN y MAX conexiones abiertas y las
+# presta por petición (y por hilo de core.concurrency).
+if env.bool("DATABASE_POOL", default=False):
+    for _db in DATABASES.values():
+        if "postgresql" in _db["ENGINE"]:
+            _db['CONN_MAX_AGE'] = 0
+            _db.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': env.int("DATABASE_POOL_MIN_SIZE", default=2),
+                'max_size': env.int("DATABASE_POOL_MAX_SIZE", default=10),
+                'timeout': env.int("DATABASE_POOL_TIMEOUT", default=10),
+            }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -211,16 +235,29 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.User'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'lifefit-dashboard-cache',
-    },
-}
+# Cache compartido entre workers (Redis) con invalidación por tags (core.cache).
+# Sin REDIS_URL se usa LocMemCache: suficiente para desarrollo y tests.
+REDIS_URL = env("REDIS_URL", default="")
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'lifefit',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'lifefit-dashboard-cache',
+        },
+    }
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -238,6 +275,9 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
 }
 
+# Vida del usuario/gimnasio/tier cacheados por core.authentication.CachedJWTAuthentication.
+AUTH_CACHE_SECONDS = env.int("AUTH_CACHE_SECONDS", default=60)
+
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = env.list(
     "CORS_ALLOWED_ORIGINS",
@@ -286,6 +326,49 @@ else:
     DEFAULT_FROM_EMAIL = "testing@lifefit.local"
 
 
+# Cola de trabajos en segundo plano (core.jobs, worker: manage.py run_jobs,
+# que build.sh levanta junto al servidor salvo RUN_JOBS_WORKER=0).
+# En desarrollo sin worker se puede ejecutar cada trabajo en el acto.
+JOBS_RUN_EAGERLY = env.bool("JOBS_RUN_EAGERLY", default=False)
+
+
+# Instrumentación por endpoint (core.instrumentation, GET /api/system/performance/).
+PERF_INSTRUMENTATION_ENABLED = env.bool("PERF_INSTRUMENTATION_ENABLED", default=True)
+PERF_SAMPLES_PER_ENDPOINT = 500
+# Cada cuánto publica cada worker sus muestras en el cache compartido (Redis),
+# desde un hilo propio; 0 desactiva la publicación periódica.
+PERF_PUBLISH_SECONDS = env.int("PERF_PUBLISH_SECONDS", default=10)
+
+# Vida máxima de los snapshots de ranking semanal/mensual (gamification.ranking).
+# Una lectura de un snapshot vencido, o con saldos del gym más nuevos, encola su
+# regeneración en core.jobs como máximo una vez por ventana de este largo.
+RANKING_SNAPSHOT_TTL = env.int("RANKING_SNAPSHOT_TTL", default=300)
+
+# Presupuesto de consultas por endpoint ("Vista.acción" o "Vista"). Incluye la
+# consulta del usuario que hace la autenticación JWT. En producción se registra
+# un warning al excederse; en los tests (QUERY_BUDGET_STRICT) el test falla.
+QUERY_BUDGETS = {
+    "athlete_profile": 10,
+    "gym_dashboard_stats": 9,
+    "coach_adherence": 8,
+    "ranking": 14,
+    "NutritionistAvailabilityViewSet.days": 5,
+    "NutritionistAvailabilityViewSet.slots": 5,
+    "NotificationViewSet.list": 4,
+    "CheckInViewSet.list": 4,
+    "GymPaymentViewSet.list": 4,
+    "FoodViewSet.typeahead": 3,
+    "UserMealLogViewSet.weekly_compliance": 4,
+    "NutritionistAssignmentViewSet.weekly_compliance": 3,
+}
+QUERY_BUDGET_STRICT = False
+
+# Hilos para consultas independientes en paralelo (core.concurrency). Cada hilo
+# abre su propia conexión: sumar workers × QUERY_FANOUT_WORKERS al dimensionar
+# el límite de conexiones de Postgres.
+QUERY_FANOUT_WORKERS = env.int("QUERY_FANOUT_WORKERS", default=4)
+
+
 # IziPay (Lyra/PayZen Perú)
 IZIPAY_USERNAME = env("IZIPAY_USERNAME", default="")
 IZIPAY_PASSWORD = env("IZIPAY_PASSWORD", default="")
@@ -4,5 +4,14 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
-    }
+    },
+    # Segundo alias para probar core.db_router: en tests apunta a la misma base.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+        "TEST": {"MIRROR": "default"},
+    },
 }
+
+# Un endpoint que excede su presupuesto de consultas hace fallar el test.
+QUERY_BUDGET_STRICT = True
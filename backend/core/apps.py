@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .authentication import connect_signals
+        from .instrumentation import install_serializer_timing
+        connect_signals()
+        install_serializer_timing()
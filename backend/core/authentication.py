@@ -0,0 +1,192 @@
+"""
+core/authentication.py
+──────────────────────
+Autenticación JWT con el usuario resuelto desde cache.
+
+``JWTAuthentication`` de simplejwt lee la fila de ``accounts.User`` en cada
+request; casi todas las vistas tocan además ``request.user.gym`` (otra
+consulta) y las validaciones Premium llaman a ``get_athlete_tier`` (una más).
+``CachedJWTAuthentication`` resuelve los tres desde el cache compartido
+(core.cache), en dos entradas de vida corta:
+
+  - ``auth_user:<id>``  → usuario (sin el hash de contraseña) + tier del atleta,
+                          tag ``user_auth_tag(id)``.
+  - ``auth_gym:<id>``   → gimnasio del usuario (estado, ``deleted_at``),
+                          tag ``gym_auth_tag(id)``.
+
+Invalidación (``connect_signals``, registrado en ``CoreConfig.ready``):
+  - guardar/borrar el usuario (incluye cambios de rol, gym o ``is_active``),
+  - crear/cambiar/borrar una suscripción o el plan de membresía (tier),
+  - guardar el gimnasio (``soft_delete``/``restore``, cambio de estado,
+    ``sessions_revoked_before`` que fija ``_revoke_gym_sessions``).
+
+Revocación O(1): los tokens con ``iat`` anterior a
+``Gym.sessions_revoked_before`` se rechazan sin consultar la blacklist.
+
+Los ``.update()`` masivos no disparan señales: quien los use sobre estos
+modelos debe llamar a ``invalidate_user_auth`` / ``invalidate_gym_auth``.
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import get_tagged, invalidate_tags, set_tagged
+
+DEFAULT_AUTH_CACHE_SECONDS = 60
+
+
+def user_auth_tag(user_id) -> str:
+    return f"auth_user:{user_id}"
+
+
+def gym_auth_tag(gym_id) -> str:
+    return f"auth_gym:{gym_id}"
+
+
+def invalidate_user_auth(*user_ids) -> None:
+    invalidate_tags(*(user_auth_tag(user_id) for user_id in user_ids))
+
+
+def invalidate_gym_auth(gym_id) -> None:
+    invalidate_tags(gym_auth_tag(gym_id))
+
+
+def _timeout() -> int:
+    return getattr(settings, "AUTH_CACHE_SECONDS", DEFAULT_AUTH_CACHE_SECONDS)
+
+
+def _load_user(user_id) -> dict | None:
+    from .permissions import query_athlete_tier
+
+    User = get_user_model()
+    # El hash de contraseña no viaja al cache; check_password lo lee al usarse.
+    user = User.objects.defer("password").filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+    if user is None:
+        return None
+    return {"user": user, "tier": query_athlete_tier(user)}
+
+
+def _cached_gym(gym_id):
+    from gyms.models import Gym
+
+    key = f"auth_gym:{gym_id}"
+    tags = [gym_auth_tag(gym_id)]
+    entry = get_tagged(key, tags)
+    if entry is None:
+        entry = {"gym": Gym.objects.filter(pk=gym_id).first()}
+        set_tagged(key, entry, tags, _timeout())
+    return entry["gym"]
+
+
+def cached_user(user_id):
+    """Usuario del token con ``gym`` y tier ya resueltos, o ``None`` si no existe."""
+    key = f"auth_user:{user_id}"
+    tags = [user_auth_tag(user_id)]
+    entry = get_tagged(key, tags)
+    if entry is None:
+        entry = _load_user(user_id)
+        if entry is None:
+            return None
+        set_tagged(key, entry, tags, _timeout())
+
+    user = entry["user"]
+    user._athlete_tier = entry["tier"]
+    if user.gym_id:
+        gym = _cached_gym(user.gym_id)
+        if gym is not None:
+            user.gym = gym
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` con el usuario, su gimnasio y su tier desde cache."""
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # La verificación compara contra el hash de contraseña, que no se cachea;
+            # la revocación por gimnasio aplica igual.
+            user = super().get_user(validated_token)
+            if user.gym_id:
+                gym = _cached_gym(user.gym_id)
+                if gym is not None:
+                    user.gym = gym
+            if _revoked_by_gym(user, validated_token):
+                raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+            return user
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if _revoked_by_gym(user, validated_token):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        return user
+
+
+def _revoked_by_gym(user, validated_token) -> bool:
+    """
+    El token se emitió antes de la última revocación de sesiones de su gimnasio.
+    ``iat`` va en segundos enteros: un token del mismo segundo que la
+    revocación (p. ej. el login justo después de reactivar el gym) es válido.
+    """
+    gym = user.gym if user.gym_id else None
+    revoked_before = getattr(gym, "sessions_revoked_before", None)
+    if revoked_before is None:
+        return False
+    issued_at = validated_token.get("iat")
+    return issued_at is None or issued_at < int(revoked_before.timestamp())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Invalidación
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _on_user_changed(instance, **kwargs):
+    invalidate_user_auth(instance.pk)
+
+
+def _on_subscription_changed(instance, **kwargs):
+    if instance.athlete_id:
+        invalidate_user_auth(instance.athlete_id)
+
+
+def _on_membership_plan_changed(instance, **kwargs):
+    from gyms.models import GymSubscription
+
+    athlete_ids = set(
+        GymSubscription.objects.filter(plan_id=instance.pk, status="active")
+        .values_list("athlete_id", flat=True)
+    )
+    if athlete_ids:
+        invalidate_user_auth(*athlete_ids)
+
+
+def _on_gym_changed(instance, **kwargs):
+    invalidate_gym_auth(instance.pk)
+
+
+def connect_signals() -> None:
+    receivers = [
+        (_on_user_changed, settings.AUTH_USER_MODEL, post_delete),
+        (_on_subscription_changed, "gyms.GymSubscription", post_delete),
+        # Al borrar un plan las suscripciones quedan con plan NULL (SET_NULL):
+        # hay que leerlas antes del borrado.
+        (_on_membership_plan_changed, "gyms.GymMembershipPlan", pre_delete),
+        (_on_gym_changed, "gyms.Gym", post_delete),
+    ]
+    for receiver, sender, delete_signal in receivers:
+        post_save.connect(receiver, sender=sender, dispatch_uid=f"auth_cache_save:{sender}")
+        delete_signal.connect(receiver, sender=sender, dispatch_uid=f"auth_cache_delete:{sender}")
@@ -0,0 +1,182 @@
+"""
+core/benchmarks.py
+──────────────────
+Benchmark de los endpoints más pesados sobre un gimnasio de carga
+(``seed_load``), con el cliente de pruebas de DRF y autenticación JWT real.
+
+Por endpoint se registran la latencia p50/p95/máx y las consultas por
+request. ``run_benchmarks`` guarda el resultado como baseline JSON y, con
+``--compare``, lo contrasta con uno anterior: más consultas o un p95 más lento
+que la tolerancia cuentan como regresión.
+
+Las respuestas cacheadas (dashboard) se miden en frío: se invalida el tag del
+gimnasio antes de cada request.
+"""
+
+from __future__ import annotations
+
+import platform
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from .instrumentation import budget_for, percentile
+
+DEFAULT_ITERATIONS = 20
+DEFAULT_WARMUP = 2
+DEFAULT_TOLERANCE = 0.25
+# Diferencias de p95 por debajo de este umbral se consideran ruido.
+LATENCY_NOISE_MS = 5.0
+
+
+@dataclass(frozen=True)
+class BenchmarkEndpoint:
+    name: str
+    role: str
+    path: Callable[[dict], str]
+    cold_cache: bool = False
+
+
+ENDPOINTS = [
+    BenchmarkEndpoint(
+        "gym_dashboard", "gym_admin", lambda s: "/api/gyms/dashboard/stats/", cold_cache=True,
+    ),
+    BenchmarkEndpoint(
+        "athlete_profile", "gym_admin", lambda s: f"/api/gyms/athlete-profile/{s['athlete'].id}/",
+    ),
+    BenchmarkEndpoint("coach_adherence", "coach", lambda s: "/api/workouts/adherence/"),
+    BenchmarkEndpoint(
+        "ranking", "athlete", lambda s: f"/api/gamification/ranking/?gym_id={s['gym'].id}&period=all",
+    ),
+    BenchmarkEndpoint("my_athletes", "coach", lambda s: "/api/gyms/coach-assignments/my_athletes/"),
+    BenchmarkEndpoint(
+        "compliance_chart", "nutritionist",
+        lambda s: "/api/gyms/nutritionist-assignments/compliance_chart/?days=30",
+    ),
+]
+
+
+def pick_subjects(gym) -> dict:
+    """Usuarios representativos del gimnasio: los de mayor carga en cada rol."""
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    members = User.objects.filter(gym=gym, is_active=True)
+    subjects = {
+        "gym": gym,
+        "gym_admin": members.filter(role=User.Role.GYM_ADMIN).first(),
+        "coach": members.filter(role=User.Role.COACH)
+        .annotate(n=Count("coach_assignments")).order_by("-n").first(),
+        "nutritionist": members.filter(role=User.Role.NUTRITIONIST)
+        .annotate(n=Count("nutritionist_assignments")).order_by("-n").first(),
+        "athlete": members.filter(role=User.Role.ATHLETE)
+        .annotate(n=Count("workout_sessions")).order_by("-n").first(),
+    }
+    missing = [role for role, user in subjects.items() if user is None]
+    if missing:
+        raise ValueError(f"El gimnasio {gym.slug} no tiene usuarios para: {', '.join(missing)}")
+    return subjects
+
+
+def dataset_summary(gym) -> dict:
+    from django.contrib.auth import get_user_model
+    from gyms.models import CheckIn
+    from nutrition.models import UserMealLog
+    from workouts.models import WorkoutSession
+
+    User = get_user_model()
+    return {
+        "gym": gym.slug,
+        "athletes": User.objects.filter(gym=gym, role=User.Role.ATHLETE).count(),
+        "checkins": CheckIn.objects.filter(gym=gym).count(),
+        "sessions": WorkoutSession.objects.filter(gym=gym).count(),
+        "meal_logs": UserMealLog.objects.filter(user__gym=gym).count(),
+    }
+
+
+def _client_for(user):
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    return client
+
+
+def run_benchmarks(gym, iterations: int = DEFAULT_ITERATIONS, warmup: int = DEFAULT_WARMUP,
+                   endpoints=ENDPOINTS, log=None) -> dict:
+    """Ejecuta cada endpoint ``warmup + iterations`` veces y devuelve el reporte."""
+    from .cache import gym_tag, invalidate_tags
+
+    log = log or (lambda message: None)
+    subjects = pick_subjects(gym)
+    results = {}
+
+    with override_settings(ALLOWED_HOSTS=["testserver"], QUERY_BUDGET_STRICT=False):
+        for endpoint in endpoints:
+            client = _client_for(subjects[endpoint.role])
+            path = endpoint.path(subjects)
+            latencies, queries, status = [], [], None
+            for i in range(warmup + iterations):
+                if endpoint.cold_cache:
+                    invalidate_tags(gym_tag(gym.id))
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = client.get(path)
+                    elapsed = (time.perf_counter() - start) * 1000
+                status = response.status_code
+                if i >= warmup:
+                    latencies.append(elapsed)
+                    queries.append(len(captured.captured_queries))
+            latencies.sort()
+            results[endpoint.name] = {
+                "path": path,
+                "status": status,
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "max_ms": round(latencies[-1], 2),
+                "queries": max(queries),
+                "query_budget": budget_for(_view_name(path)),
+            }
+            log(
+                f"  {endpoint.name:<18} p50 {results[endpoint.name]['p50_ms']:>8.1f} ms · "
+                f"p95 {results[endpoint.name]['p95_ms']:>8.1f} ms · {max(queries):>4} consultas"
+            )
+
+    return {
+        "generated_at": timezone.now().isoformat(),
+        "database": connection.vendor,
+        "python": platform.python_version(),
+        "iterations": iterations,
+        "dataset": dataset_summary(gym),
+        "endpoints": results,
+    }
+
+
+def _view_name(path: str) -> str:
+    from django.urls import resolve
+
+    from .instrumentation import endpoint_name
+    return endpoint_name(resolve(path.split("?", 1)[0]).func, "GET")
+
+
+def compare(baseline: dict, current: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """Regresiones de ``current`` respecto de ``baseline`` (lista vacía si no hay)."""
+    regressions = []
+    for name, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before is None:
+            continue
+        if now["status"] != before["status"]:
+            regressions.append(f"{name}: status {before['status']} → {now['status']}")
+        if now["queries"] > before["queries"]:
+            regressions.append(f"{name}: consultas {before['queries']} → {now['queries']}")
+        slower = now["p95_ms"] - before["p95_ms"]
+        if slower > LATENCY_NOISE_MS and now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} ms → {now['p95_ms']} ms")
+    return regressions
@@ -0,0 +1,96 @@
+"""
+core/cache.py
+─────────────
+Cache compartido con invalidación por tags.
+
+Cada entrada se guarda bajo una clave que incluye la versión actual de sus
+tags. Invalidar un tag solo incrementa su versión: las entradas viejas dejan
+de ser alcanzables y expiran solas por TTL. Funciona igual sobre Redis (todos
+los workers de gunicorn ven las mismas versiones) que sobre LocMemCache en
+desarrollo y tests.
+
+Uso:
+    data = get_tagged(f"dashboard_stats_{gym_id}", [gym_tag(gym_id)])
+    if data is None:
+        data = ...
+        set_tagged(f"dashboard_stats_{gym_id}", data, [gym_tag(gym_id)], DASHBOARD_CACHE_TTL)
+
+    invalidate_tags(gym_tag(gym_id))
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Iterable
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_TAG_PREFIX = "tag:"
+
+
+def gym_tag(gym_id) -> str:
+    """Tag que agrupa todas las entradas derivadas de los datos de un gimnasio."""
+    return f"gym:{gym_id}"
+
+
+def _tag_key(tag: str) -> str:
+    return f"{_TAG_PREFIX}{tag}"
+
+
+def _initial_version() -> int:
+    # Basada en tiempo: si el tag fue desalojado, la nueva versión nunca
+    # coincide con una anterior y no resucita entradas viejas.
+    return int(time.time() * 1000)
+
+
+def _tag_versions(tags: Iterable[str]) -> list[int]:
+    tags = list(tags)
+    keys = [_tag_key(t) for t in tags]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = _initial_version()
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+        versions.append(version)
+    return versions
+
+
+def _versioned_key(base_key: str, tags: Iterable[str]) -> str:
+    versions = _tag_versions(tags)
+    return f"{base_key}@{'.'.join(str(v) for v in versions)}"
+
+
+def get_tagged(base_key: str, tags: Iterable[str], default=None):
+    """Lee una entrada; devuelve ``default`` si no existe o algún tag fue invalidado."""
+    try:
+        return cache.get(_versioned_key(base_key, tags), default)
+    except Exception:
+        logger.warning("Cache no disponible al leer %s", base_key, exc_info=True)
+        return default
+
+
+def set_tagged(base_key: str, value, tags: Iterable[str], timeout: int | None = None) -> None:
+    """Guarda una entrada asociada a la versión actual de sus tags."""
+    try:
+        cache.set(_versioned_key(base_key, tags), value, timeout)
+    except Exception:
+        logger.warning("Cache no disponible al guardar %s", base_key, exc_info=True)
+
+
+def invalidate_tags(*tags: str) -> None:
+    """Invalida todas las entradas asociadas a cualquiera de los tags."""
+    for tag in tags:
+        key = _tag_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # El tag aún no existe: cualquier versión nueva basta.
+            cache.set(key, _initial_version(), timeout=None)
+        except Exception:
+            logger.warning("Cache no disponible al invalidar %s", tag, exc_info=True)
@@ -0,0 +1,95 @@
+"""
+core/concurrency.py
+───────────────────
+Consultas independientes en paralelo para dashboards y analítica.
+
+``run_parallel({"a": fn_a, "b": fn_b})`` ejecuta cada función en un pool de
+hilos compartido y devuelve ``{"a": resultado_a, "b": resultado_b}``. Cada hilo
+usa su propia conexión (Django las asigna por hilo), así que las consultas
+sí corren a la vez en Postgres: la latencia del dashboard pasa de la suma de
+sus agregados al más lento de ellos.
+
+Funciona igual con WSGI (gunicorn sync) que con ASGI (uvicorn): DRF ejecuta
+las vistas de forma síncrona en ambos casos y el ORM async de Django envía
+todas las consultas de una petición al mismo hilo, por eso el paralelismo se
+hace aquí y no con ``async def``.
+
+Se ejecuta en serie, en el hilo actual, cuando:
+  - hay una transacción abierta (otras conexiones no verían sus escrituras;
+    incluye los tests con ``TestCase``),
+  - la base no es Postgres (SQLite serializa las lecturas de todos modos),
+  - ``QUERY_FANOUT_WORKERS`` es 1 o hay una sola tarea.
+
+Llamadas salientes: los correos ya van por ``core.jobs`` y ningún hilo de
+petición espera a Resend. Las subidas a Cloudinary (foto de comida, avatar,
+logo) siguen en la petición: la respuesta devuelve la URL subida y los jobs
+solo reciben argumentos JSON, sin almacenamiento compartido entre la web y el
+worker donde dejar el archivo. Sacarlas del hilo queda fuera de este cambio.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable
+
+from django.conf import settings
+from django.db import connection, connections
+
+DEFAULT_FANOUT_WORKERS = 4
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=fanout_workers(), thread_name_prefix="query-fanout",
+                )
+    return _executor
+
+
+def fanout_workers() -> int:
+    return getattr(settings, "QUERY_FANOUT_WORKERS", DEFAULT_FANOUT_WORKERS)
+
+
+def _run_in_worker(fn: Callable):
+    from .instrumentation import current_metrics, track_queries
+
+    metrics = current_metrics()
+    try:
+        with track_queries(metrics) if metrics else nullcontext():
+            return fn()
+    finally:
+        # Respeta CONN_MAX_AGE: la conexión del hilo se reutiliza mientras sea válida.
+        for conn in connections.all(initialized_only=True):
+            conn.close_if_unusable_or_obsolete()
+
+
+def can_run_parallel(task_count: int) -> bool:
+    return (
+        task_count > 1
+        and fanout_workers() > 1
+        and connection.vendor == "postgresql"
+        and not connection.in_atomic_block
+    )
+
+
+def run_parallel(tasks: dict[str, Callable]) -> dict:
+    """Ejecuta funciones de solo lectura independientes y devuelve sus resultados por clave."""
+    if not can_run_parallel(len(tasks)):
+        return {key: fn() for key, fn in tasks.items()}
+
+    executor = _get_executor()
+    # Cada tarea hereda el contexto de la petición (métricas de core.instrumentation).
+    futures = {
+        key: executor.submit(contextvars.copy_context().run, _run_in_worker, fn)
+        for key, fn in tasks.items()
+    }
+    return {key: future.result() for key, future in futures.items()}
@@ -0,0 +1,153 @@
+"""
+core/db_router.py
+─────────────────
+Lecturas de analítica y exportaciones contra una réplica opcional.
+
+Sin alias ``replica`` en ``settings.DATABASES`` todo va al primario y nada
+cambia. Con réplica:
+
+  - Solo leen de ella las vistas marcadas con ``@replica_reads`` (analítica,
+    exportaciones) o el código dentro de ``with read_from_replica():``. El
+    resto del tráfico sigue en el primario.
+  - Read-your-writes: en cuanto una petición escribe, sus lecturas siguientes
+    van al primario. ``ReplicaPinMiddleware`` extiende ese pin a las
+    peticiones del mismo usuario durante ``REPLICA_PIN_SECONDS`` (margen para
+    el retraso de replicación).
+  - Dentro de una transacción abierta siempre se lee del primario.
+
+Las escrituras van siempre al primario; las migraciones solo se aplican ahí
+(la réplica las recibe por replicación).
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = "replica"
+DEFAULT_PIN_SECONDS = 10
+
+_replica_reads = contextvars.ContextVar("replica_reads", default=False)
+_request_state = contextvars.ContextVar("db_request_state", default=None)
+
+
+def replica_available() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _pin_key(user_id) -> str:
+    return f"db_pin:{user_id}"
+
+
+class _RequestState:
+    """Estado de ruteo de una petición: si ya escribió y si su usuario está fijado."""
+
+    def __init__(self, request):
+        self.request = request
+        self.wrote = False
+        self._user_pinned = None
+
+    def user_id(self):
+        user = getattr(self.request, "user", None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+    def user_pinned(self) -> bool:
+        if self._user_pinned is None:
+            user_id = self.user_id()
+            self._user_pinned = bool(user_id and cache.get(_pin_key(user_id)))
+        return self._user_pinned
+
+
+def read_alias() -> str:
+    """Alias desde el que leer en el contexto actual."""
+    if not _replica_reads.get() or not replica_available():
+        return DEFAULT_DB_ALIAS
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    state = _request_state.get()
+    if state is not None and (state.wrote or state.user_pinned()):
+        return DEFAULT_DB_ALIAS
+    return REPLICA_ALIAS
+
+
+@contextmanager
+def read_from_replica():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view_method):
+    """Decorador para vistas de solo lectura (analítica, exportaciones)."""
+    @functools.wraps(view_method)
+    def wrapper(*args, **kwargs):
+        with read_from_replica():
+            return view_method(*args, **kwargs)
+    return wrapper
+
+
+def replica_iter(iterable):
+    """
+    Mantiene las lecturas en la réplica mientras se consume un iterable fuera
+    de la vista (``StreamingHttpResponse``). Si la petición no leía de la
+    réplica, devuelve el iterable sin cambios.
+    """
+    if not _replica_reads.get():
+        return iterable
+
+    def steps():
+        iterator = iter(iterable)
+        while True:
+            with read_from_replica():
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    return steps()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """Abre el estado de ruteo de la petición y fija al usuario tras una escritura."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state.wrote and replica_available():
+            user_id = state.user_id()
+            if user_id:
+                seconds = getattr(settings, "REPLICA_PIN_SECONDS", DEFAULT_PIN_SECONDS)
+                cache.set(_pin_key(user_id), 1, seconds)
+        return response
@@ -0,0 +1,391 @@
+"""
+core/instrumentation.py
+───────────────────────
+Métricas por endpoint: consultas a la base, tiempo en base, tiempo de
+serialización y latencia total de cada request.
+
+  - ``QueryInstrumentationMiddleware`` mide cada request y lo agrupa por la
+    vista/acción resuelta (``CoachAssignmentViewSet.dashboard``,
+    ``staff_directory.get``...).
+  - Las consultas se cuentan con ``connection.execute_wrapper`` en todas las
+    conexiones; la serialización, envolviendo ``BaseSerializer.data`` (solo
+    la llamada más externa, las anidadas ya están dentro).
+  - Cada proceso guarda en memoria las últimas ``PERF_SAMPLES_PER_ENDPOINT``
+    muestras por endpoint (registrar no hace I/O). Un hilo en segundo plano
+    publica cada ``PERF_PUBLISH_SECONDS`` las últimas
+    ``PUBLISHED_SAMPLES_PER_ENDPOINT`` en el cache compartido
+    (``perf:proc:<host>:<pid>``); ninguna petición espera a Redis.
+  - Cada worker se anota en un lugar propio ``perf:slot:<n>`` con
+    ``cache.add`` (atómico), así dos workers nunca se pisan el registro.
+    ``GET /api/system/performance/`` combina las muestras de todos los workers
+    vivos y reporta percentiles y los peores endpoints; ``DELETE`` las
+    reinicia en todos. Lo de otros workers llega con hasta
+    ``PERF_PUBLISH_SECONDS`` de atraso.
+
+Presupuestos de consultas (``QUERY_BUDGETS`` en settings):
+
+    QUERY_BUDGETS = {"CoachAssignmentViewSet.dashboard": 12, "staff_directory": 6}
+
+La clave puede ser ``Vista.acción`` o solo ``Vista`` (aplica a todas sus
+acciones). Al excederse se registra un warning; con ``QUERY_BUDGET_STRICT``
+(activo en los tests) se lanza ``QueryBudgetExceeded`` y el test falla.
+
+En respuestas en streaming (exportaciones CSV) las filas se generan después
+del middleware: solo se mide hasta el primer byte y no se aplica presupuesto.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLES_PER_ENDPOINT = 500
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Un endpoint ejecutó más consultas que su presupuesto."""
+
+
+@dataclass
+class RequestMetrics:
+    queries: int = 0
+    db_ms: float = 0.0
+    serializer_ms: float = 0.0
+    _serializing: int = field(default=0, repr=False)
+    # Las consultas en paralelo (core.concurrency) suman desde otros hilos.
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.queries += 1
+                self.db_ms += elapsed
+
+
+def current_metrics() -> RequestMetrics | None:
+    return _current.get()
+
+
+@contextmanager
+def track_queries(metrics: RequestMetrics):
+    """Cuenta en ``metrics`` las consultas de todas las conexiones del hilo actual."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        yield
+
+
+# ── Registro de muestras ─────────────────────────────────────────────────────
+
+DEFAULT_PUBLISH_SECONDS = 10
+PUBLISHED_SAMPLES_PER_ENDPOINT = 100
+MAX_WORKERS = 64
+# Un worker que deja de publicar (reinicio, scale down) sale del reporte solo.
+PROCESS_TTL = 60 * 60
+_PROC_KEY = "perf:proc:{}"
+_SLOT_KEY = "perf:slot:{}"
+_RESET_KEY = "perf:reset_at"
+
+
+def process_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class MetricsRegistry:
+    def __init__(self, max_samples: int):
+        self.max_samples = max_samples
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._requests: dict[str, int] = defaultdict(int)
+        self._over_budget: dict[str, int] = defaultdict(int)
+        self._publisher_pid = None
+        self._slot = None
+
+    def record(self, endpoint: str, sample: tuple, over_budget: bool) -> None:
+        with self._lock:
+            self._samples[endpoint].append(sample)
+            self._requests[endpoint] += 1
+            if over_budget:
+                self._over_budget[endpoint] += 1
+        if self._publisher_pid != os.getpid():
+            self._start_publisher()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._requests.clear()
+            self._over_budget.clear()
+            self.started_at = time.time()
+
+    def _state(self, limit: int | None = None) -> dict:
+        with self._lock:
+            return {
+                "samples": {
+                    k: list(islice(v, max(len(v) - limit, 0), None)) if limit else list(v)
+                    for k, v in self._samples.items()
+                },
+                "requests": dict(self._requests),
+                "over_budget": dict(self._over_budget),
+                "since": self.started_at,
+            }
+
+    def snapshot(self) -> list[dict]:
+        """Filas de este proceso."""
+        state = self._state()
+        return _rows(state["samples"], state["requests"], state["over_budget"])
+
+    # ── Cache compartido ──────────────────────────────────────────────────
+
+    def _start_publisher(self) -> None:
+        """Un hilo daemon por proceso (se vuelve a lanzar tras un fork)."""
+        interval = getattr(settings, "PERF_PUBLISH_SECONDS", DEFAULT_PUBLISH_SECONDS)
+        with self._lock:
+            if self._publisher_pid == os.getpid():
+                return
+            self._publisher_pid = os.getpid()
+            self._slot = None
+        if interval > 0:
+            threading.Thread(target=self._publish_loop, args=(interval,), name="perf-publisher", daemon=True).start()
+
+    def _publish_loop(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            self.publish()
+
+    def publish(self) -> None:
+        """Publica el estado de este proceso; antes aplica un reinicio global pendiente."""
+        from django.core.cache import cache
+
+        try:
+            reset_at = cache.get(_RESET_KEY)
+            if reset_at and reset_at > self.started_at:
+                self.reset()
+            cache.set(_PROC_KEY.format(process_id()), self._state(PUBLISHED_SAMPLES_PER_ENDPOINT), PROCESS_TTL)
+            self._register(cache)
+        except Exception:
+            logger.warning("Cache no disponible al publicar métricas", exc_info=True)
+
+    def _register(self, cache) -> None:
+        """Mantiene el lugar de este worker; si venció, toma el primero libre."""
+        me = process_id()
+        if self._slot is not None and cache.get(_SLOT_KEY.format(self._slot)) == me:
+            cache.touch(_SLOT_KEY.format(self._slot), PROCESS_TTL)
+            return
+        for slot in range(MAX_WORKERS):
+            if cache.add(_SLOT_KEY.format(slot), me, PROCESS_TTL):
+                self._slot = slot
+                return
+        logger.warning("Sin lugar libre para registrar las métricas de %s", me)
+
+    def _workers(self, cache) -> set:
+        return set(cache.get_many([_SLOT_KEY.format(slot) for slot in range(MAX_WORKERS)]).values())
+
+    def shared_state(self) -> dict[str, dict]:
+        """Estado publicado por cada worker vivo; el de este proceso, completo."""
+        from django.core.cache import cache
+
+        self.publish()
+        try:
+            states = cache.get_many([_PROC_KEY.format(worker) for worker in self._workers(cache)])
+            states = {key.removeprefix("perf:proc:"): state for key, state in states.items()}
+        except Exception:
+            logger.warning("Cache no disponible al leer métricas; se reporta solo este proceso", exc_info=True)
+            states = {}
+        states[process_id()] = self._state()
+        return states
+
+    def shared_snapshot(self) -> tuple[list[dict], dict[str, dict]]:
+        """Filas combinadas de todos los workers y el estado de cada uno."""
+        states = self.shared_state()
+        samples: dict[str, list] = defaultdict(list)
+        requests: dict[str, int] = defaultdict(int)
+        over_budget: dict[str, int] = defaultdict(int)
+        for state in states.values():
+            for endpoint, items in state["samples"].items():
+                samples[endpoint].extend(items)
+            for endpoint, count in state["requests"].items():
+                requests[endpoint] += count
+            for endpoint, count in state["over_budget"].items():
+                over_budget[endpoint] += count
+        return _rows(samples, requests, over_budget), states
+
+    def reset_shared(self) -> None:
+        """Reinicia las muestras de todos los workers (cada uno al publicar)."""
+        from django.core.cache import cache
+
+        try:
+            cache.set(_RESET_KEY, time.time(), None)
+            cache.delete_many([_PROC_KEY.format(worker) for worker in self._workers(cache)])
+        except Exception:
+            logger.warning("Cache no disponible al reiniciar métricas", exc_info=True)
+        self.reset()
+
+
+def _rows(samples: dict, requests: dict, over_budget: dict) -> list[dict]:
+    rows = []
+    for endpoint, items in samples.items():
+        if not items:
+            continue
+        latency = sorted(s[0] for s in items)
+        queries = sorted(s[1] for s in items)
+        db_ms = sorted(s[2] for s in items)
+        serializer_ms = sorted(s[3] for s in items)
+        rows.append({
+            "endpoint": endpoint,
+            "requests": requests.get(endpoint, len(items)),
+            "samples": len(items),
+            "latency_ms": _summary(latency),
+            "db_ms": _summary(db_ms),
+            "serializer_ms": _summary(serializer_ms),
+            "queries": {
+                "avg": round(sum(queries) / len(queries), 1),
+                "p95": percentile(queries, 95),
+                "max": queries[-1],
+            },
+            "query_budget": budget_for(endpoint),
+            "over_budget": over_budget.get(endpoint, 0),
+        })
+    return rows
+
+
+def percentile(sorted_values: list, pct: float):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _summary(sorted_values: list) -> dict:
+    return {
+        "p50": round(percentile(sorted_values, 50), 2),
+        "p95": round(percentile(sorted_values, 95), 2),
+        "p99": round(percentile(sorted_values, 99), 2),
+        "max": round(sorted_values[-1], 2),
+    }
+
+
+registry = MetricsRegistry(getattr(settings, "PERF_SAMPLES_PER_ENDPOINT", DEFAULT_SAMPLES_PER_ENDPOINT))
+
+
+# ── Presupuestos ─────────────────────────────────────────────────────────────
+
+def budget_for(endpoint: str) -> int | None:
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    if endpoint in budgets:
+        return budgets[endpoint]
+    return budgets.get(endpoint.split(".", 1)[0])
+
+
+def endpoint_name(view_func, method: str) -> str:
+    """``Vista.acción`` para vistas DRF; ``módulo.función`` para vistas Django."""
+    cls = getattr(view_func, "cls", None)
+    if cls is None:
+        return f"{view_func.__module__}.{view_func.__name__}"
+    actions = getattr(view_func, "actions", None) or {}
+    return f"{cls.__name__}.{actions.get(method.lower(), method.lower())}"
+
+
+# ── Serialización ────────────────────────────────────────────────────────────
+
+def install_serializer_timing() -> None:
+    """Envuelve ``BaseSerializer.data`` para medir la serialización (idempotente)."""
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data
+    if getattr(original.fget, "_instrumented", False):
+        return
+
+    def data(self):
+        metrics = _current.get()
+        if metrics is None:
+            return original.fget(self)
+        metrics._serializing += 1
+        start = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            metrics._serializing -= 1
+            if not metrics._serializing:
+                metrics.serializer_ms += (time.perf_counter() - start) * 1000
+
+    data._instrumented = True
+    BaseSerializer.data = property(data)
+
+
+# ── Middleware ───────────────────────────────────────────────────────────────
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "PERF_INSTRUMENTATION_ENABLED", True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with track_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        endpoint = getattr(request, "_perf_endpoint", None)
+        if endpoint is None:
+            return response
+
+        budget = None if response.streaming else budget_for(endpoint)
+        over_budget = budget is not None and metrics.queries > budget
+        registry.record(
+            endpoint, (latency_ms, metrics.queries, metrics.db_ms, metrics.serializer_ms), over_budget,
+        )
+        if over_budget:
+            message = (
+                f"{endpoint} ejecutó {metrics.queries} consultas "
+                f"(presupuesto {budget}) en {request.method} {request.path}"
+            )
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._perf_endpoint = endpoint_name(view_func, request.method)
+
+
+def process_info(states: dict[str, dict] | None = None) -> dict:
+    """Proceso que atiende y, si se dan, los workers incluidos en el reporte."""
+    from datetime import datetime, timezone as dt_timezone
+
+    def iso(ts):
+        return datetime.fromtimestamp(ts, tz=dt_timezone.utc).isoformat()
+
+    info = {"pid": os.getpid(), "process": process_id(), "since": iso(registry.started_at)}
+    if states is not None:
+        info["workers"] = [{"process": key, "since": iso(state["since"])} for key, state in sorted(states.items())]
+    return info
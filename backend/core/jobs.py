@@ -0,0 +1,177 @@
+"""
+core/jobs.py
+────────────
+Cola de trabajos en segundo plano respaldada por la base de datos.
+
+Principios aplicados:
+  - ``enqueue`` solo inserta una fila: la petición HTTP no espera a proveedores
+    externos (email, Cloudinary). Al vivir en la misma transacción que la
+    escritura que lo origina, el trabajo no existe si esa escritura hace rollback.
+  - ``idempotency_key`` (único) evita encolar dos veces el mismo efecto.
+  - Los fallos se reintentan con backoff exponencial hasta ``max_attempts``.
+  - Los workers reclaman trabajos con ``SELECT ... FOR UPDATE SKIP LOCKED``
+    (en Postgres) para que varios procesos no tomen el mismo trabajo.
+
+Uso:
+    from core.jobs import enqueue
+    enqueue("core.tasks.send_welcome_gym_email", email, name, link,
+            idempotency_key=f"welcome_gym:{email}")
+
+Worker:
+    python manage.py run_jobs
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import socket
+import os
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# Un trabajo en RUNNING más tiempo que esto se considera huérfano (worker caído).
+LOCK_TIMEOUT_SECONDS = 600
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def backoff_seconds(attempts: int) -> int:
+    """Espera antes del siguiente intento: 30s, 60s, 120s… con jitter, máximo 1h."""
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+    return int(delay * random.uniform(0.8, 1.2))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Encolar
+# ─────────────────────────────────────────────────────────────────────────────
+
+def enqueue(
+    task: str,
+    *args,
+    idempotency_key: str | None = None,
+    delay_seconds: int = 0,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    **kwargs,
+) -> BackgroundJob:
+    """
+    Encola ``task`` (ruta importable) con argumentos serializables a JSON.
+    Si ya existe un trabajo con la misma ``idempotency_key`` se devuelve ese.
+
+    Con ``settings.JOBS_RUN_EAGERLY`` el trabajo se ejecuta en el acto
+    (útil en desarrollo sin worker).
+    """
+    import_string(task)  # falla temprano si la ruta no existe
+
+    if idempotency_key:
+        existing = BackgroundJob.objects.filter(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+
+    try:
+        with transaction.atomic():
+            job = BackgroundJob.objects.create(
+                task=task,
+                args=list(args),
+                kwargs=kwargs,
+                idempotency_key=idempotency_key,
+                max_attempts=max_attempts,
+                run_after=timezone.now() + timedelta(seconds=delay_seconds),
+            )
+    except IntegrityError:
+        return BackgroundJob.objects.get(idempotency_key=idempotency_key)
+
+    if getattr(settings, "JOBS_RUN_EAGERLY", False):
+        run_job(job)
+    return job
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Ejecutar
+# ─────────────────────────────────────────────────────────────────────────────
+
+def run_job(job: BackgroundJob) -> bool:
+    """Ejecuta un trabajo y registra el resultado. Devuelve True si tuvo éxito."""
+    job.attempts += 1
+    try:
+        import_string(job.task)(*job.args, **job.kwargs)
+    except Exception as exc:
+        job.last_error = "".join(traceback.format_exception(exc))[-4000:]
+        if job.attempts >= job.max_attempts:
+            job.status = BackgroundJob.Status.FAILED
+            job.finished_at = timezone.now()
+            logger.error("Trabajo %s (%s) falló definitivamente: %s", job.pk, job.task, exc)
+        else:
+            job.status = BackgroundJob.Status.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=backoff_seconds(job.attempts))
+            logger.warning("Trabajo %s (%s) falló, reintento %s: %s", job.pk, job.task, job.attempts, exc)
+        job.locked_by = ""
+        job.locked_at = None
+        job.save(update_fields=[
+            "attempts", "status", "run_after", "finished_at", "last_error",
+            "locked_by", "locked_at", "updated_at",
+        ])
+        return False
+
+    job.status = BackgroundJob.Status.DONE
+    job.finished_at = timezone.now()
+    job.locked_by = ""
+    job.locked_at = None
+    job.save(update_fields=["attempts", "status", "finished_at", "locked_by", "locked_at", "updated_at"])
+    return True
+
+
+def requeue_stale_jobs() -> int:
+    """Devuelve a la cola los trabajos RUNNING cuyo worker dejó de responder."""
+    cutoff = timezone.now() - timedelta(seconds=LOCK_TIMEOUT_SECONDS)
+    return BackgroundJob.objects.filter(
+        status=BackgroundJob.Status.RUNNING, locked_at__lt=cutoff,
+    ).update(status=BackgroundJob.Status.QUEUED, locked_by="", locked_at=None)
+
+
+def claim_jobs(worker_id: str, limit: int = 10) -> list[BackgroundJob]:
+    """Reclama hasta ``limit`` trabajos listos y los marca RUNNING para este worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            BackgroundJob.objects.select_for_update(skip_locked=True)
+            .filter(status=BackgroundJob.Status.QUEUED, run_after__lte=now)
+            .order_by("run_after")[:limit]
+        )
+        if jobs:
+            BackgroundJob.objects.filter(pk__in=[j.pk for j in jobs]).update(
+                status=BackgroundJob.Status.RUNNING, locked_by=worker_id, locked_at=now,
+            )
+    return jobs
+
+
+def run_pending(worker_id: str | None = None, limit: int = 10) -> int:
+    """Reclama y ejecuta un lote de trabajos. Devuelve cuántos se procesaron."""
+    worker_id = worker_id or default_worker_id()
+    jobs = claim_jobs(worker_id, limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
+
+
+def purge_finished(older_than_days: int = 14) -> int:
+    """Elimina trabajos completados antiguos. Los fallidos se conservan para auditoría."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = BackgroundJob.objects.filter(
+        status=BackgroundJob.Status.DONE, finished_at__lt=cutoff,
+    ).delete()
+    return deleted
@@ -0,0 +1,429 @@
+"""
+core/loadgen.py
+───────────────
+Generador de datos sintéticos a escala para pruebas de carga y benchmarks
+(``manage.py seed_load`` y ``manage.py run_benchmarks``).
+
+Crea gimnasios completos — staff, atletas, rutinas, planes nutricionales,
+asignaciones, suscripciones y pagos — y su historial de N meses: check-ins,
+sesiones con logs por ejercicio, comidas registradas, puntos semanales y
+retos con participantes.
+
+Principios aplicados:
+  - Todo se inserta con ``bulk_create`` en lotes de ``batch_size``; ningún
+    ``save()`` por fila (tampoco se disparan las señales).
+  - El historial conserva sus fechas reales: ``created_at`` y los
+    ``auto_now_add`` se fijan al momento del evento.
+  - Las tablas derivadas que las señales mantendrían (rollup de actividad,
+    saldos de puntos, snapshots de ranking, progreso de retos) se
+    reconstruyen al final con sus servicios de reparación.
+  - ``random.Random(seed)``: mismo seed, mismo dataset.
+
+Los gimnasios generados usan el slug ``load-NNN`` y las cuentas el dominio
+``@load.test``; ``flush_load_data`` los elimina.
+"""
+
+from __future__ import annotations
+
+import io
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+LOAD_SLUG_PREFIX = "load-"
+LOAD_EMAIL_DOMAIN = "load.test"
+LOAD_PASSWORD = "loadtest123"
+DEFAULT_BATCH_SIZE = 5000
+
+ATHLETES_PER_COACH = 150
+ATHLETES_PER_NUTRITIONIST = 300
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MEALS = [
+    ("breakfast", "Desayuno", 450),
+    ("lunch", "Almuerzo", 700),
+    ("afternoon_snack", "Merienda", 250),
+    ("dinner", "Cena", 550),
+]
+EXERCISES = [
+    ("Sentadilla", "strength", "Piernas"), ("Press banca", "strength", "Pecho"),
+    ("Peso muerto", "strength", "Espalda"), ("Dominadas", "strength", "Espalda"),
+    ("Press militar", "strength", "Hombros"), ("Zancadas", "strength", "Piernas"),
+    ("Remo con barra", "strength", "Espalda"), ("Curl de bíceps", "strength", "Brazos"),
+    ("Burpees", "hiit", "Full body"), ("Remo ergómetro", "cardio", "Full body"),
+    ("Plancha", "mobility", "Core"), ("Bicicleta", "cardio", "Piernas"),
+]
+ROUTINES = ["Fuerza A", "Fuerza B", "Hipertrofia", "Acondicionamiento"]
+EXERCISES_PER_ROUTINE = 5
+WORKOUT_WEEK_POINTS = 50
+
+
+@contextmanager
+def historic_timestamps(*models):
+    """Desactiva ``auto_now``/``auto_now_add`` para insertar fechas históricas."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class LoadGenerator:
+    def __init__(self, months: int = 12, seed: int = 42, batch_size: int = DEFAULT_BATCH_SIZE,
+                 log=None, today: date | None = None):
+        self.months = months
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.today = today or timezone.localdate()
+        self.start = self.today - timedelta(days=30 * months)
+        self.tz = timezone.get_current_timezone()
+        self.password = make_password(LOAD_PASSWORD)
+        self.counts: dict[str, int] = {}
+        self._buffers: dict = {}
+
+    # ── Inserción por lotes ──────────────────────────────────────────────────
+
+    def _add(self, obj) -> None:
+        model = type(obj)
+        buffer = self._buffers.setdefault(model, [])
+        buffer.append(obj)
+        if len(buffer) >= self.batch_size:
+            self._flush(model)
+
+    def _flush(self, model=None) -> None:
+        # Los buffers se vacían en el orden en que aparecieron sus modelos
+        # (padres antes que hijos): ninguna FK apunta a una fila sin insertar.
+        models = list(self._buffers)
+        if model is not None:
+            models = models[:models.index(model) + 1]
+        for m in models:
+            buffer = self._buffers.get(m)
+            if not buffer:
+                continue
+            with historic_timestamps(m):
+                m.objects.bulk_create(buffer, batch_size=self.batch_size)
+            self.counts[m.__name__] = self.counts.get(m.__name__, 0) + len(buffer)
+            self._buffers[m] = []
+
+    def _bulk(self, objs: list) -> list:
+        for obj in objs:
+            self._add(obj)
+        if objs:
+            self._flush(type(objs[0]))
+        return objs
+
+    def _at(self, day: date, hour: int, minute: int = 0) -> datetime:
+        return datetime.combine(day, time(hour, minute), tzinfo=self.tz)
+
+    def _stamp(self, obj, when: datetime):
+        """Fija en ``when`` los campos ``auto_now``/``auto_now_add`` aún vacíos."""
+        for field in obj._meta.concrete_fields:
+            if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+                if getattr(obj, field.attname) is None:
+                    setattr(obj, field.attname, when)
+        return obj
+
+    # ── Gimnasio ─────────────────────────────────────────────────────────────
+
+    def generate(self, gyms: int, athletes_per_gym: int) -> dict[str, int]:
+        from gyms.models import Gym
+
+        existing = Gym.objects.filter(slug__startswith=LOAD_SLUG_PREFIX).count()
+        for n in range(existing + 1, existing + gyms + 1):
+            gym = self.generate_gym(n, athletes_per_gym)
+            self.log(f"  {gym.slug}: {athletes_per_gym} atletas, {self.months} meses")
+        return dict(self.counts)
+
+    def generate_gym(self, n: int, athletes: int):
+        with transaction.atomic():
+            return self._generate_gym(n, athletes)
+
+    def _generate_gym(self, n: int, athletes: int):
+        from gyms.models import Branch, Gym
+
+        now = timezone.now()
+        slug = f"{LOAD_SLUG_PREFIX}{n:03d}"
+        gym = self._stamp(Gym(
+            name=f"Load Gym {n}", slug=slug, status=Gym.Status.ACTIVE, location="Lima, Perú",
+            max_athletes=athletes + 100, max_coaches=1000, max_nutritionists=1000,
+        ), now)
+        self._bulk([gym])
+        branch = self._bulk([self._stamp(Branch(
+            gym=gym, name="Sede Central", slug="sede-central", address="Av. Carga 123", city="Lima",
+        ), now)])[0]
+
+        staff = self._staff(gym, slug, athletes)
+        members = self._athletes(gym, slug, athletes)
+        routines = self._routines(gym, staff["coach"][0])
+        plans = self._nutrition_plans(gym)
+        profiles = self._assignments(gym, staff, members, routines, plans)
+        self._memberships(gym, members)
+        self._history(gym, branch, profiles)
+        self._challenges(gym, staff["gym_admin"][0], members)
+        self._flush()
+        self._rebuild_derived(gym, [m.id for m in members])
+        return gym
+
+    def _users(self, gym, slug: str, role: str, count: int, spread: bool = False) -> list:
+        """Usuarios de un rol; con ``spread`` las altas se reparten en toda la ventana."""
+        from accounts.models import User
+
+        span = (self.today - self.start).days
+        users = []
+        for i in range(count):
+            offset = self.rng.randrange(span) if spread else 0
+            joined = self._at(self.start + timedelta(days=offset), 9)
+            users.append(self._stamp(User(
+                email=f"{slug}-{role}-{i}@{LOAD_EMAIL_DOMAIN}", password=self.password,
+                first_name=role.replace("_", " ").title(), last_name=str(i),
+                role=role, gym=gym, is_active=self.rng.random() > 0.05 or role != User.Role.ATHLETE,
+                date_joined=joined,
+            ), joined))
+        return self._bulk(users)
+
+    def _staff(self, gym, slug: str, athletes: int) -> dict:
+        from accounts.models import User
+
+        return {
+            User.Role.GYM_ADMIN: self._users(gym, slug, User.Role.GYM_ADMIN, 1),
+            User.Role.COACH: self._users(gym, slug, User.Role.COACH, max(1, athletes // ATHLETES_PER_COACH)),
+            User.Role.NUTRITIONIST: self._users(
+                gym, slug, User.Role.NUTRITIONIST, max(1, athletes // ATHLETES_PER_NUTRITIONIST),
+            ),
+        }
+
+    def _athletes(self, gym, slug: str, count: int) -> list:
+        from accounts.models import User
+        return self._users(gym, slug, User.Role.ATHLETE, count, spread=True)
+
+    def _routines(self, gym, coach) -> list[tuple]:
+        from workouts.models import Exercise, RoutineExercise, WorkoutRoutine
+
+        now = timezone.now()
+        exercises = self._bulk([
+            self._stamp(Exercise(gym=gym, name=name, category=category, muscle_group=muscle), now)
+            for name, category, muscle in EXERCISES
+        ])
+        routines = []
+        for index, name in enumerate(ROUTINES):
+            routine = self._stamp(WorkoutRoutine(
+                gym=gym, name=name, status="published", created_by=coach, duration_minutes=60,
+            ), now)
+            picked = self.rng.sample(exercises, EXERCISES_PER_ROUTINE)
+            routine_exercises = [
+                self._stamp(RoutineExercise(routine=routine, exercise=ex, order=order, sets=4, reps=10), now)
+                for order, ex in enumerate(picked, start=1)
+            ]
+            routines.append((routine, routine_exercises))
+        self._bulk([r for r, _ in routines])
+        self._bulk([re for _, items in routines for re in items])
+        return routines
+
+    def _nutrition_plans(self, gym) -> list[tuple]:
+        from nutrition.models import MealTemplate, NutritionPlan
+
+        now = timezone.now()
+        plans = []
+        for name, calories in (("Déficit", 1800), ("Mantenimiento", 2200), ("Volumen", 2800)):
+            plan = self._stamp(NutritionPlan(
+                gym=gym, name=name, calories_per_day=calories, protein_g=150, carbs_g=220, fats_g=70,
+                duration_days=30, status="active",
+            ), now)
+            by_weekday = {}
+            for day_number, weekday in enumerate(WEEKDAYS, start=1):
+                by_weekday[day_number - 1] = [
+                    self._stamp(MealTemplate(
+                        plan=plan, day_number=day_number, weekday=weekday, meal_type=meal_type,
+                        name=label, calories=kcal, order=order,
+                    ), now)
+                    for order, (meal_type, label, kcal) in enumerate(MEALS, start=1)
+                ]
+            plans.append((plan, by_weekday))
+        self._bulk([p for p, _ in plans])
+        self._bulk([t for _, days in plans for templates in days.values() for t in templates])
+        return plans
+
+    def _assignments(self, gym, staff, members, routines, plans) -> list[dict]:
+        """Reparte atletas entre coaches y nutricionistas; devuelve su perfil de actividad."""
+        from accounts.models import User
+        from gyms.models import CoachAssignment, NutritionistAssignment
+        from nutrition.models import UserNutritionPlan
+        from workouts.models import UserRoutineAssignment
+
+        coaches, nutritionists = staff[User.Role.COACH], staff[User.Role.NUTRITIONIST]
+        profiles = []
+        for i, athlete in enumerate(members):
+            joined = athlete.date_joined
+            coach = coaches[i % len(coaches)]
+            self._add(self._stamp(CoachAssignment(coach=coach, athlete=athlete, gym=gym, is_active=True), joined))
+            profile = {
+                "athlete": athlete,
+                "engagement": self.rng.uniform(0.15, 1.0),
+                "routine": None,
+                "plan": None,
+            }
+            if self.rng.random() < 0.85:
+                routine = self.rng.choice(routines)
+                self._add(self._stamp(UserRoutineAssignment(
+                    user=athlete, routine=routine[0], assigned_by=coach, start_date=joined.date(),
+                    status="active",
+                ), joined))
+                profile["routine"] = routine
+            if self.rng.random() < 0.4:
+                nutritionist = nutritionists[i % len(nutritionists)]
+                plan = self.rng.choice(plans)
+                self._add(self._stamp(NutritionistAssignment(
+                    nutritionist=nutritionist, athlete=athlete, gym=gym, is_active=True,
+                ), joined))
+                self._add(self._stamp(UserNutritionPlan(
+                    user=athlete, plan=plan[0], assigned_by=nutritionist, start_date=joined.date(),
+                    status="active",
+                ), joined))
+                profile["plan"] = plan
+            profiles.append(profile)
+        self._flush()
+        return profiles
+
+    def _memberships(self, gym, members) -> None:
+        from gyms.models import GymMembershipPlan, GymPayment, GymSubscription
+
+        now = timezone.now()
+        basic, premium = self._bulk([
+            self._stamp(GymMembershipPlan(gym=gym, name="Básico", price=Decimal("89.00"), tier="basic"), now),
+            self._stamp(GymMembershipPlan(gym=gym, name="Premium", price=Decimal("149.00"), tier="premium"), now),
+        ])
+        for athlete in members:
+            plan = premium if self.rng.random() < 0.3 else basic
+            joined = athlete.date_joined.date()
+            subscription = self._stamp(GymSubscription(
+                athlete=athlete, gym=gym, plan=plan, start_date=joined,
+                status="active" if athlete.is_active else "expired",
+            ), athlete.date_joined)
+            self._add(subscription)
+            due = joined
+            while due <= self.today:
+                failed = self.rng.random() < 0.03
+                self._add(self._stamp(GymPayment(
+                    gym=gym, subscription=subscription, athlete=athlete, plan=plan, amount=plan.price,
+                    status="failed" if failed else "success", paid_at=self._at(due, 10),
+                    due_date=due + timedelta(days=30), payment_method="card",
+                ), self._at(due, 10)))
+                due += timedelta(days=30)
+
+    # ── Historial ────────────────────────────────────────────────────────────
+
+    def _history(self, gym, branch, profiles) -> None:
+        from gamification.models import UserPoints
+        from gyms.models import CheckIn
+        from nutrition.models import UserMealLog
+        from workouts.models import SessionExerciseLog, WorkoutSession
+
+        for profile in profiles:
+            athlete, engagement = profile["athlete"], profile["engagement"]
+            routine, plan = profile["routine"], profile["plan"]
+            day = max(self.start, athlete.date_joined.date())
+            sessions_in_week: dict[date, int] = {}
+            while day <= self.today:
+                if self.rng.random() < 0.5 * engagement:
+                    when = self._at(day, self.rng.randint(6, 21), self.rng.randrange(60))
+                    self._add(self._stamp(CheckIn(
+                        user=athlete, gym=gym, branch=branch, method="qr", timestamp=when,
+                    ), when))
+                    if routine and self.rng.random() < 0.8:
+                        session = self._stamp(WorkoutSession(
+                            user=athlete, gym=gym, routine=routine[0], performed_at=when + timedelta(minutes=5),
+                            duration_minutes=self.rng.randint(40, 90), perceived_exertion=self.rng.randint(5, 9),
+                            completion_percentage=Decimal("100.00"), status="completed", points_awarded=10,
+                        ), when)
+                        self._add(session)
+                        for routine_exercise in routine[1]:
+                            self._add(self._stamp(SessionExerciseLog(
+                                session=session, routine_exercise=routine_exercise,
+                                sets_completed=routine_exercise.sets, completed=True,
+                            ), when))
+                        week = day - timedelta(days=day.weekday())
+                        sessions_in_week[week] = sessions_in_week.get(week, 0) + 1
+                if plan and self.rng.random() < 0.75 * engagement:
+                    for template in plan[1][day.weekday()]:
+                        roll = self.rng.random()
+                        if roll < 0.15:
+                            continue
+                        when = self._at(day, 8 + template.order * 3)
+                        self._add(self._stamp(UserMealLog(
+                            user=athlete, meal_template=template, date=day,
+                            status="completed" if roll < 0.9 else "skipped",
+                        ), when))
+                day += timedelta(days=1)
+
+            current_week = self.today - timedelta(days=self.today.weekday())
+            for week, sessions in sessions_in_week.items():
+                if sessions >= 3 and week < current_week:
+                    when = self._at(week + timedelta(days=6), 20)
+                    self._add(self._stamp(UserPoints(
+                        user=athlete, points=WORKOUT_WEEK_POINTS, pending_points=WORKOUT_WEEK_POINTS,
+                        status=UserPoints.Status.APPROVED, source="workout_week",
+                        description="Semana de entrenamiento completada", week_start=week,
+                        reviewed_at=when,
+                    ), when))
+
+    def _challenges(self, gym, admin, members) -> None:
+        from challenges.models import Challenge, ChallengeParticipation
+
+        now = timezone.now()
+        Type = Challenge.ChallengeType
+        challenges = self._bulk([
+            self._stamp(Challenge(
+                gym=gym, name=name, type=kind, start_date=self.today - timedelta(days=20),
+                end_date=self.today + timedelta(days=10), responsible=admin, reward_points=100,
+                goal_value=goal, status=Challenge.Status.ACTIVE,
+                verification_type=Challenge.VerificationType.AUTOMATIC,
+            ), now)
+            for name, kind, goal in (
+                ("Reto asistencia", Type.ATTENDANCE, 12),
+                ("Reto entrenamientos", Type.WORKOUTS, 10),
+                ("Reto nutrición", Type.NUTRITION, 15),
+            )
+        ])
+        for challenge in challenges:
+            for athlete in members:
+                if self.rng.random() < 0.3:
+                    self._add(self._stamp(ChallengeParticipation(challenge=challenge, user=athlete), now))
+
+    def _rebuild_derived(self, gym, athlete_ids: list) -> None:
+        """Reconstruye lo que las señales habrían mantenido fila a fila."""
+        from challenges.services import sync_all_active_participations
+        from gamification.services import reconcile_balances
+        from gyms.activity import rebuild_activity
+        from nutrition.macros import recompute_plans
+        from nutrition.models import NutritionPlan
+
+        rebuild_activity(self.start, self.today, gym_id=gym.id)
+        recompute_plans(NutritionPlan.objects.filter(gym=gym).values_list("id", flat=True))
+        reconcile_balances(fix=True, user_ids=athlete_ids)
+        sync_all_active_participations(gym_id=gym.id)
+        call_command("refresh_rankings", gym_id=str(gym.id), stdout=io.StringIO())
+
+
+def flush_load_data() -> int:
+    """Elimina los gimnasios y cuentas generados por ``seed_load``."""
+    from accounts.models import User
+    from gyms.models import Gym
+
+    gyms = Gym.objects.filter(slug__startswith=LOAD_SLUG_PREFIX)
+    count = gyms.count()
+    User.objects.filter(email__endswith=f"@{LOAD_EMAIL_DOMAIN}").delete()
+    gyms.delete()
+    return count
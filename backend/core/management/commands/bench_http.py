@@ -0,0 +1,135 @@
+"""
+Comando de gestión: bench_http
+──────────────────────────────
+Prueba de carga HTTP contra un servidor en marcha: N clientes concurrentes
+piden los endpoints de dashboard y se reportan throughput (req/s) y latencia
+p50/p95/p99. Sirve para comparar los modos de despliegue de ``build.sh``
+(``SERVER_MODE=wsgi`` gunicorn sync vs ``SERVER_MODE=asgi`` uvicorn) sobre el
+mismo dataset (``seed_load``).
+
+Uso:
+    python manage.py bench_http --url http://localhost:8000 --email load-001-gym_admin-0@load.test
+    python manage.py bench_http --url ... --email ... --concurrency 32 --requests 1000
+    python manage.py bench_http --url ... --token <jwt> --path /api/gyms/dashboard/stats/
+    python manage.py bench_http --url ... --email ... --label asgi --output perf/asgi.json
+
+Casos de uso:
+  - Medir el efecto de un cambio de servidor, workers o threads antes de desplegarlo.
+  - Comparar cola de latencia (p99) bajo concurrencia, no solo el caso aislado.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+# Endpoints de un gym_admin: dashboard, adherencia y listados paginados.
+DEFAULT_PATHS = [
+    "/api/gyms/dashboard/stats/",
+    "/api/workouts/adherence/",
+    "/api/gyms/checkins/?pagination=cursor",
+    "/api/gyms/payments/?pagination=cursor",
+]
+
+
+class Command(BaseCommand):
+    help = "Prueba de carga HTTP: throughput y latencia de cola contra un servidor en marcha."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", type=str, required=True, help="URL base del servidor.")
+        parser.add_argument("--email", type=str, default=None, help="Cuenta con la que iniciar sesión.")
+        parser.add_argument(
+            "--password",
+            type=str,
+            default="loadtest123",
+            help="Contraseña de la cuenta (default: la de seed_load).",
+        )
+        parser.add_argument("--token", type=str, default=None, help="JWT de acceso (en vez de --email).")
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            default=None,
+            help="Endpoint a pedir; repetible (default: dashboards).",
+        )
+        parser.add_argument("--concurrency", type=int, default=16, help="Clientes simultáneos (default: 16).")
+        parser.add_argument("--requests", type=int, default=500, help="Total de requests (default: 500).")
+        parser.add_argument("--label", type=str, default="", help="Etiqueta del resultado (ej. wsgi, asgi).")
+        parser.add_argument("--output", type=str, default=None, help="Guardar el resultado en JSON.")
+
+    def handle(self, *args, **options):
+        from core.instrumentation import percentile
+
+        base = options["url"].rstrip("/")
+        paths = options["paths"] or DEFAULT_PATHS
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--concurrency y --requests deben ser mayores que 0.")
+        token = options["token"] or self._login(base, options["email"], options["password"])
+
+        local = threading.local()
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def hit(i):
+            session = getattr(local, "session", None)
+            if session is None:
+                session = local.session = requests.Session()
+            start = time.perf_counter()
+            try:
+                status = session.get(base + paths[i % len(paths)], headers=headers, timeout=60).status_code
+            except requests.RequestException:
+                status = None
+            return (time.perf_counter() - start) * 1000, status
+
+        self.stdout.write(
+            f"{options['requests']} requests · {options['concurrency']} clientes · {len(paths)} endpoints"
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            samples = list(pool.map(hit, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(ms for ms, _ in samples)
+        errors = sum(1 for _, status in samples if status != 200)
+        result = {
+            "label": options["label"],
+            "url": base,
+            "paths": paths,
+            "concurrency": options["concurrency"],
+            "requests": options["requests"],
+            "errors": errors,
+            "throughput_rps": round(options["requests"] / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(latencies[-1], 1),
+        }
+
+        self.stdout.write("\n── Resultado ────────────────────────")
+        self.stdout.write(f"  Throughput : {result['throughput_rps']} req/s")
+        self.stdout.write(
+            f"  Latencia   : p50 {result['p50_ms']} ms · p95 {result['p95_ms']} ms · "
+            f"p99 {result['p99_ms']} ms · máx {result['max_ms']} ms"
+        )
+        line = f"  Errores    : {errors}"
+        self.stdout.write(self.style.ERROR(line) if errors else line)
+        self.stdout.write("─────────────────────────────────────")
+
+        if options["output"]:
+            output = Path(options["output"])
+            output.parent.mkdir(parents=True, exist_ok=True)
+            output.write_text(json.dumps(result, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"✓ Resultado guardado en {output}"))
+
+    def _login(self, base: str, email: str | None, password: str) -> str:
+        if not email:
+            raise CommandError("Indicar --email o --token.")
+        response = requests.post(
+            f"{base}/api/auth/login/", json={"email": email, "password": password}, timeout=30,
+        )
+        if response.status_code != 200:
+            raise CommandError(f"Login fallido ({response.status_code}): {response.text[:200]}")
+        return response.json()["access"]
@@ -0,0 +1,115 @@
+"""
+Comando de gestión: run_benchmarks
+──────────────────────────────────
+Mide los endpoints más pesados (dashboard del gimnasio, athlete_profile,
+coach_adherence, ranking, my_athletes, compliance_chart) sobre un gimnasio
+generado con ``seed_load`` y guarda p50/p95 y consultas en un baseline JSON
+(core.benchmarks).
+
+Uso:
+    python manage.py run_benchmarks                                    # gym load-001
+    python manage.py run_benchmarks --gym-slug load-003 --iterations 50
+    python manage.py run_benchmarks --output perf/baseline.json
+    python manage.py run_benchmarks --compare perf/baseline.json --tolerance 0.2
+
+Casos de uso:
+  - Generar el baseline de una rama estable sobre la base de staging.
+  - Paso previo al deploy: con --compare sale con código 1 si algún endpoint
+    hace más consultas o su p95 empeora más que la tolerancia.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Benchmark de endpoints pesados con baseline JSON y detección de regresiones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--gym-slug",
+            type=str,
+            default="load-001",
+            help="Gimnasio sobre el que medir (default: load-001, creado con seed_load).",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=20,
+            help="Requests medidos por endpoint (default: 20).",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=2,
+            help="Requests de calentamiento no medidos (default: 2).",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=None,
+            help="Ruta del JSON de resultados (default: solo imprime).",
+        )
+        parser.add_argument(
+            "--compare",
+            type=str,
+            default=None,
+            help="Baseline JSON contra el que detectar regresiones.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Empeoramiento de p95 tolerado antes de reportar regresión (default: 0.25 = 25%%).",
+        )
+
+    def handle(self, *args, **options):
+        from core.benchmarks import compare, run_benchmarks
+        from gyms.models import Gym
+
+        if options["iterations"] < 1:
+            raise CommandError("--iterations debe ser mayor que 0.")
+        gym = Gym.objects.filter(slug=options["gym_slug"]).first()
+        if gym is None:
+            raise CommandError(
+                f"No existe el gimnasio '{options['gym_slug']}'. Generarlo con: python manage.py seed_load"
+            )
+
+        baseline = None
+        if options["compare"]:
+            try:
+                baseline = json.loads(Path(options["compare"]).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"No se pudo leer el baseline: {exc}")
+
+        self.stdout.write(f"Benchmark sobre {gym.slug} · {options['iterations']} iteraciones\n")
+        try:
+            report = run_benchmarks(
+                gym, iterations=options["iterations"], warmup=options["warmup"], log=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        errors = [name for name, row in report["endpoints"].items() if row["status"] != 200]
+        for name in errors:
+            self.stdout.write(self.style.ERROR(f"  ✗ {name} respondió {report['endpoints'][name]['status']}"))
+
+        if options["output"]:
+            output = Path(options["output"])
+            output.parent.mkdir(parents=True, exist_ok=True)
+            output.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"\n✓ Resultados guardados en {output}"))
+
+        if baseline is None:
+            return
+        regressions = compare(baseline, report, tolerance=options["tolerance"])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("✓ Sin regresiones respecto del baseline."))
+            return
+        self.stdout.write(self.style.ERROR(f"\n{len(regressions)} regresión(es):"))
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(f"  - {line}"))
+        sys.exit(1)
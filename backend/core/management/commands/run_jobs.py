@@ -0,0 +1,71 @@
+"""
+Comando de gestión: run_jobs
+────────────────────────────
+Worker de la cola de trabajos en segundo plano (``core.jobs``).
+
+Uso:
+    python manage.py run_jobs                  # bucle continuo
+    python manage.py run_jobs --once           # procesa lo pendiente y sale
+    python manage.py run_jobs --batch-size 20 --sleep 2
+
+Se pueden levantar varios workers en paralelo: en Postgres cada uno reclama
+trabajos distintos con SKIP LOCKED.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Ejecuta los trabajos encolados en segundo plano."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            default=False,
+            help="Procesar los trabajos listos y terminar (útil en cron).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Trabajos reclamados por iteración (default: 10).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Segundos de espera cuando la cola está vacía (default: 1).",
+        )
+
+    def handle(self, *args, **options):
+        from core.jobs import default_worker_id, purge_finished, requeue_stale_jobs, run_pending
+
+        worker_id = default_worker_id()
+        batch_size = options["batch_size"]
+        self.stdout.write(f"Worker {worker_id} iniciado.\n")
+
+        processed = 0
+        last_maintenance = 0.0
+        try:
+            while True:
+                if time.monotonic() - last_maintenance > 60:
+                    requeued = requeue_stale_jobs()
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f"  ↺ {requeued} trabajos huérfanos reencolados"))
+                    purge_finished()
+                    last_maintenance = time.monotonic()
+
+                count = run_pending(worker_id, batch_size)
+                processed += count
+                if count:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            self.stdout.write("\nWorker detenido.")
+
+        self.stdout.write(self.style.SUCCESS(f"Trabajos procesados: {processed}"))
@@ -0,0 +1,85 @@
+"""
+Comando de gestión: seed_load
+─────────────────────────────
+Genera un dataset sintético a escala (core.loadgen) para pruebas de carga y
+para ``run_benchmarks``: gimnasios con staff, atletas, suscripciones, pagos
+y N meses de historial (check-ins, sesiones con logs, comidas, puntos, retos).
+
+Uso:
+    python manage.py seed_load                                   # 1 gym · 500 atletas · 3 meses
+    python manage.py seed_load --gyms 20 --athletes-per-gym 2000 --months 12
+    python manage.py seed_load --seed 7 --batch-size 10000
+    python manage.py seed_load --flush                            # borra los datos de carga
+
+Casos de uso:
+  - Preparar una base de staging con volumen de producción.
+  - Dataset reproducible (mismo --seed) para comparar benchmarks entre ramas.
+
+Los gimnasios generados usan el slug ``load-NNN``; no se mezclan con datos reales.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Genera datos sintéticos a escala para pruebas de carga y benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gyms", type=int, default=1, help="Gimnasios a crear (default: 1).")
+        parser.add_argument(
+            "--athletes-per-gym",
+            type=int,
+            default=500,
+            help="Atletas por gimnasio (default: 500).",
+        )
+        parser.add_argument("--months", type=int, default=3, help="Meses de historial (default: 3).")
+        parser.add_argument("--seed", type=int, default=42, help="Semilla aleatoria (default: 42).")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Filas por bulk_create (default: 5000).",
+        )
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            default=False,
+            help="Eliminar los gimnasios y cuentas de carga existentes y terminar.",
+        )
+
+    def handle(self, *args, **options):
+        from core.loadgen import LOAD_PASSWORD, LoadGenerator, flush_load_data
+
+        if options["flush"]:
+            removed = flush_load_data()
+            self.stdout.write(self.style.SUCCESS(f"✓ {removed} gimnasios de carga eliminados."))
+            return
+
+        for name in ("gyms", "athletes_per_gym", "months", "batch_size"):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} debe ser mayor que 0.")
+
+        self.stdout.write(
+            f"Generando {options['gyms']} gimnasio(s) · {options['athletes_per_gym']} atletas · "
+            f"{options['months']} meses (seed {options['seed']})\n"
+        )
+        generator = LoadGenerator(
+            months=options["months"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            log=self.stdout.write,
+        )
+        started = time.perf_counter()
+        counts = generator.generate(options["gyms"], options["athletes_per_gym"])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write("\n── Filas insertadas ─────────────────")
+        for model, count in sorted(counts.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {model:<24} {count:>10,}")
+        self.stdout.write(f"  Tiempo: {elapsed:.1f}s")
+        self.stdout.write("─────────────────────────────────────")
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Listo. Contraseña de todas las cuentas @load.test: {LOAD_PASSWORD}"
+        ))
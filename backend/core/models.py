@@ -81,3 +81,39 @@ class AuditLog(BaseModel):
 
     def __str__(self):
         return f"[{self.created_at.strftime('%Y-%m-%d %H:%M')}] {self.user} -> {self.action}"
+
+
+class BackgroundJob(BaseModel):
+    """
+    Trabajo en segundo plano persistido en la base de datos (broker sin
+    servicios externos). Lo encola ``core.jobs.enqueue`` y lo ejecuta el
+    comando ``run_jobs``.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "En cola"
+        RUNNING = "running", "En ejecución"
+        DONE = "done", "Completado"
+        FAILED = "failed", "Fallido"
+
+    task = models.CharField(max_length=255, help_text="Ruta importable de la función, p. ej. core.tasks.send_welcome_gym_email")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["run_after"]
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
+
+    def __str__(self):
+        return f"{self.task} [{self.status}] intento {self.attempts}/{self.max_attempts}"
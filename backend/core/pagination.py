@@ -0,0 +1,104 @@
+"""
+core/pagination.py
+──────────────────
+Paginación por keyset (cursor) opcional para listados que crecen sin límite.
+
+Sin parámetros, ``OptInCursorPagination`` se comporta exactamente como la
+``PageNumberPagination`` global (``count``/``next``/``previous``/``results``),
+así los clientes existentes no cambian. Con ``?pagination=cursor`` (primera
+página) o ``?cursor=<token>`` (siguientes) cambia a keyset:
+
+  - ``WHERE campo < último_valor ORDER BY campo DESC LIMIT n`` sobre el índice
+    del endpoint: el costo no crece con la profundidad, sin ``OFFSET``.
+  - Sin ``COUNT(*)``: se informa ``approximate_count`` (estimación del
+    planificador en Postgres, conteo acotado en otros motores).
+
+Cada vista declara su orden con ``cursor_ordering``, alineado con un índice.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de este tamaño se cuenta exacto (barato); por encima se estima.
+APPROXIMATE_COUNT_THRESHOLD = 1000
+
+
+def approximate_count(queryset) -> int:
+    """
+    Total aproximado de filas del queryset sin recorrerlo completo.
+    En Postgres usa la estimación de ``EXPLAIN``; si es pequeña (o en otros
+    motores) cuenta hasta ``APPROXIMATE_COUNT_THRESHOLD`` filas como máximo.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        try:
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]["Plan"]["Plan Rows"])
+            if estimate > APPROXIMATE_COUNT_THRESHOLD:
+                return estimate
+        except Exception:
+            logger.warning("No se pudo estimar el total con EXPLAIN", exc_info=True)
+    return queryset[:APPROXIMATE_COUNT_THRESHOLD + 1].count()
+
+
+class KeysetPagination(CursorPagination):
+    """CursorPagination de DRF con ``approximate_count`` en la respuesta."""
+
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def __init__(self, ordering=("-created_at", "-id")):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.approximate_count = approximate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "approximate_count": self.approximate_count,
+            "results": data,
+        })
+
+
+def cursor_requested(request) -> bool:
+    params = request.query_params
+    return "cursor" in params or params.get("pagination") == "cursor"
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    ``PageNumberPagination`` por defecto; keyset si el cliente lo pide.
+    Orden del keyset: atributo ``cursor_ordering`` de la vista.
+    """
+
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not cursor_requested(request):
+            self.keyset = None
+            return super().paginate_queryset(queryset, request, view)
+        ordering = getattr(view, "cursor_ordering", None) or KeysetPagination().ordering
+        self.keyset = KeysetPagination(ordering)
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -47,6 +47,13 @@ class IsAthlete(IsAuthenticated):
 
 def get_athlete_tier(user) -> str | None:
     """Return the active subscription tier ('basic'|'premium') for an athlete, or None."""
+    # request.user ya trae el tier resuelto por core.authentication.
+    if "_athlete_tier" in user.__dict__:
+        return user._athlete_tier
+    return query_athlete_tier(user)
+
+
+def query_athlete_tier(user) -> str | None:
     if user.role != User.Role.ATHLETE:
         return None
     from gyms.models import GymSubscription
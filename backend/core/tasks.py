@@ -1,9 +1,13 @@
+import hashlib
 import logging
+
 import resend
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+from .jobs import enqueue
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,13 +49,31 @@ def send_welcome_staff_email(staff_email: str, staff_name: str, gym_name: str, r
     _send(f'¡Te has unido al staff de {gym_name} en LifeFit!', html, staff_email)
 
 
+# ── Versiones asíncronas ─────────────────────────────────────────────────────
+# Encolan el envío en core.jobs: la petición solo inserta una fila y el worker
+# (``run_jobs``) hace la llamada HTTPS a Resend con reintentos. La clave de
+# idempotencia usa el enlace de invitación, que es único por invitación.
+
+def _invite_key(kind: str, invite_link: str) -> str:
+    return f"{kind}:{hashlib.sha256(invite_link.encode()).hexdigest()}"
+
+
 def send_welcome_gym_async(admin_email: str, gym_name: str, invite_link: str) -> None:
-    send_welcome_gym_email(admin_email, gym_name, invite_link)
+    enqueue(
+        "core.tasks.send_welcome_gym_email", admin_email, gym_name, invite_link,
+        idempotency_key=_invite_key("welcome_gym", invite_link),
+    )
 
 
 def send_welcome_athlete_async(athlete_email: str, athlete_name: str, gym_name: str, invite_link: str) -> None:
-    send_welcome_athlete_email(athlete_email, athlete_name, gym_name, invite_link)
+    enqueue(
+        "core.tasks.send_welcome_athlete_email", athlete_email, athlete_name, gym_name, invite_link,
+        idempotency_key=_invite_key("welcome_athlete", invite_link),
+    )
 
 
 def send_welcome_staff_async(staff_email: str, staff_name: str, gym_name: str, role_name: str, invite_link: str) -> None:
-    send_welcome_staff_email(staff_email, staff_name, gym_name, role_name, invite_link)
+    enqueue(
+        "core.tasks.send_welcome_staff_email", staff_email, staff_name, gym_name, role_name, invite_link,
+        idempotency_key=_invite_key("welcome_staff", invite_link),
+    )
@@ -1,3 +1,486 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .jobs import enqueue, run_pending
+from .models import BackgroundJob
+
+_calls = []
+
+
+def record_call(value):
+    _calls.append(value)
+
+
+def always_fails():
+    raise RuntimeError("proveedor caído")
+
+
+class BackgroundJobTests(TestCase):
+    def setUp(self):
+        _calls.clear()
+
+    def test_enqueue_does_not_run_inline(self):
+        enqueue("core.tests.record_call", "a")
+        self.assertEqual(_calls, [])
+        self.assertEqual(run_pending("test-worker"), 1)
+        self.assertEqual(_calls, ["a"])
+        self.assertEqual(BackgroundJob.objects.get().status, BackgroundJob.Status.DONE)
+
+    def test_idempotency_key_deduplicates(self):
+        first = enqueue("core.tests.record_call", "a", idempotency_key="k1")
+        second = enqueue("core.tests.record_call", "a", idempotency_key="k1")
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(BackgroundJob.objects.count(), 1)
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        job = enqueue("core.tests.always_fails", max_attempts=2)
+        run_pending("test-worker")
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.Status.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+
+        # Aún no toca: el backoff lo mantiene fuera del lote
+        self.assertEqual(run_pending("test-worker"), 0)
+
+        BackgroundJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        run_pending("test-worker")
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.Status.FAILED)
+        self.assertIn("proveedor caído", job.last_error)
+
+    @override_settings(JOBS_RUN_EAGERLY=True)
+    def test_eager_mode(self):
+        enqueue("core.tests.record_call", "b")
+        self.assertEqual(_calls, ["b"])
+
+    def test_welcome_email_is_enqueued(self):
+        from .tasks import send_welcome_athlete_async
+        with mock.patch("core.tasks._send") as send:
+            send_welcome_athlete_async("a@b.com", "Ana", "Gym", "http://x/invite?t=1")
+            send.assert_not_called()
+            run_pending("test-worker")
+            send.assert_called_once()
+
+
+class OptInCursorPaginationTests(TestCase):
+    """El keyset es opcional: sin parámetros la respuesta sigue siendo la de PageNumberPagination."""
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.test import APIClient
+        from gyms.models import Gym, Notification
+
+        User = get_user_model()
+        gym = Gym.objects.create(name="Cursor Gym", slug="cursor-gym")
+        self.user = User.objects.create_user(
+            email="athlete@cursor.com", password="pass123", role=User.Role.ATHLETE, gym=gym,
+        )
+        Notification.objects.bulk_create([
+            Notification(recipient=self.user, notification_type="system", title=f"n{i}", gym=gym)
+            for i in range(25)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_default_response_is_unchanged(self):
+        data = self.client.get("/api/gyms/notifications/").data
+        self.assertEqual(data["count"], 25)
+        self.assertEqual(len(data["results"]), 20)
+
+    def test_cursor_mode_walks_all_rows_without_count(self):
+        data = self.client.get("/api/gyms/notifications/", {"pagination": "cursor"}).data
+        self.assertNotIn("count", data)
+        self.assertEqual(data["approximate_count"], 25)
+        first = [n["id"] for n in data["results"]]
+
+        data = self.client.get(data["next"]).data
+        second = [n["id"] for n in data["results"]]
+        self.assertEqual(len(first) + len(second), 25)
+        self.assertFalse(set(first) & set(second))
+        self.assertIsNone(data["next"])
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.test import APIClient
+        from .instrumentation import registry
+
+        User = get_user_model()
+        self.admin = User.objects.create_user(
+            email="root@perf.com", password="pass123", role=User.Role.SUPER_ADMIN,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        registry.reset_shared()
+
+    def test_percentile_nearest_rank(self):
+        from .instrumentation import percentile
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile([], 50), 0)
+
+    def test_report_groups_by_view_action(self):
+        for _ in range(3):
+            self.client.get("/api/system/feature-flags/")
+        data = self.client.get("/api/system/performance/", {"sort": "queries"}).data
+
+        row = next(r for r in data["endpoints"] if r["endpoint"] == "FeatureFlagViewSet.list")
+        self.assertEqual(row["requests"], 3)
+        self.assertGreaterEqual(row["queries"]["max"], 1)
+        self.assertIn("p95", row["latency_ms"])
+        self.assertIn("FeatureFlagViewSet.list", data["top_offenders"]["queries_avg"])
+
+    def test_report_merges_all_workers(self):
+        import time
+        from django.core.cache import cache
+
+        other = "perf:proc:otro-host:4242"
+        cache.set(other, {
+            "samples": {"FeatureFlagViewSet.list": [(900.0, 2, 5.0, 1.0)] * 2},
+            "requests": {"FeatureFlagViewSet.list": 7},
+            "over_budget": {},
+            "since": time.time(),
+        })
+        cache.set("perf:slot:5", "otro-host:4242")
+        self.client.get("/api/system/feature-flags/")
+
+        data = self.client.get("/api/system/performance/").data
+        row = next(r for r in data["endpoints"] if r["endpoint"] == "FeatureFlagViewSet.list")
+        self.assertEqual((row["requests"], row["samples"]), (8, 3))
+        self.assertEqual(row["latency_ms"]["max"], 900.0)
+        self.assertIn("otro-host:4242", [w["process"] for w in data["process"]["workers"]])
+
+        self.assertEqual(self.client.delete("/api/system/performance/").status_code, 204)
+        self.assertIsNone(cache.get(other))
+
+    def test_record_does_no_io_and_publishes_a_bounded_subset(self):
+        from django.core.cache import cache
+        from .instrumentation import PUBLISHED_SAMPLES_PER_ENDPOINT, process_id, registry
+
+        with mock.patch.object(registry, "publish") as publish:
+            for i in range(PUBLISHED_SAMPLES_PER_ENDPOINT + 20):
+                registry.record("Sintetico.list", (float(i), 1, 1.0, 0.0), False)
+        publish.assert_not_called()
+
+        registry.publish()
+        state = cache.get(f"perf:proc:{process_id()}")
+        samples = state["samples"]["Sintetico.list"]
+        self.assertEqual((len(samples), samples[-1][0]), (PUBLISHED_SAMPLES_PER_ENDPOINT, 119.0))
+        self.assertEqual(state["requests"]["Sintetico.list"], PUBLISHED_SAMPLES_PER_ENDPOINT + 20)
+        self.assertIn(process_id(), [cache.get(f"perf:slot:{n}") for n in range(64)])
+
+    def test_report_requires_super_admin(self):
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        athlete = User.objects.create_user(email="a@perf.com", password="pass123", role=User.Role.ATHLETE)
+        self.client.force_authenticate(user=athlete)
+        self.assertEqual(self.client.get("/api/system/performance/").status_code, 403)
+
+    def test_budget_exceeded_fails_in_strict_mode(self):
+        from .instrumentation import QueryBudgetExceeded, registry
+
+        with override_settings(QUERY_BUDGETS={"FeatureFlagViewSet.list": 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get("/api/system/feature-flags/")
+            with override_settings(QUERY_BUDGET_STRICT=False), self.assertLogs("core.instrumentation", "WARNING"):
+                self.assertEqual(self.client.get("/api/system/feature-flags/").status_code, 200)
+
+        row = next(r for r in registry.snapshot() if r["endpoint"] == "FeatureFlagViewSet.list")
+        self.assertEqual(row["over_budget"], 2)
+
+
+class LoadBenchmarkTests(TestCase):
+    """seed_load + run_benchmarks en miniatura: el dataset es coherente y todos los endpoints responden."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from .loadgen import LoadGenerator
+        cls.counts = LoadGenerator(months=1, seed=1, batch_size=50).generate(gyms=1, athletes_per_gym=12)
+
+    def test_dataset_and_derived_tables(self):
+        from gamification.models import UserPoints, UserPointsBalance
+        from gyms.models import CheckIn, DailyGymActivity
+        from workouts.models import SessionExerciseLog
+
+        self.assertEqual(self.counts["Gym"], 1)
+        self.assertEqual(CheckIn.objects.count(), self.counts["CheckIn"])
+        self.assertGreater(SessionExerciseLog.objects.count(), 0)
+        self.assertTrue(DailyGymActivity.objects.exists())
+        for user_id, approved in UserPoints.objects.values_list("user_id", "points"):
+            self.assertTrue(UserPointsBalance.objects.filter(user_id=user_id, approved_total__gte=approved).exists())
+
+    def test_benchmark_runs_every_endpoint(self):
+        from gyms.models import Gym
+        from .benchmarks import ENDPOINTS, compare, run_benchmarks
+
+        report = run_benchmarks(Gym.objects.get(slug="load-001"), iterations=1, warmup=0)
+        self.assertEqual(set(report["endpoints"]), {e.name for e in ENDPOINTS})
+        for name, row in report["endpoints"].items():
+            self.assertEqual(row["status"], 200, name)
+
+        self.assertEqual(compare(report, report), [])
+        worse = {"endpoints": {
+            name: {**row, "queries": row["queries"] + 1} for name, row in report["endpoints"].items()
+        }}
+        self.assertEqual(len(compare(report, worse)), len(ENDPOINTS))
+
+
+class QueryFanoutTests(TestCase):
+    def test_runs_inline_inside_transaction(self):
+        import threading
+        from .concurrency import can_run_parallel, run_parallel
+
+        self.assertFalse(can_run_parallel(3))
+        results = run_parallel({"a": threading.get_ident, "b": threading.get_ident})
+        self.assertEqual(results, {"a": threading.get_ident(), "b": threading.get_ident()})
+
+    def test_parallel_path_keeps_keys_and_request_context(self):
+        import threading
+        from .concurrency import run_parallel
+        from .instrumentation import RequestMetrics, _current
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with mock.patch("core.concurrency.can_run_parallel", return_value=True):
+                results = run_parallel({
+                    "thread": lambda: threading.current_thread().name,
+                    "metrics": lambda: _current.get(),
+                    "value": lambda: 42,
+                })
+        finally:
+            _current.reset(token)
+        self.assertTrue(results["thread"].startswith("query-fanout"))
+        self.assertIs(results["metrics"], metrics)
+        self.assertEqual(results["value"], 42)
+
+    def test_system_analytics_aggregates(self):
+        from datetime import timedelta
+        from django.contrib.auth import get_user_model
+        from rest_framework.test import APIClient
+        from gyms.models import Gym
+
+        User = get_user_model()
+        Gym.objects.create(name="Activo", slug="activo")
+        Gym.objects.create(name="Inactivo", slug="inactivo", status=Gym.Status.INACTIVE)
+        User.objects.create_user(email="new@a.com", password="x", role=User.Role.ATHLETE)
+        old = User.objects.create_user(email="old@a.com", password="x", role=User.Role.ATHLETE)
+        User.objects.filter(pk=old.pk).update(date_joined=timezone.now() - timedelta(days=30))
+        admin = User.objects.create_user(email="root@a.com", password="x", role=User.Role.SUPER_ADMIN)
+
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        data = client.get("/api/system/analytics/dashboard/").data
+        self.assertEqual(data["activeGyms"], 1)
+        self.assertEqual(data["newGymsThisMonth"], 2)
+        self.assertEqual(data["totalAthletes"], 2)
+        self.assertEqual(data["totalAthletesGrowth"], "+1 esta semana")
+        self.assertEqual(data["mrr"], 0.0)
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    """En tests el alias ``replica`` es un espejo de ``default``: se verifica a qué alias va cada consulta."""
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        User = get_user_model()
+        self.admin = User.objects.create_user(
+            email="root@replica.com", password="pass123", role=User.Role.SUPER_ADMIN,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def _queries(self, fn):
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            fn()
+        return len(primary.captured_queries), len(replica.captured_queries)
+
+    def test_only_marked_reads_use_replica(self):
+        from .db_router import read_from_replica
+        from .models import FeatureFlag
+
+        self.assertEqual(self._queries(lambda: list(FeatureFlag.objects.all())), (1, 0))
+        with read_from_replica():
+            self.assertEqual(self._queries(lambda: list(FeatureFlag.objects.all())), (0, 1))
+            with transaction.atomic():
+                self.assertEqual(self._queries(lambda: list(FeatureFlag.objects.all())), (1, 0))
+
+    def test_analytics_view_reads_from_replica(self):
+        primary, replica = self._queries(lambda: self.client.get("/api/system/analytics/usage/"))
+        self.assertGreater(replica, 0)
+
+    def test_write_pins_following_reads_to_primary(self):
+        from django.core.cache import cache
+
+        response = self.client.post("/api/system/feature-flags/", {"name": "Pin", "code": "pin"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        primary, replica = self._queries(lambda: self.client.get("/api/system/analytics/usage/"))
+        self.assertEqual(replica, 0)
+
+        cache.clear()  # el pin expiró
+        primary, replica = self._queries(lambda: self.client.get("/api/system/analytics/usage/"))
+        self.assertGreater(replica, 0)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+        from gyms.models import Gym, GymMembershipPlan, GymSubscription
+
+        User = get_user_model()
+        self.gym = Gym.objects.create(name="Auth Gym", slug="auth-cache-gym")
+        self.plan = GymMembershipPlan.objects.create(
+            gym=self.gym, name="Premium", price=100, tier=GymMembershipPlan.Tier.PREMIUM,
+        )
+        self.athlete = User.objects.create_user(
+            email="athlete@auth.com", password="pass123", role=User.Role.ATHLETE, gym=self.gym,
+        )
+        self.subscription = GymSubscription.objects.create(
+            athlete=self.athlete, gym=self.gym, plan=self.plan, start_date=timezone.localdate(),
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.athlete)}")
+
+    def _tier_request(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get("/api/gyms/my-subscription-tier/")
+        self.assertEqual(response.status_code, 200)
+        return response.data["tier"], len(captured.captured_queries)
+
+    def test_warm_request_skips_user_gym_and_tier_queries(self):
+        tier, cold = self._tier_request()
+        self.assertEqual(tier, "premium")
+        self.assertGreaterEqual(cold, 3)
+        tier, warm = self._tier_request()
+        self.assertEqual(tier, "premium")
+        self.assertEqual(warm, 0)
+
+    def test_user_and_subscription_changes_invalidate(self):
+        from .authentication import cached_user
+
+        self._tier_request()
+        self.subscription.status = "canceled"
+        self.subscription.save()
+        self.assertEqual(self._tier_request()[0], None)
+
+        self.athlete.role = "coach"
+        self.athlete.save()
+        self.assertEqual(cached_user(self.athlete.id).role, "coach")
+
+        self.athlete.is_active = False
+        self.athlete.save()
+        self.assertEqual(self.client.get("/api/gyms/my-subscription-tier/").status_code, 401)
+
+    def test_gym_deactivation_refreshes_cached_gym(self):
+        from gyms.views import _revoke_gym_sessions
+        from .authentication import cached_user
+
+        self.assertIsNone(cached_user(self.athlete.id).gym.deleted_at)
+        self.gym.soft_delete()
+        self.assertIsNotNone(cached_user(self.athlete.id).gym.deleted_at)
+
+        self.gym.restore()
+        cached_user(self.athlete.id)
+        type(self.gym).objects.filter(pk=self.gym.pk).update(status="inactive")
+        _revoke_gym_sessions(self.gym)
+        self.assertEqual(cached_user(self.athlete.id).gym.status, "inactive")
+
+    def test_cached_user_does_not_carry_password_hash(self):
+        from .authentication import cached_user
+
+        user = cached_user(self.athlete.id)
+        self.assertIn("password", user.get_deferred_fields())
+        self.assertTrue(user.check_password("pass123"))
+
+    def test_gym_revocation_is_bulk_and_rejects_earlier_tokens(self):
+        from datetime import timedelta
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+        from gyms.views import _revoke_gym_sessions
+
+        # Sesión abierta antes de la revocación.
+        earlier = AccessToken.for_user(self.athlete)
+        earlier["iat"] -= 5
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {earlier}")
+
+        refresh_tokens = [RefreshToken.for_user(self.athlete) for _ in range(3)]
+        refresh_tokens[0].blacklist()
+        OutstandingToken.objects.filter(jti=refresh_tokens[1]["jti"]).update(
+            expires_at=timezone.now() - timedelta(days=1),
+        )
+        self.assertEqual(self._tier_request()[0], "premium")
+
+        with self.assertNumQueries(3):
+            revoked = _revoke_gym_sessions(self.gym)
+        self.assertEqual(revoked, 1)
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=refresh_tokens[2]["jti"]).exists())
+        self.assertEqual(self.client.get("/api/gyms/my-subscription-tier/").status_code, 401)
+
+        # Un login en el mismo segundo de la revocación vuelve a autenticar;
+        # uno del segundo anterior no.
+        from datetime import datetime, timezone as dt_timezone
+        fresh = AccessToken.for_user(self.athlete)
+        self.gym.sessions_revoked_before = datetime.fromtimestamp(fresh["iat"], tz=dt_timezone.utc)
+        self.gym.save(update_fields=["sessions_revoked_before"])
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {fresh}")
+        self.assertEqual(self._tier_request()[0], "premium")
+
+        older = AccessToken.for_user(self.athlete)
+        older["iat"] = fresh["iat"] - 1
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {older}")
+        self.assertEqual(self.client.get("/api/gyms/my-subscription-tier/").status_code, 401)
+
+    def test_gym_revocation_applies_with_check_revoke_token(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from gyms.views import _revoke_gym_sessions
+        from .authentication import api_settings
+
+        # override_settings reemplaza api_settings de simplejwt y los módulos que ya
+        # lo importaron seguirían viendo el anterior.
+        with mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True):
+            earlier = AccessToken.for_user(self.athlete)
+            earlier["iat"] -= 5
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {earlier}")
+            self.assertEqual(self._tier_request()[0], "premium")
+
+            _revoke_gym_sessions(self.gym)
+            self.assertEqual(self.client.get("/api/gyms/my-subscription-tier/").status_code, 401)
+
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.athlete)}")
+            self.assertEqual(self._tier_request()[0], "premium")
+
+    def test_prune_tokens_removes_expired(self):
+        from datetime import timedelta
+        from django.core.management import call_command
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        expired, live = RefreshToken.for_user(self.athlete), RefreshToken.for_user(self.athlete)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired["jti"]).update(expires_at=timezone.now() - timedelta(hours=1))
+
+        call_command("prune_tokens", "--batch-size", "1", stdout=StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list("jti", flat=True)), [live["jti"]])
+        self.assertFalse(BlacklistedToken.objects.exists())
@@ -4,6 +4,7 @@ from .views import (
     FeatureFlagViewSet, GlobalAnnouncementViewSet,
     SystemAnalyticsView, UsageAnalyticsView,
     GymAnalyticsView, UserAnalyticsView, EngagementAnalyticsView,
+    PerformanceMetricsView,
 )
 
 router = DefaultRouter()
@@ -16,5 +17,6 @@ urlpatterns = [
     path('analytics/gyms/', GymAnalyticsView.as_view(), name='system-analytics-gyms'),
     path('analytics/users/', UserAnalyticsView.as_view(), name='system-analytics-users'),
     path('analytics/engagement/', EngagementAnalyticsView.as_view(), name='system-analytics-engagement'),
+    path('performance/', PerformanceMetricsView.as_view(), name='system-performance'),
     path('', include(router.urls)),
 ]
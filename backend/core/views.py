@@ -10,6 +10,7 @@ from django.db.models.functions import TruncMonth
 from .models import AuditLog, FeatureFlag, GlobalAnnouncement
 from .serializers import FeatureFlagSerializer, GlobalAnnouncementSerializer
 from .permissions import IsSuperAdmin
+from .db_router import replica_reads
 
 
 def _get_client_ip(request) -> str | None:
@@ -164,6 +165,7 @@ class GlobalAnnouncementViewSet(viewsets.ModelViewSet):
 class SystemAnalyticsView(APIView):
     permission_classes = [IsSuperAdmin]
 
+    @replica_reads
     def get(self, request, *args, **kwargs):
         User = get_user_model()
         from gyms.models import Gym
@@ -171,6 +173,7 @@ class SystemAnalyticsView(APIView):
         from datetime import date, timedelta
         from django.utils import timezone
         import calendar
+        from .concurrency import run_parallel
 
         today = timezone.now().date()
 
@@ -182,11 +185,7 @@ class SystemAnalyticsView(APIView):
         active_subs = (
             Subscription.objects
             .filter(status="active")
-            .select_related("plan")
-        )
-        mrr = sum(
-            _monthly_equivalent(s.plan.price, s.plan.billing_cycle)
-            for s in active_subs
+            .values_list("plan__price", "plan__billing_cycle")
         )
 
         # Suscripciones activas durante el mes anterior
@@ -201,28 +200,9 @@ class SystemAnalyticsView(APIView):
             .exclude(
                 Q(status="canceled") & Q(end_date__lt=first_of_last_month)
             )
-            .select_related("plan")
-        )
-        prev_mrr = sum(
-            _monthly_equivalent(s.plan.price, s.plan.billing_cycle)
-            for s in prev_subs
+            .values_list("plan__price", "plan__billing_cycle")
         )
 
-        mrr_growth = 0
-        if prev_mrr > 0:
-            mrr_growth = round(((mrr - prev_mrr) / prev_mrr) * 100, 1)
-
-        # Gyms
-        active_gyms = Gym.objects.filter(status=Gym.Status.ACTIVE).count()
-        new_gyms_this_month = Gym.objects.filter(created_at__gte=first_of_this_month).count()
-
-        # Athletes
-        total_athletes = User.objects.filter(role=User.Role.ATHLETE).count()
-        new_athletes_this_week = User.objects.filter(
-            role=User.Role.ATHLETE,
-            date_joined__gte=today - timedelta(days=7)
-        ).count()
-
         # Revenue history (last 6 months)
         six_months_ago = today - timedelta(days=180)
         revenue_by_month = (
@@ -234,11 +214,6 @@ class SystemAnalyticsView(APIView):
             .order_by("month")
         )
 
-        revenue_history = [
-            {"month": r["month"].strftime("%Y-%m"), "total": float(r["total"])}
-            for r in revenue_by_month
-        ]
-
         # Gym creation history (last 12 months)
         twelve_months_ago = today - timedelta(days=365)
         gyms_by_month = (
@@ -250,9 +225,51 @@ class SystemAnalyticsView(APIView):
             .order_by("month")
         )
 
+        # Seis consultas independientes: en Postgres corren en paralelo (core.concurrency).
+        results = run_parallel({
+            "active_subs": lambda: list(active_subs),
+            "prev_subs": lambda: list(prev_subs),
+            "gyms": lambda: Gym.objects.aggregate(
+                active=Count("id", filter=Q(status=Gym.Status.ACTIVE)),
+                new_this_month=Count("id", filter=Q(created_at__gte=first_of_this_month)),
+            ),
+            "athletes": lambda: User.objects.filter(role=User.Role.ATHLETE).aggregate(
+                total=Count("id"),
+                new_this_week=Count("id", filter=Q(date_joined__gte=today - timedelta(days=7))),
+            ),
+            "revenue": lambda: list(revenue_by_month),
+            "gym_history": lambda: list(gyms_by_month),
+        })
+
+        mrr = sum(
+            (_monthly_equivalent(price, cycle) for price, cycle in results["active_subs"]),
+            Decimal("0"),
+        )
+        prev_mrr = sum(
+            (_monthly_equivalent(price, cycle) for price, cycle in results["prev_subs"]),
+            Decimal("0"),
+        )
+
+        mrr_growth = 0
+        if prev_mrr > 0:
+            mrr_growth = round(((mrr - prev_mrr) / prev_mrr) * 100, 1)
+
+        # Gyms
+        active_gyms = results["gyms"]["active"]
+        new_gyms_this_month = results["gyms"]["new_this_month"]
+
+        # Athletes
+        total_athletes = results["athletes"]["total"]
+        new_athletes_this_week = results["athletes"]["new_this_week"]
+
+        revenue_history = [
+            {"month": r["month"].strftime("%Y-%m"), "total": float(r["total"])}
+            for r in results["revenue"]
+        ]
+
         gym_history = [
             {"month": g["month"].strftime("%Y-%m"), "count": g["count"]}
-            for g in gyms_by_month
+            for g in results["gym_history"]
         ]
 
         return Response({
@@ -270,32 +287,24 @@ class SystemAnalyticsView(APIView):
 class UsageAnalyticsView(APIView):
     permission_classes = [IsSuperAdmin]
 
+    @replica_reads
     def get(self, request, *args, **kwargs):
-        from workouts.models import WorkoutSession
+        from gyms.activity import daily_series
         from django.utils import timezone
-        from datetime import timedelta
 
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
+        today = timezone.localdate()
 
-        workouts_today = WorkoutSession.objects.filter(
-            status=WorkoutSession.Status.COMPLETED,
-            performed_at__date=today
-        ).count()
-
-        workouts_this_week = WorkoutSession.objects.filter(
-            status=WorkoutSession.Status.COMPLETED,
-            performed_at__date__gte=week_ago
-        ).count()
+        # Últimos 8 días del rollup: hoy, la semana (desde week_ago) y el gráfico de 7 días
+        series = daily_series("completed_sessions", 8, today=today)
 
         chart_data = [
-            {"date": (today - timedelta(days=i)).strftime('%b %d'), "workouts": WorkoutSession.objects.filter(status="completed", performed_at__date=today - timedelta(days=i)).count()}
-            for i in range(6, -1, -1)
+            {"date": day.strftime('%b %d'), "workouts": total}
+            for day, total in series[1:]
         ]
 
         return Response({
-            "workoutsToday": workouts_today,
-            "workoutsThisWeek": workouts_this_week,
+            "workoutsToday": series[-1][1],
+            "workoutsThisWeek": sum(total for _, total in series),
             "chartData": chart_data
         })
 
@@ -303,6 +312,7 @@ class UsageAnalyticsView(APIView):
 class GymAnalyticsView(APIView):
     permission_classes = [IsSuperAdmin]
 
+    @replica_reads
     def get(self, request, *args, **kwargs):
         from gyms.models import Gym
         from django.utils import timezone
@@ -331,6 +341,7 @@ class GymAnalyticsView(APIView):
 class UserAnalyticsView(APIView):
     permission_classes = [IsSuperAdmin]
 
+    @replica_reads
     def get(self, request, *args, **kwargs):
         User = get_user_model()
 
@@ -358,29 +369,65 @@ class UserAnalyticsView(APIView):
 class EngagementAnalyticsView(APIView):
     permission_classes = [IsSuperAdmin]
 
+    @replica_reads
     def get(self, request, *args, **kwargs):
-        from workouts.models import WorkoutSession
-        from gyms.models import CheckIn
-        from django.utils import timezone
-        from datetime import timedelta
+        from gyms.activity import active_member_counts
 
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
+        counts = active_member_counts()
+
+        return Response({
+            "checkins": {"dau": counts["checkin_dau"], "wau": counts["checkin_wau"], "mau": counts["checkin_mau"]},
+            "workouts": {"dau": counts["workout_dau"], "mau": counts["workout_mau"]},
+        })
+
+
+class PerformanceMetricsView(APIView):
+    """
+    Métricas por endpoint de todos los workers (core.instrumentation), combinadas
+    desde el cache compartido. ``process.workers`` lista los incluidos.
 
-        dau = CheckIn.objects.filter(timestamp__date=today).values("user").distinct().count()
-        wau = CheckIn.objects.filter(timestamp__date__gte=week_ago).values("user").distinct().count()
-        mau = CheckIn.objects.filter(timestamp__date__gte=month_ago).values("user").distinct().count()
+    GET    ?sort=latency|queries|db|serializer&limit=20
+    DELETE reinicia las muestras de todos los workers.
+    """
+    permission_classes = [IsSuperAdmin]
+
+    SORT_KEYS = {
+        "latency": lambda row: row["latency_ms"]["p95"],
+        "queries": lambda row: row["queries"]["avg"],
+        "db": lambda row: row["db_ms"]["p95"],
+        "serializer": lambda row: row["serializer_ms"]["p95"],
+    }
 
-        workout_dau = WorkoutSession.objects.filter(
-            status=WorkoutSession.Status.COMPLETED, performed_at__date=today
-        ).values("user").distinct().count()
+    def get(self, request, *args, **kwargs):
+        from .instrumentation import process_info, registry
 
-        workout_mau = WorkoutSession.objects.filter(
-            status=WorkoutSession.Status.COMPLETED, performed_at__date__gte=month_ago
-        ).values("user").distinct().count()
+        sort = request.query_params.get("sort", "latency")
+        if sort not in self.SORT_KEYS:
+            return Response(
+                {"detail": f"sort debe ser uno de: {', '.join(self.SORT_KEYS)}."}, status=400,
+            )
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 20)), 200))
+        except ValueError:
+            limit = 20
+
+        rows, states = registry.shared_snapshot()
+        rows.sort(key=self.SORT_KEYS[sort], reverse=True)
+        top_queries = sorted(rows, key=self.SORT_KEYS["queries"], reverse=True)[:5]
+        top_latency = sorted(rows, key=self.SORT_KEYS["latency"], reverse=True)[:5]
 
         return Response({
-            "checkins": {"dau": dau, "wau": wau, "mau": mau},
-            "workouts": {"dau": workout_dau, "mau": workout_mau},
+            "process": process_info(states),
+            "endpoints": rows[:limit],
+            "top_offenders": {
+                "latency_p95": [row["endpoint"] for row in top_latency],
+                "queries_avg": [row["endpoint"] for row in top_queries],
+                "over_budget": [row["endpoint"] for row in rows if row["over_budget"]],
+            },
         })
+
+    def delete(self, request, *args, **kwargs):
+        from .instrumentation import registry
+
+        registry.reset_shared()
+        return Response(status=204)
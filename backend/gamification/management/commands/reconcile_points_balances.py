@@ -0,0 +1,48 @@
+"""
+Comando de gestión: reconcile_points_balances
+─────────────────────────────────────────────
+Verifica ``UserPointsBalance`` contra el ledger ``UserPoints``.
+
+Uso:
+    python manage.py reconcile_points_balances          # solo reporta
+    python manage.py reconcile_points_balances --fix    # corrige diferencias
+
+Sale con código 1 si hay diferencias y no se usa --fix (útil en cron/CI).
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Verifica (y opcionalmente corrige) los saldos de puntos contra el ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            default=False,
+            help="Recalcular desde el ledger los saldos con diferencias.",
+        )
+
+    def handle(self, *args, **options):
+        from gamification.services import reconcile_balances
+
+        fix = options["fix"]
+        mismatches = reconcile_balances(fix=fix)
+
+        for m in mismatches:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"  ✗ user {m['user_id']}: saldo {m['actual']} ≠ ledger {m['expected']}"
+                )
+            )
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Todos los saldos coinciden con el ledger."))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f"{len(mismatches)} saldos corregidos."))
+        else:
+            self.stdout.write(self.style.ERROR(f"{len(mismatches)} saldos con diferencias. Usa --fix."))
+            sys.exit(1)
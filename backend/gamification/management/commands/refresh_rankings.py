@@ -0,0 +1,59 @@
+"""
+Comando de gestión: refresh_rankings
+────────────────────────────────────
+Regenera los snapshots semanales y mensuales del ranking de cada gimnasio
+activo y elimina los de períodos antiguos.
+
+Uso:
+    python manage.py refresh_rankings
+    python manage.py refresh_rankings --gym-id <uuid>
+    python manage.py refresh_rankings --keep-days 120
+
+Opcional: las lecturas del ranking ya encolan la regeneración de los
+snapshots vencidos (gamification.ranking). Sirve para un cron que los mantenga
+calientes y para podar los períodos viejos.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Regenera los snapshots de ranking (semana / mes) por gimnasio."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--gym-id",
+            type=str,
+            default=None,
+            help="Limitar a un gimnasio específico (UUID).",
+        )
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=90,
+            help="Conservar snapshots de períodos iniciados en los últimos N días (default: 90).",
+        )
+
+    def handle(self, *args, **options):
+        from gamification.models import RankingSnapshot
+        from gamification.ranking import build_snapshot
+        from gyms.models import Gym
+
+        gyms = Gym.objects.filter(status=Gym.Status.ACTIVE, deleted_at__isnull=True)
+        if options["gym_id"]:
+            gyms = gyms.filter(id=options["gym_id"])
+
+        total_rows = 0
+        for gym in gyms:
+            for period in RankingSnapshot.Period.values:
+                total_rows += build_snapshot(gym, period)
+
+        cutoff = timezone.localdate() - timedelta(days=options["keep_days"])
+        pruned, _ = RankingSnapshot.objects.filter(period_start__lt=cutoff).delete()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Snapshots regenerados: {total_rows} filas. Eliminados: {pruned}.")
+        )
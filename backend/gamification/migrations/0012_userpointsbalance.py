@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:53
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_balances(apps, schema_editor):
+    from django.db.models import Q, Sum
+    from django.db.models.functions import Coalesce
+
+    UserPoints = apps.get_model("gamification", "UserPoints")
+    UserPointsBalance = apps.get_model("gamification", "UserPointsBalance")
+
+    rows = (
+        UserPoints.objects.values("user_id")
+        .annotate(
+            approved=Coalesce(Sum("points", filter=Q(status="approved")), 0),
+            pending=Coalesce(Sum("pending_points", filter=Q(status="pending")), 0),
+        )
+        .order_by()
+    )
+    UserPointsBalance.objects.bulk_create(
+        [
+            UserPointsBalance(
+                user_id=r["user_id"],
+                approved_total=r["approved"],
+                pending_total=r["pending"],
+            )
+            for r in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0011_add_pickup_info_to_redemption'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPointsBalance',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('approved_total', models.IntegerField(default=0)),
+                ('pending_total', models.IntegerField(default=0)),
+                ('last_entry_at', models.DateTimeField(blank=True, null=True)),
+                ('last_entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='gamification.userpoints')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='points_balance', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Saldo de puntos',
+                'indexes': [models.Index(fields=['-approved_total'], name='gamificatio_approve_51cda9_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
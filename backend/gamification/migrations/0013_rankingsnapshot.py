@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:56
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0012_userpointsbalance'),
+        ('gyms', '0025_daily_gym_activity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('period', models.CharField(choices=[('week', 'Semana'), ('month', 'Mes')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('points', models.IntegerField(default=0)),
+                ('rank', models.PositiveIntegerField()),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking_snapshots', to='gyms.gym')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['gym', 'period', 'period_start', 'rank'], name='gamificatio_gym_id_7995e8_idx')],
+                'constraints': [models.UniqueConstraint(fields=('gym', 'period', 'period_start', 'user'), name='unique_ranking_snapshot_entry')],
+            },
+        ),
+    ]
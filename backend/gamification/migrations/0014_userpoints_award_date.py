@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-17 09:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+LEGACY_PREFIX = "nutrition_daily_"
+
+
+def migrate_nutrition_sources(apps, schema_editor):
+    """``source='nutrition_daily_<fecha>'`` → ``source='nutrition_daily'`` + ``award_date``."""
+    from datetime import date
+
+    UserPoints = apps.get_model("gamification", "UserPoints")
+
+    seen = set()
+    updated = []
+    rows = UserPoints.objects.filter(source__startswith=LEGACY_PREFIX).order_by("created_at")
+    for entry in rows.only("id", "user_id", "source").iterator(chunk_size=2000):
+        try:
+            day = date.fromisoformat(entry.source[len(LEGACY_PREFIX):])
+        except ValueError:
+            continue
+        # Un duplicado previo conserva su source antiguo para no violar la restricción.
+        if (entry.user_id, day) in seen:
+            continue
+        seen.add((entry.user_id, day))
+        entry.source = "nutrition_daily"
+        entry.award_date = day
+        updated.append(entry)
+    UserPoints.objects.bulk_update(updated, ["source", "award_date"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0011_progress_events'),
+        ('gamification', '0013_rankingsnapshot'),
+        ('nutrition', '0022_plan_daily_totals'),
+        ('workouts', '0009_add_session_exercise_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpoints',
+            name='award_date',
+            field=models.DateField(blank=True, help_text="Día premiado. Solo aplica a source='nutrition_daily'.", null=True),
+        ),
+        migrations.RunPython(migrate_nutrition_sources, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userpoints',
+            constraint=models.UniqueConstraint(condition=models.Q(('source', 'nutrition_daily')), fields=('user', 'award_date'), name='unique_nutrition_day_per_user'),
+        ),
+    ]
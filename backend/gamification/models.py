@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q, UniqueConstraint
 from django.conf import settings
 from django.utils import timezone
@@ -121,7 +121,8 @@ class UserPoints(BaseModel):
     Los puntos semanales (source='workout_week') nacen directamente en
     ``approved`` cuando el coach cierra la semana.  El campo ``week_start``
     identifica el lunes de la semana premiada y, junto con ``user``, garantiza
-    que no se apruebe la misma semana dos veces.
+    que no se apruebe la misma semana dos veces.  Los puntos diarios de
+    nutrición (source='nutrition_daily') hacen lo mismo con ``award_date``.
     """
 
     class Status(models.TextChoices):
@@ -152,6 +153,11 @@ class UserPoints(BaseModel):
         db_index=True,
         help_text="Lunes de la semana premiada. Solo aplica a source='workout_week'.",
     )
+    award_date      = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Día premiado. Solo aplica a source='nutrition_daily'.",
+    )
     reviewed_by     = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -189,11 +195,55 @@ class UserPoints(BaseModel):
                 condition=Q(source="workout_week"),
                 name="unique_workout_week_per_user",
             ),
+            UniqueConstraint(
+                fields=["user", "award_date"],
+                condition=Q(source="nutrition_daily"),
+                name="unique_nutrition_day_per_user",
+            ),
         ]
 
     def __str__(self):
         return f"{self.user.email} — {self.pending_points} pts [{self.status}] ({self.source})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Con campos diferidos no se fuerza una consulta extra: save() la resuelve.
+        loaded = {"status", "points", "pending_points"} <= set(field_names)
+        instance._ledger_state = instance.ledger_contribution() if loaded else None
+        return instance
+
+    def ledger_contribution(self) -> tuple[int, int]:
+        """Aporte (aprobado, pendiente) de este registro al saldo del usuario."""
+        if self.status == self.Status.APPROVED:
+            return (self.points or 0, 0)
+        return (0, self.pending_points or 0)
+
+    def save(self, *args, **kwargs):
+        # El saldo se ajusta en la misma transacción que el registro del ledger.
+        from .services import apply_balance_delta
+
+        before = (0, 0) if self._state.adding else self._ledger_state
+        with transaction.atomic():
+            if before is None:
+                stored = type(self).objects.filter(pk=self.pk).first()
+                before = stored.ledger_contribution() if stored else (0, 0)
+            super().save(*args, **kwargs)
+            after = self.ledger_contribution()
+            apply_balance_delta(self.user_id, after[0] - before[0], after[1] - before[1], entry=self)
+        self._ledger_state = after
+
+    def delete(self, *args, **kwargs):
+        from .services import apply_balance_delta
+
+        with transaction.atomic():
+            # Aporte según la fila almacenada: la instancia en memoria puede estar desfasada.
+            stored = type(self).objects.select_for_update().filter(pk=self.pk).first()
+            approved, pending = stored.ledger_contribution() if stored else (0, 0)
+            result = super().delete(*args, **kwargs)
+            apply_balance_delta(self.user_id, -approved, -pending)
+        return result
+
     def approve(self, reviewed_by) -> None:
         """Confirma los puntos pendientes. Idempotente si ya está aprobado."""
         if self.status == self.Status.APPROVED:
@@ -203,3 +253,77 @@ class UserPoints(BaseModel):
         self.reviewed_by = reviewed_by
         self.reviewed_at = timezone.now()
         self.save(update_fields=["points", "status", "reviewed_by", "reviewed_at", "updated_at"])
+
+
+class UserPointsBalance(BaseModel):
+    """
+    Saldo materializado del ledger ``UserPoints`` de cada usuario.
+
+    Se mantiene en la misma transacción en que se crea, aprueba o elimina un
+    registro (``UserPoints.save`` / ``delete``) para que las lecturas de
+    puntos sean O(1). ``reconcile_points_balances`` lo verifica contra el
+    ledger completo.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="points_balance",
+    )
+    approved_total = models.IntegerField(default=0)
+    pending_total = models.IntegerField(default=0)
+    last_entry = models.ForeignKey(
+        UserPoints,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    last_entry_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Saldo de puntos"
+        indexes = [
+            models.Index(fields=["-approved_total"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} — {self.approved_total} pts (+{self.pending_total} pendientes)"
+
+
+class RankingSnapshot(BaseModel):
+    """
+    Posición precalculada de un atleta en el ranking de su gym para un período
+    (semana o mes). La genera ``gamification.ranking.build_snapshot`` (comando
+    ``refresh_rankings``); el endpoint de ranking solo la lee.
+    """
+
+    class Period(models.TextChoices):
+        WEEK  = "week",  "Semana"
+        MONTH = "month", "Mes"
+
+    gym          = models.ForeignKey("gyms.Gym", on_delete=models.CASCADE, related_name="ranking_snapshots")
+    period       = models.CharField(max_length=10, choices=Period.choices)
+    period_start = models.DateField()
+    user         = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="ranking_snapshots",
+    )
+    points       = models.IntegerField(default=0)
+    rank         = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["rank"]
+        constraints = [
+            UniqueConstraint(
+                fields=["gym", "period", "period_start", "user"],
+                name="unique_ranking_snapshot_entry",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["gym", "period", "period_start", "rank"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} {self.user.email} — {self.points} pts ({self.period} {self.period_start})"
@@ -0,0 +1,230 @@
+"""
+gamification/ranking.py
+───────────────────────
+Ranking de atletas por gimnasio.
+
+  - Histórico (``all``): se ordena en SQL sobre el saldo materializado
+    (``UserPointsBalance``) con una función ventana ``RANK()`` y solo se
+    materializa la página pedida. La posición del usuario es un ``COUNT`` de
+    atletas con más puntos.
+  - Semana / mes: se sirven desde ``RankingSnapshot``, precalculado por
+    ``build_snapshot`` (comando ``refresh_rankings`` o trabajo de
+    ``core.jobs``). La consulta siempre responde con el último snapshot y su
+    ``computed_at``; si venció ``RANKING_SNAPSHOT_TTL`` o algún saldo del gym
+    cambió después de generarlo, encola una regeneración (una por gym,
+    período y ventana de TTL). Solo el primer snapshot de un período se
+    construye en la petición, serializado por gym.
+
+Solo cuentan puntos aprobados.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Window
+from django.db.models.functions import Rank
+from django.utils import timezone
+
+from .models import RankingSnapshot, UserPoints, UserPointsBalance
+from .services import approved_points, points_annotation
+
+User = get_user_model()
+
+ALL_TIME = "all"
+PERIODS = (ALL_TIME, RankingSnapshot.Period.WEEK, RankingSnapshot.Period.MONTH)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_SNAPSHOT_TTL = 5 * 60
+
+
+def period_start(period: str, today: date | None = None) -> date:
+    today = today or timezone.localdate()
+    if period == RankingSnapshot.Period.WEEK:
+        return today - timedelta(days=today.weekday())
+    return today.replace(day=1)
+
+
+def _gym_athletes(gym):
+    return User.objects.filter(gym=gym, role=User.Role.ATHLETE)
+
+
+def _entry(rank: int, user, points: int) -> dict:
+    return {
+        "rank": rank,
+        "athlete_id": str(user.id),
+        "name": user.get_full_name() or user.email,
+        "email": user.email,
+        "avatar_url": getattr(user, "avatar_url", None),
+        "total_points": points,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Histórico
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _all_time(gym, user, offset: int, limit: int) -> dict:
+    ranked = (
+        _gym_athletes(gym)
+        .annotate(total_points=points_annotation())
+        .annotate(rank=Window(Rank(), order_by=F("total_points").desc()))
+        .order_by("rank", "id")
+    )
+    page = [_entry(a.rank, a, a.total_points) for a in ranked[offset:offset + limit]]
+
+    my_rank = my_points = None
+    if user.gym_id == gym.id and user.role == User.Role.ATHLETE:
+        my_points = approved_points(user)
+        my_rank = (
+            _gym_athletes(gym)
+            .annotate(total_points=points_annotation())
+            .filter(total_points__gt=my_points)
+            .count()
+        ) + 1
+
+    return {
+        "count": _gym_athletes(gym).count(),
+        "ranking": page,
+        "my_rank": my_rank,
+        "my_points": my_points,
+        "computed_at": None,
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Snapshots por período
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _snapshot_rows(gym, period: str, start: date) -> list[RankingSnapshot]:
+    totals = dict(
+        UserPoints.objects.filter(
+            user__gym=gym,
+            user__role=User.Role.ATHLETE,
+            status=UserPoints.Status.APPROVED,
+            created_at__date__gte=start,
+        )
+        .values("user_id")
+        .annotate(total=Sum("points"))
+        .order_by()
+        .values_list("user_id", "total")
+    )
+    athlete_ids = _gym_athletes(gym).values_list("id", flat=True)
+    ordered = sorted(((totals.get(uid, 0), uid) for uid in athlete_ids), key=lambda t: (-t[0], str(t[1])))
+
+    rows = []
+    rank = 0
+    previous = None
+    for position, (points, uid) in enumerate(ordered, start=1):
+        if points != previous:
+            rank, previous = position, points
+        rows.append(RankingSnapshot(
+            gym=gym, period=period, period_start=start, user_id=uid, points=points, rank=rank,
+        ))
+    return rows
+
+
+def build_snapshot(gym, period: str, today: date | None = None, only_if_missing: bool = False) -> int:
+    """
+    (Re)genera el snapshot del período en curso para un gym. Devuelve el número
+    de filas escritas. Incluye a todos los atletas, con 0 si no sumaron puntos.
+
+    Bloquea la fila del gym para que lecturas, trabajos y el comando no
+    reconstruyan a la vez; con ``only_if_missing`` no hace nada si otro ya lo
+    generó mientras se esperaba el bloqueo.
+    """
+    from gyms.models import Gym
+
+    start = period_start(period, today)
+    snapshot = RankingSnapshot.objects.filter(gym=gym, period=period, period_start=start)
+    try:
+        with transaction.atomic():
+            Gym.objects.select_for_update().filter(pk=gym.pk).values_list("pk", flat=True).first()
+            if only_if_missing and snapshot.exists():
+                return 0
+            rows = _snapshot_rows(gym, period, start)
+            snapshot.delete()
+            RankingSnapshot.objects.bulk_create(rows, batch_size=1000)
+    except IntegrityError:
+        # Otra reconstrucción ganó la carrera (sin bloqueo de filas, p. ej. SQLite).
+        return 0
+    return len(rows)
+
+
+def refresh_snapshot(gym_id: str, period: str) -> None:
+    """Trabajo de ``core.jobs``: regenera el snapshot del período en curso."""
+    from gyms.models import Gym
+
+    gym = Gym.objects.filter(pk=gym_id).first()
+    if gym is not None:
+        build_snapshot(gym, period)
+
+
+def _schedule_refresh(gym, period: str) -> None:
+    """Encola la regeneración; la clave la limita a una por ventana de TTL."""
+    from core.jobs import enqueue
+
+    ttl = getattr(settings, "RANKING_SNAPSHOT_TTL", DEFAULT_SNAPSHOT_TTL)
+    window = int(timezone.now().timestamp()) // max(ttl, 1)
+    enqueue(
+        "gamification.ranking.refresh_snapshot", str(gym.pk), period,
+        idempotency_key=f"ranking_snapshot:{gym.pk}:{period}:{window}",
+    )
+
+
+def _snapshot_is_stale(gym, newest) -> bool:
+    """
+    Más viejo que ``RANKING_SNAPSHOT_TTL`` o con saldos del gym modificados
+    después (``apply_balance_delta`` toca ``updated_at`` al crear, aprobar o
+    borrar puntos).
+    """
+    ttl = getattr(settings, "RANKING_SNAPSHOT_TTL", DEFAULT_SNAPSHOT_TTL)
+    if newest < timezone.now() - timedelta(seconds=ttl):
+        return True
+    return UserPointsBalance.objects.filter(
+        user__gym=gym, user__role=User.Role.ATHLETE, updated_at__gt=newest,
+    ).exists()
+
+
+def _from_snapshot(gym, user, period: str, offset: int, limit: int) -> dict:
+    start = period_start(period)
+    qs = RankingSnapshot.objects.filter(gym=gym, period=period, period_start=start)
+    newest = qs.order_by("-created_at").values_list("created_at", flat=True).first()
+    if newest is None:
+        build_snapshot(gym, period, only_if_missing=True)
+        newest = qs.order_by("-created_at").values_list("created_at", flat=True).first()
+    elif _snapshot_is_stale(gym, newest):
+        _schedule_refresh(gym, period)
+
+    page = [
+        _entry(s.rank, s.user, s.points)
+        for s in qs.select_related("user").order_by("rank", "user_id")[offset:offset + limit]
+    ]
+    mine = qs.filter(user=user).first()
+
+    return {
+        "count": qs.count(),
+        "ranking": page,
+        "my_rank": mine.rank if mine else None,
+        "my_points": mine.points if mine else None,
+        "computed_at": newest,
+    }
+
+
+def gym_ranking(gym, user, period: str = ALL_TIME, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
+    """Página del ranking del gym más la posición del usuario autenticado."""
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    offset = (page - 1) * page_size
+
+    if period == ALL_TIME:
+        data = _all_time(gym, user, offset, page_size)
+    else:
+        data = _from_snapshot(gym, user, period, offset, page_size)
+
+    data.update({"period": period, "page": page, "page_size": page_size})
+    return data
@@ -0,0 +1,167 @@
+"""
+gamification/services.py
+────────────────────────
+Saldo de puntos materializado (``UserPointsBalance``).
+
+Principios aplicados:
+  - ``UserPoints`` es el ledger y la fuente de verdad; el saldo es una
+    proyección que se ajusta por deltas dentro de la misma transacción.
+  - Las lecturas de puntos (perfil, dashboard, canjes, listados) leen el
+    saldo en O(1) en lugar de sumar todo el historial.
+  - ``recompute_balance`` / ``reconcile_balances`` reconstruyen desde el
+    ledger; son la vía de reparación.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Iterable
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, IntegerField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import UserPoints, UserPointsBalance
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Escritura
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _ledger_totals(user_ids: Iterable) -> dict:
+    """Suma aprobados / pendientes desde el ledger para los usuarios dados."""
+    rows = (
+        UserPoints.objects.filter(user_id__in=user_ids)
+        .values("user_id")
+        .annotate(
+            approved=Coalesce(Sum("points", filter=Q(status=UserPoints.Status.APPROVED)), 0),
+            pending=Coalesce(Sum("pending_points", filter=Q(status=UserPoints.Status.PENDING)), 0),
+        )
+        .order_by()
+    )
+    return {r["user_id"]: (r["approved"], r["pending"]) for r in rows}
+
+
+def recompute_balance(user_id) -> UserPointsBalance:
+    """Reconstruye el saldo de un usuario desde su ledger completo."""
+    approved, pending = _ledger_totals([user_id]).get(user_id, (0, 0))
+    last = UserPoints.objects.filter(user_id=user_id).order_by("-created_at").first()
+    balance, _ = UserPointsBalance.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "approved_total": approved,
+            "pending_total": pending,
+            "last_entry": last,
+            "last_entry_at": last.created_at if last else None,
+        },
+    )
+    return balance
+
+
+def apply_balance_delta(user_id, approved_delta: int, pending_delta: int, entry: UserPoints | None = None) -> None:
+    """
+    Ajusta el saldo con un delta atómico (``F()``). Si el usuario aún no tiene
+    fila de saldo, se crea recalculando desde el ledger (que ya incluye el
+    registro recién guardado).
+    """
+    fields = {
+        "approved_total": F("approved_total") + approved_delta,
+        "pending_total": F("pending_total") + pending_delta,
+        "updated_at": timezone.now(),
+    }
+    if entry is not None:
+        fields["last_entry"] = entry
+        fields["last_entry_at"] = entry.created_at
+
+    if UserPointsBalance.objects.filter(user_id=user_id).update(**fields):
+        return
+
+    try:
+        with transaction.atomic():
+            recompute_balance(user_id)
+    except IntegrityError:
+        # Otra transacción creó la fila primero: aplicar el delta sobre ella.
+        UserPointsBalance.objects.filter(user_id=user_id).update(**fields)
+
+
+def apply_bulk_entries(entries: Iterable[UserPoints]) -> None:
+    """
+    Refleja en los saldos registros insertados con ``bulk_create`` (que no
+    pasa por ``UserPoints.save``). Un ``UPDATE`` por usuario afectado.
+    """
+    deltas: dict = {}
+    for entry in entries:
+        approved, pending = entry.ledger_contribution()
+        acc = deltas.setdefault(entry.user_id, [0, 0, entry])
+        acc[0] += approved
+        acc[1] += pending
+        acc[2] = entry
+    for user_id, (approved, pending, last) in deltas.items():
+        apply_balance_delta(user_id, approved, pending, entry=last)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Lectura
+# ─────────────────────────────────────────────────────────────────────────────
+
+def get_balance(user) -> UserPointsBalance:
+    """
+    Saldo del usuario. Si todavía no tiene fila devuelve un saldo en cero sin
+    guardar: la lectura no escribe; la fila la crean ``apply_balance_delta`` al
+    registrar puntos o ``reconcile_points_balances``.
+    """
+    user_id = getattr(user, "pk", user)
+    balance = UserPointsBalance.objects.filter(user_id=user_id).first()
+    return balance or UserPointsBalance(user_id=user_id, approved_total=0, pending_total=0)
+
+
+def approved_points(user) -> int:
+    return get_balance(user).approved_total
+
+
+def points_annotation():
+    """
+    Annotación de puntos aprobados para querysets de User (LEFT JOIN al saldo,
+    sin subconsulta correlacionada). Uso: ``.annotate(puntos=points_annotation())``.
+    """
+    return Coalesce(F("points_balance__approved_total"), Value(0), output_field=IntegerField())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reconciliación
+# ─────────────────────────────────────────────────────────────────────────────
+
+def reconcile_balances(fix: bool = False, user_ids: Iterable | None = None) -> list[dict]:
+    """
+    Compara cada saldo con el ledger. Devuelve las diferencias encontradas y,
+    con ``fix=True``, las corrige. Usuarios con ledger y sin saldo también se
+    reportan (y se crean al corregir).
+    """
+    ledger_users = UserPoints.objects.values_list("user_id", flat=True).distinct()
+    balance_users = UserPointsBalance.objects.values_list("user_id", flat=True)
+    if user_ids is not None:
+        user_ids = set(user_ids)
+    else:
+        user_ids = set(ledger_users) | set(balance_users)
+
+    totals = _ledger_totals(user_ids)
+    balances = {
+        b.user_id: b for b in UserPointsBalance.objects.filter(user_id__in=user_ids)
+    }
+
+    mismatches = []
+    for user_id in user_ids:
+        expected = totals.get(user_id, (0, 0))
+        balance = balances.get(user_id)
+        actual = (balance.approved_total, balance.pending_total) if balance else None
+        if actual != expected:
+            mismatches.append({"user_id": user_id, "expected": expected, "actual": actual})
+
+    if fix:
+        for mismatch in mismatches:
+            recompute_balance(mismatch["user_id"])
+
+    return mismatches
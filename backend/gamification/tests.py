@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.jobs import run_pending
+from core.models import BackgroundJob
+from gyms.models import Gym
+from .models import UserPoints, UserPointsBalance
+from .services import get_balance, reconcile_balances
+
+User = get_user_model()
+
+
+class UserPointsBalanceTests(TestCase):
+    """El saldo materializado debe seguir al ledger en cada creación, aprobación y borrado."""
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Points Gym", slug="points-gym")
+        self.athlete = User.objects.create_user(
+            email="athlete@points.com", password="pass123",
+            role=User.Role.ATHLETE, gym=self.gym,
+        )
+        self.coach = User.objects.create_user(
+            email="coach@points.com", password="pass123",
+            role=User.Role.COACH, gym=self.gym,
+        )
+
+    def _balance(self):
+        return UserPointsBalance.objects.get(user=self.athlete)
+
+    def test_balance_follows_ledger(self):
+        UserPoints.objects.create(
+            user=self.athlete, points=50, pending_points=50,
+            status=UserPoints.Status.APPROVED, source="challenge",
+        )
+        pending = UserPoints.objects.create(user=self.athlete, pending_points=20, source="session")
+        self.assertEqual((self._balance().approved_total, self._balance().pending_total), (50, 20))
+
+        UserPoints.objects.get(pk=pending.pk).approve(self.coach)
+        self.assertEqual((self._balance().approved_total, self._balance().pending_total), (70, 0))
+
+        UserPoints.objects.create(
+            user=self.athlete, points=-30, pending_points=-30,
+            status=UserPoints.Status.APPROVED, source="reward_redemption",
+        )
+        self.assertEqual(self._balance().approved_total, 40)
+
+        pending.delete()
+        self.assertEqual(self._balance().approved_total, 20)
+        self.assertEqual(reconcile_balances(), [])
+
+    def test_reconcile_detects_and_fixes_drift(self):
+        UserPoints.objects.create(
+            user=self.athlete, points=10, pending_points=10,
+            status=UserPoints.Status.APPROVED,
+        )
+        UserPointsBalance.objects.filter(user=self.athlete).update(approved_total=999)
+
+        self.assertEqual(len(reconcile_balances()), 1)
+        reconcile_balances(fix=True)
+        self.assertEqual(self._balance().approved_total, 10)
+
+    def test_get_balance_does_not_write(self):
+        with self.assertNumQueries(1):
+            balance = get_balance(self.athlete)
+        self.assertEqual((balance.approved_total, balance.pending_total), (0, 0))
+        self.assertFalse(UserPointsBalance.objects.filter(user=self.athlete).exists())
+
+        UserPoints.objects.create(user=self.athlete, pending_points=5, source="session")
+        self.assertEqual(get_balance(self.athlete).pending_total, 5)
+
+
+class RankingTests(TestCase):
+    """El ranking pagina en SQL, ignora puntos pendientes y ubica al usuario sin recorrer la lista."""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+        self.client = APIClient()
+        self.gym = Gym.objects.create(name="Ranking Gym", slug="ranking-gym")
+        self.athletes = []
+        for i, pts in enumerate([30, 10, 20]):
+            athlete = User.objects.create_user(
+                email=f"athlete{i}@ranking.com", password="pass123",
+                role=User.Role.ATHLETE, gym=self.gym,
+            )
+            UserPoints.objects.create(
+                user=athlete, points=pts, pending_points=pts, status=UserPoints.Status.APPROVED,
+            )
+            self.athletes.append(athlete)
+        # Pendientes no deben contar
+        UserPoints.objects.create(user=self.athletes[1], pending_points=500)
+
+    def _get(self, user, **params):
+        self.client.force_authenticate(user=user)
+        return self.client.get("/api/gamification/ranking/", {"gym_slug": self.gym.slug, **params})
+
+    def test_all_time_page_and_my_rank(self):
+        res = self._get(self.athletes[1], page_size=2)
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual([e["total_points"] for e in res.data["ranking"]], [30, 20])
+        self.assertEqual(res.data["count"], 3)
+        self.assertEqual(res.data["my_rank"], 3)
+        self.assertEqual(res.data["my_points"], 10)
+
+    def test_period_served_from_snapshot(self):
+        from .models import RankingSnapshot
+        res = self._get(self.athletes[2], period="week")
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual(res.data["my_rank"], 2)
+        self.assertEqual(RankingSnapshot.objects.filter(gym=self.gym, period="week").count(), 3)
+
+    def test_period_snapshot_refreshes_after_new_points(self):
+        from .models import RankingSnapshot
+        self._get(self.athletes[1], period="week")
+        built_at = RankingSnapshot.objects.filter(gym=self.gym).latest("created_at").created_at
+
+        res = self._get(self.athletes[1], period="week")
+        self.assertEqual(res.data["computed_at"], built_at)
+
+        UserPoints.objects.create(
+            user=self.athletes[1], points=50, pending_points=50, status=UserPoints.Status.APPROVED,
+        )
+        # La lectura no reconstruye: sirve el snapshot anterior y encola una sola regeneración.
+        for _ in range(2):
+            res = self._get(self.athletes[1], period="week")
+            self.assertEqual((res.data["my_rank"], res.data["computed_at"]), (3, built_at))
+        jobs = BackgroundJob.objects.filter(task="gamification.ranking.refresh_snapshot")
+        self.assertEqual(jobs.count(), 1)
+
+        run_pending()
+        res = self._get(self.athletes[1], period="week")
+        self.assertEqual((res.data["my_rank"], res.data["my_points"]), (1, 60))
+
+    def test_build_snapshot_only_if_missing_keeps_existing(self):
+        from .models import RankingSnapshot
+        from .ranking import build_snapshot
+
+        self.assertEqual(build_snapshot(self.gym, "month", only_if_missing=True), 3)
+        ids = set(RankingSnapshot.objects.filter(gym=self.gym, period="month").values_list("id", flat=True))
+        self.assertEqual(build_snapshot(self.gym, "month", only_if_missing=True), 0)
+        self.assertEqual(
+            set(RankingSnapshot.objects.filter(gym=self.gym, period="month").values_list("id", flat=True)), ids,
+        )
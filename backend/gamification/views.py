@@ -2,7 +2,7 @@ import logging
 
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import F, Sum
+from django.db.models import F
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
@@ -13,7 +13,9 @@ logger = logging.getLogger(__name__)
 
 from gyms.models import Gym, Notification
 from gyms.views import create_notification
-from .models import GymPointsConfig, Reward, RewardRedemption, UserPoints
+from .models import GymPointsConfig, Reward, RewardRedemption, UserPoints, UserPointsBalance
+from .ranking import ALL_TIME, DEFAULT_PAGE_SIZE, PERIODS, gym_ranking
+from .services import get_balance
 from .serializers import (
     AthleteStatsSerializer,
     GymPointsConfigSerializer,
@@ -33,11 +35,9 @@ def my_stats(request):
     """
     user = request.user
 
-    approved_qs = UserPoints.objects.filter(user=user, status=UserPoints.Status.APPROVED)
-    pending_qs  = UserPoints.objects.filter(user=user, status=UserPoints.Status.PENDING)
-
-    total_confirmed = approved_qs.aggregate(total=Sum("points"))["total"] or 0
-    total_pending   = pending_qs.aggregate(total=Sum("pending_points"))["total"] or 0
+    balance = get_balance(user)
+    total_confirmed = balance.approved_total
+    total_pending   = balance.pending_total
 
     # Historial: aprobados recientes primero, luego pendientes
     recent_entries = (
@@ -71,6 +71,12 @@ def my_stats(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def ranking(request):
+    """
+    GET /api/gamification/ranking/?gym_slug=<slug>&period=all|week|month&page=1&page_size=50
+
+    Devuelve una página del ranking (solo puntos aprobados) y la posición del
+    usuario autenticado. Semana y mes se leen de snapshots precalculados.
+    """
     gym_id   = request.query_params.get("gym_id")
     gym_slug = request.query_params.get("gym_slug") or request.query_params.get("gym")
 
@@ -84,34 +90,18 @@ def ranking(request):
     if not gym:
         return Response({"detail": "Gimnasio no encontrado."}, status=404)
 
-    from django.db.models import IntegerField
-    from django.db.models.functions import Coalesce
-    athletes = (
-        User.objects.filter(gym=gym, role="athlete")
-        .annotate(total_points=Coalesce(Sum("points__points"), 0, output_field=IntegerField()))
-        .order_by("-total_points")
-    )
+    period = request.query_params.get("period", ALL_TIME)
+    if period not in PERIODS:
+        return Response({"detail": f"period debe ser uno de: {', '.join(PERIODS)}."}, status=400)
 
-    athlete_points = []
-    for i, athlete in enumerate(athletes, start=1):
-        athlete_points.append({
-            "rank": i,
-            "athlete_id": str(athlete.id),
-            "name": athlete.get_full_name() or athlete.email,
-            "email": athlete.email,
-            "avatar_url": athlete.avatar_url if hasattr(athlete, "avatar_url") else None,
-            "total_points": athlete.total_points,
-        })
+    try:
+        page = int(request.query_params.get("page", 1))
+        page_size = int(request.query_params.get("page_size", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return Response({"detail": "page y page_size deben ser enteros."}, status=400)
 
-    current_user_id = str(request.user.id)
-    my_entry = next((e for e in athlete_points if e["athlete_id"] == current_user_id), None)
-
-    return Response({
-        "gym": gym.name,
-        "ranking": athlete_points,
-        "my_rank": my_entry["rank"] if my_entry else None,
-        "my_points": my_entry["total_points"] if my_entry else None,
-    })
+    data = gym_ranking(gym, request.user, period=period, page=page, page_size=page_size)
+    return Response({"gym": gym.name, **data})
 
 
 # ── Points approval ──────────────────────────────────────────────────────────
@@ -227,11 +217,10 @@ class RewardRedemptionViewSet(viewsets.ModelViewSet):
             if reward.available_stock is not None and reward.available_stock <= 0:
                 raise ValidationError({"detail": "No hay stock disponible para esta recompensa."})
 
-            total_points = (
-                UserPoints.objects
-                .filter(user=user, status=UserPoints.Status.APPROVED)
-                .aggregate(t=Sum("points"))["t"] or 0
-            )
+            # Bloquear el saldo serializa canjes concurrentes del mismo atleta;
+            # sin fila de saldo el atleta aún no tiene puntos.
+            balance = UserPointsBalance.objects.select_for_update().filter(user=user).first()
+            total_points = balance.approved_total if balance else 0
             if total_points < reward.points_cost:
                 raise ValidationError({
                     "detail": f"Puntos insuficientes. Necesitas {reward.points_cost} pts, tienes {total_points}."
@@ -0,0 +1,314 @@
+"""
+gyms/activity.py
+────────────────
+Rollup diario de actividad por gimnasio (``DailyGymActivity``) y última
+actividad por usuario (``MemberActivity``).
+
+Escritura:
+  - Las señales llaman a ``refresh_gym_day`` con la celda gym×día afectada y
+    las métricas que cambiaron. Cada métrica se recalcula con una consulta
+    acotada a ese día (índices ``gym, timestamp`` / ``gym, performed_at``),
+    así que una escritura duplicada o un borrado nunca desajusta el contador.
+  - ``rebuild_activity`` reconstruye un rango completo con consultas agrupadas;
+    lo usa el comando ``rebuild_gym_activity`` para backfill y reparación.
+
+Lectura:
+  - ``gym_activity_totals`` suma ventanas de días con agregados condicionales.
+  - ``active_member_counts`` resuelve DAU/WAU/MAU sobre ``MemberActivity``.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CheckIn, DailyGymActivity, MemberActivity
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+METRICS = ("checkins", "active_users", "completed_sessions", "new_athletes", "meal_logs")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cálculo por celda gym × día
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _checkin_metrics(gym_id, day: date) -> dict:
+    agg = CheckIn.objects.filter(gym_id=gym_id, timestamp__date=day).aggregate(
+        checkins=Count("id"),
+        active_users=Count("user", distinct=True),
+    )
+    return {"checkins": agg["checkins"], "active_users": agg["active_users"]}
+
+
+def _session_metrics(gym_id, day: date) -> dict:
+    from workouts.models import WorkoutSession
+    return {
+        "completed_sessions": WorkoutSession.objects.filter(
+            gym_id=gym_id,
+            status=WorkoutSession.Status.COMPLETED,
+            performed_at__date=day,
+        ).count(),
+    }
+
+
+def _athlete_metrics(gym_id, day: date) -> dict:
+    return {
+        "new_athletes": User.objects.filter(
+            gym_id=gym_id, role=User.Role.ATHLETE, date_joined__date=day,
+        ).count(),
+    }
+
+
+def _meal_log_metrics(gym_id, day: date) -> dict:
+    from nutrition.models import UserMealLog
+    return {
+        "meal_logs": UserMealLog.objects.filter(user__gym_id=gym_id, date=day).count(),
+    }
+
+
+_METRIC_CALCULATORS = {
+    "checkins": _checkin_metrics,
+    "active_users": _checkin_metrics,
+    "completed_sessions": _session_metrics,
+    "new_athletes": _athlete_metrics,
+    "meal_logs": _meal_log_metrics,
+}
+
+
+def refresh_gym_day(gym_id, day: date, metrics=METRICS) -> None:
+    """
+    Recalcula las métricas indicadas de la celda (gym, day) y la guarda.
+    Nunca lanza: un fallo (cálculo o escritura) se registra y, dentro de su
+    savepoint, no aborta la transacción de quien escribió el dato.
+    """
+    if not gym_id:
+        return
+
+    try:
+        with transaction.atomic():
+            values: dict = {}
+            for calculator in dict.fromkeys(_METRIC_CALCULATORS[m] for m in metrics):
+                values.update(calculator(gym_id, day))
+            _save_cell(gym_id, day, values)
+    except Exception:
+        logger.warning("No se pudo actualizar DailyGymActivity gym=%s day=%s", gym_id, day, exc_info=True)
+
+
+def _save_cell(gym_id, day: date, values: dict) -> None:
+    try:
+        with transaction.atomic():
+            DailyGymActivity.objects.update_or_create(gym_id=gym_id, date=day, defaults=values)
+    except IntegrityError:
+        # Otra petición creó la fila en paralelo: basta con actualizarla.
+        DailyGymActivity.objects.filter(gym_id=gym_id, date=day).update(**values)
+
+
+def touch_member(user_id, gym_id, *, checkin_on: date | None = None, workout_on: date | None = None) -> None:
+    """Adelanta la última fecha de actividad del usuario (nunca la retrocede)."""
+    try:
+        activity, _ = MemberActivity.objects.get_or_create(user_id=user_id, defaults={"gym_id": gym_id})
+    except IntegrityError:
+        activity = MemberActivity.objects.get(user_id=user_id)
+
+    changed = []
+    if gym_id and activity.gym_id != gym_id:
+        activity.gym_id = gym_id
+        changed.append("gym")
+    if checkin_on and (activity.last_checkin_on is None or checkin_on > activity.last_checkin_on):
+        activity.last_checkin_on = checkin_on
+        changed.append("last_checkin_on")
+    if workout_on and (activity.last_workout_on is None or workout_on > activity.last_workout_on):
+        activity.last_workout_on = workout_on
+        changed.append("last_workout_on")
+    if changed:
+        activity.save(update_fields=changed + ["updated_at"])
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reconstrucción por rango (backfill / reparación)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def rebuild_activity(start: date, end: date, gym_id=None) -> int:
+    """
+    Reconstruye ``DailyGymActivity`` para [start, end] y ``MemberActivity``
+    completo con una consulta agrupada por métrica. Devuelve las filas escritas.
+    """
+    from nutrition.models import UserMealLog
+    from workouts.models import WorkoutSession
+
+    cells: dict = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    gym_filter = Q(gym_id=gym_id) if gym_id else Q()
+
+    for row in (
+        CheckIn.objects.filter(gym_filter, timestamp__date__gte=start, timestamp__date__lte=end)
+        .annotate(day=TruncDate("timestamp"))
+        .values("gym_id", "day")
+        .annotate(checkins=Count("id"), active_users=Count("user", distinct=True))
+        .order_by()
+    ):
+        cell = cells[(row["gym_id"], row["day"])]
+        cell["checkins"] = row["checkins"]
+        cell["active_users"] = row["active_users"]
+
+    for row in (
+        WorkoutSession.objects.filter(
+            gym_filter,
+            gym__isnull=False,
+            status=WorkoutSession.Status.COMPLETED,
+            performed_at__date__gte=start,
+            performed_at__date__lte=end,
+        )
+        .annotate(day=TruncDate("performed_at"))
+        .values("gym_id", "day")
+        .annotate(n=Count("id"))
+        .order_by()
+    ):
+        cells[(row["gym_id"], row["day"])]["completed_sessions"] = row["n"]
+
+    for row in (
+        User.objects.filter(
+            gym_filter,
+            gym__isnull=False,
+            role=User.Role.ATHLETE,
+            date_joined__date__gte=start,
+            date_joined__date__lte=end,
+        )
+        .annotate(day=TruncDate("date_joined"))
+        .values("gym_id", "day")
+        .annotate(n=Count("id"))
+        .order_by()
+    ):
+        cells[(row["gym_id"], row["day"])]["new_athletes"] = row["n"]
+
+    meal_filter = Q(user__gym_id=gym_id) if gym_id else Q(user__gym__isnull=False)
+    for row in (
+        UserMealLog.objects.filter(meal_filter, date__gte=start, date__lte=end)
+        .values("user__gym_id", "date")
+        .annotate(n=Count("id"))
+        .order_by()
+    ):
+        cells[(row["user__gym_id"], row["date"])]["meal_logs"] = row["n"]
+
+    rows = [
+        DailyGymActivity(gym_id=g, date=d, **metrics)
+        for (g, d), metrics in cells.items()
+    ]
+    with transaction.atomic():
+        stale = DailyGymActivity.objects.filter(date__gte=start, date__lte=end)
+        if gym_id:
+            stale = stale.filter(gym_id=gym_id)
+        stale.delete()
+        DailyGymActivity.objects.bulk_create(rows, batch_size=500)
+
+    _rebuild_member_activity(gym_id)
+    return len(rows)
+
+
+def _rebuild_member_activity(gym_id=None) -> None:
+    from workouts.models import WorkoutSession
+
+    last_checkin = dict(
+        CheckIn.objects.filter(Q(gym_id=gym_id) if gym_id else Q())
+        .values("user_id")
+        .annotate(last=Max(TruncDate("timestamp")))
+        .order_by()
+        .values_list("user_id", "last")
+    )
+    last_workout = dict(
+        WorkoutSession.objects.filter(
+            Q(user__gym_id=gym_id) if gym_id else Q(),
+            status=WorkoutSession.Status.COMPLETED,
+        )
+        .values("user_id")
+        .annotate(last=Max(TruncDate("performed_at")))
+        .order_by()
+        .values_list("user_id", "last")
+    )
+    user_ids = set(last_checkin) | set(last_workout)
+    gyms = dict(User.objects.filter(id__in=user_ids).values_list("id", "gym_id"))
+
+    with transaction.atomic():
+        MemberActivity.objects.filter(user_id__in=user_ids).delete()
+        MemberActivity.objects.bulk_create(
+            [
+                MemberActivity(
+                    user_id=uid,
+                    gym_id=gyms.get(uid),
+                    last_checkin_on=last_checkin.get(uid),
+                    last_workout_on=last_workout.get(uid),
+                )
+                for uid in user_ids if uid in gyms
+            ],
+            batch_size=500,
+        )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Lectura
+# ─────────────────────────────────────────────────────────────────────────────
+
+def gym_activity_totals(gym_id=None, today: date | None = None) -> dict:
+    """
+    Totales de día / semana / mes (y mes previo de altas) en una sola consulta.
+    Sin ``gym_id`` suma todos los gimnasios (analítica de plataforma).
+    """
+    today = today or timezone.localdate()
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+    prev_month = month_ago - timedelta(days=30)
+
+    qs = DailyGymActivity.objects.filter(date__gte=prev_month, date__lte=today)
+    if gym_id:
+        qs = qs.filter(gym_id=gym_id)
+
+    agg = qs.aggregate(
+        checkins_today=Sum("checkins", filter=Q(date=today)),
+        checkins_week=Sum("checkins", filter=Q(date__gte=week_ago)),
+        checkins_month=Sum("checkins", filter=Q(date__gte=month_ago)),
+        sessions_today=Sum("completed_sessions", filter=Q(date=today)),
+        sessions_week=Sum("completed_sessions", filter=Q(date__gte=week_ago)),
+        athletes_joined_month=Sum("new_athletes", filter=Q(date__gte=month_ago)),
+        athletes_joined_prev=Sum("new_athletes", filter=Q(date__lt=month_ago)),
+        meal_logs_week=Sum("meal_logs", filter=Q(date__gte=week_ago)),
+    )
+    return {key: value or 0 for key, value in agg.items()}
+
+
+def daily_series(field: str, days: int, gym_id=None, today: date | None = None) -> list[tuple[date, int]]:
+    """Serie diaria de una métrica para los últimos ``days`` días (incluye hoy)."""
+    today = today or timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    qs = DailyGymActivity.objects.filter(date__gte=start, date__lte=today)
+    if gym_id:
+        qs = qs.filter(gym_id=gym_id)
+    by_day = dict(qs.values("date").annotate(total=Sum(field)).order_by().values_list("date", "total"))
+    return [(start + timedelta(days=i), by_day.get(start + timedelta(days=i), 0)) for i in range(days)]
+
+
+def active_member_counts(gym_id=None, today: date | None = None) -> dict:
+    """DAU / WAU / MAU de check-ins y entrenamientos en una sola consulta."""
+    today = today or timezone.localdate()
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+
+    qs = MemberActivity.objects.all()
+    if gym_id:
+        qs = qs.filter(gym_id=gym_id)
+
+    return qs.aggregate(
+        checkin_dau=Count("id", filter=Q(last_checkin_on__gte=today)),
+        checkin_wau=Count("id", filter=Q(last_checkin_on__gte=week_ago)),
+        checkin_mau=Count("id", filter=Q(last_checkin_on__gte=month_ago)),
+        workout_dau=Count("id", filter=Q(last_workout_on__gte=today)),
+        workout_mau=Count("id", filter=Q(last_workout_on__gte=month_ago)),
+    )
@@ -0,0 +1,251 @@
+"""
+gyms/athlete_summary.py
+───────────────────────
+Resumen del perfil de un atleta (``athlete_profile``) con pocas consultas.
+
+Principios aplicados:
+  - Todos los contadores (sesiones, comidas, check-ins, planes, retos,
+    insignias, puntos, tier, meta) viajan como subconsultas escalares en la
+    misma consulta que carga al atleta: una sola ida a la base.
+  - Las relaciones "activas" (rutina, plan con su cumplimiento, coach,
+    nutricionista) se cargan con ``select_related`` y sus propios agregados.
+  - Las listas (historial de puntos, medidas, citas) son una consulta cada una.
+
+El número total de consultas es fijo (ver tests); no depende del historial.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+User = get_user_model()
+
+
+def _count(queryset, outer_field: str = "user", distinct_field: str | None = None):
+    """Subconsulta escalar ``COUNT`` correlacionada con el atleta (``OuterRef('pk')``)."""
+    counted = Count(distinct_field, distinct=True) if distinct_field else Count("pk")
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{outer_field: OuterRef("pk")})
+            .order_by()
+            .values(outer_field)
+            .annotate(total=counted)
+            .values("total")[:1],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def athlete_summary_queryset(today: date | None = None):
+    """Atletas anotados con todos los contadores del perfil."""
+    from challenges.models import ChallengeParticipation, UserBadge
+    from gamification.services import points_annotation
+    from nutrition.models import UserMealLog, UserNutritionPlan
+    from workouts.models import WorkoutSession
+    from .models import CheckIn, GymSubscription
+
+    today = today or timezone.localdate()
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+
+    sessions = WorkoutSession.objects.filter(status="completed")
+    meals = UserMealLog.objects.filter(status="completed")
+
+    return (
+        User.objects.filter(role=User.Role.ATHLETE)
+        .select_related("goal")
+        .annotate(
+            puntos=points_annotation(),
+            sessions_week=_count(sessions.filter(performed_at__date__gte=week_ago)),
+            sessions_month=_count(sessions.filter(performed_at__date__gte=month_ago)),
+            sessions_total=_count(sessions),
+            meals_week=_count(meals.filter(date__gte=week_ago)),
+            meals_today=_count(meals.filter(date=today)),
+            completed_plans=_count(UserNutritionPlan.objects.filter(status="completed")),
+            active_challenges=_count(ChallengeParticipation.objects.filter(
+                status=ChallengeParticipation.ParticipationStatus.JOINED,
+            )),
+            badges_earned=_count(UserBadge.objects.all()),
+            checkins_month=_count(CheckIn.objects.filter(timestamp__date__gte=month_ago)),
+            checkins_total=_count(CheckIn.objects.all()),
+            membership_tier=Subquery(
+                GymSubscription.objects.filter(athlete=OuterRef("pk"), status="active")
+                .values("plan__tier")[:1]
+            ),
+        )
+    )
+
+
+def _active_plan(athlete):
+    """Plan nutricional activo con su total de comidas y las completadas alguna vez."""
+    from nutrition.models import MealTemplate, UserMealLog, UserNutritionPlan
+
+    return (
+        UserNutritionPlan.objects.filter(user=athlete, status="active")
+        .select_related("plan", "assigned_by")
+        .annotate(
+            total_meal_templates=Coalesce(
+                Subquery(
+                    MealTemplate.objects.filter(plan=OuterRef("plan"))
+                    .order_by()
+                    .values("plan")
+                    .annotate(total=Count("pk"))
+                    .values("total")[:1],
+                    output_field=IntegerField(),
+                ),
+                Value(0),
+            ),
+            completed_templates=Coalesce(
+                Subquery(
+                    UserMealLog.objects.filter(
+                        user=OuterRef("user"),
+                        meal_template__plan=OuterRef("plan"),
+                        status="completed",
+                    )
+                    .order_by()
+                    .values("user")
+                    .annotate(total=Count("meal_template", distinct=True))
+                    .values("total")[:1],
+                    output_field=IntegerField(),
+                ),
+                Value(0),
+            ),
+        )
+        .first()
+    )
+
+
+def _staff_card(staff, build_uri) -> dict:
+    return {
+        "id": str(staff.id),
+        "name": f"{staff.first_name} {staff.last_name}",
+        "profile_picture": build_uri(staff.profile_picture.url) if staff.profile_picture else None,
+        "bio": staff.bio,
+        "specialty": staff.specialty,
+        "years_experience": staff.years_experience,
+    }
+
+
+def _measurement(m) -> dict:
+    return {
+        "id": str(m.id),
+        "measured_at": m.measured_at.isoformat() if hasattr(m.measured_at, 'isoformat') else str(m.measured_at),
+        "weight_kg": str(m.weight_kg) if m.weight_kg is not None else None,
+        "height_cm": str(m.height_cm) if m.height_cm is not None else None,
+        "body_fat_pct": str(m.body_fat_pct) if m.body_fat_pct is not None else None,
+        "muscle_mass_kg": str(m.muscle_mass_kg) if m.muscle_mass_kg is not None else None,
+        "waist_cm": str(m.waist_cm) if m.waist_cm is not None else None,
+        "hip_cm": str(m.hip_cm) if m.hip_cm is not None else None,
+        "arm_cm": str(m.arm_cm) if m.arm_cm is not None else None,
+        "visceral_fat": m.visceral_fat,
+        "bmi": m.bmi,
+        "notes": m.notes,
+    }
+
+
+def _appointment(apt) -> dict:
+    return {
+        "id": str(apt.id),
+        "scheduled_at": apt.scheduled_at.isoformat(),
+        "duration_minutes": apt.duration_minutes,
+        "appointment_type": apt.appointment_type,
+        "appointment_type_display": apt.get_appointment_type_display(),
+        "status": apt.status,
+        "status_display": apt.get_status_display(),
+        "notes": apt.notes,
+    }
+
+
+def build_athlete_profile(athlete, build_uri) -> dict:
+    """
+    Arma la respuesta de ``athlete_profile``. ``athlete`` debe venir de
+    ``athlete_summary_queryset``; ``build_uri`` convierte rutas de media en
+    URLs absolutas (``request.build_absolute_uri``).
+    """
+    from gamification.models import UserPoints
+    from workouts.models import UserRoutineAssignment
+    from .models import BodyMeasurement, CoachAssignment, NutritionistAppointment, NutritionistAssignment
+
+    active_routine = UserRoutineAssignment.objects.filter(
+        user=athlete, status="active"
+    ).select_related("routine", "assigned_by").first()
+    active_plan = _active_plan(athlete)
+
+    compliance_pct = 0
+    if active_plan and active_plan.total_meal_templates > 0:
+        compliance_pct = round((active_plan.completed_templates / active_plan.total_meal_templates) * 100, 1)
+
+    coach_assign = CoachAssignment.objects.filter(athlete=athlete, is_active=True).select_related("coach").first()
+    nutri_assign = NutritionistAssignment.objects.filter(athlete=athlete, is_active=True).select_related("nutritionist").first()
+
+    points_history = list(UserPoints.objects.filter(user=athlete).order_by("-created_at")[:20].values(
+        "points", "source", "description", "created_at"
+    ))
+    measurements = [
+        _measurement(m) for m in BodyMeasurement.objects.filter(athlete=athlete).order_by("-measured_at")[:10]
+    ]
+    appointments = [
+        _appointment(apt) for apt in NutritionistAppointment.objects.filter(athlete=athlete).order_by("-scheduled_at")[:10]
+    ]
+
+    goal = getattr(athlete, "goal", None)
+
+    return {
+        "athlete": {
+            "id": str(athlete.id),
+            "first_name": athlete.first_name,
+            "last_name": athlete.last_name,
+            "email": athlete.email,
+            "puntos": athlete.puntos,
+            "phone": athlete.phone,
+            "dni": athlete.dni,
+            "date_joined": athlete.date_joined.isoformat() if athlete.date_joined else None,
+            "is_active": athlete.is_active,
+            "fitness_goal": athlete.fitness_goal,
+            "goal_notes": athlete.goal_notes,
+        },
+        "coach": _staff_card(coach_assign.coach, build_uri) if coach_assign else None,
+        "nutritionist": _staff_card(nutri_assign.nutritionist, build_uri) if nutri_assign else None,
+        "routine": {
+            "id": str(active_routine.routine.id),
+            "name": active_routine.routine.name,
+            "assigned_by": f"{active_routine.assigned_by.first_name} {active_routine.assigned_by.last_name}" if active_routine.assigned_by else None,
+            "start_date": active_routine.start_date.isoformat(),
+        } if active_routine else None,
+        "nutrition_plan": {
+            "id": str(active_plan.id),
+            "name": active_plan.plan.name,
+            "assigned_by": f"{active_plan.assigned_by.first_name} {active_plan.assigned_by.last_name}" if active_plan.assigned_by else None,
+            "start_date": active_plan.start_date.isoformat(),
+            "compliance_percentage": compliance_pct,
+        } if active_plan else None,
+        "stats": {
+            "sessions_week": athlete.sessions_week,
+            "sessions_month": athlete.sessions_month,
+            "sessions_total": athlete.sessions_total,
+            "meals_week": athlete.meals_week,
+            "meals_today": athlete.meals_today,
+            "completed_plans": athlete.completed_plans,
+            "active_challenges": athlete.active_challenges,
+            "badges_earned": athlete.badges_earned,
+            "total_points_earned": athlete.puntos,
+            "checkins_month": athlete.checkins_month,
+            "checkins_total": athlete.checkins_total,
+        },
+        "points_history": points_history,
+        "measurements": measurements,
+        "appointments": appointments,
+        "membership_tier": athlete.membership_tier,
+        "goal": {
+            "target_weight_kg": str(goal.target_weight_kg) if goal.target_weight_kg else None,
+            "target_body_fat_pct": str(goal.target_body_fat_pct) if goal.target_body_fat_pct else None,
+            "target_date": goal.target_date.isoformat() if goal.target_date else None,
+            "notes": goal.notes,
+        } if goal else None,
+    }
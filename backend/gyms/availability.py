@@ -0,0 +1,155 @@
+"""
+gyms/availability.py
+────────────────────
+Motor de disponibilidad de nutricionistas.
+
+  1. Expande los bloques semanales (``NutritionistAvailability``) en slots
+     concretos para cada fecha del rango, salvo las fechas bloqueadas por
+     ``AvailabilityOverride``.
+  2. Resta las citas no canceladas (``NutritionistAppointment``) con un
+     barrido ordenado: slots y citas se recorren una sola vez por inicio,
+     manteniendo en un heap las citas que siguen abiertas.
+
+Una consulta por tabla para todo el rango. El calendario de la ventana de
+reserva (``CALENDAR_WINDOW_DAYS``) se cachea por nutricionista y se invalida
+desde gyms.signals al reservar, cancelar o reprogramar una cita y al cambiar
+bloques o excepciones.
+"""
+
+from __future__ import annotations
+
+import heapq
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+from core.cache import get_tagged, set_tagged
+
+from .models import AvailabilityOverride, NutritionistAppointment, NutritionistAvailability
+
+CALENDAR_WINDOW_DAYS = 60
+CALENDAR_CACHE_TTL = 60 * 10
+
+
+def calendar_tag(nutritionist_id) -> str:
+    """Tag de cache del calendario de un nutricionista."""
+    return f"nutritionist_calendar:{nutritionist_id}"
+
+
+def _candidate_slots(blocks, blocked: set, start: date, end: date, tz) -> list[tuple[datetime, datetime]]:
+    by_weekday: dict[int, list] = {}
+    for block in blocks:
+        by_weekday.setdefault(block.day_of_week, []).append(block)
+
+    slots = []
+    day = start
+    while day <= end:
+        if day not in blocked:
+            for block in by_weekday.get(day.weekday(), ()):
+                duration = timedelta(minutes=block.slot_duration_minutes)
+                if not duration:
+                    continue
+                slot_start = datetime.combine(day, block.start_time, tzinfo=tz)
+                limit = datetime.combine(day, block.end_time, tzinfo=tz)
+                while slot_start + duration <= limit:
+                    slots.append((slot_start, slot_start + duration))
+                    slot_start += duration
+        day += timedelta(days=1)
+    slots.sort()
+    return slots
+
+
+def subtract_booked(
+    slots: list[tuple[datetime, datetime]],
+    booked: list[tuple[datetime, datetime]],
+) -> list[tuple[datetime, datetime]]:
+    """
+    Devuelve los slots que no se solapan con ninguna cita. Ambas listas deben
+    venir ordenadas por inicio. O((S + A) log A).
+    """
+    free = []
+    open_appts: list[tuple[datetime, datetime]] = []  # heap (fin, inicio)
+    i = 0
+    for slot_start, slot_end in slots:
+        while i < len(booked) and booked[i][0] < slot_end:
+            heapq.heappush(open_appts, (booked[i][1], booked[i][0]))
+            i += 1
+        while open_appts and open_appts[0][0] <= slot_start:
+            heapq.heappop(open_appts)
+        if not any(appt_start < slot_end for _, appt_start in open_appts):
+            free.append((slot_start, slot_end))
+    return free
+
+
+def build_calendar(nutritionist_id, gym_id, start: date, end: date) -> dict[date, list[datetime]]:
+    """
+    Slots libres por fecha entre ``start`` y ``end`` (inclusive). Solo incluye
+    fechas con al menos un slot libre.
+    """
+    tz = timezone.get_current_timezone()
+
+    blocks = list(NutritionistAvailability.objects.filter(
+        nutritionist_id=nutritionist_id, gym_id=gym_id, is_active=True,
+    ))
+    if not blocks:
+        return {}
+    blocked = set(AvailabilityOverride.objects.filter(
+        nutritionist_id=nutritionist_id, gym_id=gym_id, date__range=(start, end),
+    ).values_list("date", flat=True))
+
+    range_start = datetime.combine(start, time.min, tzinfo=tz)
+    range_end = datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz)
+    booked = sorted(
+        (scheduled_at, scheduled_at + timedelta(minutes=minutes))
+        for scheduled_at, minutes in NutritionistAppointment.objects.filter(
+            nutritionist_id=nutritionist_id,
+            # Una cita larga del día anterior puede invadir el primer slot.
+            scheduled_at__gte=range_start - timedelta(days=1),
+            scheduled_at__lt=range_end,
+        ).exclude(status=NutritionistAppointment.Status.CANCELLED).values_list(
+            "scheduled_at", "duration_minutes",
+        )
+    )
+
+    calendar: dict[date, list[datetime]] = {}
+    for slot_start, _ in subtract_booked(_candidate_slots(blocks, blocked, start, end, tz), booked):
+        calendar.setdefault(slot_start.date(), []).append(slot_start)
+    return calendar
+
+
+def nutritionist_calendar(nutritionist_id, gym_id) -> dict[date, list[datetime]]:
+    """
+    Calendario de la ventana de reserva (hoy + ``CALENDAR_WINDOW_DAYS``), desde
+    cache si está vigente. Los slots ya pasados se descartan al leer.
+    """
+    today = timezone.localdate()
+    base_key = f"nutritionist_calendar:{gym_id}:{nutritionist_id}:{today.isoformat()}"
+    tags = [calendar_tag(nutritionist_id)]
+
+    calendar = get_tagged(base_key, tags)
+    if calendar is None:
+        calendar = build_calendar(
+            nutritionist_id, gym_id, today, today + timedelta(days=CALENDAR_WINDOW_DAYS),
+        )
+        set_tagged(base_key, calendar, tags, CALENDAR_CACHE_TTL)
+
+    now = timezone.now()
+    upcoming = {}
+    for day, slots in calendar.items():
+        slots = [s for s in slots if s >= now] if day == today else slots
+        if slots:
+            upcoming[day] = slots
+    return upcoming
+
+
+def free_days(nutritionist_id, gym_id) -> list[date]:
+    """Fechas de la ventana de reserva con al menos un slot libre."""
+    return sorted(nutritionist_calendar(nutritionist_id, gym_id))
+
+
+def free_slots(nutritionist_id, gym_id, day: date) -> list[datetime]:
+    """Slots libres de una fecha. Fuera de la ventana se calcula sin cache."""
+    today = timezone.localdate()
+    if today <= day <= today + timedelta(days=CALENDAR_WINDOW_DAYS):
+        return nutritionist_calendar(nutritionist_id, gym_id).get(day, [])
+    return build_calendar(nutritionist_id, gym_id, day, day).get(day, [])
@@ -0,0 +1,122 @@
+"""
+gyms/exports.py
+───────────────
+Filas de las exportaciones CSV del gimnasio (ver core.exports).
+
+Cada función recibe un queryset ya filtrado por permisos y devuelve un
+generador de filas; los datos relacionados se resuelven por lote.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from core.exports import EXPORT_CHUNK_SIZE, iter_chunks, local_dt
+
+COACH_ATHLETES_HEADER = ["Nombre", "Email", "Puntos", "Rutina Activa", "Plan Nutricional", "Sesiones (7d)", "Activo"]
+NUTRITION_ATHLETES_HEADER = ["Nombre", "Email", "Puntos", "Plan Activo", "Cumplimiento %", "Comidas Hoy"]
+PAYMENTS_HEADER = [
+    "Fecha de pago", "Atleta", "Email", "Plan", "Monto", "Moneda", "Estado",
+    "Método", "Referencia", "Vencimiento",
+]
+CHECKINS_HEADER = ["Fecha y hora", "Atleta", "Email", "Sede", "Método"]
+
+
+def _athletes(athletes):
+    from gamification.services import points_annotation
+    return (
+        athletes.annotate(puntos=points_annotation())
+        .only("id", "first_name", "last_name", "email", "is_active")
+        .order_by("first_name", "last_name", "id")
+    )
+
+
+def coach_athletes_rows(athletes, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Atletas de un coach: rutina y plan activos y sesiones de los últimos 7 días."""
+    from nutrition.models import UserNutritionPlan
+    from workouts.models import UserRoutineAssignment, WorkoutSession
+
+    cutoff = timezone.localdate() - timedelta(days=7)
+    for chunk in iter_chunks(_athletes(athletes), chunk_size):
+        ids = [a.id for a in chunk]
+        routines = dict(
+            UserRoutineAssignment.objects.filter(user_id__in=ids, status="active")
+            .values_list("user_id", "routine__name")
+        )
+        plans = dict(
+            UserNutritionPlan.objects.filter(user_id__in=ids, status="active")
+            .values_list("user_id", "plan__name")
+        )
+        sessions = dict(
+            WorkoutSession.objects.filter(
+                user_id__in=ids, performed_at__date__gte=cutoff, status="completed",
+            ).values("user_id").annotate(c=Count("id")).order_by().values_list("user_id", "c")
+        )
+        for a in chunk:
+            yield [
+                f"{a.first_name} {a.last_name}", a.email, a.puntos,
+                routines.get(a.id, ""),
+                plans.get(a.id, ""),
+                sessions.get(a.id, 0),
+                "Si" if a.is_active else "No",
+            ]
+
+
+def nutrition_athletes_rows(athletes, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Atletas de un nutricionista: plan activo, cumplimiento y comidas completadas hoy."""
+    from nutrition.models import UserMealLog, UserNutritionPlan
+
+    today = timezone.localdate()
+    for chunk in iter_chunks(_athletes(athletes), chunk_size):
+        ids = [a.id for a in chunk]
+        plans = {
+            user_id: (name, compliance)
+            for user_id, name, compliance in UserNutritionPlan.objects.filter(
+                user_id__in=ids, status="active",
+            ).values_list("user_id", "plan__name", "compliance_percentage")
+        }
+        meals = dict(
+            UserMealLog.objects.filter(user_id__in=ids, date=today, status="completed")
+            .values("user_id").annotate(c=Count("id")).order_by().values_list("user_id", "c")
+        )
+        for a in chunk:
+            plan_name, compliance = plans.get(a.id, ("", 0))
+            yield [
+                f"{a.first_name} {a.last_name}", a.email, a.puntos,
+                plan_name, compliance, meals.get(a.id, 0),
+            ]
+
+
+def payment_rows(payments, chunk_size: int = EXPORT_CHUNK_SIZE):
+    from .models import GymPayment
+
+    status_labels = dict(GymPayment.PaymentStatus.choices)
+    rows = payments.values_list(
+        "paid_at", "athlete__first_name", "athlete__last_name", "athlete__email", "plan__name",
+        "amount", "currency", "status", "payment_method", "reference", "due_date",
+    )
+    for paid_at, first, last, email, plan, amount, currency, state, method, reference, due in rows.iterator(
+        chunk_size=chunk_size
+    ):
+        yield [
+            local_dt(paid_at), f"{first or ''} {last or ''}".strip(), email or "", plan or "",
+            amount, currency, status_labels.get(state, state), method, reference,
+            due.isoformat() if due else "",
+        ]
+
+
+def checkin_rows(checkins, chunk_size: int = EXPORT_CHUNK_SIZE):
+    from .models import CheckIn
+
+    method_labels = dict(CheckIn.Method.choices)
+    rows = checkins.values_list(
+        "timestamp", "user__first_name", "user__last_name", "user__email", "branch__name", "method",
+    )
+    for timestamp, first, last, email, branch, method in rows.iterator(chunk_size=chunk_size):
+        yield [
+            local_dt(timestamp), f"{first} {last}".strip(), email, branch or "",
+            method_labels.get(method, method),
+        ]
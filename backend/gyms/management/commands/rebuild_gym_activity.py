@@ -0,0 +1,61 @@
+"""
+Comando de gestión: rebuild_gym_activity
+────────────────────────────────────────
+Reconstruye el rollup diario ``DailyGymActivity`` y ``MemberActivity`` a
+partir de CheckIn, WorkoutSession, User y UserMealLog.
+
+Uso:
+    python manage.py rebuild_gym_activity                 # últimos 400 días
+    python manage.py rebuild_gym_activity --days 30
+    python manage.py rebuild_gym_activity --since 2025-01-01 --gym-id <uuid>
+
+Casos de uso:
+  - Backfill inicial después de desplegar el rollup.
+  - Reparar celdas tras importaciones masivas o cambios de gym de usuarios.
+"""
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el rollup diario de actividad por gimnasio."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=400,
+            help="Cantidad de días hacia atrás a reconstruir (default: 400).",
+        )
+        parser.add_argument(
+            "--since",
+            type=str,
+            default=None,
+            help="Fecha inicial YYYY-MM-DD (tiene prioridad sobre --days).",
+        )
+        parser.add_argument(
+            "--gym-id",
+            type=str,
+            default=None,
+            help="Limitar la reconstrucción a un gimnasio específico (UUID).",
+        )
+
+    def handle(self, *args, **options):
+        from gyms.activity import rebuild_activity
+
+        today = timezone.localdate()
+        if options["since"]:
+            try:
+                start = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("--since debe tener formato YYYY-MM-DD.")
+        else:
+            start = today - timedelta(days=options["days"])
+
+        rows = rebuild_activity(start, today, gym_id=options["gym_id"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rollup reconstruido {start} → {today}: {rows} filas gym×día.")
+        )
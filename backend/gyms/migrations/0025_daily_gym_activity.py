@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:50
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0024_announcement_gym_and_roles'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyGymActivity',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('date', models.DateField()),
+                ('checkins', models.PositiveIntegerField(default=0)),
+                ('active_users', models.PositiveIntegerField(default=0, help_text='Usuarios distintos con check-in ese día')),
+                ('completed_sessions', models.PositiveIntegerField(default=0)),
+                ('new_athletes', models.PositiveIntegerField(default=0)),
+                ('meal_logs', models.PositiveIntegerField(default=0)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to='gyms.gym')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='gyms_dailyg_date_6f1f79_idx')],
+                'constraints': [models.UniqueConstraint(fields=('gym', 'date'), name='uniq_daily_gym_activity')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MemberActivity',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('last_checkin_on', models.DateField(blank=True, null=True)),
+                ('last_workout_on', models.DateField(blank=True, null=True)),
+                ('gym', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='member_activity', to='gyms.gym')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['gym', 'last_checkin_on'], name='gyms_member_gym_id_a5deb3_idx'), models.Index(fields=['gym', 'last_workout_on'], name='gyms_member_gym_id_570da5_idx'), models.Index(fields=['last_checkin_on'], name='gyms_member_last_ch_04f1c7_idx'), models.Index(fields=['last_workout_on'], name='gyms_member_last_wo_217143_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0025_daily_gym_activity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gympayment',
+            index=models.Index(fields=['gym', '-paid_at'], name='gyms_gympay_gym_id_52ac31_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0026_gympayment_gym_paid_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gym',
+            name='sessions_revoked_before',
+            field=models.DateTimeField(blank=True, help_text='Tokens de sus usuarios emitidos antes de este instante no son válidos', null=True),
+        ),
+    ]
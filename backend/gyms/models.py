@@ -34,6 +34,9 @@ class Gym(BaseModel):
     max_athletes = models.IntegerField(default=100, help_text="Límite de atletas activos")
     max_coaches = models.IntegerField(default=2, help_text="Límite de coaches activos")
     max_nutritionists = models.IntegerField(default=2, help_text="Límite de nutricionistas activos")
+    sessions_revoked_before = models.DateTimeField(
+        null=True, blank=True, help_text="Tokens de sus usuarios emitidos antes de este instante no son válidos",
+    )
 
     class Meta:
         ordering = ["name"]
@@ -281,6 +284,7 @@ class GymPayment(BaseModel):
 
     class Meta:
         ordering = ["-paid_at"]
+        indexes = [models.Index(fields=["gym", "-paid_at"])]
 
     def __str__(self) -> str:
         return f"{self.gym.name} - {self.athlete} - S/{self.amount} ({self.get_status_display()})"
@@ -515,3 +519,64 @@ class CoachMessage(BaseModel):
     def __str__(self) -> str:
         sender = self.coach.email if self.sender_is_coach else self.athlete.email
         return f"[COACH MSG] {sender}"
+
+
+class DailyGymActivity(BaseModel):
+    """
+    Rollup diario de actividad por gimnasio.
+
+    Lo mantienen las señales de ``gyms.signals`` (una celda gym×día se recalcula
+    cuando cambia uno de sus eventos) y se reconstruye con el comando
+    ``rebuild_gym_activity``. Los dashboards leen decenas de filas de aquí en
+    lugar de escanear CheckIn / WorkoutSession.
+    """
+
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name="daily_activity")
+    date = models.DateField()
+    checkins = models.PositiveIntegerField(default=0)
+    active_users = models.PositiveIntegerField(default=0, help_text="Usuarios distintos con check-in ese día")
+    completed_sessions = models.PositiveIntegerField(default=0)
+    new_athletes = models.PositiveIntegerField(default=0)
+    meal_logs = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(fields=["gym", "date"], name="uniq_daily_gym_activity"),
+        ]
+        indexes = [
+            models.Index(fields=["date"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.gym.name} {self.date:%Y-%m-%d}: {self.checkins} check-ins"
+
+
+class MemberActivity(BaseModel):
+    """
+    Última actividad conocida de cada usuario.
+
+    Permite contar usuarios activos distintos en una ventana (DAU/WAU/MAU)
+    con un solo ``COUNT`` indexado: un usuario está activo en los últimos N
+    días si su último evento cae dentro de la ventana.
+    """
+
+    user = models.OneToOneField(
+        "accounts.User",
+        on_delete=models.CASCADE,
+        related_name="activity",
+    )
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, null=True, blank=True, related_name="member_activity")
+    last_checkin_on = models.DateField(null=True, blank=True)
+    last_workout_on = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["gym", "last_checkin_on"]),
+            models.Index(fields=["gym", "last_workout_on"]),
+            models.Index(fields=["last_checkin_on"]),
+            models.Index(fields=["last_workout_on"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Actividad de {self.user.email}"
@@ -0,0 +1,85 @@
+"""
+gyms/notifications.py
+─────────────────────
+Envío de notificaciones a muchos destinatarios.
+
+``create_notification`` (gyms.views) cubre el caso de un destinatario. Para
+anuncios a todo un gimnasio o a todos los participantes de un reto se usa
+``notify_many``: arma las filas en memoria y las inserta con ``bulk_create``
+por lotes (un INSERT cada ``chunk_size`` destinatarios), sin leer cada User.
+Con ``defer=True`` el trabajo se encola en core.jobs y la petición no espera.
+"""
+
+from __future__ import annotations
+
+from itertools import islice
+from typing import Iterable
+
+from django.db.models import QuerySet
+
+from .models import Notification
+
+NOTIFICATION_CHUNK_SIZE = 500
+
+
+def _chunks(iterable: Iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def notify_many(
+    recipient_ids: Iterable,
+    notification_type: str,
+    title: str,
+    message: str = "",
+    actor_id=None,
+    gym_id=None,
+    link: str = "",
+    *,
+    defer: bool = False,
+    chunk_size: int = NOTIFICATION_CHUNK_SIZE,
+) -> int:
+    """
+    Crea la misma notificación para cada id de ``recipient_ids`` (lista o
+    queryset ``values_list("id", flat=True)``). Devuelve cuántas se crearon o,
+    con ``defer=True``, cuántas se encolaron.
+    """
+    if defer:
+        from core.jobs import enqueue
+
+        ids = [str(pk) for pk in dict.fromkeys(recipient_ids)]
+        if ids:
+            enqueue(
+                "gyms.notifications.notify_many",
+                ids, notification_type, title, message,
+                actor_id=str(actor_id) if actor_id else None,
+                gym_id=str(gym_id) if gym_id else None,
+                link=link,
+                chunk_size=chunk_size,
+            )
+        return len(ids)
+
+    if isinstance(recipient_ids, QuerySet):
+        recipient_ids = recipient_ids.iterator(chunk_size=chunk_size)
+
+    created = 0
+    seen: set = set()
+    for chunk in _chunks(recipient_ids, chunk_size):
+        rows = []
+        for pk in chunk:
+            if pk in seen:
+                continue
+            seen.add(pk)
+            rows.append(Notification(
+                recipient_id=pk,
+                actor_id=actor_id,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                gym_id=gym_id,
+                link=link,
+            ))
+        Notification.objects.bulk_create(rows)
+        created += len(rows)
+    return created
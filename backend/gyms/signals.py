@@ -0,0 +1,130 @@
+"""
+gyms/signals.py
+───────────────
+Mantienen el rollup ``DailyGymActivity`` / ``MemberActivity`` al día e
+invalidan el cache compartido del gimnasio afectado y el calendario de
+nutricionistas (gyms.availability).
+
+Regla: las señales son delgadas. Solo identifican la celda gym×día / el tag
+afectado y delegan en gyms.activity y core.cache.
+"""
+
+import logging
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.cache import gym_tag, invalidate_tags
+
+from .activity import refresh_gym_day, touch_member
+
+logger = logging.getLogger(__name__)
+
+
+def _local_day(dt):
+    return timezone.localtime(dt).date() if timezone.is_aware(dt) else dt.date()
+
+
+@receiver(post_save, sender="gyms.CheckIn")
+def on_checkin_activity(sender, instance, created, **kwargs):
+    refresh_gym_day(instance.gym_id, _local_day(instance.timestamp), ("checkins", "active_users"))
+    if created:
+        touch_member(instance.user_id, instance.gym_id, checkin_on=_local_day(instance.timestamp))
+
+
+@receiver(post_delete, sender="gyms.CheckIn")
+def on_checkin_deleted_activity(sender, instance, **kwargs):
+    refresh_gym_day(instance.gym_id, _local_day(instance.timestamp), ("checkins", "active_users"))
+
+
+@receiver(post_save, sender="workouts.WorkoutSession")
+def on_workout_session_activity(sender, instance, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and set(update_fields) == {"points_awarded"}:
+        return
+    day = _local_day(instance.performed_at)
+    refresh_gym_day(instance.gym_id, day, ("completed_sessions",))
+    if instance.status == "completed":
+        touch_member(instance.user_id, instance.gym_id, workout_on=day)
+
+
+@receiver(post_delete, sender="workouts.WorkoutSession")
+def on_workout_session_deleted_activity(sender, instance, **kwargs):
+    refresh_gym_day(instance.gym_id, _local_day(instance.performed_at), ("completed_sessions",))
+
+
+_ATHLETE_FIELDS = {"gym", "gym_id", "role"}
+
+
+def _athlete_gym(gym_id, role):
+    return gym_id if role == "athlete" else None
+
+
+@receiver(post_init, sender="accounts.User")
+def remember_user_gym(sender, instance, **kwargs):
+    # Sin forzar la carga de campos diferidos (``only()``, auth cacheado).
+    instance._activity_gym = _athlete_gym(instance.__dict__.get("gym_id"), instance.__dict__.get("role"))
+
+
+@receiver(post_save, sender="accounts.User")
+def on_user_activity(sender, instance, created, update_fields=None, **kwargs):
+    """
+    ``new_athletes`` cuenta por gym y día de alta: se recalcula al crear un
+    atleta con gym y también cuando un usuario existente recibe o cambia de gym
+    (registro con Google, ``_complete_registration``) o de rol.
+    """
+    if update_fields is not None and not _ATHLETE_FIELDS & set(update_fields):
+        return
+    previous = None if created else getattr(instance, "_activity_gym", None)
+    current = _athlete_gym(instance.gym_id, instance.role)
+    instance._activity_gym = current
+    if previous == current:
+        return
+    day = _local_day(instance.date_joined)
+    for gym_id in {previous, current} - {None}:
+        refresh_gym_day(gym_id, day, ("new_athletes",))
+
+
+@receiver(post_save, sender="nutrition.UserMealLog")
+def on_meal_log_activity(sender, instance, created, **kwargs):
+    if not created:
+        return
+    gym_id = getattr(instance.user, "gym_id", None)
+    refresh_gym_day(gym_id, instance.date, ("meal_logs",))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Invalidación del cache por gimnasio
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _invalidate_gym(instance, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and set(update_fields) <= {"last_login", "points_awarded"}:
+        return
+    if instance.gym_id:
+        invalidate_tags(gym_tag(instance.gym_id))
+
+
+for _model in ("gyms.CheckIn", "workouts.WorkoutSession", "gyms.GymSubscription", "accounts.User"):
+    post_save.connect(_invalidate_gym, sender=_model, dispatch_uid=f"invalidate_gym_cache_save:{_model}")
+    post_delete.connect(_invalidate_gym, sender=_model, dispatch_uid=f"invalidate_gym_cache_delete:{_model}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Invalidación del calendario de nutricionistas
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _invalidate_calendar(instance, **kwargs):
+    from .availability import calendar_tag
+
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and set(update_fields) <= {"clinical_notes", "updated_at"}:
+        return
+    if instance.nutritionist_id:
+        invalidate_tags(calendar_tag(instance.nutritionist_id))
+
+
+for _model in ("gyms.NutritionistAppointment", "gyms.NutritionistAvailability", "gyms.AvailabilityOverride"):
+    post_save.connect(_invalidate_calendar, sender=_model, dispatch_uid=f"invalidate_calendar_save:{_model}")
+    post_delete.connect(_invalidate_calendar, sender=_model, dispatch_uid=f"invalidate_calendar_delete:{_model}")
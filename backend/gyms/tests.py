@@ -7,8 +7,9 @@ from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
 
+from .activity import gym_activity_totals, rebuild_activity
 from .models import (
-    AvailabilityOverride, CoachAssignment, Gym, Notification,
+    AvailabilityOverride, CheckIn, CoachAssignment, DailyGymActivity, Gym, Notification,
     NutritionistAppointment, NutritionistAssignment, NutritionistAvailability,
 )
 
@@ -315,3 +316,323 @@ class AppointmentCreationTests(TestCase):
                 notification_type=Notification.Type.APPOINTMENT_SCHEDULED,
             ).exists()
         )
+
+
+class DailyGymActivityTests(TestCase):
+    """El rollup diario debe coincidir con los datos crudos, tanto incremental como reconstruido."""
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Rollup Gym", slug="rollup-gym")
+        self.athletes = [
+            User.objects.create_user(
+                email=f"athlete{i}@rollup.com", password="pass123",
+                role=User.Role.ATHLETE, gym=self.gym,
+            )
+            for i in range(2)
+        ]
+        self.today = timezone.localdate()
+
+    def test_signals_keep_rollup_in_sync(self):
+        CheckIn.objects.create(user=self.athletes[0], gym=self.gym)
+        CheckIn.objects.create(user=self.athletes[0], gym=self.gym)
+        CheckIn.objects.create(user=self.athletes[1], gym=self.gym)
+
+        row = DailyGymActivity.objects.get(gym=self.gym, date=self.today)
+        self.assertEqual(row.checkins, 3)
+        self.assertEqual(row.active_users, 2)
+        self.assertEqual(row.new_athletes, 2)
+
+        totals = gym_activity_totals(self.gym.id, self.today)
+        self.assertEqual(totals["checkins_today"], 3)
+        self.assertEqual(totals["athletes_joined_month"], 2)
+
+    def test_athlete_assigned_to_gym_later_is_counted(self):
+        late = User.objects.create_user(email="late@rollup.com", password="pass123", role=User.Role.ATHLETE)
+        late = User.objects.get(pk=late.pk)
+        late.gym = self.gym
+        late.save()
+        self.assertEqual(DailyGymActivity.objects.get(gym=self.gym, date=self.today).new_athletes, 3)
+
+        other = Gym.objects.create(name="Otro Gym", slug="rollup-other")
+        late.gym = other
+        late.save()
+        self.assertEqual(DailyGymActivity.objects.get(gym=self.gym, date=self.today).new_athletes, 2)
+        self.assertEqual(DailyGymActivity.objects.get(gym=other, date=self.today).new_athletes, 1)
+
+    def test_refresh_never_raises(self):
+        from unittest import mock
+        from gyms import activity
+
+        with mock.patch.dict(activity._METRIC_CALCULATORS, {"checkins": mock.Mock(side_effect=RuntimeError)}), \
+                self.assertLogs("gyms.activity", "WARNING"):
+            activity.refresh_gym_day(self.gym.id, self.today, ("checkins",))
+
+    def test_rebuild_matches_incremental(self):
+        for athlete in self.athletes:
+            CheckIn.objects.create(user=athlete, gym=self.gym)
+        before = DailyGymActivity.objects.get(gym=self.gym, date=self.today)
+
+        DailyGymActivity.objects.all().delete()
+        rebuild_activity(self.today - timedelta(days=30), self.today)
+
+        after = DailyGymActivity.objects.get(gym=self.gym, date=self.today)
+        self.assertEqual(
+            (before.checkins, before.active_users, before.new_athletes),
+            (after.checkins, after.active_users, after.new_athletes),
+        )
+
+
+class DashboardCacheInvalidationTests(TestCase):
+    """Escribir datos de un gym invalida solo el dashboard cacheado de ese gym."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.gym = Gym.objects.create(name="Cache Gym", slug="cache-gym")
+        self.other_gym = Gym.objects.create(name="Other Gym", slug="other-cache-gym")
+        self.admin = User.objects.create_user(
+            email="admin@cache.com", password="pass123",
+            role=User.Role.GYM_ADMIN, gym=self.gym,
+        )
+        self.athlete = User.objects.create_user(
+            email="athlete@cache.com", password="pass123",
+            role=User.Role.ATHLETE, gym=self.gym,
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def _checkins_today(self):
+        return self.client.get("/api/gyms/dashboard/stats/").data["checkins_today"]
+
+    def test_checkin_busts_gym_dashboard(self):
+        self.assertEqual(self._checkins_today(), 0)
+        CheckIn.objects.create(user=self.athlete, gym=self.gym)
+        self.assertEqual(self._checkins_today(), 1)
+
+    def test_other_gym_write_keeps_cache(self):
+        from core.cache import get_tagged, gym_tag
+        self._checkins_today()
+        outsider = User.objects.create_user(
+            email="outsider@cache.com", password="pass123",
+            role=User.Role.ATHLETE, gym=self.other_gym,
+        )
+        CheckIn.objects.create(user=outsider, gym=self.other_gym)
+        self.assertIsNotNone(get_tagged(f"dashboard_stats_{self.gym.id}", [gym_tag(self.gym.id)]))
+
+
+class BulkNotificationTests(TestCase):
+    """notify_many inserta por lotes y no consulta cada destinatario."""
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Notif Gym", slug="bulk-notif-gym")
+        self.users = [
+            User.objects.create_user(
+                email=f"athlete{i}@bulk.com", password="pass123",
+                role=User.Role.ATHLETE, gym=self.gym,
+            )
+            for i in range(5)
+        ]
+
+    def test_bulk_insert_in_chunks(self):
+        from .notifications import notify_many
+        ids = User.objects.filter(gym=self.gym).values_list("id", flat=True)
+        # 1 SELECT de ids + 3 INSERT (lotes de 2)
+        with self.assertNumQueries(4):
+            created = notify_many(ids, Notification.Type.SYSTEM, "Aviso", gym_id=self.gym.id, chunk_size=2)
+        self.assertEqual(created, 5)
+        self.assertEqual(Notification.objects.filter(gym=self.gym, title="Aviso").count(), 5)
+
+    def test_defer_enqueues_job(self):
+        from core.jobs import run_pending
+        from .notifications import notify_many
+        notify_many([u.id for u in self.users], Notification.Type.SYSTEM, "Diferido", defer=True)
+        self.assertFalse(Notification.objects.filter(title="Diferido").exists())
+        run_pending("test-worker")
+        self.assertEqual(Notification.objects.filter(title="Diferido").count(), 5)
+
+
+class AthleteProfileQueryTests(TestCase):
+    """El perfil del atleta se arma con un número fijo de consultas."""
+
+    def setUp(self):
+        from nutrition.models import MealTemplate, NutritionPlan, UserMealLog, UserNutritionPlan
+        from workouts.models import WorkoutSession
+
+        self.gym = Gym.objects.create(name="Profile Gym", slug="profile-gym")
+        self.coach = User.objects.create_user(
+            email="coach@profile.com", password="pass123", role=User.Role.COACH, gym=self.gym,
+        )
+        self.athlete = User.objects.create_user(
+            email="athlete@profile.com", password="pass123", role=User.Role.ATHLETE, gym=self.gym,
+        )
+        CoachAssignment.objects.create(coach=self.coach, athlete=self.athlete, gym=self.gym)
+        plan = NutritionPlan.objects.create(gym=self.gym, name="Plan", created_for=self.athlete)
+        breakfast = MealTemplate.objects.create(plan=plan, name="Desayuno")
+        MealTemplate.objects.create(plan=plan, name="Cena")
+        UserNutritionPlan.objects.create(
+            user=self.athlete, plan=plan, start_date=timezone.localdate(), status="active",
+        )
+        UserMealLog.objects.create(user=self.athlete, meal_template=breakfast, date=timezone.localdate())
+        for days in (1, 20, 60):
+            WorkoutSession.objects.create(
+                user=self.athlete, gym=self.gym, status="completed",
+                performed_at=timezone.now() - timedelta(days=days),
+            )
+            CheckIn.objects.create(user=self.athlete, gym=self.gym)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.coach)
+        self.url = reverse("athlete-profile", args=[self.athlete.id])
+
+    def test_profile_query_count_is_pinned(self):
+        with self.assertNumQueries(8):
+            res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+
+        stats = res.data["stats"]
+        self.assertEqual((stats["sessions_week"], stats["sessions_month"], stats["sessions_total"]), (1, 2, 3))
+        self.assertEqual((stats["meals_today"], stats["meals_week"]), (1, 1))
+        self.assertEqual((stats["checkins_month"], stats["checkins_total"]), (3, 3))
+        self.assertEqual(res.data["nutrition_plan"]["compliance_percentage"], 50.0)
+        self.assertEqual(res.data["coach"]["id"], str(self.coach.id))
+        self.assertIsNone(res.data["goal"])
+
+
+class AvailabilityEngineTests(TestCase):
+    """Días y slots libres salen del motor de disponibilidad, con cache invalidado por citas."""
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Agenda Gym", slug="agenda-gym")
+        self.nutritionist = User.objects.create_user(
+            email="nutri@agenda.com", password="pass123", role=User.Role.NUTRITIONIST, gym=self.gym,
+        )
+        self.athlete = User.objects.create_user(
+            email="athlete@agenda.com", password="pass123", role=User.Role.ATHLETE, gym=self.gym,
+        )
+        NutritionistAssignment.objects.create(nutritionist=self.nutritionist, athlete=self.athlete, gym=self.gym)
+        today = timezone.localdate()
+        self.day = today + timedelta(days=(7 - today.weekday()) or 7)  # próximo lunes
+        NutritionistAvailability.objects.create(
+            nutritionist=self.nutritionist, gym=self.gym, day_of_week=0,
+            start_time=dt_time(9, 0), end_time=dt_time(10, 30), slot_duration_minutes=30,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.athlete)
+        self.params = {"nutritionist_id": str(self.nutritionist.id)}
+
+    def _at(self, hour, minute=0):
+        return timezone.make_aware(timezone.datetime.combine(self.day, dt_time(hour, minute)))
+
+    def _book(self, hour, minute=0, duration=30):
+        return NutritionistAppointment.objects.create(
+            nutritionist=self.nutritionist, athlete=self.athlete, gym=self.gym,
+            scheduled_at=self._at(hour, minute), duration_minutes=duration,
+        )
+
+    def _days(self):
+        return self.client.get("/api/gyms/availability/days/", self.params).data
+
+    def test_subtract_booked_handles_long_and_overlapping_appointments(self):
+        from .availability import subtract_booked
+
+        slots = [(self._at(9, m), self._at(9, m) + timedelta(minutes=30)) for m in (0, 30)]
+        slots.append((self._at(10), self._at(10, 30)))
+        booked = [(self._at(8, 30), self._at(9, 45)), (self._at(9), self._at(9, 15))]
+        self.assertEqual(subtract_booked(slots, booked), [slots[2]])
+
+    def test_fully_booked_day_is_not_offered(self):
+        self.assertIn(self.day.isoformat(), self._days())
+        self._book(9, duration=60)
+        slots = self.client.get(
+            "/api/gyms/availability/slots/", {**self.params, "date": self.day.isoformat()},
+        ).data
+        self.assertEqual(slots, [self._at(10).isoformat()])
+
+        self._book(10)
+        self.assertNotIn(self.day.isoformat(), self._days())
+
+    def test_calendar_is_cached_and_invalidated_on_cancel(self):
+        appointment = self._book(9, duration=90)
+        with self.assertNumQueries(3):
+            days = self._days()
+        self.assertNotIn(self.day.isoformat(), days)
+        with self.assertNumQueries(0):
+            self._days()
+
+        res = self.client.post(f"/api/gyms/appointments/{appointment.id}/cancel/")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(self.day.isoformat(), self._days())
+
+
+class StreamingExportTests(TestCase):
+    """Las exportaciones CSV salen en streaming, filtradas por rango de fechas."""
+
+    def setUp(self):
+        from .models import GymMembershipPlan, GymPayment
+
+        self.gym = Gym.objects.create(name="Export Gym", slug="export-gym")
+        self.admin = User.objects.create_user(
+            email="admin@export.com", password="pass123", role=User.Role.GYM_ADMIN, gym=self.gym,
+        )
+        self.coach = User.objects.create_user(
+            email="coach@export.com", password="pass123", role=User.Role.COACH, gym=self.gym,
+        )
+        self.athlete = User.objects.create_user(
+            email="athlete@export.com", password="pass123", first_name="Ana", last_name="Export",
+            role=User.Role.ATHLETE, gym=self.gym,
+        )
+        CoachAssignment.objects.create(coach=self.coach, athlete=self.athlete, gym=self.gym)
+        plan = GymMembershipPlan.objects.create(gym=self.gym, name="Mensual", price=100)
+        now = timezone.now()
+        for days, amount in ((1, 100), (40, 80)):
+            GymPayment.objects.create(
+                gym=self.gym, athlete=self.athlete, plan=plan, amount=amount, paid_at=now - timedelta(days=days),
+            )
+        CheckIn.objects.create(user=self.athlete, gym=self.gym)
+        self.client = APIClient()
+
+    def _csv(self, user, url, params=None):
+        self.client.force_authenticate(user=user)
+        res = self.client.get(url, params or {})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        return b"".join(res.streaming_content).decode("utf-8-sig").strip().splitlines()
+
+    def test_payments_export_respects_date_range(self):
+        lines = self._csv(self.admin, "/api/gyms/payments/export/")
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Ana Export,athlete@export.com,Mensual,100.00", lines[1])
+
+        start = (timezone.localdate() - timedelta(days=60)).isoformat()
+        self.assertEqual(len(self._csv(self.admin, "/api/gyms/payments/export/", {"from": start})), 3)
+
+    def test_export_streams_asynchronously_under_asgi(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncRequestFactory
+        from core import exports
+
+        rows = ([str(i), "x"] for i in range(1200))
+        response = exports.csv_stream_response("a.csv", ["ID", "X"], rows, request=AsyncRequestFactory().get("/"))
+        self.assertTrue(response.is_async)
+
+        async def consume():
+            return [chunk async for chunk in response.streaming_content]
+
+        chunks = async_to_sync(consume)()
+        self.assertEqual(len(chunks), 3)  # 1202 líneas en lotes de ASYNC_STREAM_LINES
+        lines = b"".join(chunks).decode("utf-8-sig").splitlines()
+        self.assertEqual((len(lines), lines[-1]), (1201, "1199,x"))
+
+    def test_payments_export_rejects_bad_range(self):
+        self.client.force_authenticate(user=self.admin)
+        res = self.client.get("/api/gyms/payments/export/", {"from": "2026-02-01", "to": "2026-01-01"})
+        self.assertEqual(res.status_code, 400)
+
+    def test_checkins_and_athletes_exports(self):
+        lines = self._csv(self.admin, "/api/gyms/checkins/export/")
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith("Ana Export,athlete@export.com,,Manual"))
+
+        lines = self._csv(self.coach, "/api/gyms/coach-assignments/export_athletes/")
+        self.assertEqual(lines[0].split(",")[:3], ["Nombre", "Email", "Puntos"])
+        self.assertEqual(lines[1], "Ana Export,athlete@export.com,0,,,0,Si")
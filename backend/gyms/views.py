@@ -1,14 +1,10 @@
-﻿import csv
-import logging
-import pytz
-from datetime import date, datetime, time as dt_time, timedelta
+﻿import logging
+from datetime import date, timedelta
 
 logger = logging.getLogger(__name__)
 
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 from django.db.models import Count, Q, Sum
-from django.http import HttpResponse
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
@@ -16,50 +12,62 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 
+from core.cache import get_tagged, gym_tag, set_tagged
 from core.constants import DASHBOARD_CACHE_TTL
+from core.db_router import replica_reads
+from core.pagination import OptInCursorPagination
 from core.permissions import IsGymAdmin, IsSuperAdmin
 
 
 def _points_annotation():
-    """Retorna una annotación ``puntos`` que suma los UserPoints aprobados.
+    """Retorna una annotación ``puntos`` con los UserPoints aprobados.
     Úsala con ``.annotate(puntos=_points_annotation())`` en querysets de User.
+    Lee el saldo materializado (``UserPointsBalance``) con un LEFT JOIN.
     """
-    from django.db.models import OuterRef, Subquery, Sum, Value, IntegerField
-    from django.db.models.functions import Coalesce
-    from gamification.models import UserPoints
-    subq = UserPoints.objects.filter(
-        user=OuterRef("pk"), status=UserPoints.Status.APPROVED
-    ).values("user").annotate(total=Sum("points")).values("total")
-    return Coalesce(Subquery(subq, output_field=IntegerField()), Value(0))
+    from gamification.services import points_annotation
+    return points_annotation()
+
+
+REVOKE_BATCH_SIZE = 5000
 
 
 def _revoke_gym_sessions(gym) -> int:
     """
-    Blacklist all outstanding JWT tokens for every user belonging to this gym.
+    Revoke every JWT session of the gym's users.
+
+    ``sessions_revoked_before`` invalida al instante todos los tokens emitidos
+    antes del segundo en curso (lo comprueba core.authentication en cada request, incluidos
+    los access tokens, que no pasan por la blacklist). Además se blacklistean
+    en bloque los refresh tokens vigentes, para que no puedan renovarse.
     Returns the number of tokens blacklisted. Never raises — failure is logged only.
     """
     try:
         from rest_framework_simplejwt.token_blacklist.models import (
             BlacklistedToken, OutstandingToken,
         )
-        user_ids = (
-            get_user_model().objects
-            .filter(gym=gym)
+
+        now = timezone.now()
+        # Al segundo, como el ``iat`` de los tokens (core.authentication).
+        gym.sessions_revoked_before = now.replace(microsecond=0)
+        gym.save(update_fields=["sessions_revoked_before", "updated_at"])
+
+        token_ids = list(
+            OutstandingToken.objects
+            .filter(user__gym=gym, expires_at__gt=now, blacklistedtoken__isnull=True)
             .values_list("id", flat=True)
         )
-        tokens = OutstandingToken.objects.filter(user_id__in=user_ids)
-        count = 0
-        for token in tokens:
-            _, created = BlacklistedToken.objects.get_or_create(token=token)
-            if created:
-                count += 1
-        return count
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token_id=token_id) for token_id in token_ids],
+            batch_size=REVOKE_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        return len(token_ids)
     except Exception as exc:
         logger.warning("No se pudieron revocar sesiones del gym %s: %s", gym.pk, exc)
         return 0
 
 from .models import (
-    AthleteGoal, BodyMeasurement, Branch, CheckIn, CoachAssignment, CoachMessage, Gym,
+    AthleteGoal, BodyMeasurement, Branch, CheckIn, CoachAssignment, CoachMessage, DailyGymActivity, Gym,
     GymMembershipPlan, GymFeatureFlag, GymPayment, GymSubscription, Notification,
     NutritionistAssignment, AvailabilityOverride, NutritionistAppointment,
     NutritionistAvailability, NutritionistMessage,
@@ -463,6 +471,8 @@ class GymFeatureFlagViewSet(viewsets.ModelViewSet):
 class CheckInViewSet(viewsets.ModelViewSet):
     serializer_class = CheckInSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ("-timestamp", "-id")
 
     def get_queryset(self):
         user = self.request.user
@@ -608,14 +618,17 @@ class CheckInViewSet(viewsets.ModelViewSet):
         if not user.gym_id:
             return Response({"detail": "No gym assigned"}, status=400)
 
-        today = date.today()
+        today = timezone.localdate()
         staff_roles = {User.Role.GYM_ADMIN, User.Role.RECEPTIONIST, User.Role.COACH, User.Role.NUTRITIONIST}
-        checkins_filter = {"gym_id": user.gym_id, "timestamp__date": today}
 
         if user.role in staff_roles:
-            checkins_today = CheckIn.objects.filter(**checkins_filter).count()
+            checkins_today = (
+                DailyGymActivity.objects.filter(gym_id=user.gym_id, date=today)
+                .values_list("checkins", flat=True)
+                .first()
+            ) or 0
         elif user.role == User.Role.ATHLETE:
-            checkins_today = CheckIn.objects.filter(user=user, **checkins_filter).count()
+            checkins_today = CheckIn.objects.filter(user=user, gym_id=user.gym_id, timestamp__date=today).count()
         else:
             checkins_today = 0
 
@@ -684,6 +697,29 @@ class CheckInViewSet(viewsets.ModelViewSet):
             "total":    len(result),
         })
 
+    @action(detail=False, methods=["get"], url_path="export")
+    @replica_reads
+    def export(self, request):
+        """
+        GET /api/gyms/checkins/export/?from=YYYY-MM-DD&to=YYYY-MM-DD
+        Historial de check-ins del gimnasio como CSV (streaming). Solo staff.
+        """
+        from core.exports import csv_stream_response, datetime_bounds, parse_date_range
+        from .exports import CHECKINS_HEADER, checkin_rows
+
+        if request.user.role == User.Role.ATHLETE:
+            raise PermissionDenied("No tienes permisos.")
+
+        start, end = parse_date_range(request.query_params)
+        lower, upper = datetime_bounds(start, end)
+        checkins = self.get_queryset().filter(timestamp__gte=lower, timestamp__lt=upper).order_by("timestamp")
+        return csv_stream_response(
+            f"checkins_{start}_{end}.csv",
+            CHECKINS_HEADER,
+            checkin_rows(checkins),
+            request=request,
+        )
+
 
 class CoachAssignmentViewSet(viewsets.ModelViewSet):
     serializer_class = CoachAssignmentSerializer
@@ -927,8 +963,12 @@ class CoachAssignmentViewSet(viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=["get"])
+    @replica_reads
     def export_athletes(self, request):
-        """Exporta atletas asignados como CSV"""
+        """Exporta atletas asignados como CSV (streaming, ver core.exports)."""
+        from core.exports import csv_stream_response
+        from .exports import COACH_ATHLETES_HEADER, coach_athletes_rows
+
         user = request.user
         if user.role not in {User.Role.COACH, User.Role.SUPER_ADMIN, User.Role.GYM_ADMIN}:
             return Response({"detail": "No tienes permisos."}, status=status.HTTP_403_FORBIDDEN)
@@ -937,56 +977,14 @@ class CoachAssignmentViewSet(viewsets.ModelViewSet):
         if user.role == User.Role.COACH:
             assignments = assignments.filter(coach=user)
 
-        athlete_ids = list(assignments.values_list("athlete_id", flat=True))
-        athletes = User.objects.filter(id__in=athlete_ids).order_by("first_name", "last_name")
-
-        from workouts.models import UserRoutineAssignment, WorkoutSession
-        from nutrition.models import UserNutritionPlan
-
-        athlete_id_list = [a.id for a in athletes]
-        cutoff = date.today() - timedelta(days=7)
-        routines_map = {
-            r.user_id: r
-            for r in UserRoutineAssignment.objects.filter(
-                user_id__in=athlete_id_list, status="active"
-            ).select_related("routine")
-        }
-        plans_map = {
-            p.user_id: p
-            for p in UserNutritionPlan.objects.filter(
-                user_id__in=athlete_id_list, status="active"
-            ).select_related("plan")
-        }
-        from django.db.models import Count as _Count
-        sessions_map = dict(
-            WorkoutSession.objects.filter(
-                user_id__in=athlete_id_list,
-                performed_at__date__gte=cutoff,
-                status="completed",
-            ).values("user_id").annotate(c=_Count("id")).values_list("user_id", "c")
+        athletes = User.objects.filter(id__in=assignments.values("athlete_id"))
+        return csv_stream_response(
+            f"atletas_{date.today().isoformat()}.csv",
+            COACH_ATHLETES_HEADER,
+            coach_athletes_rows(athletes),
+            request=request,
         )
 
-        response = HttpResponse(content_type="text/csv; charset=utf-8")
-        response["Content-Disposition"] = f'attachment; filename="atletas_{date.today().isoformat()}.csv"'
-        response.write("﻿")
-
-        writer = csv.writer(response)
-        writer.writerow(["Nombre", "Email", "Puntos", "Rutina Activa", "Plan Nutricional", "Sesiones (7d)", "Activo"])
-
-        athletes_with_points = athletes.annotate(puntos=_points_annotation())
-        for a in athletes_with_points:
-            routine = routines_map.get(a.id)
-            plan = plans_map.get(a.id)
-            writer.writerow([
-                f"{a.first_name} {a.last_name}", a.email, a.puntos,
-                routine.routine.name if routine else "",
-                plan.plan.name if plan else "",
-                sessions_map.get(a.id, 0),
-                "Si" if a.is_active else "No",
-            ])
-
-        return response
-
     @action(detail=False, methods=["post"])
     def self_assign(self, request):
         """El atleta se autoasigna a un coach. Requiere Plan Premium."""
@@ -1315,8 +1313,12 @@ class NutritionistAssignmentViewSet(viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=["get"])
+    @replica_reads
     def export_athletes(self, request):
-        """Exporta atletas asignados como CSV"""
+        """Exporta atletas asignados como CSV (streaming, ver core.exports)."""
+        from core.exports import csv_stream_response
+        from .exports import NUTRITION_ATHLETES_HEADER, nutrition_athletes_rows
+
         user = request.user
         if user.role not in {User.Role.NUTRITIONIST, User.Role.SUPER_ADMIN, User.Role.GYM_ADMIN}:
             return Response({"detail": "No tienes permisos."}, status=status.HTTP_403_FORBIDDEN)
@@ -1325,49 +1327,14 @@ class NutritionistAssignmentViewSet(viewsets.ModelViewSet):
         if user.role == User.Role.NUTRITIONIST:
             assignments = assignments.filter(nutritionist=user)
 
-        athlete_ids = list(assignments.values_list("athlete_id", flat=True))
-        athletes = User.objects.filter(id__in=athlete_ids).order_by("first_name", "last_name")
-
-        from nutrition.models import UserNutritionPlan, UserMealLog
-        from datetime import date as _date
-
-        athlete_id_list = [a.id for a in athletes]
-        today_str = _date.today().isoformat()
-        plans_map = {
-            p.user_id: p
-            for p in UserNutritionPlan.objects.filter(
-                user_id__in=athlete_id_list, status="active"
-            ).select_related("plan")
-        }
-        from django.db.models import Count as _Count
-        meals_map = dict(
-            UserMealLog.objects.filter(
-                user_id__in=athlete_id_list,
-                date=today_str,
-                status="completed",
-            ).values("user_id").annotate(c=_Count("id")).values_list("user_id", "c")
+        athletes = User.objects.filter(id__in=assignments.values("athlete_id"))
+        return csv_stream_response(
+            f"atletas_nutricion_{date.today().isoformat()}.csv",
+            NUTRITION_ATHLETES_HEADER,
+            nutrition_athletes_rows(athletes),
+            request=request,
         )
 
-        response = HttpResponse(content_type="text/csv; charset=utf-8")
-        response["Content-Disposition"] = f'attachment; filename="atletas_nutricion_{_date.today().isoformat()}.csv"'
-        response.write("﻿")
-
-        writer = csv.writer(response)
-        writer.writerow(["Nombre", "Email", "Nivel", "Puntos", "Plan Activo", "Cumplimiento %", "Comidas Hoy", "Completadas / Total"])
-
-        athletes_with_points = athletes.annotate(puntos=_points_annotation())
-        for a in athletes_with_points:
-            plan = plans_map.get(a.id)
-            compliance = plan.compliance_percentage if plan else 0
-            writer.writerow([
-                f"{a.first_name} {a.last_name}", a.email, a.puntos,
-                plan.plan.name if plan else "",
-                compliance,
-                meals_map.get(a.id, 0),
-            ])
-
-        return response
-
     @action(detail=False, methods=["get"])
     def compliance_chart(self, request):
         """Devuelve datos de cumplimiento diario para los últimos N días"""
@@ -1422,6 +1389,48 @@ class NutritionistAssignmentViewSet(viewsets.ModelViewSet):
 
         return Response({"daily": daily_data, "days": days})
 
+    @action(detail=False, methods=["get"])
+    def weekly_compliance(self, request):
+        """
+        Cumplimiento de la semana de cada atleta asignado (nutrition.compliance).
+        ?end_date=YYYY-MM-DD (default: hoy). Atletas con menor promedio primero.
+        """
+        from nutrition.compliance import WEEK_DAYS, weekly_compliance
+
+        user = request.user
+        if user.role not in {User.Role.NUTRITIONIST, User.Role.SUPER_ADMIN, User.Role.GYM_ADMIN}:
+            return Response({"detail": "No tienes permisos."}, status=status.HTTP_403_FORBIDDEN)
+
+        end_date = date.today()
+        if request.query_params.get("end_date"):
+            try:
+                end_date = date.fromisoformat(request.query_params["end_date"])
+            except ValueError:
+                return Response({"detail": "Formato de fecha inválido. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+        assignments = self.get_queryset().filter(is_active=True)
+        if user.role == User.Role.NUTRITIONIST:
+            assignments = assignments.filter(nutritionist=user)
+        athletes = {str(a.athlete_id): a.athlete for a in assignments}
+
+        results = []
+        for athlete_id, week in weekly_compliance(athletes, end_date).items():
+            athlete = athletes[athlete_id]
+            results.append({
+                "athlete_id": athlete_id,
+                "athlete_name": athlete.get_full_name() or athlete.email,
+                "has_active_plan": any(day is not None for day in week["daily"]),
+                **week,
+            })
+        # Primero los atletas con plan y menor cumplimiento: los que requieren atención.
+        results.sort(key=lambda row: (not row["has_active_plan"], row["avg_compliance"], row["athlete_name"]))
+
+        return Response({
+            "start_date": (end_date - timedelta(days=WEEK_DAYS - 1)).isoformat(),
+            "end_date": end_date.isoformat(),
+            "results": results,
+        })
+
     @action(detail=False, methods=["post"])
     def self_assign(self, request):
         """El atleta se autoasigna a un nutricionista. Requiere Plan Premium."""
@@ -1527,6 +1536,8 @@ class NutritionistAssignmentViewSet(viewsets.ModelViewSet):
 class NotificationViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         user = self.request.user
@@ -1767,6 +1778,8 @@ class GymSubscriptionViewSet(viewsets.ModelViewSet):
 class GymPaymentViewSet(viewsets.ModelViewSet):
     serializer_class = GymPaymentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ("-paid_at", "-id")
 
     def get_queryset(self):
         user = self.request.user
@@ -1849,6 +1862,7 @@ class GymPaymentViewSet(viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=["get"])
+    @replica_reads
     def revenue_history(self, request):
         user = self.request.user
         if not user.gym_id:
@@ -1874,6 +1888,29 @@ class GymPaymentViewSet(viewsets.ModelViewSet):
             for m in monthly
         ])
 
+    @action(detail=False, methods=["get"], url_path="export")
+    @replica_reads
+    def export(self, request):
+        """
+        GET /api/gyms/payments/export/?from=YYYY-MM-DD&to=YYYY-MM-DD
+        Pagos del gimnasio como CSV (streaming). Acepta los mismos filtros que el listado.
+        """
+        from core.exports import csv_stream_response, datetime_bounds, parse_date_range
+        from .exports import PAYMENTS_HEADER, payment_rows
+
+        if request.user.role not in {User.Role.SUPER_ADMIN, User.Role.GYM_ADMIN}:
+            raise PermissionDenied("Solo administradores pueden exportar pagos.")
+
+        start, end = parse_date_range(request.query_params)
+        lower, upper = datetime_bounds(start, end)
+        payments = self.get_queryset().filter(paid_at__gte=lower, paid_at__lt=upper).order_by("paid_at", "id")
+        return csv_stream_response(
+            f"pagos_{start}_{end}.csv",
+            PAYMENTS_HEADER,
+            payment_rows(payments),
+            request=request,
+        )
+
 
 AVAILABILITY_MANAGERS = {User.Role.GYM_ADMIN, User.Role.SUPER_ADMIN}
 
@@ -1949,44 +1986,16 @@ class NutritionistAvailabilityViewSet(viewsets.ModelViewSet):
     def days(self, request):
         """
         GET /api/gyms/availability/days/?nutritionist_id=X
-        Returns list of dates (YYYY-MM-DD) that have at least one available slot
-        within the next 21 days.
+        Returns list of dates (YYYY-MM-DD) that still have at least one free slot
+        within the booking window (gyms.availability).
         """
+        from .availability import free_days
+
         nutritionist_id = request.query_params.get("nutritionist_id")
         if not nutritionist_id:
             return Response({"error": "Se requiere nutritionist_id."}, status=400)
 
-        today = date.today()
-        max_date = today + timedelta(days=60)
-
-        # Fetch blocked overrides in range
-        blocked = set(
-            AvailabilityOverride.objects.filter(
-                nutritionist_id=nutritionist_id,
-                gym_id=request.user.gym_id,
-                date__range=(today, max_date),
-            ).values_list("date", flat=True)
-        )
-
-        # Fetch active availability blocks (by day_of_week)
-        blocks = NutritionistAvailability.objects.filter(
-            nutritionist_id=nutritionist_id,
-            gym_id=request.user.gym_id,
-            is_active=True,
-        ).values_list("day_of_week", flat=True)
-        available_weekdays = set(blocks)
-
-        # Fetch already fully-booked dates (all slots taken)
-        # For simplicity, we return any day that has a block and isn't overridden;
-        # slot-level conflict is checked per-day when the user selects the date.
-        available_dates = []
-        current = today  # include today
-        while current <= max_date:
-            if current.weekday() in available_weekdays and current not in blocked:
-                available_dates.append(current.isoformat())
-            current += timedelta(days=1)
-
-        return Response(available_dates)
+        return Response([d.isoformat() for d in free_days(nutritionist_id, request.user.gym_id)])
 
     @action(detail=False, methods=["get"], url_path="slots")
     def slots(self, request):
@@ -1994,6 +2003,8 @@ class NutritionistAvailabilityViewSet(viewsets.ModelViewSet):
         GET /api/gyms/availability/slots/?nutritionist_id=X&date=YYYY-MM-DD
         Returns available (unbooked) slot datetimes for a given nutritionist and date.
         """
+        from .availability import free_slots
+
         nutritionist_id = request.query_params.get("nutritionist_id")
         date_str = request.query_params.get("date")
 
@@ -2008,66 +2019,8 @@ class NutritionistAvailabilityViewSet(viewsets.ModelViewSet):
         except ValueError:
             return Response({"error": "Formato de fecha inválido. Use YYYY-MM-DD."}, status=400)
 
-        # day_of_week: Monday=0 … Sunday=6 (same as Python weekday())
-        dow = target_date.weekday()
-
-        # Verificar si la fecha está bloqueada por un override
-        if AvailabilityOverride.objects.filter(
-            nutritionist_id=nutritionist_id,
-            gym_id=request.user.gym_id,
-            date=target_date,
-        ).exists():
-            return Response([])
-
-        blocks = NutritionistAvailability.objects.filter(
-            nutritionist_id=nutritionist_id,
-            gym_id=request.user.gym_id,
-            day_of_week=dow,
-            is_active=True,
-        )
-
-        if not blocks.exists():
-            return Response([])
-
-        from django.conf import settings as django_settings
-        tz = pytz.timezone(django_settings.TIME_ZONE)
-        candidate_slots: list[datetime] = []
-        for block in blocks:
-            duration = timedelta(minutes=block.slot_duration_minutes)
-            slot_start = tz.localize(datetime.combine(target_date, block.start_time))
-            slot_end_limit = tz.localize(datetime.combine(target_date, block.end_time))
-            while slot_start + duration <= slot_end_limit:
-                candidate_slots.append(slot_start)
-                slot_start += duration
-
-        if not candidate_slots:
-            return Response([])
-
-        # Remove slots already taken by non-cancelled appointments
-        day_start = datetime.combine(target_date, dt_time.min, tzinfo=tz)
-        day_end = datetime.combine(target_date, dt_time.max, tzinfo=tz)
-
-        booked = NutritionistAppointment.objects.filter(
-            nutritionist_id=nutritionist_id,
-            scheduled_at__range=(day_start, day_end),
-        ).exclude(status=NutritionistAppointment.Status.CANCELLED).values_list(
-            "scheduled_at", "duration_minutes"
-        )
-
-        slot_dur = blocks.first().slot_duration_minutes
-
-        def overlaps(slot_dt: datetime, appt_start: datetime, appt_mins: int) -> bool:
-            appt_end = appt_start + timedelta(minutes=appt_mins)
-            slot_end = slot_dt + timedelta(minutes=slot_dur)
-            return slot_dt < appt_end and slot_end > appt_start
-
-        available = [
-            s.isoformat()
-            for s in candidate_slots
-            if not any(overlaps(s, appt_start, appt_mins) for appt_start, appt_mins in booked)
-        ]
-
-        return Response(available)
+        slots = free_slots(nutritionist_id, request.user.gym_id, target_date)
+        return Response([s.isoformat() for s in slots])
 
 
 class NutritionistAppointmentViewSet(viewsets.ModelViewSet):
@@ -2549,6 +2502,8 @@ class NutritionistAppointmentViewSet(viewsets.ModelViewSet):
 class NutritionistMessageViewSet(viewsets.ModelViewSet):
     serializer_class = NutritionistMessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ("-created_at", "-id")
     http_method_names = ["get", "post", "patch", "delete"]
 
     def get_queryset(self):
@@ -2853,192 +2808,16 @@ def athlete_profile(request, athlete_id):
     if user.role not in {User.Role.SUPER_ADMIN, User.Role.GYM_ADMIN, User.Role.COACH, User.Role.NUTRITIONIST}:
         return Response({"detail": "No tienes permisos."}, status=status.HTTP_403_FORBIDDEN)
 
-    try:
-        athlete = User.objects.get(id=athlete_id, role=User.Role.ATHLETE)
-    except User.DoesNotExist:
+    from .athlete_summary import athlete_summary_queryset, build_athlete_profile
+
+    athlete = athlete_summary_queryset().filter(id=athlete_id).first()
+    if athlete is None:
         return Response({"detail": "Atleta no encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
     if user.role != User.Role.SUPER_ADMIN and user.gym_id != athlete.gym_id:
         return Response({"detail": "No tienes permisos."}, status=status.HTTP_403_FORBIDDEN)
 
-    from workouts.models import UserRoutineAssignment, WorkoutSession
-    from nutrition.models import UserNutritionPlan, UserMealLog
-    from challenges.models import ChallengeParticipation, UserBadge
-    from gamification.models import UserPoints
-    from datetime import date, timedelta
-    from django.db.models import Sum, Count
-
-    today = date.today()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-
-    active_routine = UserRoutineAssignment.objects.filter(
-        user=athlete, status="active"
-    ).select_related("routine", "assigned_by").first()
-
-    sessions_week = WorkoutSession.objects.filter(
-        user=athlete, performed_at__date__gte=week_ago, status="completed"
-    ).count()
-    sessions_month = WorkoutSession.objects.filter(
-        user=athlete, performed_at__date__gte=month_ago, status="completed"
-    ).count()
-    sessions_total = WorkoutSession.objects.filter(
-        user=athlete, status="completed"
-    ).count()
-
-    active_plan = UserNutritionPlan.objects.filter(
-        user=athlete, status="active"
-    ).select_related("plan", "assigned_by").first()
-
-    completed_plans = UserNutritionPlan.objects.filter(
-        user=athlete, status="completed"
-    ).count()
-
-    week_meals = UserMealLog.objects.filter(
-        user=athlete, date__gte=week_ago.isoformat(), status="completed"
-    ).count()
-    today_meals = UserMealLog.objects.filter(
-        user=athlete, date=today.isoformat(), status="completed"
-    ).select_related("meal_template").count()
-
-    total_meal_templates = 0
-    if active_plan:
-        total_meal_templates = active_plan.plan.meal_templates.count()
-
-    compliance_pct = 0
-    if active_plan and total_meal_templates > 0:
-        completed_logs = UserMealLog.objects.filter(
-            user=athlete, meal_template__plan=active_plan.plan, status="completed"
-        ).values("meal_template").distinct().count()
-        compliance_pct = round((completed_logs / total_meal_templates) * 100, 1)
-
-    active_challenges = ChallengeParticipation.objects.filter(
-        user=athlete,
-        status=ChallengeParticipation.ParticipationStatus.JOINED,
-    ).count()
-
-    badges_earned = UserBadge.objects.filter(user=athlete).count()
-
-    total_points_earned = UserPoints.objects.filter(user=athlete).aggregate(
-        total=Sum("points")
-    )["total"] or 0
-
-    points_history = list(UserPoints.objects.filter(user=athlete).order_by("-created_at")[:20].values(
-        "points", "source", "description", "created_at"
-    ))
-
-    checkins_month = athlete.checkins.filter(timestamp__date__gte=month_ago).count()
-    checkins_total = athlete.checkins.count()
-
-    from gyms.models import AthleteGoal, CoachAssignment, NutritionistAssignment, BodyMeasurement, NutritionistAppointment
-    coach_assign = CoachAssignment.objects.filter(athlete=athlete, is_active=True).select_related("coach").first()
-    nutri_assign = NutritionistAssignment.objects.filter(athlete=athlete, is_active=True).select_related("nutritionist").first()
-
-    # Medidas antropométricas — últimas 10
-    measurements = [
-        {
-            "id": str(m.id),
-            "measured_at": m.measured_at.isoformat() if hasattr(m.measured_at, 'isoformat') else str(m.measured_at),
-            "weight_kg": str(m.weight_kg) if m.weight_kg is not None else None,
-            "height_cm": str(m.height_cm) if m.height_cm is not None else None,
-            "body_fat_pct": str(m.body_fat_pct) if m.body_fat_pct is not None else None,
-            "muscle_mass_kg": str(m.muscle_mass_kg) if m.muscle_mass_kg is not None else None,
-            "waist_cm": str(m.waist_cm) if m.waist_cm is not None else None,
-            "hip_cm": str(m.hip_cm) if m.hip_cm is not None else None,
-            "arm_cm": str(m.arm_cm) if m.arm_cm is not None else None,
-            "visceral_fat": m.visceral_fat,
-            "bmi": m.bmi,
-            "notes": m.notes,
-        }
-        for m in BodyMeasurement.objects.filter(athlete=athlete).order_by("-measured_at")[:10]
-    ]
-
-    # Citas — próximas y recientes
-    appointments = [
-        {
-            "id": str(apt.id),
-            "scheduled_at": apt.scheduled_at.isoformat(),
-            "duration_minutes": apt.duration_minutes,
-            "appointment_type": apt.appointment_type,
-            "appointment_type_display": apt.get_appointment_type_display(),
-            "status": apt.status,
-            "status_display": apt.get_status_display(),
-            "notes": apt.notes,
-        }
-        for apt in NutritionistAppointment.objects.filter(athlete=athlete).order_by("-scheduled_at")[:10]
-    ]
-
-    # Tier de membresía del atleta
-    from core.permissions import get_athlete_tier
-    membership_tier = get_athlete_tier(athlete)
-
-    return Response({
-        "athlete": {
-            "id": str(athlete.id),
-            "first_name": athlete.first_name,
-            "last_name": athlete.last_name,
-            "email": athlete.email,
-            "puntos": total_points_earned,
-            "phone": athlete.phone,
-            "dni": athlete.dni,
-            "date_joined": athlete.date_joined.isoformat() if athlete.date_joined else None,
-            "is_active": athlete.is_active,
-            "fitness_goal": athlete.fitness_goal,
-            "goal_notes": athlete.goal_notes,
-        },
-        "coach": {
-            "id": str(coach_assign.coach.id),
-            "name": f"{coach_assign.coach.first_name} {coach_assign.coach.last_name}",
-            "profile_picture": request.build_absolute_uri(coach_assign.coach.profile_picture.url) if coach_assign.coach.profile_picture else None,
-            "bio": coach_assign.coach.bio,
-            "specialty": coach_assign.coach.specialty,
-            "years_experience": coach_assign.coach.years_experience,
-        } if coach_assign else None,
-        "nutritionist": {
-            "id": str(nutri_assign.nutritionist.id),
-            "name": f"{nutri_assign.nutritionist.first_name} {nutri_assign.nutritionist.last_name}",
-            "profile_picture": request.build_absolute_uri(nutri_assign.nutritionist.profile_picture.url) if nutri_assign.nutritionist.profile_picture else None,
-            "bio": nutri_assign.nutritionist.bio,
-            "specialty": nutri_assign.nutritionist.specialty,
-            "years_experience": nutri_assign.nutritionist.years_experience,
-        } if nutri_assign else None,
-        "routine": {
-            "id": str(active_routine.routine.id) if active_routine else None,
-            "name": active_routine.routine.name if active_routine else None,
-            "assigned_by": f"{active_routine.assigned_by.first_name} {active_routine.assigned_by.last_name}" if active_routine and active_routine.assigned_by else None,
-            "start_date": active_routine.start_date.isoformat() if active_routine else None,
-        } if active_routine else None,
-        "nutrition_plan": {
-            "id": str(active_plan.id) if active_plan else None,
-            "name": active_plan.plan.name if active_plan else None,
-            "assigned_by": f"{active_plan.assigned_by.first_name} {active_plan.assigned_by.last_name}" if active_plan and active_plan.assigned_by else None,
-            "start_date": active_plan.start_date.isoformat() if active_plan else None,
-            "compliance_percentage": compliance_pct,
-        } if active_plan else None,
-        "stats": {
-            "sessions_week": sessions_week,
-            "sessions_month": sessions_month,
-            "sessions_total": sessions_total,
-            "meals_week": week_meals,
-            "meals_today": today_meals,
-            "completed_plans": completed_plans,
-            "active_challenges": active_challenges,
-            "badges_earned": badges_earned,
-            "total_points_earned": total_points_earned,
-            "checkins_month": checkins_month,
-            "checkins_total": checkins_total,
-        },
-        "points_history": points_history,
-        "measurements": measurements,
-        "appointments": appointments,
-        "membership_tier": membership_tier,
-        "goal": (lambda g: {
-            "target_weight_kg": str(g.target_weight_kg) if g.target_weight_kg else None,
-            "target_body_fat_pct": str(g.target_body_fat_pct) if g.target_body_fat_pct else None,
-            "target_date": g.target_date.isoformat() if g.target_date else None,
-            "notes": g.notes,
-        } if g else None)(AthleteGoal.objects.filter(athlete=athlete).first()),
-    })
+    return Response(build_athlete_profile(athlete, request.build_absolute_uri))
 
 
 @api_view(["GET"])
@@ -3108,27 +2887,39 @@ def gym_dashboard_stats(request):
         return Response({"detail": "Gimnasio no disponible."}, status=400)
 
     cache_key = f"dashboard_stats_{gym_id}"
-    cached_data = cache.get(cache_key)
+    cache_tags = [gym_tag(gym_id)]
+    cached_data = get_tagged(cache_key, cache_tags)
     if cached_data is not None:
         return Response(cached_data)
 
-    today = date.today()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-
-    athletes = User.objects.filter(gym_id=gym_id, role=User.Role.ATHLETE)
-    total_athletes = athletes.count()
-    active_athletes = athletes.filter(is_active=True).count()
-
-    checkins_today = CheckIn.objects.filter(gym_id=gym_id, timestamp__date=today).count()
-    checkins_week = CheckIn.objects.filter(gym_id=gym_id, timestamp__date__gte=week_ago).count()
-    checkins_month = CheckIn.objects.filter(gym_id=gym_id, timestamp__date__gte=month_ago).count()
+    from core.concurrency import run_parallel
+    from .activity import gym_activity_totals
+    from .models import GymSubscription
 
-    athletes_joined_month = athletes.filter(date_joined__gte=month_ago).count()
-    athletes_joined_prev = athletes.filter(
-        date_joined__gte=month_ago - timedelta(days=30),
-        date_joined__lt=month_ago,
-    ).count()
+    today = timezone.localdate()
+
+    # Tres consultas independientes: en Postgres corren en paralelo (core.concurrency).
+    results = run_parallel({
+        "staff": lambda: User.objects.filter(gym_id=gym_id).aggregate(
+            total_athletes=Count("id", filter=Q(role=User.Role.ATHLETE)),
+            active_athletes=Count("id", filter=Q(role=User.Role.ATHLETE, is_active=True)),
+            coaches=Count("id", filter=Q(role=User.Role.COACH, is_active=True)),
+            nutritionists=Count("id", filter=Q(role=User.Role.NUTRITIONIST, is_active=True)),
+        ),
+        # Ventanas de día / semana / mes desde el rollup diario (una sola consulta)
+        "totals": lambda: gym_activity_totals(gym_id, today),
+        "expiring": lambda: list(GymSubscription.objects.filter(
+            gym_id=gym_id,
+            status="active",
+            end_date__gte=today,
+            end_date__lte=today + timedelta(days=10),
+        ).select_related("athlete", "plan").order_by("end_date")[:5]),
+    })
+    staff, totals = results["staff"], results["totals"]
+    total_athletes = staff["total_athletes"]
+    active_athletes = staff["active_athletes"]
+    athletes_joined_month = totals["athletes_joined_month"]
+    athletes_joined_prev = totals["athletes_joined_prev"]
 
     growth_rate = 0
     if athletes_joined_prev > 0:
@@ -3136,27 +2927,8 @@ def gym_dashboard_stats(request):
             ((athletes_joined_month - athletes_joined_prev) / athletes_joined_prev) * 100
         )
 
-    today_sessions_count = 0
-    try:
-        from workouts.models import WorkoutSession
-        today_sessions_count = WorkoutSession.objects.filter(
-            gym_id=gym_id,
-            performed_at__date=today,
-            status=WorkoutSession.Status.COMPLETED,
-        ).count()
-    except Exception:
-        pass
-
-    from .models import GymSubscription
-    expiring_subscriptions = GymSubscription.objects.filter(
-        gym_id=gym_id,
-        status="active",
-        end_date__gte=today,
-        end_date__lte=today + timedelta(days=10),
-    ).select_related("athlete", "plan").order_by("end_date")[:5]
-
     expiring_list = []
-    for s in expiring_subscriptions:
+    for s in results["expiring"]:
         expiring_list.append({
             "id": str(s.athlete.id),
             "name": f"{s.athlete.first_name} {s.athlete.last_name}",
@@ -3165,32 +2937,34 @@ def gym_dashboard_stats(request):
             "days_remaining": (s.end_date - today).days if s.end_date else None,
         })
 
-    coaches_count = User.objects.filter(gym_id=gym_id, role=User.Role.COACH, is_active=True).count()
-    nutritionists_count = User.objects.filter(gym_id=gym_id, role=User.Role.NUTRITIONIST, is_active=True).count()
+    coaches_count = staff["coaches"]
+    nutritionists_count = staff["nutritionists"]
 
     data = {
         "total_athletes": total_athletes,
         "active_athletes": active_athletes,
         "inactive_athletes": total_athletes - active_athletes,
-        "checkins_today": checkins_today,
-        "checkins_week": checkins_week,
-        "checkins_month": checkins_month,
+        "checkins_today": totals["checkins_today"],
+        "checkins_week": totals["checkins_week"],
+        "checkins_month": totals["checkins_month"],
         "athletes_joined_month": athletes_joined_month,
         "growth_rate": growth_rate,
-        "sessions_today": today_sessions_count,
+        "sessions_today": totals["sessions_today"],
         "active_coaches": coaches_count,
         "active_nutritionists": nutritionists_count,
         "expiring_memberships": expiring_list,
         "date": today.isoformat(),
     }
 
-    cache.set(cache_key, data, CACHE_TTL)
+    set_tagged(cache_key, data, cache_tags, CACHE_TTL)
     return Response(data)
 
 
 class CoachMessageViewSet(viewsets.ModelViewSet):
     serializer_class = CoachMessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ("-created_at", "-id")
     http_method_names = ["get", "post", "patch", "delete"]
 
     def get_queryset(self):
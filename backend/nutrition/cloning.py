@@ -0,0 +1,143 @@
+"""
+nutrition/cloning.py
+────────────────────
+Copia de planes nutricionales con inserciones por lotes.
+
+Crear cada ``MealFoodItem`` con ``save()`` recalcula la comida y el plan
+padre por ítem (nutrition.macros): un plan semanal de 42 comidas × ~5
+alimentos costaba más de 800 consultas. ``clone_plan`` lee el plan origen una
+vez (comidas + ítems + alimentos), calcula en memoria los macros de cada ítem,
+los totales de cada comida y los totales diarios del plan con las mismas
+reglas, y escribe planes, comidas e ítems con un ``bulk_create`` por tabla.
+El costo es fijo para un atleta o para una cohorte entera.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .macros import add_to_daily_totals
+from .models import MealFoodItem, MealTemplate, NutritionPlan, UserNutritionPlan
+
+CLONE_BATCH_SIZE = 1000
+CLONE_MAX_ATHLETES = 500
+
+# Campos que se copian tal cual de cada MealTemplate del plan origen.
+TEMPLATE_FIELDS = (
+    "day_number", "weekday", "meal_type", "name", "description",
+    "calories", "protein_g", "carbs_g", "fats_g",
+    "ingredients", "instructions", "order",
+)
+ITEM_MACRO_FIELDS = ("calories", "protein_g", "carbs_g", "fats_g", "fiber_g")
+MEAL_TOTAL_FIELDS = ("calories", "protein_g", "carbs_g", "fats_g")
+
+
+def plan_name_for(source_plan, athlete) -> str:
+    return f"{source_plan.name} — {athlete.first_name or athlete.email}"
+
+
+def _blueprint(source_plan) -> list[tuple[dict, list[dict]]]:
+    """
+    Comidas del plan origen listas para copiar: ``(campos de la comida,
+    [campos de cada ítem])`` con macros ya calculados. Los totales de una comida
+    con ítems salen de sus ítems, igual que ``MealTemplate.sync_macros_from_items``.
+    """
+    templates = source_plan.meal_templates.prefetch_related(
+        Prefetch("food_items", queryset=MealFoodItem.objects.select_related("food").order_by("order"))
+    )
+    blueprint = []
+    for template in templates:
+        meal = {field: getattr(template, field) for field in TEMPLATE_FIELDS}
+        items = []
+        for source_item in template.food_items.all():
+            item = MealFoodItem(food=source_item.food, quantity_g=source_item.quantity_g, order=source_item.order)
+            item.compute_macros()
+            items.append({
+                "food_id": item.food_id,
+                "quantity_g": item.quantity_g,
+                "order": item.order,
+                # Mismo valor que guarda la columna decimal(…, 2).
+                **{field: Decimal(str(getattr(item, field))) for field in ITEM_MACRO_FIELDS},
+            })
+        if items:
+            for field in MEAL_TOTAL_FIELDS:
+                meal[field] = int(sum(item[field] for item in items))
+        blueprint.append((meal, items))
+    return blueprint
+
+
+@transaction.atomic
+def clone_plan(source_plan, athletes, *, batch_size: int = CLONE_BATCH_SIZE) -> list[NutritionPlan]:
+    """
+    Crea una copia personal (``created_for``) de ``source_plan`` para cada
+    atleta, con todas sus comidas e ítems. Devuelve los planes en el orden de
+    ``athletes``. Consultas: 2 lecturas + un INSERT por tabla y lote.
+    """
+    athletes = list(athletes)
+    if not athletes:
+        return []
+    blueprint = _blueprint(source_plan)
+    daily_totals = {}
+    for meal_fields, _ in blueprint:
+        add_to_daily_totals(daily_totals, meal_fields["weekday"], meal_fields["day_number"], meal_fields)
+
+    plans = [
+        NutritionPlan(
+            gym_id=source_plan.gym_id,
+            name=plan_name_for(source_plan, athlete),
+            description=source_plan.description,
+            calories_per_day=source_plan.calories_per_day,
+            protein_g=source_plan.protein_g,
+            carbs_g=source_plan.carbs_g,
+            fats_g=source_plan.fats_g,
+            duration_days=source_plan.duration_days,
+            status=NutritionPlan.Status.ACTIVE,
+            points_reward=source_plan.points_reward,
+            created_for=athlete,
+            daily_totals=daily_totals,
+        )
+        for athlete in athletes
+    ]
+    NutritionPlan.objects.bulk_create(plans, batch_size=batch_size)
+
+    meals, items = [], []
+    for plan in plans:
+        for meal_fields, item_rows in blueprint:
+            meal = MealTemplate(plan=plan, **meal_fields)
+            meals.append(meal)
+            items.extend(MealFoodItem(meal=meal, **row) for row in item_rows)
+    MealTemplate.objects.bulk_create(meals, batch_size=batch_size)
+    MealFoodItem.objects.bulk_create(items, batch_size=batch_size)
+    return plans
+
+
+def assign_plans(plans, assigned_by=None, start_date: date | None = None,
+                 batch_size: int = CLONE_BATCH_SIZE) -> list[UserNutritionPlan]:
+    """
+    Asigna cada plan personal a su atleta (``created_for``) con un solo INSERT
+    por lote. Con ``start_date`` futura la asignación queda programada, como en
+    ``UserNutritionPlanViewSet.perform_create``.
+    """
+    today = date.today()
+    start_date = start_date or today
+    status = (
+        UserNutritionPlan.AssignmentStatus.SCHEDULED
+        if start_date > today
+        else UserNutritionPlan.AssignmentStatus.ACTIVE
+    )
+    assignments = [
+        UserNutritionPlan(
+            user_id=plan.created_for_id,
+            plan=plan,
+            assigned_by=assigned_by,
+            start_date=start_date,
+            end_date=start_date + timedelta(days=plan.duration_days),
+            status=status,
+        )
+        for plan in plans
+    ]
+    return UserNutritionPlan.objects.bulk_create(assignments, batch_size=batch_size)
@@ -0,0 +1,137 @@
+"""
+nutrition/compliance.py
+───────────────────────
+Cumplimiento nutricional diario y semanal para uno o muchos atletas.
+
+Antes ``calc_weekly_compliance`` llamaba siete veces a ``calc_daily_compliance``
+y cada día volvía a leer la asignación activa, contar las comidas del día y
+cargar los logs: ~28 consultas por atleta y semana. Aquí el costo es fijo
+para cualquier rango de fechas y cualquier número de atletas:
+
+  1. asignaciones activas + comidas de cada plan (un LEFT JOIN),
+  2. logs del rango para esos planes.
+
+Con las comidas de cada plan agrupadas por día de semana, cada log suma en la
+celda (día, estado) de una matriz por atleta; el porcentaje del día sale de
+esa fila. Reglas (las mismas de siempre):
+
+  - solo cuentan las comidas cuyo ``weekday`` coincide con el día,
+  - una comida alternativa vale 0.5 de una completada,
+  - un atleta sin asignación activa devuelve ``None`` para cada día.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Iterable
+
+from .models import UserMealLog, UserNutritionPlan
+
+# Índice = date.weekday(); mismos valores que MealTemplate.weekday.
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+ALTERNATIVE_WEIGHT = 0.5
+PERFECT_DAY_PCT = 80
+WEEK_DAYS = 7
+
+_STATUS_COLUMN = {
+    UserMealLog.MealLogStatus.COMPLETED: 0,
+    UserMealLog.MealLogStatus.SKIPPED: 1,
+    UserMealLog.MealLogStatus.ALTERNATIVE: 2,
+}
+_LOGGED = 3
+
+
+def _active_plan_meals(user_ids: list) -> dict[str, dict[int, set]]:
+    """
+    Atleta → {día de semana → ids de sus comidas} de su asignación activa más
+    reciente (la que devolvía ``.first()``). Un plan sin comidas queda vacío.
+    """
+    rows = (
+        UserNutritionPlan.objects.filter(user_id__in=user_ids, status=UserNutritionPlan.AssignmentStatus.ACTIVE)
+        .order_by("user_id", "-start_date")
+        .values_list("user_id", "id", "plan__meal_templates__id", "plan__meal_templates__weekday")
+    )
+    plans: dict[str, dict[int, set]] = {}
+    chosen: dict[str, object] = {}
+    for user_id, assignment_id, meal_id, weekday in rows:
+        key = str(user_id)
+        if chosen.setdefault(key, assignment_id) != assignment_id:
+            continue
+        meals = plans.setdefault(key, {})
+        if meal_id is not None and weekday in WEEKDAYS:
+            meals.setdefault(WEEKDAYS.index(weekday), set()).add(meal_id)
+    return plans
+
+
+def _day_result(total: int, counts: list[int]) -> dict:
+    completed, skipped, alternatives, logged = counts
+    if total == 0:
+        return {"total": 0, "completed": 0, "skipped": 0, "alternatives": 0, "unlogged": 0, "compliance_pct": 0.0}
+    weighted = completed + alternatives * ALTERNATIVE_WEIGHT
+    return {
+        "total":          total,
+        "completed":      completed,
+        "skipped":        skipped,
+        "alternatives":   alternatives,
+        "unlogged":       total - logged,
+        "compliance_pct": round((weighted / total) * 100, 1),
+    }
+
+
+def daily_compliance(user_ids: Iterable, start: date, end: date) -> dict[str, list[dict | None]]:
+    """
+    Cumplimiento de cada día entre ``start`` y ``end`` (inclusive) por atleta,
+    con las claves de ``calc_daily_compliance``. Resultado indexado por
+    ``str(user_id)``; cada lista tiene un elemento por día.
+    """
+    user_ids = list(user_ids)
+    days = (end - start).days + 1
+    result: dict[str, list[dict | None]] = {str(pk): [None] * days for pk in user_ids}
+    if days < 1 or not user_ids:
+        return result
+
+    plans = _active_plan_meals(user_ids)
+    meal_ids = {meal_id for meals in plans.values() for ids in meals.values() for meal_id in ids}
+
+    # Matriz por atleta: fila = día del rango, columnas = completed/skipped/alternative/registrados.
+    matrix = {key: [[0, 0, 0, 0] for _ in range(days)] for key in plans}
+    if meal_ids:
+        logs = (
+            UserMealLog.objects.filter(user_id__in=user_ids, date__range=(start, end), meal_template_id__in=meal_ids)
+            .order_by()
+            .values_list("user_id", "meal_template_id", "date", "status")
+        )
+        for user_id, meal_id, log_date, status in logs:
+            key = str(user_id)
+            meals = plans.get(key)
+            if meals is None or meal_id not in meals.get(log_date.weekday(), ()):
+                continue
+            row = matrix[key][(log_date - start).days]
+            row[_LOGGED] += 1
+            if status in _STATUS_COLUMN:
+                row[_STATUS_COLUMN[status]] += 1
+
+    for key, meals in plans.items():
+        result[key] = [
+            _day_result(len(meals.get((start + timedelta(days=i)).weekday(), ())), matrix[key][i])
+            for i in range(days)
+        ]
+    return result
+
+
+def summarize_week(daily: list[dict | None]) -> dict:
+    """Promedio de los días con comidas y si todos llegaron a ``PERFECT_DAY_PCT``."""
+    valid = [d for d in daily if d and d["total"] > 0]
+    avg = round(sum(d["compliance_pct"] for d in valid) / len(valid), 1) if valid else 0.0
+    return {
+        "daily":          daily,
+        "avg_compliance": avg,
+        "perfect_week":   all(d["compliance_pct"] >= PERFECT_DAY_PCT for d in valid) if valid else False,
+    }
+
+
+def weekly_compliance(user_ids: Iterable, end_date: date | None = None) -> dict[str, dict]:
+    """Resumen de los 7 días que terminan en ``end_date`` para cada atleta."""
+    end_date = end_date or date.today()
+    start = end_date - timedelta(days=WEEK_DAYS - 1)
+    return {key: summarize_week(daily) for key, daily in daily_compliance(user_ids, start, end_date).items()}
@@ -0,0 +1,144 @@
+"""
+nutrition/macros.py
+───────────────────
+Recálculo de macros derivados: totales de cada comida (suma de sus
+``MealFoodItem``) y totales diarios de cada plan (``NutritionPlan.daily_totals``,
+suma de sus comidas por día).
+
+Guardar o borrar un ítem marca su comida como sucia; guardar o borrar una
+comida marca su plan. Fuera de ``deferred_macros()`` se recalcula en el acto.
+Dentro, las marcas se acumulan y al salir del bloque, antes del commit, se
+recalcula cada comida y cada plan sucio una sola vez. En ambos casos son tres
+consultas sin importar cuántos ítems se editaron: un UPDATE de las comidas con
+subconsultas de suma, el aggregate de sus planes y un ``bulk_update`` de los
+planes. Un ítem suelto (el editor de planes) cuesta las mismas tres
+consultas que antes de existir los totales diarios.
+
+Uso:
+    with deferred_macros():          # abre su propia transacción
+        for item in items:
+            item.save()              # solo marca la comida
+    # aquí las comidas y los planes ya tienen sus totales
+
+Los ``.delete()``/``.update()`` sobre querysets no pasan por los modelos:
+quien los use debe llamar a ``mark_meals_dirty`` / ``mark_plans_dirty``.
+"""
+
+from __future__ import annotations
+
+import contextvars
+from contextlib import contextmanager
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Exists, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, Floor
+
+MEAL_MACRO_FIELDS = ("calories", "protein_g", "carbs_g", "fats_g")
+
+_dirty = contextvars.ContextVar("nutrition_dirty_macros", default=None)
+
+
+class _DirtySet:
+    def __init__(self):
+        self.meals: set = set()
+        self.plans: set = set()
+
+
+@contextmanager
+def deferred_macros():
+    """Acumula las marcas del bloque y recalcula cada comida/plan una vez al final."""
+    if _dirty.get() is not None:
+        # Anidado: el bloque exterior recalcula.
+        with transaction.atomic():
+            yield
+        return
+
+    dirty = _DirtySet()
+    token = _dirty.set(dirty)
+    try:
+        with transaction.atomic():
+            yield
+            recompute_meals(dirty.meals)
+            recompute_plans(dirty.plans, meal_ids=dirty.meals)
+    finally:
+        _dirty.reset(token)
+
+
+def mark_meals_dirty(*meal_ids) -> None:
+    meal_ids = {pk for pk in meal_ids if pk}
+    dirty = _dirty.get()
+    if dirty is not None:
+        dirty.meals |= meal_ids
+    elif meal_ids:
+        recompute_meals(meal_ids)
+        recompute_plans((), meal_ids=meal_ids)
+
+
+def mark_plans_dirty(*plan_ids) -> None:
+    plan_ids = {pk for pk in plan_ids if pk}
+    dirty = _dirty.get()
+    if dirty is not None:
+        dirty.plans |= plan_ids
+    elif plan_ids:
+        recompute_plans(plan_ids)
+
+
+def recompute_meals(meal_ids: Iterable) -> None:
+    """
+    Totales de las comidas desde sus ítems, en un solo UPDATE. Las comidas sin
+    ítems conservan sus macros cargados a mano.
+    """
+    from .models import MealFoodItem, MealTemplate
+
+    meal_ids = list(meal_ids)
+    if not meal_ids:
+        return
+    items = MealFoodItem.objects.filter(meal_id=OuterRef("pk")).order_by().values("meal_id")
+    MealTemplate.objects.filter(id__in=meal_ids).filter(Exists(items)).update(**{
+        # Floor: el mismo truncado que ``int()`` sobre la suma decimal.
+        field: Cast(Floor(Subquery(items.annotate(total=Sum(field)).values("total"))), IntegerField())
+        for field in MEAL_MACRO_FIELDS
+    })
+
+
+def day_key(weekday, day_number) -> str:
+    """Clave del día, la misma que ``NutritionPlanSerializer.get_meals_by_day``."""
+    return weekday if weekday else str(day_number)
+
+
+def add_to_daily_totals(totals: dict, weekday, day_number, macros: dict) -> None:
+    day = totals.setdefault(day_key(weekday, day_number), dict.fromkeys(MEAL_MACRO_FIELDS, 0))
+    for field in MEAL_MACRO_FIELDS:
+        day[field] += int(macros[field] or 0)
+
+
+def recompute_plans(plan_ids: Iterable, meal_ids: Iterable = ()) -> None:
+    """
+    ``daily_totals`` de cada plan: suma de macros de sus comidas por día.
+    ``meal_ids`` agrega los planes de esas comidas sin una consulta aparte.
+    """
+    from .models import MealTemplate, NutritionPlan
+
+    totals = {pk: {} for pk in plan_ids}
+    meal_ids = list(meal_ids)
+    if not totals and not meal_ids:
+        return
+    plans = Q(plan_id__in=list(totals))
+    if meal_ids:
+        plans |= Q(plan_id__in=MealTemplate.objects.filter(id__in=meal_ids).values("plan_id"))
+    rows = (
+        MealTemplate.objects.filter(plans)
+        .values("plan_id", "weekday", "day_number")
+        .annotate(**{field: Sum(field) for field in MEAL_MACRO_FIELDS})
+        .order_by()
+    )
+    for row in rows:
+        add_to_daily_totals(totals.setdefault(row["plan_id"], {}), row["weekday"], row["day_number"], row)
+    if not totals:
+        return
+    NutritionPlan.objects.bulk_update(
+        [NutritionPlan(id=pk, daily_totals=days) for pk, days in totals.items()],
+        ["daily_totals"],
+        batch_size=500,
+    )
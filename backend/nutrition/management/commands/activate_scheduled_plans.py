@@ -0,0 +1,62 @@
+"""
+Comando de gestión: activate_scheduled_plans
+────────────────────────────────────────────
+Activa las asignaciones nutricionales programadas cuyo ``start_date`` ya
+llegó y completa el plan activo anterior de cada atleta
+(nutrition.transitions.activate_due_plans).
+
+Es idempotente y se pone al día solo: si no corrió uno o más días, la
+siguiente ejecución deja activa la última semana vencida de cada atleta.
+
+Uso:
+    python manage.py activate_scheduled_plans
+    python manage.py activate_scheduled_plans --date 2026-06-08
+    python manage.py activate_scheduled_plans --dry-run
+
+Pensado para ejecutarse como cron diario, apenas pasada la medianoche.
+"""
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Activa los planes nutricionales programados que ya empezaron."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=str,
+            default=None,
+            help="Activar lo programado hasta esta fecha, YYYY-MM-DD (default: hoy).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Solo contar, sin cambiar asignaciones.",
+        )
+
+    def handle(self, *args, **options):
+        from nutrition.transitions import activate_due_plans
+
+        today = date.today()
+        if options["date"]:
+            try:
+                today = date.fromisoformat(options["date"])
+            except ValueError as exc:
+                raise CommandError("--date debe tener formato YYYY-MM-DD.") from exc
+
+        started = time.perf_counter()
+        summary = activate_due_plans(today, dry_run=options["dry_run"])
+        elapsed = time.perf_counter() - started
+
+        prefix = "[dry-run] " if options["dry_run"] else "✓ "
+        line = (
+            f"{prefix}{summary['activated']} planes activados para {summary['athletes']} atletas, "
+            f"{summary['completed']} completados, {summary['skipped']} semanas vencidas sin activar "
+            f"({elapsed:.2f}s)."
+        )
+        self.stdout.write(line if options["dry_run"] else self.style.SUCCESS(line))
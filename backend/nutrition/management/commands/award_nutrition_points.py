@@ -0,0 +1,95 @@
+"""
+Comando de gestión: award_nutrition_points
+──────────────────────────────────────────
+Otorga los puntos diarios de nutrición del día anterior a todos los atletas
+con un plan activo (services.award_daily_points_bulk).
+
+Trabaja por lotes de atletas: el cumplimiento de cada lote se calcula con dos
+consultas (nutrition.compliance) y los puntos se insertan con un
+``bulk_create``. La restricción ``unique_nutrition_day_per_user`` evita pagar
+dos veces el mismo día, aunque el atleta ya lo haya reclamado con
+``award_daily`` o el comando se ejecute de nuevo.
+
+Uso:
+    python manage.py award_nutrition_points
+    python manage.py award_nutrition_points --date 2026-06-01
+    python manage.py award_nutrition_points --batch-size 2000 --dry-run
+
+Pensado para ejecutarse como cron nocturno, después de medianoche.
+"""
+
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = "Otorga los puntos diarios de nutrición a todos los atletas con plan activo."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=str,
+            default=None,
+            help="Día a premiar, YYYY-MM-DD (default: ayer).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Atletas por lote (default: 1000).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            default=False,
+            help="Calcular sin insertar puntos.",
+        )
+
+    def handle(self, *args, **options):
+        from nutrition.services import award_daily_points_bulk
+
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size debe ser mayor que 0.")
+        target_date = date.today() - timedelta(days=1)
+        if options["date"]:
+            try:
+                target_date = date.fromisoformat(options["date"])
+            except ValueError as exc:
+                raise CommandError("--date debe tener formato YYYY-MM-DD.") from exc
+        if target_date >= date.today():
+            raise CommandError("Solo se premian días ya terminados.")
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("Modo DRY-RUN activado. No se guardarán cambios.\n"))
+        self.stdout.write(f"Premiando cumplimiento del {target_date.isoformat()}\n")
+
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        def report(summary):
+            self.stdout.write(f"  … {summary['processed']} atletas, {summary['awarded']} premiados")
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            totals = award_daily_points_bulk(
+                target_date, batch_size=options["batch_size"], dry_run=options["dry_run"], on_batch=report,
+            )
+        elapsed = time.perf_counter() - started
+        rate = totals["processed"] / elapsed if elapsed else 0
+
+        self.stdout.write("\n── Resumen ──────────────────────────")
+        self.stdout.write(f"  Atletas     : {totals['processed']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"  {'Premiarían' if options['dry_run'] else 'Premiados'}   : {totals['awarded']} ({totals['points']} pts)"
+        ))
+        self.stdout.write(f"  Ya premiados: {totals['already_awarded']}")
+        self.stdout.write(f"  Bajo 80 %   : {totals['below_threshold']}")
+        self.stdout.write(f"  Tiempo      : {elapsed:.2f}s · {queries} consultas · {rate:.0f} atletas/s")
+        self.stdout.write("─────────────────────────────────────\n")
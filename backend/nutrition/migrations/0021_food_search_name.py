@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:52
+
+from django.db import migrations, models
+
+
+def backfill_search_name(apps, schema_editor):
+    from nutrition.search import normalize_search_text
+
+    Food = apps.get_model("nutrition", "Food")
+    foods = list(Food.objects.only("id", "name"))
+    for food in foods:
+        food.search_name = normalize_search_text(food.name)
+    Food.objects.bulk_update(foods, ["search_name"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0020_alter_usermeallog_photo_imagefield'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='food',
+            name='search_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_search_name, migrations.RunPython.noop),
+    ]
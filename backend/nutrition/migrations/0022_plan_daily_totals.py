@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:58
+
+from django.db import migrations, models
+
+
+def backfill_daily_totals(apps, schema_editor):
+    from django.db.models import Sum
+
+    MealTemplate = apps.get_model("nutrition", "MealTemplate")
+    NutritionPlan = apps.get_model("nutrition", "NutritionPlan")
+
+    fields = ("calories", "protein_g", "carbs_g", "fats_g")
+    totals = {}
+    rows = (
+        MealTemplate.objects.values("plan_id", "weekday", "day_number")
+        .annotate(**{field: Sum(field) for field in fields})
+        .order_by()
+    )
+    for row in rows:
+        key = row["weekday"] if row["weekday"] else str(row["day_number"])
+        day = totals.setdefault(row["plan_id"], {}).setdefault(key, dict.fromkeys(fields, 0))
+        for field in fields:
+            day[field] += int(row[field] or 0)
+    NutritionPlan.objects.bulk_update(
+        [NutritionPlan(id=pk, daily_totals=days) for pk, days in totals.items()],
+        ["daily_totals"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0021_food_search_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nutritionplan',
+            name='daily_totals',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(backfill_daily_totals, migrations.RunPython.noop),
+    ]
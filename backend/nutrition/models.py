@@ -52,6 +52,9 @@ class Food(BaseModel):
     fats_per_100g      = models.DecimalField(max_digits=6, decimal_places=2, default=0)
     fiber_per_100g     = models.DecimalField(max_digits=6, decimal_places=2, default=0, blank=True)
 
+    # Nombre normalizado para búsqueda (nutrition.search); se calcula al guardar.
+    search_name = models.CharField(max_length=255, blank=True, default="", editable=False)
+
     class Meta:
         ordering = ["name"]
         indexes = [
@@ -59,6 +62,15 @@ class Food(BaseModel):
             models.Index(fields=["name"]),
         ]
 
+    def save(self, *args, **kwargs):
+        from .search import normalize_search_text
+
+        self.search_name = normalize_search_text(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return self.name
 
@@ -95,6 +107,9 @@ class NutritionPlan(BaseModel):
         blank=True,
         help_text="Si está seteado, es un plan personal de ese atleta y no aparece en la biblioteca.",
     )
+    # {"monday": {"calories": …, "protein_g": …, "carbs_g": …, "fats_g": …}, …}
+    # Suma de las comidas de cada día; la mantiene nutrition.macros.
+    daily_totals = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ["name"]
@@ -174,18 +189,20 @@ class MealTemplate(BaseModel):
 
     def sync_macros_from_items(self):
         """Recalcula los macros totales de la comida desde sus MealFoodItems."""
-        items = self.food_items.all()
-        if items.exists():
-            from django.db.models import Sum
-            agg = items.aggregate(
-                c=Sum("calories"), p=Sum("protein_g"),
-                cb=Sum("carbs_g"), f=Sum("fats_g"),
-            )
-            self.calories  = int(agg["c"] or 0)
-            self.protein_g = int(agg["p"] or 0)
-            self.carbs_g   = int(agg["cb"] or 0)
-            self.fats_g    = int(agg["f"] or 0)
-            self.save(update_fields=["calories", "protein_g", "carbs_g", "fats_g"])
+        from .macros import mark_meals_dirty
+        mark_meals_dirty(self.pk)
+
+    def save(self, *args, **kwargs):
+        from .macros import mark_plans_dirty
+        super().save(*args, **kwargs)
+        mark_plans_dirty(self.plan_id)
+
+    def delete(self, *args, **kwargs):
+        from .macros import mark_plans_dirty
+        plan_id = self.plan_id
+        result = super().delete(*args, **kwargs)
+        mark_plans_dirty(plan_id)
+        return result
 
     def __str__(self) -> str:
         if self.weekday:
@@ -215,20 +232,27 @@ class MealFoodItem(BaseModel):
     class Meta:
         ordering = ["meal", "order"]
 
-    def save(self, *args, **kwargs):
+    def compute_macros(self):
+        """Calcula los macros del ítem (cantidad × macros/100g del alimento) sin guardar."""
         factor = self.quantity_g / 100
         self.calories  = round(float(self.food.calories_per_100g)  * float(factor), 2)
         self.protein_g = round(float(self.food.protein_per_100g)   * float(factor), 2)
         self.carbs_g   = round(float(self.food.carbs_per_100g)     * float(factor), 2)
         self.fats_g    = round(float(self.food.fats_per_100g)      * float(factor), 2)
         self.fiber_g   = round(float(self.food.fiber_per_100g)     * float(factor), 2)
+
+    def save(self, *args, **kwargs):
+        from .macros import mark_meals_dirty
+        self.compute_macros()
         super().save(*args, **kwargs)
-        self.meal.sync_macros_from_items()
+        mark_meals_dirty(self.meal_id)
 
     def delete(self, *args, **kwargs):
-        meal = self.meal
-        super().delete(*args, **kwargs)
-        meal.sync_macros_from_items()
+        from .macros import mark_meals_dirty
+        meal_id = self.meal_id
+        result = super().delete(*args, **kwargs)
+        mark_meals_dirty(meal_id)
+        return result
 
     def __str__(self) -> str:
         return f"{self.food.name} {self.quantity_g}g → {self.meal.name}"
@@ -0,0 +1,144 @@
+"""
+nutrition/search.py
+───────────────────
+Búsqueda del catálogo de alimentos (CENAN + alimentos de cada gimnasio).
+
+``Food.search_name`` guarda el nombre normalizado (minúsculas, sin tildes,
+sin puntuación) y se mantiene en ``Food.save``; así "platano" encuentra
+"Plátano de seda" con un ``LIKE`` simple en vez de normalizar el nombre en
+cada consulta. "Contiene la palabra" (``LIKE '%x%'``) no puede usar un índice
+btree: el catálogo visible (CENAN + alimentos del gym, unos miles de filas)
+se recorre entero, lo que cuesta poco; si creciera, el paso sería un índice
+trigram (pg_trgm).
+
+Orden de relevancia (``rank_foods``):
+    0  nombre exacto             "palta"
+    1  prefijo del nombre        "palta fuerte"
+    2  prefijo de una palabra    "aceite de palta"
+    3  resto: contiene todas las palabras buscadas, en cualquier orden
+
+``typeahead`` completa con coincidencias aproximadas ("platno" → "plátano")
+cuando las exactas no llenan el límite: compara las palabras de la consulta
+con el vocabulario del catálogo visible, cacheado en core.cache e invalidado
+con cada alta, edición o baja de un alimento.
+"""
+
+from __future__ import annotations
+
+import difflib
+import re
+import unicodedata
+
+from django.db.models import Case, IntegerField, QuerySet, Value, When
+from django.db.models.functions import Length
+
+from core.cache import get_tagged, invalidate_tags, set_tagged
+
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 25
+MIN_QUERY_LENGTH = 2
+# Palabras de la consulta más cortas no se corrigen: casi todo se parece.
+FUZZY_MIN_WORD_LENGTH = 4
+FUZZY_CUTOFF = 0.75
+VOCABULARY_TTL = 60 * 60
+CATALOG_TAG = "food_catalog"
+
+TYPEAHEAD_FIELDS = (
+    "id", "name", "food_group", "gym_id",
+    "calories_per_100g", "protein_per_100g", "carbs_per_100g", "fats_per_100g",
+)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_search_text(text: str) -> str:
+    """ "Plátano  (de Seda)" → "platano de seda"; "Piña" → "pina"."""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def invalidate_catalog() -> None:
+    invalidate_tags(CATALOG_TAG)
+
+
+def rank_foods(queryset: QuerySet, query: str) -> QuerySet:
+    """Alimentos que contienen todas las palabras de ``query``, ordenados por relevancia."""
+    normalized = normalize_search_text(query)
+    words = normalized.split()
+    if not words:
+        return queryset.none()
+    for word in words:
+        queryset = queryset.filter(search_name__contains=word)
+    return queryset.annotate(
+        search_rank=Case(
+            When(search_name=normalized, then=Value(0)),
+            When(search_name__startswith=normalized, then=Value(1)),
+            When(search_name__contains=f" {normalized}", then=Value(2)),
+            default=Value(3),
+            output_field=IntegerField(),
+        ),
+    ).order_by("search_rank", Length("search_name"), "name")
+
+
+def _vocabulary(queryset: QuerySet, scope_key: str) -> dict[str, list]:
+    """Palabra normalizada → ids de los alimentos visibles que la contienen."""
+    key = f"food_vocabulary:{scope_key}"
+    vocabulary = get_tagged(key, [CATALOG_TAG])
+    if vocabulary is None:
+        vocabulary = {}
+        for food_id, search_name in queryset.values_list("id", "search_name"):
+            for word in set(search_name.split()):
+                vocabulary.setdefault(word, []).append(food_id)
+        set_tagged(key, vocabulary, [CATALOG_TAG], VOCABULARY_TTL)
+    return vocabulary
+
+
+def _fuzzy_ids(queryset: QuerySet, query: str, scope_key: str) -> list:
+    """Ids de alimentos cuyas palabras se parecen a todas las de la consulta."""
+    words = normalize_search_text(query).split()
+    if not words or not any(len(w) >= FUZZY_MIN_WORD_LENGTH for w in words):
+        return []
+    vocabulary = _vocabulary(queryset, scope_key)
+    vocabulary_words = list(vocabulary)
+
+    matching = None
+    for word in words:
+        if len(word) < FUZZY_MIN_WORD_LENGTH:
+            similar = [w for w in vocabulary_words if w.startswith(word)]
+        else:
+            similar = difflib.get_close_matches(word, vocabulary_words, n=8, cutoff=FUZZY_CUTOFF)
+        ids = {food_id for w in similar for food_id in vocabulary[w]}
+        matching = ids if matching is None else matching & ids
+        if not matching:
+            return []
+    return list(matching)
+
+
+def typeahead(queryset: QuerySet, query: str, scope_key: str, limit: int = TYPEAHEAD_LIMIT) -> list[dict]:
+    """
+    Sugerencias para autocompletar: filas livianas (``TYPEAHEAD_FIELDS``) en
+    orden de relevancia, completadas con coincidencias aproximadas.
+    ``scope_key`` identifica el catálogo visible (ej. el gimnasio del usuario).
+    """
+    if len(normalize_search_text(query)) < MIN_QUERY_LENGTH:
+        return []
+    results = list(rank_foods(queryset, query).values(*TYPEAHEAD_FIELDS)[:limit])
+    if len(results) < limit:
+        seen = {row["id"] for row in results}
+        fuzzy_ids = [food_id for food_id in _fuzzy_ids(queryset, query, scope_key) if food_id not in seen]
+        if fuzzy_ids:
+            results += list(
+                queryset.filter(id__in=fuzzy_ids)
+                .order_by(Length("search_name"), "name")
+                .values(*TYPEAHEAD_FIELDS)[: limit - len(results)]
+            )
+    return [_typeahead_row(row) for row in results]
+
+
+def _typeahead_row(row: dict) -> dict:
+    """Mismos nombres y formatos que ``FoodSerializer`` (decimales como texto)."""
+    row["gym"] = row.pop("gym_id")
+    for field in ("calories_per_100g", "protein_per_100g", "carbs_per_100g", "fats_per_100g"):
+        row[field] = str(row[field])
+    return row
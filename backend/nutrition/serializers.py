@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 
 from .models import Food, MealFoodItem, MealTemplate, NutritionItem, NutritionMeal, NutritionPlan, UserMealLog, UserNutritionPlan
@@ -53,6 +55,14 @@ class MealFoodItemSerializer(serializers.ModelSerializer):
         ]
 
 
+class MealFoodItemBulkSerializer(serializers.Serializer):
+    """Un ítem de la lista completa de ``MealTemplateViewSet.food_items`` (sin ``id`` = nuevo)."""
+    id         = serializers.UUIDField(required=False)
+    food       = serializers.UUIDField()
+    quantity_g = serializers.DecimalField(max_digits=7, decimal_places=1, min_value=Decimal("0.1"))
+    order      = serializers.IntegerField(min_value=0, required=False)
+
+
 class MealTemplateSerializer(serializers.ModelSerializer):
     meal_type_display = serializers.CharField(source="get_meal_type_display", read_only=True)
     weekday_display = serializers.CharField(source="get_weekday_display", read_only=True)
@@ -139,6 +149,7 @@ class NutritionPlanSerializer(serializers.ModelSerializer):
             "duration_days",
             "status",
             "points_reward",
+            "daily_totals",
             "created_at",
             "updated_at",
             "meals_by_day",
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from datetime import date, timedelta
+from datetime import date
 
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 
-from .models import MealTemplate, UserMealLog, UserNutritionPlan
+from .compliance import daily_compliance, weekly_compliance
+from .models import UserNutritionPlan
 
 User = get_user_model()
 
+NUTRITION_DAILY_SOURCE = "nutrition_daily"
+AWARD_BATCH_SIZE = 1000
+
 
 def calc_daily_compliance(user, target_date: date) -> dict | None:
     """
@@ -15,65 +20,38 @@ def calc_daily_compliance(user, target_date: date) -> dict | None:
     Only considers meals whose weekday matches target_date's weekday.
     Returns None if the user has no active plan.
     """
-    assignment = UserNutritionPlan.objects.filter(
-        user=user, status="active"
-    ).select_related("plan").first()
-    if not assignment:
-        return None
-
-    weekday = target_date.strftime("%A").lower()  # e.g. "monday"
-    meals = MealTemplate.objects.filter(plan=assignment.plan, weekday=weekday)
-    total = meals.count()
-    if total == 0:
-        return {"total": 0, "completed": 0, "skipped": 0, "alternatives": 0, "unlogged": 0, "compliance_pct": 0.0}
-
-    logs = UserMealLog.objects.filter(
-        user=user,
-        meal_template__plan=assignment.plan,
-        date=target_date,
-    )
-    log_map: dict = {str(l.meal_template_id): l for l in logs}
-
-    completed    = sum(1 for m in meals if str(m.id) in log_map and log_map[str(m.id)].status == UserMealLog.MealLogStatus.COMPLETED)
-    skipped      = sum(1 for m in meals if str(m.id) in log_map and log_map[str(m.id)].status == UserMealLog.MealLogStatus.SKIPPED)
-    alternatives = sum(1 for m in meals if str(m.id) in log_map and log_map[str(m.id)].status == UserMealLog.MealLogStatus.ALTERNATIVE)
-    unlogged     = total - len(log_map)
-
-    # Alternative meals count 50% toward compliance
-    weighted     = completed + (alternatives * 0.5)
-    compliance   = round((weighted / total) * 100, 1)
-
-    return {
-        "total":        total,
-        "completed":    completed,
-        "skipped":      skipped,
-        "alternatives": alternatives,
-        "unlogged":     unlogged,
-        "compliance_pct": compliance,
-    }
+    return daily_compliance([user.pk], target_date, target_date)[str(user.pk)][0]
 
 
 def calc_weekly_compliance(user, end_date: date | None = None) -> dict:
     """
     Returns average compliance over the last 7 days (inclusive of end_date).
+    Two queries regardless of the range (see nutrition.compliance).
     """
-    if not end_date:
-        end_date = date.today()
-    start = end_date - timedelta(days=6)
+    return weekly_compliance([user.pk], end_date)[str(user.pk)]
 
-    daily = []
-    for i in range(7):
-        d = start + timedelta(days=i)
-        daily.append(calc_daily_compliance(user, d))
 
-    valid = [d for d in daily if d and d["total"] > 0]
-    avg   = round(sum(d["compliance_pct"] for d in valid) / len(valid), 1) if valid else 0.0
+def daily_points_for(compliance_pct: float) -> int:
+    """Points earned for a day's compliance: 15 at 100 %, 8 from 80 %, else 0."""
+    if compliance_pct >= 100:
+        return 15
+    if compliance_pct >= 80:
+        return 8
+    return 0
 
-    return {
-        "daily":          daily,
-        "avg_compliance": avg,
-        "perfect_week":   all(d and d["compliance_pct"] >= 80 for d in valid) if valid else False,
-    }
+
+def _daily_points_entry(user_id, target_date: date, points: int, compliance_pct: float):
+    from gamification.models import UserPoints
+
+    return UserPoints(
+        user_id=user_id,
+        points=points,
+        pending_points=points,
+        status=UserPoints.Status.APPROVED,
+        source=NUTRITION_DAILY_SOURCE,
+        award_date=target_date,
+        description=f"Nutrición {target_date.isoformat()}: {compliance_pct}%",
+    )
 
 
 def award_daily_points(user, target_date: date) -> dict | None:
@@ -84,8 +62,8 @@ def award_daily_points(user, target_date: date) -> dict | None:
     """
     from gamification.models import UserPoints
 
-    source_key = f"nutrition_daily_{target_date.isoformat()}"
-    if UserPoints.objects.filter(user=user, source=source_key).exists():
+    awarded = UserPoints.objects.filter(user=user, source=NUTRITION_DAILY_SOURCE, award_date=target_date)
+    if awarded.exists():
         return None  # already processed
 
     result = calc_daily_compliance(user, target_date)
@@ -93,24 +71,79 @@ def award_daily_points(user, target_date: date) -> dict | None:
         return None
 
     compliance_pct = result["compliance_pct"]
-
-    if compliance_pct >= 100:
-        base_pts = 15
-    elif compliance_pct >= 80:
-        base_pts = 8
-    else:
+    base_pts = daily_points_for(compliance_pct)
+    if not base_pts:
         return {"points_awarded": 0, "compliance_pct": compliance_pct}
 
-    UserPoints.objects.create(
-        user=user,
-        points=base_pts,
-        pending_points=base_pts,
-        status=UserPoints.Status.APPROVED,
-        source=source_key,
-        description=f"Nutrición {target_date.isoformat()}: {compliance_pct}%",
-    )
+    try:
+        with transaction.atomic():
+            _daily_points_entry(user.pk, target_date, base_pts, compliance_pct).save()
+    except IntegrityError:
+        return None  # awarded concurrently (nightly job or another request)
 
     return {
         "points_awarded": base_pts,
         "compliance_pct": compliance_pct,
     }
+
+
+def award_daily_points_bulk(target_date: date, batch_size: int = AWARD_BATCH_SIZE, dry_run: bool = False,
+                            on_batch=None) -> dict:
+    """
+    Awards target_date's nutrition points to every user with an active plan.
+
+    Per batch of users: one compliance read (2 queries), one lookup of the
+    days already awarded, one ``bulk_create`` and the balance deltas
+    (``apply_bulk_entries``). ``unique_nutrition_day_per_user`` makes a
+    concurrent ``award_daily`` or a re-run skip the row instead of paying twice.
+    ``on_batch(summary)`` is called after each batch with the running totals.
+    """
+    from gamification.models import UserPoints
+    from gamification.services import apply_bulk_entries
+
+    user_ids = list(
+        UserNutritionPlan.objects.filter(status=UserNutritionPlan.AssignmentStatus.ACTIVE)
+        .order_by("user_id")
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+    totals = {"processed": 0, "awarded": 0, "points": 0, "already_awarded": 0, "below_threshold": 0}
+
+    for offset in range(0, len(user_ids), batch_size):
+        batch = user_ids[offset:offset + batch_size]
+        already = set(
+            UserPoints.objects.filter(user_id__in=batch, source=NUTRITION_DAILY_SOURCE, award_date=target_date)
+            .values_list("user_id", flat=True)
+        )
+        pending = [user_id for user_id in batch if user_id not in already]
+        compliance = daily_compliance(pending, target_date, target_date) if pending else {}
+
+        entries = []
+        for user_id in pending:
+            day = compliance[str(user_id)][0]
+            if not day or day["total"] == 0:
+                continue
+            points = daily_points_for(day["compliance_pct"])
+            if not points:
+                totals["below_threshold"] += 1
+                continue
+            entries.append(_daily_points_entry(user_id, target_date, points, day["compliance_pct"]))
+
+        if entries and not dry_run:
+            with transaction.atomic():
+                UserPoints.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+                # ignore_conflicts doesn't report which rows made it in: re-read them by id.
+                inserted = set(
+                    UserPoints.objects.filter(id__in=[e.id for e in entries]).values_list("id", flat=True)
+                )
+                already |= {e.user_id for e in entries if e.id not in inserted}
+                entries = [e for e in entries if e.id in inserted]
+                apply_bulk_entries(entries)
+
+        totals["processed"] += len(batch)
+        totals["already_awarded"] += len(already)
+        totals["awarded"] += len(entries)
+        totals["points"] += sum(e.points for e in entries)
+        if on_batch:
+            on_batch(totals)
+    return totals
@@ -0,0 +1,17 @@
+"""
+nutrition/signals.py
+────────────────────
+Invalidan el vocabulario cacheado del catálogo de alimentos
+(nutrition.search) cuando se crea, edita o elimina un alimento.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .search import invalidate_catalog
+
+
+@receiver(post_save, sender="nutrition.Food")
+@receiver(post_delete, sender="nutrition.Food")
+def on_food_changed(sender, instance, **kwargs):
+    invalidate_catalog()
@@ -1,11 +1,12 @@
 import datetime
+from decimal import Decimal
 
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from rest_framework.test import APIClient
 
 from gyms.models import Gym, Notification
-from .models import MealTemplate, NutritionPlan, UserMealLog, UserNutritionPlan
+from .models import Food, MealFoodItem, MealTemplate, NutritionPlan, UserMealLog, UserNutritionPlan
 
 User = get_user_model()
 
@@ -122,3 +123,503 @@ class MealLogFutureDayTests(TestCase):
         res = self._post(self.today_meal.id)
         self.assertEqual(res.status_code, 200, res.data)
         self.assertTrue(UserMealLog.objects.filter(meal_template=self.today_meal).exists())
+
+
+class FoodSearchTests(TestCase):
+    """Búsqueda del catálogo: sin tildes, ordenada por relevancia y con typeahead tolerante a errores."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.gym = Gym.objects.create(name="Test Gym", slug="food-search-gym")
+        other_gym = Gym.objects.create(name="Other Gym", slug="food-search-other")
+        self.nutritionist = User.objects.create_user(
+            email="nutri@foodsearch.com", password="pass123",
+            first_name="Nutri", last_name="Test",
+            role=User.Role.NUTRITIONIST, gym=self.gym,
+        )
+        for name, group, gym in [
+            ("Harina de plátano", Food.FoodGroup.CEREALS, None),
+            ("Plátano verde", Food.FoodGroup.FRUITS, None),
+            ("Plátano de seda", Food.FoodGroup.FRUITS, None),
+            ("Piña", Food.FoodGroup.FRUITS, None),
+            ("Pollo, pechuga sin piel", Food.FoodGroup.MEATS, None),
+            ("Plátano frito de la casa", Food.FoodGroup.OTHERS, self.gym),
+            ("Plátano del otro gym", Food.FoodGroup.OTHERS, other_gym),
+        ]:
+            Food.objects.create(name=name, food_group=group, gym=gym)
+        self.client.force_authenticate(user=self.nutritionist)
+
+    def _names(self, path, params):
+        data = self.client.get(path, params).data
+        return [row["name"] for row in data["results"]]
+
+    def test_search_is_accent_insensitive_and_ranked(self):
+        names = self._names("/api/nutrition/foods/", {"search": "PLATANO"})
+        self.assertEqual(
+            names, ["Plátano verde", "Plátano de seda", "Plátano frito de la casa", "Harina de plátano"],
+        )
+        self.assertEqual(self._names("/api/nutrition/foods/", {"search": "pina"}), ["Piña"])
+        self.assertEqual(
+            self._names("/api/nutrition/foods/", {"search": "pechuga pollo"}), ["Pollo, pechuga sin piel"],
+        )
+
+    def test_typeahead_filters_and_fuzzy_matches(self):
+        path = "/api/nutrition/foods/typeahead/"
+        self.assertEqual(
+            self._names(path, {"q": "platano", "group": "fruits"}), ["Plátano verde", "Plátano de seda"],
+        )
+        self.assertNotIn("Plátano frito de la casa", self._names(path, {"q": "plat", "scope": "global"}))
+        self.assertEqual(self._names(path, {"q": "p"}), [])
+
+        with self.assertNumQueries(3):
+            names = self._names(path, {"q": "platno"})
+        self.assertEqual(len(names), 4)
+        self.assertNotIn("Plátano del otro gym", names)
+        row = self.client.get(path, {"q": "pina"}).data["results"][0]
+        self.assertEqual(set(row), {
+            "id", "name", "food_group", "gym",
+            "calories_per_100g", "protein_per_100g", "carbs_per_100g", "fats_per_100g",
+        })
+
+    def test_renamed_food_is_reindexed(self):
+        food = Food.objects.get(name="Piña")
+        food.name = "Ñame"
+        food.save(update_fields=["name"])
+        food.refresh_from_db()
+        self.assertEqual(food.search_name, "name")
+        self.assertEqual(self._names("/api/nutrition/foods/typeahead/", {"q": "ñame"}), ["Ñame"])
+
+
+class PlanCloningTests(TestCase):
+    """La copia de planes inserta por lotes y conserva macros y totales de cada comida."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.gym = Gym.objects.create(name="Test Gym", slug="clone-gym")
+        self.nutritionist = User.objects.create_user(
+            email="nutri@clone.com", password="pass123",
+            first_name="Nutri", last_name="Test",
+            role=User.Role.NUTRITIONIST, gym=self.gym,
+        )
+        self.athletes = [
+            User.objects.create_user(
+                email=f"athlete{i}@clone.com", password="pass123",
+                first_name=f"Atleta{i}", last_name="Test",
+                role=User.Role.ATHLETE, gym=self.gym,
+            )
+            for i in range(3)
+        ]
+        self.library = NutritionPlan.objects.create(gym=self.gym, name="Base", status=NutritionPlan.Status.ACTIVE)
+        rice = Food.objects.create(name="Arroz", calories_per_100g="130.33", protein_per_100g="2.71", carbs_per_100g="28.17")
+        chicken = Food.objects.create(name="Pollo", calories_per_100g="165", protein_per_100g="31.02", fats_per_100g="3.57")
+        for weekday in ("monday", "tuesday"):
+            for order, meal_type in enumerate(("breakfast", "lunch", "dinner"), start=1):
+                meal = MealTemplate.objects.create(
+                    plan=self.library, weekday=weekday, meal_type=meal_type, name=meal_type, order=order,
+                )
+                MealFoodItem.objects.create(meal=meal, food=rice, quantity_g=Decimal("155.5"), order=1)
+                MealFoodItem.objects.create(meal=meal, food=chicken, quantity_g=Decimal("120"), order=2)
+        MealTemplate.objects.create(plan=self.library, weekday="sunday", meal_type="lunch", name="Libre", calories=900)
+        self.client.force_authenticate(user=self.nutritionist)
+
+    def _snapshot(self, plan):
+        return sorted(
+            (m.weekday, m.meal_type, m.calories, m.protein_g, m.carbs_g, m.fats_g,
+             tuple((i.food_id, i.quantity_g, i.calories, i.protein_g, i.fats_g) for i in m.food_items.order_by("order")))
+            for m in plan.meal_templates.all()
+        )
+
+    def test_clone_matches_item_by_item_save(self):
+        from .cloning import clone_plan
+
+        res = self.client.post(
+            f"/api/nutrition/plans/{self.library.id}/clone/", {"athlete_id": str(self.athletes[0].id)}, format="json",
+        )
+        self.assertEqual(res.status_code, 201, res.data)
+        cloned = NutritionPlan.objects.get(id=res.data["id"])
+        self.assertEqual(cloned.created_for, self.athletes[0])
+        self.assertEqual(self._snapshot(cloned), self._snapshot(self.library))
+        self.library.refresh_from_db()
+        self.assertEqual(cloned.daily_totals, self.library.daily_totals)
+
+        with self.assertNumQueries(7):  # 2 lecturas + 3 INSERT + savepoint
+            clone_plan(self.library, self.athletes[:1])
+        with self.assertNumQueries(7):
+            clone_plan(self.library, self.athletes)
+
+    def test_clone_to_athletes_assigns_and_notifies(self):
+        outsider = User.objects.create_user(
+            email="outsider@clone.com", password="pass123", role=User.Role.ATHLETE,
+            gym=Gym.objects.create(name="Other", slug="clone-other"),
+        )
+        path = f"/api/nutrition/plans/{self.library.id}/clone_to_athletes/"
+        res = self.client.post(path, {"athlete_ids": [str(outsider.id)]}, format="json")
+        self.assertEqual(res.status_code, 400)
+
+        ids = [str(a.id) for a in self.athletes]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            res = self.client.post(path, {"athlete_ids": ids, "assign": True}, format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual([row["athlete_id"] for row in res.data["plans"]], ids)
+        for row in res.data["plans"]:
+            plan = NutritionPlan.objects.get(id=row["plan_id"])
+            self.assertEqual(plan.meal_templates.count(), 7)
+            assignment = UserNutritionPlan.objects.get(id=row["assignment_id"])
+            self.assertEqual((assignment.plan_id, assignment.status), (plan.id, "active"))
+        notifications = Notification.objects.filter(recipient__in=self.athletes, notification_type="plan_assigned")
+        self.assertEqual(
+            set(notifications.values_list("link", flat=True)), {"/clone-gym/panel/mi-nutricion"},
+        )
+        self.assertEqual(notifications.count(), 3)
+
+    def test_clone_to_athletes_rolls_back_when_assignment_fails(self):
+        from unittest import mock
+
+        path = f"/api/nutrition/plans/{self.library.id}/clone_to_athletes/"
+        ids = [str(a.id) for a in self.athletes]
+        with mock.patch("nutrition.cloning.assign_plans", side_effect=RuntimeError("boom")):
+            with self.captureOnCommitCallbacks() as callbacks, self.assertRaises(RuntimeError):
+                self.client.post(path, {"athlete_ids": ids, "assign": True}, format="json")
+        self.assertEqual(callbacks, [])
+        self.assertFalse(NutritionPlan.objects.filter(created_for__in=self.athletes).exists())
+        self.assertFalse(Notification.objects.filter(recipient__in=self.athletes).exists())
+
+
+class MealMacroRecomputeTests(TestCase):
+    """Los macros de comidas y los totales diarios del plan se recalculan una vez por bloque."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.gym = Gym.objects.create(name="Test Gym", slug="macros-gym")
+        self.nutritionist = User.objects.create_user(
+            email="nutri@macros.com", password="pass123",
+            first_name="Nutri", last_name="Test",
+            role=User.Role.NUTRITIONIST, gym=self.gym,
+        )
+        self.plan = NutritionPlan.objects.create(gym=self.gym, name="Plan", status=NutritionPlan.Status.ACTIVE)
+        self.meal = MealTemplate.objects.create(plan=self.plan, weekday="monday", meal_type="lunch", name="Almuerzo")
+        MealTemplate.objects.create(plan=self.plan, weekday="monday", meal_type="dinner", name="Cena", calories=500)
+        self.rice = Food.objects.create(name="Arroz", calories_per_100g=130, carbs_per_100g=28)
+        self.egg = Food.objects.create(name="Huevo", calories_per_100g=155, protein_per_100g=13, fats_per_100g=11)
+        self.client.force_authenticate(user=self.nutritionist)
+
+    def _meal_updates(self, captured):
+        return [q for q in captured.captured_queries if q["sql"].startswith('UPDATE "nutrition_mealtemplate"')]
+
+    def test_single_save_keeps_meal_and_plan_in_sync(self):
+        with self.assertNumQueries(4):  # INSERT + UPDATE comida + aggregate y UPDATE del plan
+            MealFoodItem.objects.create(meal=self.meal, food=self.rice, quantity_g=Decimal("200"))
+        self.meal.refresh_from_db()
+        self.plan.refresh_from_db()
+        self.assertEqual((self.meal.calories, self.meal.carbs_g), (260, 56))
+        self.assertEqual(self.plan.daily_totals["monday"]["calories"], 760)
+
+    def test_deferred_block_recomputes_each_meal_once(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .macros import deferred_macros
+
+        with CaptureQueriesContext(connection) as captured, deferred_macros():
+            for _ in range(10):
+                MealFoodItem.objects.create(meal=self.meal, food=self.egg, quantity_g=Decimal("50"))
+        self.assertEqual(len(self._meal_updates(captured)), 1)
+        self.meal.refresh_from_db()
+        self.assertEqual((self.meal.calories, self.meal.protein_g), (775, 65))
+
+    def test_item_moved_between_meals_updates_both(self):
+        dinner = MealTemplate.objects.get(plan=self.plan, meal_type="dinner")
+        item = MealFoodItem.objects.create(meal=self.meal, food=self.rice, quantity_g=Decimal("100"))
+        MealFoodItem.objects.create(meal=self.meal, food=self.egg, quantity_g=Decimal("100"))
+        res = self.client.patch(
+            f"/api/nutrition/meal-food-items/{item.id}/", {"meal": str(dinner.id)}, format="json",
+        )
+        self.assertEqual(res.status_code, 200, res.data)
+        self.meal.refresh_from_db()
+        dinner.refresh_from_db()
+        self.assertEqual((self.meal.calories, dinner.calories), (155, 130))
+        self.plan.refresh_from_db()
+        self.assertEqual(self.plan.daily_totals["monday"]["calories"], 285)
+
+    def test_bulk_food_items_endpoint(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        kept = MealFoodItem.objects.create(meal=self.meal, food=self.rice, quantity_g=Decimal("100"), order=1)
+        dropped = MealFoodItem.objects.create(meal=self.meal, food=self.egg, quantity_g=Decimal("100"), order=2)
+        path = f"/api/nutrition/meal-templates/{self.meal.id}/food_items/"
+        items = [
+            {"id": str(kept.id), "food": str(self.rice.id), "quantity_g": "150"},
+            {"food": str(self.egg.id), "quantity_g": "100"},
+            {"food": str(self.egg.id), "quantity_g": "50"},
+        ]
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.put(path, {"items": items}, format="json")
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual(len(self._meal_updates(captured)), 1)
+        self.assertFalse(MealFoodItem.objects.filter(id=dropped.id).exists())
+        self.assertEqual([i["order"] for i in res.data["food_items"]], [1, 2, 3])
+        self.assertEqual(res.data["calories"], 195 + 155 + 77)
+
+        self.plan.refresh_from_db()
+        self.assertEqual(self.plan.daily_totals["monday"]["calories"], 195 + 155 + 77 + 500)
+
+        foreign = Food.objects.create(name="Ajeno", gym=Gym.objects.create(name="Otro", slug="macros-other"))
+        res = self.client.put(path, {"items": [{"food": str(foreign.id), "quantity_g": "10"}]}, format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(self.meal.food_items.count(), 3)
+
+    def test_remove_day_updates_daily_totals(self):
+        res = self.client.post(f"/api/nutrition/plans/{self.plan.id}/remove_day/", {"weekday": "monday"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.plan.refresh_from_db()
+        self.assertEqual(self.plan.daily_totals, {})
+
+
+class WeeklyComplianceTests(TestCase):
+    """El cumplimiento de una semana, o de todos los atletas de un nutricionista, cuesta 2 consultas."""
+
+    # 2026-06-01 es lunes: la semana termina el domingo 7.
+    MONDAY = datetime.date(2026, 6, 1)
+
+    def setUp(self):
+        from gyms.models import NutritionistAssignment
+
+        self.client = APIClient()
+        self.gym = Gym.objects.create(name="Test Gym", slug="compliance-gym")
+        self.nutritionist = User.objects.create_user(
+            email="nutri@compliance.com", password="pass123",
+            first_name="Nutri", last_name="Test",
+            role=User.Role.NUTRITIONIST, gym=self.gym,
+        )
+        self.plan = NutritionPlan.objects.create(gym=self.gym, name="Plan", status=NutritionPlan.Status.ACTIVE)
+        self.breakfast = MealTemplate.objects.create(plan=self.plan, weekday="monday", meal_type="breakfast", name="Desayuno")
+        self.lunch = MealTemplate.objects.create(plan=self.plan, weekday="monday", meal_type="lunch", name="Almuerzo")
+        self.tuesday = MealTemplate.objects.create(plan=self.plan, weekday="tuesday", meal_type="lunch", name="Almuerzo")
+
+        self.athletes = []
+        for i in range(3):
+            athlete = User.objects.create_user(
+                email=f"athlete{i}@compliance.com", password="pass123",
+                first_name=f"Atleta{i}", role=User.Role.ATHLETE, gym=self.gym,
+            )
+            UserNutritionPlan.objects.create(user=athlete, plan=self.plan, start_date=self.MONDAY)
+            NutritionistAssignment.objects.create(nutritionist=self.nutritionist, athlete=athlete, gym=self.gym)
+            self.athletes.append(athlete)
+        self.no_plan = User.objects.create_user(
+            email="sinplan@compliance.com", password="pass123", role=User.Role.ATHLETE, gym=self.gym,
+        )
+        NutritionistAssignment.objects.create(nutritionist=self.nutritionist, athlete=self.no_plan, gym=self.gym)
+
+        status = UserMealLog.MealLogStatus
+        first = self.athletes[0]
+        UserMealLog.objects.create(user=first, meal_template=self.breakfast, date=self.MONDAY, status=status.COMPLETED)
+        UserMealLog.objects.create(user=first, meal_template=self.lunch, date=self.MONDAY, status=status.ALTERNATIVE)
+        UserMealLog.objects.create(
+            user=first, meal_template=self.tuesday, date=self.MONDAY + datetime.timedelta(days=1), status=status.SKIPPED,
+        )
+        # Comida de otro día de semana: no cuenta para el martes.
+        UserMealLog.objects.create(
+            user=first, meal_template=self.breakfast, date=self.MONDAY + datetime.timedelta(days=1), status=status.COMPLETED,
+        )
+        UserMealLog.objects.create(user=self.athletes[1], meal_template=self.breakfast, date=self.MONDAY, status=status.COMPLETED)
+        UserMealLog.objects.create(user=self.athletes[1], meal_template=self.lunch, date=self.MONDAY, status=status.COMPLETED)
+        UserMealLog.objects.create(
+            user=self.athletes[1], meal_template=self.tuesday, date=self.MONDAY + datetime.timedelta(days=1), status=status.COMPLETED,
+        )
+
+    def test_weekly_compliance_for_one_athlete(self):
+        from .services import calc_daily_compliance, calc_weekly_compliance
+
+        end = self.MONDAY + datetime.timedelta(days=6)
+        with self.assertNumQueries(2):
+            week = calc_weekly_compliance(self.athletes[0], end)
+
+        monday, tuesday = week["daily"][:2]
+        self.assertEqual(monday, {
+            "total": 2, "completed": 1, "skipped": 0, "alternatives": 1, "unlogged": 0, "compliance_pct": 75.0,
+        })
+        self.assertEqual((tuesday["total"], tuesday["skipped"], tuesday["unlogged"], tuesday["compliance_pct"]), (1, 1, 0, 0.0))
+        self.assertEqual(week["daily"][2]["total"], 0)
+        self.assertEqual(week["avg_compliance"], 37.5)
+        self.assertFalse(week["perfect_week"])
+
+        self.assertEqual(calc_daily_compliance(self.athletes[0], self.MONDAY), monday)
+        self.assertIsNone(calc_daily_compliance(self.no_plan, self.MONDAY))
+        self.assertTrue(calc_weekly_compliance(self.athletes[1], end)["perfect_week"])
+
+    def test_nutritionist_overview(self):
+        self.client.force_authenticate(user=self.nutritionist)
+        end = (self.MONDAY + datetime.timedelta(days=6)).isoformat()
+        with self.assertNumQueries(3):
+            res = self.client.get(f"/api/gyms/nutritionist-assignments/weekly_compliance/?end_date={end}")
+
+        self.assertEqual(res.status_code, 200, res.data)
+        rows = res.data["results"]
+        self.assertEqual(
+            [row["athlete_id"] for row in rows],
+            [str(a.id) for a in (self.athletes[2], self.athletes[0], self.athletes[1], self.no_plan)],
+        )
+        self.assertEqual([row["avg_compliance"] for row in rows], [0.0, 37.5, 100.0, 0.0])
+        self.assertFalse(rows[-1]["has_active_plan"])
+        self.assertEqual(rows[-1]["daily"], [None] * 7)
+        self.assertEqual(res.data["start_date"], self.MONDAY.isoformat())
+
+        self.client.force_authenticate(user=self.athletes[0])
+        self.assertEqual(self.client.get("/api/gyms/nutritionist-assignments/weekly_compliance/").status_code, 403)
+
+
+class NightlyNutritionPointsTests(TestCase):
+    """El job nocturno premia a todos los atletas por lotes y nunca paga dos veces el mismo día."""
+
+    DAY = datetime.date(2026, 6, 1)  # lunes
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="nightly-points-gym")
+        self.plan = NutritionPlan.objects.create(gym=self.gym, name="Plan", status=NutritionPlan.Status.ACTIVE)
+        self.breakfast = MealTemplate.objects.create(plan=self.plan, weekday="monday", meal_type="breakfast", name="Desayuno")
+        self.lunch = MealTemplate.objects.create(plan=self.plan, weekday="monday", meal_type="lunch", name="Almuerzo")
+
+        # Atleta i completa i comidas: 0 %, 50 %, 100 %.
+        status = UserMealLog.MealLogStatus
+        self.athletes = []
+        for i in range(3):
+            athlete = User.objects.create_user(
+                email=f"athlete{i}@nightly.com", password="pass123", role=User.Role.ATHLETE, gym=self.gym,
+            )
+            UserNutritionPlan.objects.create(user=athlete, plan=self.plan, start_date=self.DAY)
+            for meal in (self.breakfast, self.lunch)[:i]:
+                UserMealLog.objects.create(user=athlete, meal_template=meal, date=self.DAY, status=status.COMPLETED)
+            self.athletes.append(athlete)
+
+    def test_bulk_award_is_idempotent_and_updates_balances(self):
+        from gamification.models import UserPoints
+        from gamification.services import get_balance
+        from .services import NUTRITION_DAILY_SOURCE, award_daily_points, award_daily_points_bulk
+
+        totals = award_daily_points_bulk(self.DAY, batch_size=2)
+        self.assertEqual(
+            (totals["processed"], totals["awarded"], totals["points"], totals["below_threshold"]), (3, 1, 15, 2),
+        )
+        entry = UserPoints.objects.get(source=NUTRITION_DAILY_SOURCE)
+        self.assertEqual((entry.user_id, entry.award_date, entry.status), (self.athletes[2].id, self.DAY, "approved"))
+        self.assertEqual(get_balance(self.athletes[2]).approved_total, 15)
+
+        again = award_daily_points_bulk(self.DAY)
+        self.assertEqual((again["awarded"], again["already_awarded"]), (0, 1))
+        self.assertIsNone(award_daily_points(self.athletes[2], self.DAY))
+        self.assertEqual(UserPoints.objects.filter(source=NUTRITION_DAILY_SOURCE).count(), 1)
+
+    def test_unique_constraint_blocks_duplicate_day(self):
+        from django.db import IntegrityError
+        from gamification.models import UserPoints
+        from .services import award_daily_points
+
+        self.assertEqual(award_daily_points(self.athletes[2], self.DAY)["points_awarded"], 15)
+        with self.assertRaises(IntegrityError):
+            UserPoints.objects.create(user=self.athletes[2], source="nutrition_daily", award_date=self.DAY)
+
+    def test_command_reports_throughput(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from gamification.models import UserPoints
+
+        out = StringIO()
+        call_command("award_nutrition_points", "--date", self.DAY.isoformat(), "--dry-run", stdout=out)
+        self.assertIn("atletas/s", out.getvalue())
+        self.assertFalse(UserPoints.objects.exists())
+
+
+class ScheduledPlanTransitionTests(TestCase):
+    """El cambio de semana lo hace el job; las vistas del plan activo solo leen."""
+
+    TODAY = datetime.date(2026, 6, 8)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.gym = Gym.objects.create(name="Test Gym", slug="transitions-gym")
+        self.plan = NutritionPlan.objects.create(gym=self.gym, name="Plan", status=NutritionPlan.Status.ACTIVE)
+        week = datetime.timedelta(days=7)
+        Status = UserNutritionPlan.AssignmentStatus
+
+        self.athlete = User.objects.create_user(
+            email="athlete@transitions.com", password="pass123", role=User.Role.ATHLETE, gym=self.gym,
+        )
+        self.current = UserNutritionPlan.objects.create(
+            user=self.athlete, plan=self.plan, start_date=self.TODAY - week, status=Status.ACTIVE,
+        )
+        self.next = UserNutritionPlan.objects.create(
+            user=self.athlete, plan=self.plan, start_date=self.TODAY, status=Status.SCHEDULED,
+        )
+        self.future = UserNutritionPlan.objects.create(
+            user=self.athlete, plan=self.plan, start_date=self.TODAY + week, status=Status.SCHEDULED,
+        )
+
+        # El job no corrió la semana pasada: dos semanas vencidas.
+        self.behind = User.objects.create_user(
+            email="behind@transitions.com", password="pass123", role=User.Role.ATHLETE, gym=self.gym,
+        )
+        self.old = UserNutritionPlan.objects.create(
+            user=self.behind, plan=self.plan, start_date=self.TODAY - 2 * week, status=Status.ACTIVE,
+        )
+        self.missed = UserNutritionPlan.objects.create(
+            user=self.behind, plan=self.plan, start_date=self.TODAY - week, status=Status.SCHEDULED,
+        )
+        self.latest = UserNutritionPlan.objects.create(
+            user=self.behind, plan=self.plan, start_date=self.TODAY - datetime.timedelta(days=1), status=Status.SCHEDULED,
+        )
+
+    def _statuses(self, *assignments):
+        return [UserNutritionPlan.objects.get(pk=a.pk).status for a in assignments]
+
+    def test_job_promotes_due_plans_and_catches_up(self):
+        from .transitions import activate_due_plans
+
+        summary = activate_due_plans(self.TODAY)
+        self.assertEqual(summary, {"athletes": 2, "activated": 2, "completed": 2, "skipped": 1})
+        self.assertEqual(self._statuses(self.current, self.next, self.future), ["completed", "active", "scheduled"])
+        self.assertEqual(self._statuses(self.old, self.missed, self.latest), ["completed", "completed", "active"])
+        self.current.refresh_from_db()
+        self.old.refresh_from_db()
+        self.assertEqual((self.current.end_date, self.old.end_date), (self.TODAY, self.latest.start_date))
+
+        self.assertEqual(activate_due_plans(self.TODAY)["activated"], 0)
+
+    def test_my_active_is_read_only(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        today = datetime.date.today()
+        for assignment, start in ((self.current, today - datetime.timedelta(days=7)), (self.next, today),
+                                  (self.future, today + datetime.timedelta(days=7))):
+            assignment.start_date = start
+            assignment.save()
+        self.client.force_authenticate(user=self.athlete)
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.get("/api/nutrition/assignments/my_active/")
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse([q for q in captured.captured_queries if q["sql"].startswith("UPDATE")])
+        # El job aún no corrió: la semana vencida ya se muestra como actual.
+        self.assertEqual((res.data["id"], res.data["status"]), (str(self.next.id), "active"))
+        self.assertEqual([w["status"] for w in res.data["chain"]], ["completed", "active", "scheduled"])
+        self.assertEqual(self._statuses(self.current, self.next), ["active", "scheduled"])
+
+    def test_athlete_nutrition_projects_due_week(self):
+        nutritionist = User.objects.create_user(
+            email="nutri@transitions.com", password="pass123", role=User.Role.NUTRITIONIST, gym=self.gym,
+        )
+        self.client.force_authenticate(user=nutritionist)
+        res = self.client.get("/api/nutrition/assignments/athlete_nutrition/", {"athlete_id": str(self.behind.id)})
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual(res.data["active_plan"]["id"], str(self.latest.id))
+        self.assertEqual([p["id"] for p in res.data["completed_plans"]], [str(self.old.id), str(self.missed.id)])
+        self.assertEqual(self._statuses(self.old, self.missed, self.latest), ["active", "scheduled", "scheduled"])
+
+    def test_command_dry_run(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command("activate_scheduled_plans", "--date", self.TODAY.isoformat(), "--dry-run", stdout=out)
+        self.assertIn("2 planes activados", out.getvalue())
+        self.assertEqual(self._statuses(self.next, self.latest), ["scheduled", "scheduled"])
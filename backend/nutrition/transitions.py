@@ -0,0 +1,101 @@
+"""
+nutrition/transitions.py
+────────────────────────
+Cambio de semana de los planes nutricionales: cada asignación ``scheduled``
+cuyo ``start_date`` llegó pasa a ``active`` y la activa anterior del atleta
+se completa.
+
+Antes esto ocurría dentro de ``my_active`` y ``athlete_nutrition``: cada GET
+hacía un ``exists()`` y, el día del cambio, dos UPDATE con sus bloqueos de
+fila. Ahora lo hace ``activate_due_plans`` para todos los atletas a la vez
+(comando ``activate_scheduled_plans``, cron al pasar la medianoche) y las
+vistas solo leen: ``project_due_transitions`` les aplica en memoria el mismo
+cambio, así un job atrasado solo demora el cambio de estado en la base, no lo
+que ve el atleta.
+
+Ponerse al día: si el job no corrió uno o más días, la siguiente ejecución
+activa la última asignación vencida de cada atleta y completa las anteriores.
+Volver a ejecutarlo no cambia nada: solo toca filas aún ``scheduled``.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+
+from .models import UserNutritionPlan
+
+Status = UserNutritionPlan.AssignmentStatus
+
+
+@transaction.atomic
+def activate_due_plans(today: date | None = None, dry_run: bool = False) -> dict:
+    """
+    Promueve las asignaciones programadas vencidas hasta ``today`` (inclusive).
+    Consultas: una lectura + un UPDATE por fecha de inicio distinta + dos UPDATE.
+    Devuelve ``{"athletes", "activated", "completed", "skipped"}``.
+    """
+    today = today or date.today()
+    due = list(
+        UserNutritionPlan.objects.select_for_update()
+        .filter(status=Status.SCHEDULED, start_date__lte=today)
+        .order_by("user_id", "start_date")
+        .values_list("id", "user_id", "start_date")
+    )
+
+    # La más reciente de cada atleta queda activa; las anteriores ya pasaron.
+    latest: dict = {}
+    for assignment_id, user_id, start_date in due:
+        latest[user_id] = (assignment_id, start_date)
+    promoted = {assignment_id for assignment_id, _ in latest.values()}
+    skipped = [assignment_id for assignment_id, _, _ in due if assignment_id not in promoted]
+
+    users_by_start = defaultdict(list)
+    for user_id, (_, start_date) in latest.items():
+        users_by_start[start_date].append(user_id)
+
+    summary = {"athletes": len(latest), "activated": len(promoted), "completed": 0, "skipped": len(skipped)}
+    if dry_run or not due:
+        if dry_run:
+            summary["completed"] = UserNutritionPlan.objects.filter(user_id__in=latest, status=Status.ACTIVE).count()
+        return summary
+
+    # La semana anterior termina el día en que empieza la nueva.
+    for start_date, user_ids in users_by_start.items():
+        summary["completed"] += UserNutritionPlan.objects.filter(
+            user_id__in=user_ids, status=Status.ACTIVE,
+        ).update(status=Status.COMPLETED, end_date=start_date)
+    if skipped:
+        UserNutritionPlan.objects.filter(id__in=skipped).update(status=Status.COMPLETED)
+    UserNutritionPlan.objects.filter(id__in=promoted).update(status=Status.ACTIVE)
+    return summary
+
+
+def project_due_transitions(assignments: list, today: date | None = None) -> list:
+    """
+    Aplica en memoria, sin guardar, lo que ``activate_due_plans`` hará con las
+    asignaciones de un atleta: la última programada vencida pasa a activa y la
+    activa anterior y las vencidas previas a completadas.
+    """
+    today = today or date.today()
+    due = [a for a in assignments if a.status == Status.SCHEDULED and a.start_date <= today]
+    if not due:
+        return assignments
+    latest = max(due, key=lambda a: a.start_date)
+    for assignment in assignments:
+        if assignment is latest:
+            assignment.status = Status.ACTIVE
+        elif assignment.status == Status.ACTIVE:
+            assignment.status = Status.COMPLETED
+            assignment.end_date = latest.start_date
+        elif assignment in due:
+            assignment.status = Status.COMPLETED
+    return assignments
+
+
+def current_assignment(assignments: list):
+    """La asignación activa más reciente (la que devolvía ``.filter(status=active).first()``)."""
+    active = [a for a in assignments if a.status == Status.ACTIVE]
+    return max(active, key=lambda a: a.start_date) if active else None
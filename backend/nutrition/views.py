@@ -23,6 +23,8 @@ from .serializers import (
     UserMealLogSerializer,
     UserNutritionPlanSerializer,
 )
+from .macros import deferred_macros, mark_meals_dirty, mark_plans_dirty
+from .search import TYPEAHEAD_LIMIT, TYPEAHEAD_MAX_LIMIT, rank_foods, typeahead
 
 User = get_user_model()
 
@@ -115,45 +117,9 @@ class NutritionPlanViewSet(viewsets.ModelViewSet):
             from rest_framework.exceptions import ValidationError
             raise ValidationError({"athlete_id": "Atleta no encontrado."})
 
-        # Clonar el plan
-        cloned = NutritionPlan.objects.create(
-            gym=source_plan.gym,
-            name=f"{source_plan.name} — {athlete.first_name or athlete.email}",
-            description=source_plan.description,
-            calories_per_day=source_plan.calories_per_day,
-            protein_g=source_plan.protein_g,
-            carbs_g=source_plan.carbs_g,
-            fats_g=source_plan.fats_g,
-            duration_days=source_plan.duration_days,
-            status=NutritionPlan.Status.ACTIVE,
-            points_reward=source_plan.points_reward,
-            created_for=athlete,
-        )
-
-        # Clonar MealTemplates y sus MealFoodItems
-        for template in source_plan.meal_templates.prefetch_related("food_items").all():
-            new_template = MealTemplate.objects.create(
-                plan=cloned,
-                day_number=template.day_number,
-                weekday=template.weekday,
-                meal_type=template.meal_type,
-                name=template.name,
-                description=template.description,
-                calories=template.calories,
-                protein_g=template.protein_g,
-                carbs_g=template.carbs_g,
-                fats_g=template.fats_g,
-                ingredients=template.ingredients,
-                instructions=template.instructions,
-                order=template.order,
-            )
-            for item in template.food_items.all():
-                MealFoodItem.objects.create(
-                    meal=new_template,
-                    food=item.food,
-                    quantity_g=item.quantity_g,
-                    order=item.order,
-                )
+        # Clonar el plan con sus MealTemplates y MealFoodItems (inserciones por lotes)
+        from .cloning import clone_plan
+        cloned = clone_plan(source_plan, [athlete])[0]
 
         from .serializers import NutritionPlanDetailSerializer
         return Response(
@@ -161,6 +127,84 @@ class NutritionPlanViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED,
         )
 
+    @action(detail=True, methods=["post"])
+    def clone_to_athletes(self, request, pk=None):
+        """
+        Clona un plan de biblioteca como plan personal para varios atletas a la vez
+        (cohortes de onboarding) y, opcionalmente, se los asigna.
+        POST /api/nutrition/plans/{id}/clone_to_athletes/
+        body: { "athlete_ids": ["...", ...], "assign": true, "start_date": "YYYY-MM-DD" }
+        """
+        from django.db import transaction
+        from rest_framework.exceptions import ValidationError
+        from .cloning import CLONE_MAX_ATHLETES, assign_plans, clone_plan
+
+        user = request.user
+        if user.role not in {User.Role.SUPER_ADMIN, User.Role.GYM_ADMIN, User.Role.NUTRITIONIST}:
+            raise PermissionDenied("No tienes permisos para clonar planes.")
+
+        source_plan = self.get_object()
+        athlete_ids = request.data.get("athlete_ids")
+        if not isinstance(athlete_ids, list) or not athlete_ids:
+            raise ValidationError({"athlete_ids": "Se requiere una lista de athlete_ids."})
+        athlete_ids = [str(pk) for pk in dict.fromkeys(athlete_ids)]
+        if len(athlete_ids) > CLONE_MAX_ATHLETES:
+            raise ValidationError({"athlete_ids": f"Máximo {CLONE_MAX_ATHLETES} atletas por llamada."})
+
+        start_date = None
+        if request.data.get("start_date"):
+            try:
+                start_date = date.fromisoformat(request.data["start_date"])
+            except (TypeError, ValueError):
+                raise ValidationError({"start_date": "Fecha inválida (YYYY-MM-DD)."})
+
+        athletes = User.objects.filter(id__in=athlete_ids, role=User.Role.ATHLETE)
+        if user.role != User.Role.SUPER_ADMIN:
+            athletes = athletes.filter(gym_id=user.gym_id)
+        athletes = {str(a.id): a for a in athletes}
+        missing = [pk for pk in athlete_ids if pk not in athletes]
+        if missing:
+            raise ValidationError({"athlete_ids": f"Atletas no encontrados en tu gimnasio: {', '.join(missing)}"})
+
+        def notify_assigned():
+            try:
+                from gyms.models import Notification
+                from gyms.notifications import notify_many
+                gym = source_plan.gym or getattr(user, "gym", None)
+                notify_many(
+                    athlete_ids,
+                    Notification.Type.PLAN_ASSIGNED,
+                    "Nuevo plan nutricional",
+                    f"Tu nutricionista te asignó el plan '{source_plan.name}'.",
+                    actor_id=user.id,
+                    gym_id=gym.id if gym else None,
+                    link=f"/{gym.slug}/panel/mi-nutricion" if gym else "",
+                )
+            except Exception:
+                logger.warning("clone_to_athletes: notificaciones fallidas", exc_info=True)
+
+        # Clonar y asignar van juntos: si falla la asignación no quedan copias
+        # huérfanas, y los atletas solo reciben el aviso si todo se guardó.
+        assignments = {}
+        with transaction.atomic():
+            plans = clone_plan(source_plan, [athletes[pk] for pk in athlete_ids])
+            if request.data.get("assign"):
+                assigned_by = None if user.role == User.Role.SUPER_ADMIN else user
+                assignments = {a.plan_id: a for a in assign_plans(plans, assigned_by, start_date)}
+                transaction.on_commit(notify_assigned)
+
+        return Response({
+            "created": len(plans),
+            "plans": [
+                {
+                    "athlete_id": str(plan.created_for_id),
+                    "plan_id": str(plan.id),
+                    "assignment_id": str(assignments[plan.id].id) if plan.id in assignments else None,
+                }
+                for plan in plans
+            ],
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=["post"])
     def add_day(self, request, pk=None):
         """Crea los 6 MealTemplates (uno por tipo) para un día de la semana."""
@@ -179,10 +223,11 @@ class NutritionPlanViewSet(viewsets.ModelViewSet):
             (MealTemplate.MealType.DINNER,          "Cena",         5),
             (MealTemplate.MealType.LATE_SNACK,      "Recena",       6),
         ]
-        created = [
-            MealTemplate.objects.create(plan=plan, weekday=weekday, meal_type=mt, name=name, order=order)
-            for mt, name, order in MEAL_DEFAULTS
-        ]
+        with deferred_macros():
+            created = [
+                MealTemplate.objects.create(plan=plan, weekday=weekday, meal_type=mt, name=name, order=order)
+                for mt, name, order in MEAL_DEFAULTS
+            ]
         from .serializers import MealTemplateSerializer as MTS
         return Response(MTS(created, many=True).data, status=status.HTTP_201_CREATED)
 
@@ -192,6 +237,7 @@ class NutritionPlanViewSet(viewsets.ModelViewSet):
         plan = self.get_object()
         weekday = request.data.get("weekday", "").lower()
         deleted, _ = MealTemplate.objects.filter(plan=plan, weekday=weekday).delete()
+        mark_plans_dirty(plan.id)
         return Response({"deleted": deleted}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"])
@@ -333,6 +379,69 @@ class MealTemplateViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("No tienes permisos para crear comidas.")
         serializer.save()
 
+    @action(detail=True, methods=["put"])
+    def food_items(self, request, pk=None):
+        """
+        Reemplaza la lista completa de alimentos de la comida en una transacción:
+        ítems con ``id`` se actualizan, sin ``id`` se crean y los que no vienen se
+        eliminan. Macros de la comida y totales del plan se recalculan una vez.
+        PUT /api/nutrition/meal-templates/{id}/food_items/
+        body: { "items": [{ "id": "...", "food": "...", "quantity_g": 150, "order": 1 }, ...] }
+        """
+        from django.utils import timezone
+        from rest_framework.exceptions import ValidationError
+        from .serializers import MealFoodItemBulkSerializer
+
+        user = request.user
+        meal = self.get_object()
+        if user.role not in {User.Role.SUPER_ADMIN, User.Role.GYM_ADMIN, User.Role.NUTRITIONIST} or (
+            user.role != User.Role.SUPER_ADMIN and meal.plan.gym_id != user.gym_id
+        ):
+            raise PermissionDenied("No puedes modificar los alimentos de esta comida.")
+
+        serializer = MealFoodItemBulkSerializer(data=request.data.get("items"), many=True)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data
+
+        foods = Food.objects.filter(id__in={row["food"] for row in rows})
+        if user.role != User.Role.SUPER_ADMIN:
+            foods = foods.filter(Q(gym_id=user.gym_id) | Q(gym__isnull=True))
+        foods = {food.id: food for food in foods}
+        existing = {item.id: item for item in meal.food_items.all()}
+        errors = {}
+        for index, row in enumerate(rows):
+            if row["food"] not in foods:
+                errors[index] = {"food": "Alimento no encontrado."}
+            elif "id" in row and row["id"] not in existing:
+                errors[index] = {"id": "El ítem no pertenece a esta comida."}
+        if errors:
+            raise ValidationError({"items": errors})
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for index, row in enumerate(rows, start=1):
+            item = existing.get(row.get("id")) or MealFoodItem(meal=meal)
+            item.food = foods[row["food"]]
+            item.quantity_g = row["quantity_g"]
+            item.order = row.get("order", index)
+            item.compute_macros()
+            item.updated_at = now
+            (to_update if item.pk in existing else to_create).append(item)
+
+        with deferred_macros():
+            meal.food_items.exclude(id__in=[item.pk for item in to_update]).delete()
+            MealFoodItem.objects.bulk_create(to_create)
+            MealFoodItem.objects.bulk_update(
+                to_update,
+                ["food", "quantity_g", "order", "calories", "protein_g", "carbs_g", "fats_g", "fiber_g", "updated_at"],
+            )
+            mark_meals_dirty(meal.id)
+
+        meal = self.get_queryset().prefetch_related(
+            Prefetch("food_items", queryset=MealFoodItem.objects.select_related("food"))
+        ).get(pk=meal.pk)
+        return Response(MealTemplateSerializer(meal).data)
+
 
 class UserMealLogViewSet(viewsets.ModelViewSet):
     serializer_class = UserMealLogSerializer
@@ -808,38 +917,24 @@ class UserNutritionPlanViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated])
     def my_active(self, request):
+        """
+        Plan activo del atleta con su cadena de semanas. Solo lectura: la
+        activación de planes programados la hace nutrition.transitions y aquí
+        se proyecta en memoria por si el job aún no corrió.
+        """
         user = request.user
 
-        # Auto-activate any scheduled plan whose start_date has arrived,
-        # completing any currently active plan first to avoid duplicate actives.
-        today = date.today()
-        scheduled_due = UserNutritionPlan.objects.filter(
-            user=user,
-            status=UserNutritionPlan.AssignmentStatus.SCHEDULED,
-            start_date__lte=today,
-        )
-        if scheduled_due.exists():
-            # Complete currently active plans before promoting the scheduled one
-            UserNutritionPlan.objects.filter(
-                user=user,
-                status=UserNutritionPlan.AssignmentStatus.ACTIVE,
-            ).update(status=UserNutritionPlan.AssignmentStatus.COMPLETED, end_date=today)
-            scheduled_due.update(status=UserNutritionPlan.AssignmentStatus.ACTIVE)
-
-        assignment = UserNutritionPlan.objects.filter(
-            user=user,
-            status=UserNutritionPlan.AssignmentStatus.ACTIVE,
-        ).select_related('plan', 'plan__gym', 'assigned_by').first()
-
         from datetime import timedelta
         from .serializers import NutritionPlanDetailSerializer
+        from .transitions import current_assignment, project_due_transitions
 
         # ── Chain: todas las asignaciones del atleta, ordenadas por start_date
         chain_qs = UserNutritionPlan.objects.filter(
             user=user,
-        ).select_related("plan").order_by("start_date")
+        ).select_related("plan", "plan__gym", "assigned_by").order_by("start_date")
 
-        chain_list = list(chain_qs)
+        chain_list = project_due_transitions(list(chain_qs))
+        assignment = current_assignment(chain_list)
 
         # Si no hay plan activo y el chain está vacío, devolver 404 clásico
         if not assignment and not chain_list:
@@ -1376,39 +1471,23 @@ class UserNutritionPlanViewSet(viewsets.ModelViewSet):
 
         today = date.today()
 
-        # Auto-activate scheduled plans that have started,
-        # completing any currently active plan first to avoid duplicate actives.
-        scheduled_due = UserNutritionPlan.objects.filter(
-            user_id=athlete_id,
-            status=UserNutritionPlan.AssignmentStatus.SCHEDULED,
-            start_date__lte=today,
-        )
-        if scheduled_due.exists():
-            UserNutritionPlan.objects.filter(
-                user_id=athlete_id,
-                status=UserNutritionPlan.AssignmentStatus.ACTIVE,
-            ).update(status=UserNutritionPlan.AssignmentStatus.COMPLETED, end_date=today)
-            scheduled_due.update(status=UserNutritionPlan.AssignmentStatus.ACTIVE)
-
-        active_plan = UserNutritionPlan.objects.filter(
-            user_id=athlete_id, status="active"
-        ).select_related("plan", "plan__gym", "assigned_by").prefetch_related(
-            "plan__meal_templates", "plan__meal_templates__food_items__food"
-        ).first()
-
-        scheduled_plan = UserNutritionPlan.objects.filter(
-            user_id=athlete_id, status="scheduled"
-        ).select_related("plan").first()
-
         from datetime import timedelta
-        from .serializers import NutritionPlanDetailSerializer
+        from django.db.models import prefetch_related_objects
+        from .transitions import current_assignment, project_due_transitions
 
-        # ── Chain del programa: todas las asignaciones del atleta, ordenadas por start_date
+        # ── Chain del programa: todas las asignaciones del atleta, ordenadas por start_date.
+        # Solo lectura: si el job de nutrition.transitions aún no corrió, el
+        # cambio de semana se proyecta en memoria.
         chain_qs = UserNutritionPlan.objects.filter(
             user_id=athlete_id,
-        ).select_related("plan").order_by("start_date")
+        ).select_related("plan", "plan__gym", "assigned_by").order_by("start_date")
 
-        chain_list = list(chain_qs)
+        chain_list = project_due_transitions(list(chain_qs), today)
+        active_plan = current_assignment(chain_list)
+        if active_plan:
+            prefetch_related_objects(
+                [active_plan], "plan__meal_templates", "plan__meal_templates__food_items__food"
+            )
         total_weeks = len(chain_list)
         week_number = next(
             (i + 1 for i, a in enumerate(chain_list) if active_plan and a.id == active_plan.id),
@@ -1497,10 +1576,12 @@ class UserNutritionPlanViewSet(viewsets.ModelViewSet):
             })
 
         plan_serializer = UserNutritionPlanSerializer(active_plan, context={"request": request}) if active_plan else None
-        completed_plans_qs = UserNutritionPlan.objects.filter(
-            user_id=athlete_id, status="completed"
-        ).select_related("plan").order_by("-end_date")
-        completed_serializer = UserNutritionPlanSerializer(completed_plans_qs, many=True, context={"request": request})
+        completed_plans = sorted(
+            (a for a in chain_list if a.status == UserNutritionPlan.AssignmentStatus.COMPLETED),
+            key=lambda a: a.end_date or date.min,
+            reverse=True,
+        )
+        completed_serializer = UserNutritionPlanSerializer(completed_plans, many=True, context={"request": request})
 
         # ── is_overdue usa duration_days real
         overdue_data = None
@@ -1559,20 +1640,25 @@ class MealFoodItemViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.role not in {User.Role.SUPER_ADMIN, User.Role.GYM_ADMIN, User.Role.NUTRITIONIST}:
             raise PermissionDenied("No tienes permisos para agregar alimentos a comidas.")
-        serializer.save()
+        with deferred_macros():
+            serializer.save()
 
     def perform_update(self, serializer):
         user = self.request.user
         instance = self.get_object()
         if user.role == User.Role.SUPER_ADMIN or instance.meal.plan.gym_id == user.gym_id:
-            serializer.save()
+            # Una petición recalcula una vez, también la comida de origen si el ítem se mueve.
+            with deferred_macros():
+                mark_meals_dirty(instance.meal_id)
+                serializer.save()
             return
         raise PermissionDenied("No puedes modificar este alimento.")
 
     def perform_destroy(self, instance):
         user = self.request.user
         if user.role == User.Role.SUPER_ADMIN or instance.meal.plan.gym_id == user.gym_id:
-            instance.delete()
+            with deferred_macros():
+                instance.delete()
             return
         raise PermissionDenied("No puedes eliminar este alimento.")
 
@@ -1581,30 +1667,54 @@ class FoodViewSet(viewsets.ModelViewSet):
     serializer_class = FoodSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
+    def _visible_foods(self):
+        """Alimentos visibles para el usuario, con los filtros de grupo y alcance."""
         user = self.request.user
-        from django.db.models import Q
-        queryset = Food.objects.select_related("gym", "created_by")
+        params = self.request.query_params
+        queryset = Food.objects.all()
+
+        # Nutricionista, gym_admin y atletas ven alimentos de su gym + globales (CENAN)
+        if user.role != User.Role.SUPER_ADMIN:
+            queryset = queryset.filter(Q(gym_id=user.gym_id) | Q(gym__isnull=True))
 
         # Filtro por grupo si se provee
-        group = self.request.query_params.get("group")
+        group = params.get("group") or params.get("food_group")
         if group:
             queryset = queryset.filter(food_group=group)
 
-        # Búsqueda por nombre
-        search = self.request.query_params.get("search")
-        if search:
-            queryset = queryset.filter(name__icontains=search)
+        # Alcance: solo CENAN (global) o solo los creados en gimnasios (gym)
+        scope = params.get("scope")
+        if scope == "global":
+            queryset = queryset.filter(gym__isnull=True)
+        elif scope == "gym":
+            queryset = queryset.filter(gym__isnull=False)
+        return queryset
 
-        if user.role == User.Role.SUPER_ADMIN:
-            return queryset
+    def get_queryset(self):
+        queryset = self._visible_foods().select_related("gym", "created_by")
 
-        # Nutricionista y gym_admin ven alimentos de su gym + globales (CENAN)
-        if user.role in {User.Role.GYM_ADMIN, User.Role.NUTRITIONIST}:
-            return queryset.filter(Q(gym=user.gym) | Q(gym__isnull=True))
+        # Búsqueda por nombre, sin tildes y ordenada por relevancia
+        search = self.request.query_params.get("search")
+        if search:
+            queryset = rank_foods(queryset, search)
+        return queryset
 
-        # Atletas solo ven alimentos globales y de su gym
-        return queryset.filter(Q(gym=user.gym) | Q(gym__isnull=True))
+    @action(detail=False, methods=["get"])
+    def typeahead(self, request):
+        """Autocompletado del catálogo: ``?q=plat&group=fruits&scope=global&limit=10``."""
+        user = request.user
+        params = request.query_params
+        try:
+            limit = min(max(int(params.get("limit", TYPEAHEAD_LIMIT)), 1), TYPEAHEAD_MAX_LIMIT)
+        except ValueError:
+            limit = TYPEAHEAD_LIMIT
+        scope_key = ":".join([
+            "all" if user.role == User.Role.SUPER_ADMIN else str(user.gym_id),
+            params.get("group") or params.get("food_group") or "",
+            params.get("scope") or "",
+        ])
+        results = typeahead(self._visible_foods(), params.get("q", ""), scope_key, limit)
+        return Response({"results": results})
 
     def perform_create(self, serializer):
         user = self.request.user
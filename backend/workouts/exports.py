@@ -0,0 +1,30 @@
+"""
+workouts/exports.py
+───────────────────
+Filas de la exportación CSV de sesiones de entrenamiento (ver core.exports).
+"""
+
+from __future__ import annotations
+
+from core.exports import EXPORT_CHUNK_SIZE, local_dt
+
+from .models import WorkoutSession
+
+SESSIONS_HEADER = [
+    "Fecha", "Atleta", "Email", "Rutina", "Estado", "Duración (min)", "Esfuerzo percibido", "% Completado",
+]
+
+
+def session_rows(sessions, chunk_size: int = EXPORT_CHUNK_SIZE):
+    status_labels = dict(WorkoutSession.Status.choices)
+    rows = sessions.values_list(
+        "performed_at", "user__first_name", "user__last_name", "user__email", "routine__name",
+        "status", "duration_minutes", "perceived_exertion", "completion_percentage",
+    )
+    for performed_at, first, last, email, routine, state, minutes, exertion, completion in rows.iterator(
+        chunk_size=chunk_size
+    ):
+        yield [
+            local_dt(performed_at), f"{first} {last}".strip(), email, routine or "",
+            status_labels.get(state, state), minutes, exertion, completion,
+        ]
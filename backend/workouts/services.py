@@ -0,0 +1,180 @@
+"""
+workouts/services.py
+────────────────────
+Cálculos de adherencia de entrenamiento para el panel del coach.
+
+El motor trabaja por conjuntos: todas las métricas se obtienen con un número
+fijo de consultas agrupadas (``values().annotate()``), sin importar cuántos
+atletas tenga asignados el coach o el gym.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from .models import UserRoutineAssignment, WeeklyRoutinePlan, WorkoutSession
+
+User = get_user_model()
+
+ADHERENCE_WINDOW_DAYS = 30
+INACTIVITY_ALERT_DAYS = 7
+
+
+def _local_date(dt) -> date:
+    return timezone.localtime(dt).date()
+
+
+def build_coach_adherence(athlete_ids, today: date) -> list[dict]:
+    """
+    Devuelve el payload de adherencia de los atletas indicados.
+
+    ``athlete_ids`` puede ser una lista o un queryset ``values_list("id")``;
+    en el segundo caso se usa como subconsulta y no se materializa en Python.
+
+    Consultas fijas: atletas, asignaciones activas, sesiones por rutina,
+    totales por atleta, slots del plan semanal y semanas ya aprobadas.
+    """
+    from gamification.models import UserPoints
+
+    since = today - timedelta(days=ADHERENCE_WINDOW_DAYS)
+    current_week_start = today - timedelta(days=today.weekday())
+    current_week_end   = current_week_start + timedelta(days=6)
+    completed = Q(status=WorkoutSession.Status.COMPLETED)
+
+    athletes = list(
+        User.objects.filter(id__in=athlete_ids)
+        .only("id", "first_name", "last_name", "email")
+    )
+
+    # Asignaciones activas agrupadas por atleta
+    assignments_by_user: dict = defaultdict(list)
+    for assignment in (
+        UserRoutineAssignment.objects.filter(
+            user_id__in=athlete_ids,
+            status=UserRoutineAssignment.AssignmentStatus.ACTIVE,
+        ).select_related("routine")
+    ):
+        assignments_by_user[assignment.user_id].append(assignment)
+
+    # Sesiones completadas de los últimos 30 días por (atleta, rutina)
+    routine_stats = {
+        (row["user_id"], row["routine_id"]): row
+        for row in (
+            WorkoutSession.objects.filter(
+                completed,
+                user_id__in=athlete_ids,
+                routine__isnull=False,
+                performed_at__date__gte=since,
+            )
+            .values("user_id", "routine_id")
+            .annotate(
+                session_count=Count("id"),
+                last_performed=Max("performed_at"),
+                avg_completion=Avg("completion_percentage"),
+            )
+            .order_by()
+        )
+    }
+
+    # Totales por atleta: 30 días, última actividad y semana actual
+    user_stats = {
+        row["user_id"]: row
+        for row in (
+            WorkoutSession.objects.filter(completed, user_id__in=athlete_ids)
+            .values("user_id")
+            .annotate(
+                total_30d=Count("id", filter=Q(performed_at__date__gte=since)),
+                last_any=Max("performed_at"),
+                week_sessions=Count(
+                    "id",
+                    filter=Q(
+                        performed_at__date__gte=current_week_start,
+                        performed_at__date__lte=current_week_end,
+                    ),
+                ),
+            )
+            .order_by()
+        )
+    }
+
+    weekly_slots = dict(
+        WeeklyRoutinePlan.objects.filter(athlete_id__in=athlete_ids)
+        .values("athlete_id")
+        .annotate(n=Count("id"))
+        .order_by()
+        .values_list("athlete_id", "n")
+    )
+
+    approved_this_week = set(
+        UserPoints.objects.filter(
+            user_id__in=athlete_ids,
+            source="workout_week",
+            week_start=current_week_start,
+        ).values_list("user_id", flat=True)
+    )
+
+    result = []
+    for athlete in athletes:
+        routines_data = []
+        for assignment in assignments_by_user.get(athlete.id, []):
+            stats = routine_stats.get((athlete.id, assignment.routine_id), {})
+            session_count = stats.get("session_count", 0)
+            last_performed = stats.get("last_performed")
+
+            # Días desde asignación para calcular adherencia esperada (1 vez por semana)
+            days_active = max((today - assignment.start_date).days, 1)
+            expected = max(days_active // 7, 1)
+            adherence_pct = min(round((session_count / expected) * 100), 100)
+
+            routines_data.append({
+                "routine_id": str(assignment.routine.id),
+                "routine_name": assignment.routine.name,
+                "assigned_since": assignment.start_date.isoformat(),
+                "sessions_last_30d": session_count,
+                "adherence_pct": adherence_pct,
+                "last_completed": last_performed.date().isoformat() if last_performed else None,
+                "days_since_last": (today - _local_date(last_performed)).days if last_performed else None,
+                "avg_completion": round(float(stats.get("avg_completion") or 0), 2),
+            })
+
+        totals = user_stats.get(athlete.id, {})
+        total_sessions = totals.get("total_30d", 0)
+        slots = weekly_slots.get(athlete.id, 0)
+
+        # Adherencia: misma fórmula que el panel (plan semanal × 4 semanas)
+        if slots:
+            avg_adherence = min(round((total_sessions / max(slots * 4, 1)) * 100), 100)
+        elif routines_data:
+            avg_adherence = round(sum(r["adherence_pct"] for r in routines_data) / len(routines_data))
+        else:
+            avg_adherence = 0
+
+        last_any = totals.get("last_any")
+        days_inactive = (today - _local_date(last_any)).days if last_any else None
+
+        pending_approval = (
+            slots > 0
+            and totals.get("week_sessions", 0) >= slots
+            and athlete.id not in approved_this_week
+        )
+
+        result.append({
+            "athlete_id": str(athlete.id),
+            "athlete_name": f"{athlete.first_name} {athlete.last_name}".strip() or athlete.email,
+            "athlete_email": athlete.email,
+            "routines": routines_data,
+            "total_sessions_30d": total_sessions,
+            "avg_adherence_pct": avg_adherence,
+            "days_inactive": days_inactive,
+            "alert": days_inactive is None or days_inactive >= INACTIVITY_ALERT_DAYS,
+            "pending_approval": pending_approval,
+            "current_week_start": current_week_start.isoformat(),
+        })
+
+    result.sort(key=lambda x: (not x["alert"], -x["avg_adherence_pct"]))
+    return result
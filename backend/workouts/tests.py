@@ -1,3 +1,99 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from gyms.models import CoachAssignment, Gym
+from .models import UserRoutineAssignment, WeeklyRoutinePlan, WorkoutRoutine, WorkoutSession
+
+User = get_user_model()
+
+
+class CoachAdherenceTests(TestCase):
+    """El panel de adherencia debe resolver todo con un número fijo de consultas."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.gym = Gym.objects.create(name="Test Gym", slug="adherence-gym")
+        self.coach = User.objects.create_user(
+            email="coach@adherence.com", password="pass123",
+            first_name="Coach", last_name="Test",
+            role=User.Role.COACH, gym=self.gym,
+        )
+        self.routine = WorkoutRoutine.objects.create(gym=self.gym, name="Full body")
+        self.today = timezone.localdate()
+
+    def _add_athlete(self, idx, sessions=2):
+        athlete = User.objects.create_user(
+            email=f"athlete{idx}@adherence.com", password="pass123",
+            first_name="Atleta", last_name=str(idx),
+            role=User.Role.ATHLETE, gym=self.gym,
+        )
+        CoachAssignment.objects.create(coach=self.coach, athlete=athlete, gym=self.gym)
+        UserRoutineAssignment.objects.create(
+            user=athlete, routine=self.routine, start_date=self.today - timedelta(days=28),
+        )
+        WeeklyRoutinePlan.objects.create(athlete=athlete, routine=self.routine, day_of_week=0)
+        for i in range(sessions):
+            WorkoutSession.objects.create(
+                user=athlete, gym=self.gym, routine=self.routine,
+                performed_at=timezone.now() - timedelta(days=i),
+                status=WorkoutSession.Status.COMPLETED,
+                completion_percentage=50 + i * 50,
+            )
+        return athlete
+
+    def _get(self):
+        self.client.force_authenticate(user=self.coach)
+        return self.client.get("/api/workouts/adherence/")
+
+    def test_payload(self):
+        self._add_athlete(1)
+        res = self._get()
+        self.assertEqual(res.status_code, 200)
+        row = res.data[0]
+        self.assertEqual(row["total_sessions_30d"], 2)
+        self.assertEqual(row["days_inactive"], 0)
+        self.assertFalse(row["alert"])
+        routine = row["routines"][0]
+        self.assertEqual(routine["sessions_last_30d"], 2)
+        self.assertEqual(routine["avg_completion"], 75.0)
+
+    def test_query_count_independent_of_athletes(self):
+        self._add_athlete(1)
+        with self.assertNumQueries(6):
+            self._get()
+        for idx in range(2, 6):
+            self._add_athlete(idx)
+        with self.assertNumQueries(6):
+            res = self._get()
+        self.assertEqual(len(res.data), 5)
+
+
+class SessionExportTests(TestCase):
+    def test_sessions_export_streams_gym_history(self):
+        gym = Gym.objects.create(name="Export Gym", slug="sessions-export-gym")
+        coach = User.objects.create_user(
+            email="coach@sessions.com", password="pass123", role=User.Role.COACH, gym=gym,
+        )
+        athlete = User.objects.create_user(
+            email="athlete@sessions.com", password="pass123", first_name="Leo", last_name="Fit",
+            role=User.Role.ATHLETE, gym=gym,
+        )
+        for days in (2, 90):
+            WorkoutSession.objects.create(
+                user=athlete, gym=gym, status=WorkoutSession.Status.COMPLETED,
+                performed_at=timezone.now() - timedelta(days=days),
+            )
+
+        client = APIClient()
+        client.force_authenticate(user=coach)
+        res = client.get("/api/workouts/sessions/export/")
+        lines = b"".join(res.streaming_content).decode("utf-8-sig").strip().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Leo Fit,athlete@sessions.com,,Completed,30,5", lines[1])
 
-# Create your tests here.
+        client.force_authenticate(user=athlete)
+        self.assertEqual(client.get("/api/workouts/sessions/export/").status_code, 403)
@@ -2,15 +2,18 @@ from datetime import date, timedelta
 
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Count, F, Max, Prefetch, Q
+from django.db.models import Count, F, Prefetch, Q
 from django.utils import timezone
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 
+from core.db_router import replica_reads
 from core.filters import global_or_user_gym_filter
+from core.pagination import KeysetPagination, cursor_requested
 from .models import Exercise, RoutineExercise, SessionExerciseLog, UserRoutineAssignment, WorkoutRoutine, WorkoutSession, WeeklyRoutinePlan
+from .services import build_coach_adherence
 from .serializers import (
     ExerciseSerializer,
     RoutineExerciseSerializer,
@@ -348,6 +351,34 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
             return queryset.filter(user=user)
         return queryset.none()
 
+    @action(detail=False, methods=["get"], url_path="export")
+    @replica_reads
+    def export(self, request):
+        """
+        GET /api/workouts/sessions/export/?from=YYYY-MM-DD&to=YYYY-MM-DD
+        Historial de sesiones del gimnasio como CSV (streaming). Solo staff.
+        """
+        from core.exports import csv_stream_response, datetime_bounds, parse_date_range
+        from .exports import SESSIONS_HEADER, session_rows
+
+        if request.user.role not in {User.Role.SUPER_ADMIN, User.Role.GYM_ADMIN, User.Role.COACH}:
+            raise PermissionDenied("No tienes permisos.")
+
+        start, end = parse_date_range(request.query_params)
+        lower, upper = datetime_bounds(start, end)
+        sessions = (
+            self.get_queryset()
+            .prefetch_related(None)
+            .filter(performed_at__gte=lower, performed_at__lt=upper)
+            .order_by("performed_at", "id")
+        )
+        return csv_stream_response(
+            f"sesiones_{start}_{end}.csv",
+            SESSIONS_HEADER,
+            session_rows(sessions),
+            request=request,
+        )
+
     @action(detail=False, methods=["get"])
     def my_history(self, request):
         """Historial de sesiones completadas del atleta con logs de ejercicios."""
@@ -355,29 +386,33 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
         if user.role != User.Role.ATHLETE:
             return Response({"detail": "Solo disponible para atletas."}, status=status.HTTP_403_FORBIDDEN)
 
-        try:
-            page = max(1, int(request.query_params.get("page", 1)))
-        except (ValueError, TypeError):
-            page = 1
-        page_size = 10
-
         sessions = (
             WorkoutSession.objects
             .filter(user=user, status=WorkoutSession.Status.COMPLETED)
             .select_related("routine")
             .prefetch_related("exercise_logs__routine_exercise__exercise")
-            .order_by("-performed_at")
+            .order_by("-performed_at", "-id")
         )
 
-        total = sessions.count()
-        offset = (page - 1) * page_size
-        page_qs = sessions[offset: offset + page_size]
+        # ?pagination=cursor / ?cursor=… → keyset sobre (user, status, performed_at)
+        keyset = None
+        if cursor_requested(request):
+            keyset = KeysetPagination(ordering=("-performed_at", "-id"))
+            keyset.page_size = 10
+            page_qs = keyset.paginate_queryset(sessions, request, view=self)
+        else:
+            try:
+                page = max(1, int(request.query_params.get("page", 1)))
+            except (ValueError, TypeError):
+                page = 1
+            page_size = 10
+            total = sessions.count()
+            offset = (page - 1) * page_size
+            page_qs = sessions[offset: offset + page_size]
 
         results = []
         for s in page_qs:
-            logs = s.exercise_logs.all()
-            total_ex   = logs.count()
-            done_ex    = logs.filter(completed=True).count()
+            logs = list(s.exercise_logs.all())
             results.append({
                 "id":                   str(s.id),
                 "routine_name":         s.routine.name if s.routine else None,
@@ -386,8 +421,8 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
                 "perceived_exertion":   s.perceived_exertion,
                 "completion_percentage": float(s.completion_percentage),
                 "points_awarded":       s.points_awarded,
-                "exercises_done":       done_ex,
-                "exercises_total":      total_ex,
+                "exercises_done":       sum(1 for log in logs if log.completed),
+                "exercises_total":      len(logs),
                 "exercise_logs": [
                     {
                         "exercise_name":  log.routine_exercise.exercise.name,
@@ -399,6 +434,8 @@ class WorkoutSessionViewSet(viewsets.ModelViewSet):
                 ],
             })
 
+        if keyset is not None:
+            return keyset.get_paginated_response(results)
         return Response({
             "count":    total,
             "page":     page,
@@ -507,125 +544,15 @@ def coach_adherence(request):
 
     # Atletas asignados al coach (o todos del gym si es admin)
     if user.role == User.Role.COACH:
-        athlete_ids = list(
-            CoachAssignment.objects.filter(coach=user, is_active=True)
-            .values_list("athlete_id", flat=True)
-        )
+        athlete_ids = CoachAssignment.objects.filter(
+            coach=user, is_active=True,
+        ).values_list("athlete_id", flat=True)
     else:
-        athlete_ids = list(
-            User.objects.filter(gym_id=user.gym_id, role=User.Role.ATHLETE)
-            .values_list("id", flat=True)
-        )
-
-    athletes = User.objects.filter(id__in=athlete_ids).only("id", "first_name", "last_name", "email")
-
-    since = today - timedelta(days=30)
-    result = []
-
-    for athlete in athletes:
-        assignments = UserRoutineAssignment.objects.filter(
-            user=athlete,
-            status=UserRoutineAssignment.AssignmentStatus.ACTIVE,
-        ).select_related("routine")
-
-        routines_data = []
-        for assignment in assignments:
-            sessions = WorkoutSession.objects.filter(
-                user=athlete,
-                routine=assignment.routine,
-                status=WorkoutSession.Status.COMPLETED,
-                performed_at__date__gte=since,
-            ).order_by("-performed_at")
-
-            last_session = sessions.first()
-            session_count = sessions.count()
-
-            # Días desde asignación para calcular adherencia esperada (1 vez por semana)
-            days_active = max((today - assignment.start_date).days, 1)
-            expected = max(days_active // 7, 1)
-            adherence_pct = min(round((session_count / expected) * 100), 100)
-
-            days_since_last = None
-            if last_session:
-                days_since_last = (today - timezone.localtime(last_session.performed_at).date()).days
-
-            routines_data.append({
-                "routine_id": str(assignment.routine.id),
-                "routine_name": assignment.routine.name,
-                "assigned_since": assignment.start_date.isoformat(),
-                "sessions_last_30d": session_count,
-                "adherence_pct": adherence_pct,
-                "last_completed": last_session.performed_at.date().isoformat() if last_session else None,
-                "days_since_last": days_since_last,
-                "avg_completion": float(
-                    sessions.aggregate(avg=Count("completion_percentage"))["avg"] or 0
-                ),
-            })
+        athlete_ids = User.objects.filter(
+            gym_id=user.gym_id, role=User.Role.ATHLETE,
+        ).values_list("id", flat=True)
 
-        # Contar TODAS las sesiones completadas (no solo las de rutinas asignadas)
-        total_sessions = WorkoutSession.objects.filter(
-            user=athlete,
-            status=WorkoutSession.Status.COMPLETED,
-            performed_at__date__gte=since,
-        ).count()
-
-        # Adherencia: misma fórmula que el panel (plan semanal × 4 semanas)
-        weekly_slots = WeeklyRoutinePlan.objects.filter(athlete=athlete).count()
-        if weekly_slots:
-            expected = max(weekly_slots * 4, 1)
-            avg_adherence = min(round((total_sessions / expected) * 100), 100)
-        elif routines_data:
-            avg_adherence = round(sum(r["adherence_pct"] for r in routines_data) / len(routines_data))
-        else:
-            avg_adherence = 0
-
-        # Última actividad (cualquier sesión)
-        last_any = WorkoutSession.objects.filter(
-            user=athlete,
-            status=WorkoutSession.Status.COMPLETED,
-        ).aggregate(last=Max("performed_at"))["last"]
-
-        days_inactive = None
-        if last_any:
-            days_inactive = (today - timezone.localtime(last_any).date()).days
-
-        # Semana actual pendiente de aprobación
-        from gamification.models import UserPoints
-        current_week_start = today - timedelta(days=today.weekday())
-        current_week_end   = current_week_start + timedelta(days=6)
-        week_slots_count   = WeeklyRoutinePlan.objects.filter(athlete=athlete).count()
-        week_sessions      = WorkoutSession.objects.filter(
-            user=athlete,
-            status=WorkoutSession.Status.COMPLETED,
-            performed_at__date__gte=current_week_start,
-            performed_at__date__lte=current_week_end,
-        ).count()
-        already_approved_this_week = UserPoints.objects.filter(
-            user=athlete,
-            source="workout_week",
-            week_start=current_week_start,
-        ).exists()
-        pending_approval = (
-            week_slots_count > 0
-            and week_sessions >= week_slots_count
-            and not already_approved_this_week
-        )
-
-        result.append({
-            "athlete_id": str(athlete.id),
-            "athlete_name": f"{athlete.first_name} {athlete.last_name}".strip() or athlete.email,
-            "athlete_email": athlete.email,
-            "routines": routines_data,
-            "total_sessions_30d": total_sessions,
-            "avg_adherence_pct": avg_adherence,
-            "days_inactive": days_inactive,
-            "alert": days_inactive is None or days_inactive >= 7,
-            "pending_approval": pending_approval,
-            "current_week_start": current_week_start.isoformat(),
-        })
-
-    result.sort(key=lambda x: (not x["alert"], -x["avg_adherence_pct"]))
-    return Response(result)
+    return Response(build_coach_adherence(athlete_ids, today))
 
 
 @api_view(["POST"])
@@ -1052,11 +979,8 @@ def coach_athlete_detail(request, athlete_id):
         week_points = 100
 
     # ── 6. Resumen del atleta ─────────────────────────────────────────────────
-    from gamification.models import UserPoints
-    from django.db.models import Sum
-    athlete_points = UserPoints.objects.filter(
-        user=athlete, status=UserPoints.Status.APPROVED
-    ).aggregate(total=Sum("points"))["total"] or 0
+    from gamification.services import approved_points
+    athlete_points = approved_points(athlete)
     athlete_summary = {
         "id":           str(athlete.id),
         "full_name":    athlete.get_full_name() or athlete.email,
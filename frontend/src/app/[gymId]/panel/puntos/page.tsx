@@ -42,7 +42,7 @@ function sourceIcon(source: string) {
 }
 
 function sourceLabel(source: string): string {
-  if (source.startsWith('nutrition_daily_')) return 'Nutrición diaria'
+  if (source === 'nutrition_daily' || source.startsWith('nutrition_daily_')) return 'Nutrición diaria'
   if (source === 'workout_week') return 'Semana de entrenamiento'
   if (source === 'workout_session') return 'Sesión de entrenamiento'
   if (source === 'reward_redemption') return 'Canje de recompensa'